@@ -8,6 +8,7 @@ from .cuentas_multi_moneda import router as cuentas_multi_moneda_router
 from .trm import router as trm_router
 from .conceptos_flujo_caja import router as conceptos_flujo_caja_router
 from .transacciones_flujo_caja import router as transacciones_flujo_caja_router
+from .escenarios_flujo_caja import router as escenarios_flujo_caja_router
 from .saldo_inicial import router as saldo_inicial_router
 from .diferencia_saldos import router as diferencia_saldos_router
 from .gmf_config import router as gmf_config_router
@@ -29,6 +30,7 @@ api_router.include_router(cuentas_multi_moneda_router)
 api_router.include_router(trm_router, prefix="/trm", tags=["TRM"])
 api_router.include_router(conceptos_flujo_caja_router)
 api_router.include_router(transacciones_flujo_caja_router)
+api_router.include_router(escenarios_flujo_caja_router)
 api_router.include_router(saldo_inicial_router, prefix="/saldo-inicial", tags=["Saldo Inicial"])
 api_router.include_router(diferencia_saldos_router, prefix="/diferencia-saldos", tags=["Diferencia Saldos"])
 api_router.include_router(gmf_config_router, prefix="/gmf-config", tags=["GMF Config"])
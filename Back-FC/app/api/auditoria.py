@@ -3,9 +3,11 @@ from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta, date
 
-from ..core.database import get_db
+from ..core.database import get_db, get_read_db
+from ..core.serializacion import respuesta_json
 from ..services.auth_service import get_current_user, check_user_role
-from ..services.auditoria_service import AuditoriaService
+from ..services.auditoria_service import AuditoriaService, log_reporte
+from ..services.exportacion_service import en_sesion_propia, encabezados_auditoria, filas_auditoria, respuesta_exportacion
 from ..models.usuarios import Usuario
 from ..schemas.auditoria import (
     RegistroAuditoriaResponse,
@@ -22,6 +24,7 @@ router = APIRouter(prefix="/auditoria", tags=["auditoria"])
 
 @router.get("/registros", response_model=AuditoriaListResponse)
 def obtener_registros_auditoria(
+    request: Request,
     pagina: int = Query(1, ge=1, description="Número de página"),
     limite: int = Query(50, ge=1, le=1000, description="Registros por página"),
     usuario_id: Optional[int] = Query(None, description="Filtrar por usuario"),
@@ -30,7 +33,7 @@ def obtener_registros_auditoria(
     fecha_inicio: Optional[date] = Query(None, description="Fecha inicio (YYYY-MM-DD)"),
     fecha_fin: Optional[date] = Query(None, description="Fecha fin (YYYY-MM-DD)"),
     busqueda: Optional[str] = Query(None, description="Búsqueda en descripción, usuario o entidad"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: Usuario = Depends(check_user_role(["Administrador", "administrador"]))
 ):
     """
@@ -46,7 +49,7 @@ def obtener_registros_auditoria(
     skip = (pagina - 1) * limite
     
     # Obtener registros
-    registros, total = AuditoriaService.obtener_registros(
+    registros, total = AuditoriaService.obtener_registros_serializados(
         db=db,
         skip=skip,
         limit=limite,
@@ -61,19 +64,50 @@ def obtener_registros_auditoria(
     # Calcular total de páginas
     total_paginas = (total + limite - 1) // limite
     
-    return AuditoriaListResponse(
-        registros=registros,
-        total=total,
-        pagina=pagina,
-        limite=limite,
-        total_paginas=total_paginas
+    return respuesta_json(request, {
+        "registros": registros,
+        "total": total,
+        "pagina": pagina,
+        "limite": limite,
+        "total_paginas": total_paginas
+    })
+
+@router.post("/exportar")
+def exportar_registros_auditoria(
+    filtros: ExportarAuditoriaRequest,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(check_user_role(["Administrador", "administrador"]))
+):
+    """
+    Exportar registros de auditoría en streaming (Excel o CSV) con los filtros del listado.
+    Solo disponible para administradores.
+    """
+    formatos = {"excel": "xlsx", "csv": "csv"}
+    if filtros.formato not in formatos:
+        raise HTTPException(status_code=400, detail=f"Formato no soportado para exportación: {filtros.formato}")
+    
+    log_reporte(db, current_user, "auditoria", filtros.model_dump(mode="json"), request)
+    
+    return respuesta_exportacion(
+        request,
+        en_sesion_propia(filas_auditoria, {
+            "usuario_id": filtros.usuario_id,
+            "accion": filtros.accion,
+            "modulo": filtros.modulo,
+            "fecha_inicio": filtros.fecha_inicio,
+            "fecha_fin": filtros.fecha_fin,
+        }, filtros.incluir_valores),
+        encabezados_auditoria(filtros.incluir_valores),
+        formatos[filtros.formato],
+        f"auditoria_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
     )
 
 @router.get("/estadisticas", response_model=EstadisticasAuditoria)
 def obtener_estadisticas_auditoria(
     fecha_inicio: Optional[date] = Query(None, description="Fecha inicio para estadísticas"),
     fecha_fin: Optional[date] = Query(None, description="Fecha fin para estadísticas"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: Usuario = Depends(check_user_role(["Administrador", "administrador"]))
 ):
     """
@@ -130,7 +164,7 @@ def obtener_estadisticas_auditoria(
 
 @router.get("/usuarios-activos")
 def obtener_usuarios_activos(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: Usuario = Depends(check_user_role(["Administrador", "administrador"]))
 ):
     """
@@ -142,7 +176,7 @@ def obtener_usuarios_activos(
 @router.get("/registro/{registro_id}", response_model=RegistroAuditoriaResponse)
 def obtener_detalle_registro(
     registro_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: Usuario = Depends(check_user_role(["Administrador", "administrador"]))
 ):
     """
@@ -188,7 +222,7 @@ def crear_registro_manual(
 @router.get("/resumen-diario/{fecha}", response_model=ResumenDiarioAuditoria)
 def obtener_resumen_diario(
     fecha: date,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: Usuario = Depends(check_user_role(["Administrador", "administrador", "Tesorería", "tesoreria", "Pagaduría", "pagaduria"]))
 ):
     """
@@ -235,7 +269,7 @@ def obtener_resumen_diario(
 def obtener_actividad_usuario(
     usuario_id: int,
     dias: int = Query(30, ge=1, le=365, description="Días hacia atrás para analizar"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: Usuario = Depends(check_user_role(["Administrador", "administrador"]))
 ):
     """
@@ -13,6 +13,7 @@ from ..services.auth_service import (
     get_password_hash
 )
 from ..models.usuarios import Usuario
+from ..core.principal_cache import UsuarioPrincipal
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 settings = get_settings()
@@ -85,13 +86,13 @@ async def register_user(
     return UserResponse.model_validate(new_user)
 
 @router.get("/me", response_model=UserResponse)
-async def read_users_me(current_user: Usuario = Depends(get_current_user)):
+async def read_users_me(current_user: UsuarioPrincipal = Depends(get_current_user)):
     """Obtener información del usuario actual"""
     return UserResponse.model_validate(current_user)
 
 @router.post("/refresh", response_model=Token)
 async def refresh_access_token(
-    current_user: Usuario = Depends(get_current_user),
+    current_user: UsuarioPrincipal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Renovar token de acceso usando el token actual"""
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from typing import List
 from ..core.database import get_db
+from ..core.etag import VersionCondicional
 from ..models.bancos import Banco
 from pydantic import BaseModel
 
@@ -14,7 +15,7 @@ class BancoResponse(BaseModel):
     class Config:
         from_attributes = True
 
-@router.get("/", response_model=List[BancoResponse])
+@router.get("/", response_model=List[BancoResponse], dependencies=[Depends(VersionCondicional("cuentas"))])
 def get_all_banks(db: Session = Depends(get_db)):
     """Obtener todos los bancos disponibles"""
     try:
@@ -25,7 +26,7 @@ def get_all_banks(db: Session = Depends(get_db)):
         raise
 
 # Endpoint temporal sin autenticación para desarrollo
-@router.get("/test", response_model=List[BancoResponse])
+@router.get("/test", response_model=List[BancoResponse], dependencies=[Depends(VersionCondicional("cuentas"))])
 def test_get_all_banks(db: Session = Depends(get_db)):
     """TEST: Obtener todos los bancos disponibles (sin autenticación)"""
     try:
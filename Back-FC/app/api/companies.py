@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from ..core.database import get_db
+from ..core.etag import VersionCondicional
 from ..models.companias import Compania
 from ..models.bancos import Banco
 from ..schemas.companies import (
@@ -20,7 +21,7 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/companies", tags=["companies"])
 
 # Endpoint temporal para testing sin autenticación
-@router.get("/test", response_model=List[CompaniaListResponse])
+@router.get("/test", response_model=List[CompaniaListResponse], dependencies=[Depends(VersionCondicional("companias"))])
 async def get_companies_test(
     db: Session = Depends(get_db)
 ):
@@ -226,7 +227,7 @@ async def delete_company_test(
     except Exception as e:
         logger.warning(f"Error en auditoría de eliminación de empresa: {e}")
 
-@router.get("/", response_model=List[CompaniaListResponse])
+@router.get("/", response_model=List[CompaniaListResponse], dependencies=[Depends(VersionCondicional("companias"))])
 async def get_companies(
     skip: int = Query(0, ge=0, description="Número de registros a omitir"),
     limit: int = Query(100, ge=1, le=100, description="Número máximo de registros a retornar"),
@@ -249,7 +250,7 @@ async def get_companies(
     companies = query.offset(skip).limit(limit).all()
     return companies
 
-@router.get("/{company_id}", response_model=CompaniaResponse)
+@router.get("/{company_id}", response_model=CompaniaResponse, dependencies=[Depends(VersionCondicional("companias"))])
 async def get_company(
     company_id: int,
     db: Session = Depends(get_db),
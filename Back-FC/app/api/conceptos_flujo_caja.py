@@ -7,6 +7,8 @@ from sqlalchemy.orm import Session
 import logging
 
 from ..core.database import get_db
+from ..core.etag import VersionCondicional
+from ..core.catalogo_cache import catalogo_cache
 from ..models import ConceptoFlujoCaja
 from ..schemas.flujo_caja import (
     ConceptoFlujoCajaCreate,
@@ -31,6 +33,7 @@ def crear_concepto(
     try:
         service = ConceptoFlujoCajaService(db)
         concepto = service.crear_concepto(concepto_data)
+        catalogo_cache.invalidar()
         
         # 📝 AUDITORÍA: Registrar creación de concepto
         try:
@@ -58,7 +61,7 @@ def crear_concepto(
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error interno del servidor")
 
-@router.get("/", response_model=List[ConceptoFlujoCajaResponse])
+@router.get("/", response_model=List[ConceptoFlujoCajaResponse], dependencies=[Depends(VersionCondicional("conceptos"))])
 def obtener_conceptos(
     area: Optional[AreaConceptoSchema] = Query(None, description="Filtrar por área"),
     activos_only: bool = Query(True, description="Solo conceptos activos"),
@@ -79,7 +82,7 @@ def obtener_conceptos(
     
     return conceptos
 
-@router.get("/por-area/{area}", response_model=List[ConceptoFlujoCajaResponse])
+@router.get("/por-area/{area}", response_model=List[ConceptoFlujoCajaResponse], dependencies=[Depends(VersionCondicional("conceptos"))])
 def obtener_conceptos_por_area(
     area: AreaConceptoSchema,
     activos_only: bool = Query(True, description="Solo conceptos activos"),
@@ -91,7 +94,7 @@ def obtener_conceptos_por_area(
     conceptos = service.obtener_conceptos_por_area(area, activos_only)
     return conceptos
 
-@router.get("/{concepto_id}", response_model=ConceptoFlujoCajaResponse)
+@router.get("/{concepto_id}", response_model=ConceptoFlujoCajaResponse, dependencies=[Depends(VersionCondicional("conceptos"))])
 def obtener_concepto(
     concepto_id: int,
     db: Session = Depends(get_db),
@@ -130,6 +133,7 @@ def actualizar_concepto(
         }
         
         concepto = service.actualizar_concepto(concepto_id, concepto_data)
+        catalogo_cache.invalidar()
         
         if not concepto:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Concepto no encontrado")
@@ -183,6 +187,7 @@ def eliminar_concepto(
     area_concepto = concepto.area.value if hasattr(concepto.area, 'value') else str(concepto.area)
     
     eliminado = service.eliminar_concepto(concepto_id)
+    catalogo_cache.invalidar()
     
     if not eliminado:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Concepto no encontrado")
@@ -207,7 +212,7 @@ def eliminar_concepto(
     except Exception as e:
         logger.warning(f"Error en auditoría de eliminación de concepto: {e}")
 
-@router.get("/dependencias/{area}", response_model=List[ConceptoFlujoCajaResponse])
+@router.get("/dependencias/{area}", response_model=List[ConceptoFlujoCajaResponse], dependencies=[Depends(VersionCondicional("conceptos"))])
 def obtener_conceptos_con_dependencias(
     area: AreaConceptoSchema,
     db: Session = Depends(get_db),
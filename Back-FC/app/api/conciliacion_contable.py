@@ -3,7 +3,7 @@ API endpoints para conciliación contable
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import date
 from decimal import Decimal
 
@@ -14,6 +14,8 @@ from ..services.conciliacion_contable_service import ConciliacionContableService
 from ..schemas.conciliacion_contable import (
     ConciliacionFechaRequest,
     ConciliacionFechaResponse,
+    ConciliacionRangoRequest,
+    ConciliacionRangoResponse,
     EmpresaConciliacionResponse
 )
 from ..models.usuarios import Usuario
@@ -64,6 +66,69 @@ async def obtener_conciliacion_por_fecha(
             detail=f"Error obteniendo conciliación: {str(e)}"
         )
 
+# Rango máximo de una conciliación masiva (un año)
+MAX_DIAS_RANGO = 366
+
+@router.post("/rango", response_model=ConciliacionRangoResponse)
+async def conciliar_rango(
+    rango: ConciliacionRangoRequest,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """
+    Calcular y guardar la conciliación de todas las empresas para cada día hábil del rango
+    (cierre de mes) con un número fijo de sentencias
+    """
+    if rango.fecha_fin < rango.fecha_inicio:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="fecha_fin debe ser mayor o igual a fecha_inicio"
+        )
+    if (rango.fecha_fin - rango.fecha_inicio).days + 1 > MAX_DIAS_RANGO:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"El rango no puede superar {MAX_DIAS_RANGO} días"
+        )
+    
+    try:
+        fechas = ConciliacionContableService.conciliar_rango(
+            db=db,
+            fecha_inicio=rango.fecha_inicio,
+            fecha_fin=rango.fecha_fin
+        )
+        
+        # 📝 AUDITORÍA: Registrar conciliación por rango
+        try:
+            AuditoriaService.registrar_accion(
+                db=db,
+                usuario=current_user,
+                accion="UPDATE",
+                modulo="CONCILIACION",
+                entidad="ConciliacionContable",
+                descripcion=f"Concilió rango {rango.fecha_inicio} a {rango.fecha_fin}",
+                valores_nuevos={
+                    "fecha_inicio": str(rango.fecha_inicio),
+                    "fecha_fin": str(rango.fecha_fin),
+                    "total_fechas": len(fechas)
+                }
+            )
+        except Exception as audit_error:
+            logger.warning(f"Error en auditoría de conciliación por rango: {audit_error}")
+        
+        return ConciliacionRangoResponse(
+            fecha_inicio=rango.fecha_inicio,
+            fecha_fin=rango.fecha_fin,
+            fechas=fechas
+        )
+        
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ Error conciliando rango {rango.fecha_inicio} a {rango.fecha_fin}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error conciliando rango: {str(e)}"
+        )
+
 @router.put("/centralizadora/{empresa_id}")
 async def actualizar_total_centralizadora(
     empresa_id: int,
@@ -240,7 +305,8 @@ async def cerrar_conciliacion(
         conciliacion = ConciliacionContableService.cerrar_conciliacion(
             db=db,
             empresa_id=empresa_id,
-            fecha=fecha
+            fecha=fecha,
+            usuario_id=current_user.id
         )
         
         # 📝 AUDITORÍA: Registrar cierre de conciliación
@@ -280,6 +346,61 @@ async def cerrar_conciliacion(
             detail=f"Error cerrando conciliación: {str(e)}"
         )
 
+@router.put("/reabrir/{empresa_id}")
+async def reabrir_conciliacion(
+    empresa_id: int,
+    fecha: date,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """
+    Reabrir una conciliación cerrada (vuelve a Confirmado y descongela el día)
+    """
+    try:
+        conciliacion = ConciliacionContableService.reabrir_conciliacion(
+            db=db,
+            empresa_id=empresa_id,
+            fecha=fecha
+        )
+        
+        # 📝 AUDITORÍA: Registrar reapertura de conciliación
+        try:
+            AuditoriaService.registrar_accion(
+                db=db,
+                usuario=current_user,
+                accion="UPDATE",
+                modulo="CONCILIACION",
+                entidad="ConciliacionContable",
+                entidad_id=str(conciliacion.id),
+                descripcion=f"Reabrió conciliación para empresa {empresa_id} en fecha {fecha}",
+                valores_anteriores={"estado": "Cerrado"},
+                valores_nuevos={
+                    "empresa_id": empresa_id,
+                    "fecha": str(fecha),
+                    "estado": conciliacion.estado
+                }
+            )
+        except Exception as audit_error:
+            logger.warning(f"Error en auditoría de reapertura conciliación: {audit_error}")
+        
+        return {
+            "message": "Conciliación reabierta exitosamente",
+            "conciliacion_id": conciliacion.id,
+            "estado": conciliacion.estado
+        }
+        
+    except ValueError as ve:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(ve)
+        )
+    except Exception as e:
+        logger.error(f"Error reabriendo conciliación: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error reabriendo conciliación: {str(e)}"
+        )
+
 @router.put("/evaluar-todas")
 async def evaluar_todas_conciliaciones(
     fecha: date,
@@ -328,30 +449,21 @@ async def evaluar_todas_conciliaciones(
 @router.put("/cerrar-todas")
 async def cerrar_todas_conciliaciones(
     fecha: date,
+    fecha_fin: Optional[date] = None,
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
 ):
     """
-    Cerrar todas las conciliaciones de una fecha (las marca como confirmadas)
+    Cerrar todas las conciliaciones de una fecha, o de `fecha`..`fecha_fin`
+    (las marca como confirmadas en una sola sentencia)
     """
     try:
-        # Primero evaluar todas
-        conciliaciones = ConciliacionContableService.evaluar_todas_conciliaciones(
+        confirmadas = ConciliacionContableService.confirmar_todas_conciliaciones(
             db=db,
-            fecha=fecha
+            fecha_inicio=fecha,
+            fecha_fin=fecha_fin
         )
         
-        # Luego confirmar cada una
-        confirmadas = 0
-        for conciliacion in conciliaciones:
-            if conciliacion.total_centralizadora is not None:
-                ConciliacionContableService.confirmar_conciliacion(
-                    db=db,
-                    empresa_id=conciliacion.empresa_id,
-                    fecha=fecha
-                )
-                confirmadas += 1
-        
         # 📝 AUDITORÍA: Registrar cierre masivo
         try:
             AuditoriaService.registrar_accion(
@@ -360,9 +472,10 @@ async def cerrar_todas_conciliaciones(
                 accion="UPDATE",
                 modulo="CONCILIACION",
                 entidad="ConciliacionContable",
-                descripcion=f"Cerró todas las conciliaciones para fecha {fecha}",
+                descripcion=f"Cerró todas las conciliaciones para fecha {fecha}" + (f" a {fecha_fin}" if fecha_fin else ""),
                 valores_nuevos={
                     "fecha": str(fecha),
+                    "fecha_fin": str(fecha_fin) if fecha_fin else None,
                     "total_confirmadas": confirmadas
                 }
             )
@@ -372,6 +485,7 @@ async def cerrar_todas_conciliaciones(
         return {
             "message": f"Se cerraron {confirmadas} conciliaciones",
             "fecha": fecha,
+            "fecha_fin": fecha_fin,
             "total_cerradas": confirmadas
         }
         
@@ -252,11 +252,20 @@ async def recalcular_cuatro_por_mil(
     2. Recalcula también los subtotales de pagaduría
     """
     from app.services.dependencias_flujo_caja_service import DependenciasFlujoCajaService
+    from app.services.cierre_dia_service import CierreDiaService
     
     try:
         fecha_obj = payload.fecha
         cuenta_bancaria_id = payload.cuenta_bancaria_id
         
+        cierre = CierreDiaService(db)
+        compania_cuenta = cierre.compania_de_cuenta(cuenta_bancaria_id, payload.compania_id)
+        if cierre.dia_cerrado(fecha_obj, compania_cuenta):
+            raise HTTPException(
+                status_code=status.HTTP_423_LOCKED,
+                detail=f"El día {fecha_obj} está cerrado para la compañía {compania_cuenta}; reabra la conciliación para recalcular"
+            )
+        
         # Usar el servicio de dependencias para recalcular
         service = DependenciasFlujoCajaService(db)
         resultado = service.recalcular_cuatro_por_mil(
@@ -4,6 +4,8 @@ from typing import List
 import logging
 
 from ..core.database import get_db
+from ..core.etag import VersionCondicional
+from ..core.catalogo_cache import catalogo_cache
 from ..models.cuentas_bancarias import CuentaBancaria, TipoCuenta
 from ..models.cuenta_moneda import CuentaMoneda, TipoMoneda
 from ..models.bancos import Banco
@@ -58,7 +60,7 @@ class BancoResponse(BaseModel):
         from_attributes = True
 
 # Endpoints de prueba temporales
-@router.get("/test/banks")
+@router.get("/test/banks", dependencies=[Depends(VersionCondicional("cuentas", "companias"))])
 def get_banks_test(db: Session = Depends(get_db)):
     """Endpoint de prueba para obtener todos los bancos"""
     try:
@@ -71,7 +73,7 @@ def get_banks_test(db: Session = Depends(get_db)):
             detail=f"Error interno del servidor: {str(e)}"
         )
 
-@router.get("/test/companies/{company_id}")
+@router.get("/test/companies/{company_id}", dependencies=[Depends(VersionCondicional("cuentas", "companias"))])
 def get_company_bank_accounts_test(company_id: int, db: Session = Depends(get_db)):
     """Endpoint de prueba para obtener cuentas bancarias de una compañía"""
     try:
@@ -93,7 +95,7 @@ def get_company_bank_accounts_test(company_id: int, db: Session = Depends(get_db
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error interno del servidor: {str(e)}"
         )
-@router.get("/todas-las-cuentas")
+@router.get("/todas-las-cuentas", dependencies=[Depends(VersionCondicional("cuentas", "companias"))])
 def get_all_bank_accounts(db: Session = Depends(get_db)):
     """Obtener todas las cuentas bancarias del sistema para cargue inicial"""
     try:
@@ -143,7 +145,7 @@ def get_all_bank_accounts(db: Session = Depends(get_db)):
             detail=f"Error interno del servidor: {str(e)}"
         )
 
-@router.get("/companies/{company_id}", response_model=List[CuentaBancariaResponse])
+@router.get("/companies/{company_id}", response_model=List[CuentaBancariaResponse], dependencies=[Depends(VersionCondicional("cuentas", "companias"))])
 def get_company_bank_accounts(company_id: int, db: Session = Depends(get_db)):
     """Obtener todas las cuentas bancarias de una compañía"""
     cuentas = db.query(CuentaBancaria).filter(CuentaBancaria.compania_id == company_id).all()
@@ -202,6 +204,7 @@ def create_bank_account(
     )
     db.add(db_cuenta)
     db.commit()
+    catalogo_cache.invalidar()
     db.refresh(db_cuenta)
     
     # Crear las relaciones de monedas
@@ -213,6 +216,7 @@ def create_bank_account(
         db.add(cuenta_moneda)
     
     db.commit()
+    catalogo_cache.invalidar()
     db.refresh(db_cuenta)
     
     # 📝 AUDITORÍA: Registrar creación de cuenta bancaria
@@ -275,6 +279,7 @@ def update_bank_account(
         setattr(db_cuenta, field, value)
     
     db.commit()
+    catalogo_cache.invalidar()
     db.refresh(db_cuenta)
     
     # Obtener información relacionada actualizada
@@ -334,6 +339,7 @@ def delete_bank_account(
     
     db.delete(db_cuenta)
     db.commit()
+    catalogo_cache.invalidar()
     
     # 📝 AUDITORÍA: Registrar eliminación de cuenta bancaria
     try:
@@ -358,7 +364,7 @@ def delete_bank_account(
     return {"message": "Cuenta bancaria eliminada exitosamente"}
 
 # Endpoint para obtener todos los bancos disponibles
-@router.get("/banks", response_model=List[BancoResponse])
+@router.get("/banks", response_model=List[BancoResponse], dependencies=[Depends(VersionCondicional("cuentas", "companias"))])
 def get_all_banks(db: Session = Depends(get_db)):
     """Obtener todos los bancos disponibles"""
     bancos = db.query(Banco).all()
@@ -405,6 +411,7 @@ async def create_bank_account_test(
         )
         db.add(db_cuenta)
         db.commit()
+        catalogo_cache.invalidar()
         db.refresh(db_cuenta)
         
         # Crear las relaciones de monedas
@@ -416,6 +423,7 @@ async def create_bank_account_test(
             db.add(cuenta_moneda)
         
         db.commit()
+        catalogo_cache.invalidar()
         db.refresh(db_cuenta)
 
         # 📝 AUDITORÍA: Registrar creación de cuenta bancaria
@@ -469,7 +477,7 @@ async def create_bank_account_test(
             detail=f"Error interno del servidor: {str(e)}"
         )
 
-@router.get("/all")
+@router.get("/all", dependencies=[Depends(VersionCondicional("cuentas", "companias"))])
 def get_all_bank_accounts(db: Session = Depends(get_db)):
     """Obtener todas las cuentas bancarias de todas las compañías"""
     try:
@@ -527,6 +535,7 @@ async def delete_bank_account_test(
 
         db.delete(db_cuenta)
         db.commit()
+        catalogo_cache.invalidar()
 
         # 📝 AUDITORÍA: Registrar eliminación de cuenta bancaria
         try:
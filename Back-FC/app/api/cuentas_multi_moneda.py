@@ -3,12 +3,15 @@
 API para obtener cuentas bancarias expandidas por moneda
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any
 from datetime import date
 
 from app.core.database import get_db
+from app.core.etag import VersionCondicional
+from app.core.serializacion import respuesta_json
 from app.models.cuentas_bancarias import CuentaBancaria
 from app.models.cuenta_moneda import CuentaMoneda, TipoMoneda
 from app.models.companias import Compania
@@ -17,21 +20,34 @@ from app.models.trm import TRM
 
 router = APIRouter(prefix="/cuentas-multi-moneda", tags=["cuentas-multi-moneda"])
 
-@router.get("/expandidas")
+@router.get("/expandidas", dependencies=[Depends(VersionCondicional("cuentas", "companias", "trm", por_dia=True))])
 async def obtener_cuentas_expandidas_por_moneda(
+    request: Request,
     incluir_trm: bool = True,
     db: Session = Depends(get_db)
 ):
     """
     Obtiene todas las cuentas bancarias expandidas por moneda.
     Si una cuenta tiene COP y USD, aparecerá dos veces: una para cada moneda.
+    Una sola consulta (cuenta × moneda con banco y compañía) serializada con orjson.
     """
     
     try:
         print("🔍 OBTENIENDO CUENTAS EXPANDIDAS POR MONEDA")
         
-        # Obtener todas las cuentas bancarias con sus relaciones
-        cuentas = db.query(CuentaBancaria).all()
+        # Cuenta × moneda con banco y compañía en una sola consulta (antes: 2 consultas por cuenta)
+        filas = db.query(
+            CuentaBancaria.id, CuentaBancaria.numero_cuenta, CuentaBancaria.compania_id,
+            CuentaBancaria.banco_id, CuentaBancaria.tipo_cuenta, CuentaMoneda.moneda,
+            Banco.nombre.label("banco_nombre"), Compania.nombre.label("compania_nombre")
+        ).join(
+            CuentaMoneda, CuentaMoneda.id_cuenta == CuentaBancaria.id
+        ).outerjoin(
+            Banco, Banco.id == CuentaBancaria.banco_id
+        ).outerjoin(
+            Compania, Compania.id == CuentaBancaria.compania_id
+        ).order_by(CuentaBancaria.id, CuentaMoneda.id).all()
+        total_cuentas = db.query(func.count(CuentaBancaria.id)).scalar()
         
         # Obtener TRM del día si es necesario
         trm_actual = None
@@ -40,69 +56,59 @@ async def obtener_cuentas_expandidas_por_moneda(
             if not trm_actual:
                 # Buscar la TRM más reciente si no hay para hoy
                 trm_actual = db.query(TRM).order_by(TRM.fecha.desc()).first()
+        trm_info = {
+            "fecha": trm_actual.fecha.isoformat(),
+            "valor": float(trm_actual.valor)
+        } if trm_actual else None
         
         cuentas_expandidas = []
         
-        for cuenta in cuentas:
-            # Obtener información relacionada
-            banco = db.query(Banco).filter(Banco.id == cuenta.banco_id).first()
-            compania = db.query(Compania).filter(Compania.id == cuenta.compania_id).first()
+        for fila in filas:
+            moneda = fila.moneda.value
+            nombre_banco = fila.banco_nombre if fila.banco_nombre is not None else "BANCO"
             
-            # Para cada moneda de la cuenta, crear una entrada
-            for cuenta_moneda in cuenta.monedas:
-                moneda = cuenta_moneda.moneda.value
-                
-                # Crear identificador único para la cuenta-moneda
-                cuenta_moneda_id = f"{cuenta.id}_{moneda}"
-                
-                cuenta_expandida = {
-                    "id": cuenta.id,  # ID original de la cuenta
-                    "cuenta_moneda_id": cuenta_moneda_id,  # ID único cuenta-moneda
-                    "numero_cuenta": cuenta.numero_cuenta,
-                    "compania_id": cuenta.compania_id,
-                    "banco_id": cuenta.banco_id,
-                    "tipo_cuenta": cuenta.tipo_cuenta.value if cuenta.tipo_cuenta else "CORRIENTE",
-                    "moneda": moneda,
-                    "banco": {
-                        "id": banco.id,
-                        "nombre": banco.nombre
-                    } if banco else None,
-                    "compania": {
-                        "id": compania.id,
-                        "nombre": compania.nombre
-                    } if compania else None,
-                    # Nombre completo para mostrar en UI
-                    "nombre_completo": f"{banco.nombre if banco else 'BANCO'} {cuenta.numero_cuenta[-4:]} ({moneda})",
-                    "nombre_display": f"{banco.nombre if banco else 'BANCO'} ({moneda})"
-                }
-                
-                # Agregar información de TRM si está disponible y es USD
-                if trm_actual and moneda == "USD":
-                    cuenta_expandida["trm"] = {
-                        "fecha": trm_actual.fecha.isoformat(),
-                        "valor": float(trm_actual.valor)
-                    }
-                
-                cuentas_expandidas.append(cuenta_expandida)
+            cuenta_expandida = {
+                "id": fila.id,  # ID original de la cuenta
+                "cuenta_moneda_id": f"{fila.id}_{moneda}",  # ID único cuenta-moneda
+                "numero_cuenta": fila.numero_cuenta,
+                "compania_id": fila.compania_id,
+                "banco_id": fila.banco_id,
+                "tipo_cuenta": fila.tipo_cuenta.value if fila.tipo_cuenta else "CORRIENTE",
+                "moneda": moneda,
+                "banco": {
+                    "id": fila.banco_id,
+                    "nombre": fila.banco_nombre
+                } if fila.banco_nombre is not None else None,
+                "compania": {
+                    "id": fila.compania_id,
+                    "nombre": fila.compania_nombre
+                } if fila.compania_nombre is not None else None,
+                # Nombre completo para mostrar en UI
+                "nombre_completo": f"{nombre_banco} {fila.numero_cuenta[-4:]} ({moneda})",
+                "nombre_display": f"{nombre_banco} ({moneda})"
+            }
+            
+            # Agregar información de TRM si está disponible y es USD
+            if trm_info and moneda == "USD":
+                cuenta_expandida["trm"] = trm_info
+            
+            cuentas_expandidas.append(cuenta_expandida)
         
         print(f"✅ Cuentas expandidas generadas: {len(cuentas_expandidas)}")
         print(f"📊 TRM actual: {trm_actual.valor if trm_actual else 'No disponible'}")
         
-        return {
+        return respuesta_json(request, {
             "cuentas": cuentas_expandidas,
-            "total_cuentas_originales": len(cuentas),
+            "total_cuentas_originales": total_cuentas,
             "total_cuentas_expandidas": len(cuentas_expandidas),
-            "trm_actual": {
-                "fecha": trm_actual.fecha.isoformat(),
-                "valor": float(trm_actual.valor)
-            } if trm_actual else None
-        }
+            "trm_actual": trm_info
+        })
         
     except Exception as e:
         print(f"❌ ERROR AL OBTENER CUENTAS EXPANDIDAS: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error al obtener cuentas expandidas: {str(e)}")
 
-@router.get("/por-compania/{compania_id}")
+@router.get("/por-compania/{compania_id}", dependencies=[Depends(VersionCondicional("cuentas", "companias", "trm", por_dia=True))])
 async def obtener_cuentas_expandidas_por_compania(
     compania_id: int,
     incluir_trm: bool = True,
@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends
+
+from ..core.config import get_settings
+from ..core.perfilado import registro_perfil
+from ..models.usuarios import Usuario
+from ..services.auth_service import check_user_role
+
+router = APIRouter(prefix="/debug", tags=["Depuración"])
+
+solo_administradores = check_user_role(["Administrador", "administrador"])
+
+
+@router.get("/perf")
+def obtener_perfilado(current_user: Usuario = Depends(solo_administradores)):
+    """
+    Tiempos acumulados por endpoint de este worker: SQL por request, fases del recálculo
+    y sentencias repetidas (posibles N+1). Requiere PERF_PROFILING_ENABLED=true.
+    """
+    settings = get_settings()
+    return {
+        "activo": settings.perf_profiling_enabled,
+        "umbral_n_mas_1": settings.perf_n_mas_1_umbral,
+        "endpoints": registro_perfil.snapshot(),
+    }
+
+
+@router.delete("/perf")
+def reiniciar_perfilado(current_user: Usuario = Depends(solo_administradores)):
+    """Reinicia los acumulados (p. ej. antes de una prueba de carga)"""
+    registro_perfil.reset()
+    return {"message": "Acumulados de perfilado reiniciados"}
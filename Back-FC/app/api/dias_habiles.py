@@ -8,6 +8,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
+from app.core.etag import VersionCondicional
 from app.services.dias_habiles_service import DiasHabilesService
 from app.models.dias_festivos import DiaFestivo
 
@@ -19,7 +20,7 @@ def get_dias_habiles_service(db: Session = Depends(get_db)) -> DiasHabilesServic
     return DiasHabilesService(db)
 
 
-@router.get("/validar/{fecha}")
+@router.get("/validar/{fecha}", dependencies=[Depends(VersionCondicional("festivos"))])
 async def validar_dia_habil(
     fecha: date,
     service: DiasHabilesService = Depends(get_dias_habiles_service)
@@ -43,7 +44,7 @@ async def validar_dia_habil(
         raise HTTPException(status_code=500, detail=f"Error al validar fecha: {str(e)}")
 
 
-@router.get("/proximo/{fecha}")
+@router.get("/proximo/{fecha}", dependencies=[Depends(VersionCondicional("festivos"))])
 async def obtener_proximo_dia_habil(
     fecha: date,
     incluir_actual: bool = Query(False, description="Incluir la fecha actual si es hábil"),
@@ -73,7 +74,7 @@ async def obtener_proximo_dia_habil(
         raise HTTPException(status_code=500, detail=f"Error al obtener próximo día hábil: {str(e)}")
 
 
-@router.get("/anterior/{fecha}")
+@router.get("/anterior/{fecha}", dependencies=[Depends(VersionCondicional("festivos"))])
 async def obtener_anterior_dia_habil(
     fecha: date,
     incluir_actual: bool = Query(False, description="Incluir la fecha actual si es hábil"),
@@ -103,7 +104,7 @@ async def obtener_anterior_dia_habil(
         raise HTTPException(status_code=500, detail=f"Error al obtener día hábil anterior: {str(e)}")
 
 
-@router.get("/rango")
+@router.get("/rango", dependencies=[Depends(VersionCondicional("festivos"))])
 async def obtener_dias_habiles_rango(
     fecha_inicio: date = Query(..., description="Fecha de inicio del rango"),
     fecha_fin: date = Query(..., description="Fecha de fin del rango"),
@@ -155,7 +156,7 @@ async def obtener_dias_habiles_rango(
         raise HTTPException(status_code=500, detail=f"Error al obtener rango de días hábiles: {str(e)}")
 
 
-@router.get("/mes/{anio}/{mes}")
+@router.get("/mes/{anio}/{mes}", dependencies=[Depends(VersionCondicional("festivos"))])
 async def obtener_dias_habiles_mes(
     anio: int,
     mes: int,
@@ -207,7 +208,7 @@ async def obtener_dias_habiles_mes(
         raise HTTPException(status_code=500, detail=f"Error al obtener días hábiles del mes: {str(e)}")
 
 
-@router.get("/hoy")
+@router.get("/hoy", dependencies=[Depends(VersionCondicional("festivos", por_dia=True))])
 async def obtener_info_hoy(
     service: DiasHabilesService = Depends(get_dias_habiles_service)
 ):
@@ -236,7 +237,7 @@ async def obtener_info_hoy(
         raise HTTPException(status_code=500, detail=f"Error al obtener información de hoy: {str(e)}")
 
 
-@router.get("/festivos")
+@router.get("/festivos", dependencies=[Depends(VersionCondicional("festivos"))])
 async def obtener_festivos(
     anio: Optional[int] = Query(None, description="Año específico"),
     mes: Optional[int] = Query(None, description="Mes específico (requiere año)"),
@@ -0,0 +1,150 @@
+"""
+API endpoints para escenarios "qué pasaría si" del flujo de caja
+Los escenarios se evalúan en memoria; ningún endpoint escribe en transacciones_flujo_caja
+"""
+import logging
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from ..api.auth import get_current_user
+from ..core.database import get_db
+from ..models.escenario_flujo_caja import EscenarioFlujoCaja
+from ..schemas.escenario_flujo_caja import EscenarioBase, EscenarioCreate, EscenarioResponse, EscenarioUpdate
+from ..services.escenario_flujo_caja_service import EscenarioFlujoCajaService
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/api/escenarios-flujo-caja", tags=["Escenarios Flujo de Caja"])
+
+ROLES_ADMIN = {"admin", "administrador"}
+
+
+def _es_admin(usuario) -> bool:
+    return (usuario.rol or "").lower() in ROLES_ADMIN
+
+
+def _obtener_o_404(service: EscenarioFlujoCajaService, escenario_id: int) -> EscenarioFlujoCaja:
+    escenario = service.obtener(escenario_id)
+    if not escenario:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Escenario no encontrado")
+    return escenario
+
+
+def _verificar_propietario(escenario: EscenarioFlujoCaja, usuario) -> None:
+    """Solo quien creó el escenario (o un administrador) lo modifica o elimina"""
+    if escenario.usuario_id != usuario.id and not _es_admin(usuario):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="El escenario pertenece a otro usuario")
+
+
+def _error_evaluacion(e: Exception) -> HTTPException:
+    if isinstance(e, LookupError):
+        return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get("/", response_model=List[EscenarioResponse])
+def listar_escenarios(
+    todos: bool = Query(False, description="Escenarios de todos los usuarios (solo administradores)"),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Escenarios del usuario, más recientes primero"""
+    usuario_id = None if todos and _es_admin(current_user) else current_user.id
+    return EscenarioFlujoCajaService(db).listar(usuario_id)
+
+
+@router.post("/", response_model=EscenarioResponse, status_code=status.HTTP_201_CREATED)
+def crear_escenario(
+    datos: EscenarioCreate,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Guarda un escenario (ventana + ajustes); no toca las transacciones reales"""
+    try:
+        return EscenarioFlujoCajaService(db).crear(datos, current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.post("/evaluar")
+def evaluar_escenario_temporal(
+    escenario: EscenarioBase,
+    incluir_grilla: bool = False,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Evalúa ajustes sin guardarlos y devuelve las diferencias contra la línea base"""
+    try:
+        return EscenarioFlujoCajaService(db).evaluar(escenario, incluir_grilla)
+    except (ValueError, LookupError) as e:
+        raise _error_evaluacion(e)
+
+
+@router.get("/comparar")
+def comparar_escenarios(
+    ids: List[int] = Query(..., description="IDs de escenarios guardados"),
+    incluir_grilla: bool = False,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Evalúa varios escenarios guardados; la línea base se calcula una vez por ventana"""
+    service = EscenarioFlujoCajaService(db)
+    escenarios = [_obtener_o_404(service, escenario_id) for escenario_id in ids]
+    try:
+        return service.comparar(escenarios, incluir_grilla)
+    except (ValueError, LookupError) as e:
+        raise _error_evaluacion(e)
+
+
+@router.get("/{escenario_id}", response_model=EscenarioResponse)
+def obtener_escenario(
+    escenario_id: int,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    return _obtener_o_404(EscenarioFlujoCajaService(db), escenario_id)
+
+
+@router.get("/{escenario_id}/evaluar")
+def evaluar_escenario(
+    escenario_id: int,
+    incluir_grilla: bool = False,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Evalúa un escenario guardado contra los datos reales actuales"""
+    service = EscenarioFlujoCajaService(db)
+    escenario = _obtener_o_404(service, escenario_id)
+    try:
+        return service.evaluar(escenario, incluir_grilla)
+    except (ValueError, LookupError) as e:
+        raise _error_evaluacion(e)
+
+
+@router.put("/{escenario_id}", response_model=EscenarioResponse)
+def actualizar_escenario(
+    escenario_id: int,
+    datos: EscenarioUpdate,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    service = EscenarioFlujoCajaService(db)
+    escenario = _obtener_o_404(service, escenario_id)
+    _verificar_propietario(escenario, current_user)
+    try:
+        return service.actualizar(escenario, datos)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.delete("/{escenario_id}", status_code=status.HTTP_204_NO_CONTENT)
+def eliminar_escenario(
+    escenario_id: int,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    service = EscenarioFlujoCajaService(db)
+    escenario = _obtener_o_404(service, escenario_id)
+    _verificar_propietario(escenario, current_user)
+    service.eliminar(escenario)
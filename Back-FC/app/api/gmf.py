@@ -7,6 +7,7 @@ from sqlalchemy.orm import Session
 
 from app.core.database import get_db
 from app.services.dependencias_flujo_caja_service import DependenciasFlujoCajaService
+from app.services.cierre_dia_service import CierreDiaService
 from app.models.transacciones_flujo_caja import TransaccionFlujoCaja, AreaTransaccion
 from app.models.conceptos_flujo_caja import ConceptoFlujoCaja
 
@@ -31,6 +32,14 @@ def recalculate_gmf(payload: GMFRecalcRequest, db: Session = Depends(get_db)):
     logger = logging.getLogger(__name__)
     logger.info(f"🔄 [API GMF] Recálculo solicitado: fecha={payload.fecha}, cuenta={payload.cuenta_bancaria_id}")
     
+    cierre = CierreDiaService(db)
+    compania_cuenta = cierre.compania_de_cuenta(payload.cuenta_bancaria_id, payload.compania_id)
+    if cierre.dia_cerrado(payload.fecha, compania_cuenta):
+        raise HTTPException(
+            status_code=status.HTTP_423_LOCKED,
+            detail=f"El día {payload.fecha} está cerrado para la compañía {compania_cuenta}; reabra la conciliación para recalcular"
+        )
+    
     service = DependenciasFlujoCajaService(db)
     result = service.recalcular_gmf(
         fecha=payload.fecha,
@@ -3,25 +3,32 @@
 API para informes consolidados mensuales
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.orm import Session, selectinload
 from typing import Dict, List, Any, Optional
 from datetime import date, datetime
 from calendar import monthrange
 
-from app.core.database import get_db
+from app.core.database import get_read_db
+from app.core.serializacion import respuesta_json
+from app.api.auth import get_current_user
 from app.models.transacciones_flujo_caja import TransaccionFlujoCaja, AreaTransaccion
 from app.models.companias import Compania
 from app.models.cuentas_bancarias import CuentaBancaria
 from app.models.conceptos_flujo_caja import ConceptoFlujoCaja
+from app.services.cierre_dia_service import CierreDiaService, excluir_particiones
+from app.services.exportacion_service import (
+    ENCABEZADOS_CONSOLIDADO, en_sesion_propia, filas_consolidado_mensual, respuesta_exportacion
+)
 
 router = APIRouter(prefix="/informes-consolidados", tags=["informes-consolidados"])
 
 @router.get("/mensual")
 async def obtener_informe_consolidado_mensual(
+    request: Request,
     año: int = Query(..., description="Año del informe"),
     mes: int = Query(..., description="Mes del informe (1-12)"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Obtiene informe consolidado mensual con datos agregados por compañía y cuenta
@@ -44,13 +51,30 @@ async def obtener_informe_consolidado_mensual(
         
         print(f"🔍 OBTENIENDO INFORME CONSOLIDADO: {fecha_inicio} - {fecha_fin}")
         
-        # Obtener todas las transacciones del mes
-        transacciones = db.query(TransaccionFlujoCaja).filter(
-            TransaccionFlujoCaja.fecha >= fecha_inicio,
-            TransaccionFlujoCaja.fecha <= fecha_fin
+        # Días cerrados: se toman los agregados de su snapshot en lugar de releer las filas
+        snapshots = CierreDiaService(db).snapshots_en_rango(fecha_inicio, fecha_fin)
+        
+        # Obtener las transacciones del mes de los días abiertos
+        transacciones = excluir_particiones(
+            db.query(
+                TransaccionFlujoCaja.concepto_id, TransaccionFlujoCaja.compania_id,
+                TransaccionFlujoCaja.cuenta_id, TransaccionFlujoCaja.monto
+            ).filter(
+                TransaccionFlujoCaja.fecha >= fecha_inicio,
+                TransaccionFlujoCaja.fecha <= fecha_fin
+            ),
+            [(s.fecha, s.compania_id) for s in snapshots]
         ).all()
         
-        print(f"📊 TRANSACCIONES ENCONTRADAS: {len(transacciones)}")
+        # Filas (concepto, compañía, cuenta, monto) de los días abiertos y de los snapshots
+        filas = [
+            (concepto_id, compania_id or 0, cuenta_id or 0, monto)  # Usar 0 si es NULL
+            for concepto_id, compania_id, cuenta_id, monto in transacciones
+        ]
+        for snapshot in snapshots:
+            filas.extend(snapshot.agregados)
+        
+        print(f"📊 TRANSACCIONES ENCONTRADAS: {len(transacciones)} (+{len(snapshots)} días cerrados)")
         
         # Obtener compañías y cuentas
         companias = db.query(Compania).all()
@@ -68,14 +92,9 @@ async def obtener_informe_consolidado_mensual(
             "pagaduria": {}   # conceptos 52+
         }
         
-        # Procesar cada transacción
-        for transaccion in transacciones:
-            compania_id = transaccion.compania_id or 0  # Usar 0 si es NULL
-            cuenta_id = transaccion.cuenta_id or 0      # Usar 0 si es NULL
-            concepto_id = transaccion.concepto_id
-            monto = float(transaccion.monto)
-            
-            print(f"📊 Procesando: concepto_id={concepto_id}, compania_id={compania_id}, cuenta_id={cuenta_id}, monto={monto}")
+        # Procesar cada fila
+        for concepto_id, compania_id, cuenta_id, monto in filas:
+            monto = float(monto)
             
             # Determinar área (Tesorería vs Pagaduría)
             area = "tesoreria" if concepto_id <= 51 else "pagaduria"
@@ -103,7 +122,7 @@ async def obtener_informe_consolidado_mensual(
                 "nombre_mes": fecha_inicio.strftime("%B %Y")
             },
             "metadata": {
-                "total_transacciones": len(transacciones),
+                "total_transacciones": len(transacciones) + sum(s.resumen["total_transacciones"] for s in snapshots),
                 "companias": [{"id": c.id, "nombre": c.nombre} for c in companias],
                 "cuentas": [{"id": c.id, "numero_cuenta": c.numero_cuenta, "banco": c.banco.nombre if c.banco else None} for c in cuentas],
                 "conceptos_tesoreria": [{"id": c.id, "nombre": c.nombre} for c in conceptos if c.id <= 51],
@@ -113,17 +132,41 @@ async def obtener_informe_consolidado_mensual(
         }
         
         print(f"✅ INFORME CONSOLIDADO GENERADO EXITOSAMENTE")
-        return respuesta
+        return respuesta_json(request, respuesta)
         
     except Exception as e:
         print(f"❌ ERROR EN INFORME CONSOLIDADO: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error al generar informe consolidado: {str(e)}")
 
+@router.get("/mensual/exportar")
+def exportar_informe_consolidado_mensual(
+    request: Request,
+    año: int = Query(..., description="Año del informe"),
+    mes: int = Query(..., description="Mes del informe (1-12)"),
+    formato: str = Query("xlsx", description="xlsx o csv"),
+    current_user = Depends(get_current_user)
+):
+    """
+    Exporta el consolidado mensual (totales por área, concepto, compañía y cuenta) en
+    streaming, en lugar de armar el archivo en el navegador a partir del JSON de /mensual
+    """
+    if mes < 1 or mes > 12:
+        raise HTTPException(status_code=400, detail="Mes debe estar entre 1 y 12")
+    
+    return respuesta_exportacion(
+        request,
+        en_sesion_propia(filas_consolidado_mensual, año, mes),
+        ENCABEZADOS_CONSOLIDADO,
+        formato,
+        f"consolidado_{año}_{mes:02d}"
+    )
+
 @router.get("/resumen-mensual")
 async def obtener_resumen_mensual(
+    request: Request,
     año: int = Query(..., description="Año del resumen"),
     mes: int = Query(..., description="Mes del resumen (1-12)"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Obtiene resumen de métricas del mes para mostrar en cards superiores
@@ -135,22 +178,32 @@ async def obtener_resumen_mensual(
         fecha_inicio = date(año, mes, 1)
         fecha_fin = date(año, mes, ultimo_dia)
         
-        # Obtener transacciones del mes
-        transacciones = db.query(TransaccionFlujoCaja).filter(
-            TransaccionFlujoCaja.fecha >= fecha_inicio,
-            TransaccionFlujoCaja.fecha <= fecha_fin
-        ).all()
+        # Días cerrados: sus totales salen del resumen del snapshot
+        snapshots = CierreDiaService(db).snapshots_en_rango(fecha_inicio, fecha_fin)
+        
+        # Obtener transacciones del mes de los días abiertos
+        montos = [float(monto) for monto, in excluir_particiones(
+            db.query(TransaccionFlujoCaja.monto).filter(
+                TransaccionFlujoCaja.fecha >= fecha_inicio,
+                TransaccionFlujoCaja.fecha <= fecha_fin
+            ),
+            [(s.fecha, s.compania_id) for s in snapshots]
+        )]
         
         # Calcular métricas
-        total_ingresos = sum(float(t.monto) for t in transacciones if float(t.monto) > 0)
-        total_gastos = abs(sum(float(t.monto) for t in transacciones if float(t.monto) < 0))
+        total_ingresos = sum(m for m in montos if m > 0)
+        total_gastos = abs(sum(m for m in montos if m < 0))
+        total_transacciones = len(montos)
+        for snapshot in snapshots:
+            total_ingresos += float(snapshot.resumen["total_ingresos"])
+            total_gastos += float(snapshot.resumen["total_gastos"])
+            total_transacciones += snapshot.resumen["total_transacciones"]
         balance_neto = total_ingresos - total_gastos
-        total_transacciones = len(transacciones)
         
         # Calcular tasa de ahorro
         tasa_ahorro = (balance_neto / total_ingresos * 100) if total_ingresos > 0 else 0
         
-        return {
+        return respuesta_json(request, {
             "periodo": {
                 "año": año,
                 "mes": mes,
@@ -163,7 +216,7 @@ async def obtener_resumen_mensual(
                 "tasa_ahorro": round(tasa_ahorro, 1),
                 "total_transacciones": total_transacciones
             }
-        }
+        })
         
     except Exception as e:
         print(f"❌ ERROR EN RESUMEN MENSUAL: {str(e)}")
@@ -171,9 +224,10 @@ async def obtener_resumen_mensual(
 
 @router.get("/mensual-multi-moneda")
 async def obtener_informe_consolidado_multi_moneda(
+    request: Request,
     año: int = Query(..., description="Año del informe"),
     mes: int = Query(..., description="Mes del informe (1-12)"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Obtiene informe consolidado mensual con cuentas expandidas por moneda.
@@ -213,16 +267,33 @@ async def obtener_informe_consolidado_multi_moneda(
         
         print(f"💱 TRM PROMEDIO DEL MES: {valor_trm}")
         
-        # Obtener todas las transacciones del mes
-        transacciones = db.query(TransaccionFlujoCaja).filter(
-            TransaccionFlujoCaja.fecha >= fecha_inicio,
-            TransaccionFlujoCaja.fecha <= fecha_fin
+        # Días cerrados: se toman los agregados de su snapshot en lugar de releer las filas
+        snapshots = CierreDiaService(db).snapshots_en_rango(fecha_inicio, fecha_fin)
+        
+        # Obtener las transacciones del mes de los días abiertos
+        transacciones = excluir_particiones(
+            db.query(
+                TransaccionFlujoCaja.concepto_id, TransaccionFlujoCaja.compania_id,
+                TransaccionFlujoCaja.cuenta_id, TransaccionFlujoCaja.monto
+            ).filter(
+                TransaccionFlujoCaja.fecha >= fecha_inicio,
+                TransaccionFlujoCaja.fecha <= fecha_fin
+            ),
+            [(s.fecha, s.compania_id) for s in snapshots]
         ).all()
         
-        print(f"📊 TRANSACCIONES ENCONTRADAS: {len(transacciones)}")
+        # Filas (concepto, compañía, cuenta, monto) de los días abiertos y de los snapshots
+        filas = [
+            (concepto_id, compania_id or 0, cuenta_id or 0, monto)  # Usar 0 si es NULL
+            for concepto_id, compania_id, cuenta_id, monto in transacciones
+        ]
+        for snapshot in snapshots:
+            filas.extend(snapshot.agregados)
+        
+        print(f"📊 TRANSACCIONES ENCONTRADAS: {len(transacciones)} (+{len(snapshots)} días cerrados)")
         
         # Obtener cuentas con sus monedas
-        cuentas = db.query(CuentaBancaria).all()
+        cuentas = db.query(CuentaBancaria).options(selectinload(CuentaBancaria.monedas)).all()
         companias = db.query(Compania).all()
         conceptos = db.query(ConceptoFlujoCaja).all()
         bancos = db.query(Banco).all()
@@ -269,27 +340,28 @@ async def obtener_informe_consolidado_multi_moneda(
         
         print(f"🏦 CUENTAS EXPANDIDAS: {len(cuentas_expandidas)}")
         
+        # Índice (cuenta, compañía) → cuentas-moneda para no recorrer la lista en cada fila
+        cuentas_por_clave: Dict[tuple, List[Dict[str, Any]]] = {}
+        for cuenta_expandida in cuentas_expandidas:
+            cuentas_por_clave.setdefault(
+                (cuenta_expandida["id"], cuenta_expandida["compania_id"]), []
+            ).append(cuenta_expandida)
+        
         # Estructura de datos consolidados por cuenta-moneda
         datos_consolidados = {
             "tesoreria": {},  # conceptos 1-51
             "pagaduria": {}   # conceptos 52+
         }
         
-        # Procesar cada transacción
-        for transaccion in transacciones:
-            compania_id = transaccion.compania_id or 0
-            cuenta_id = transaccion.cuenta_id or 0
-            concepto_id = transaccion.concepto_id
-            monto = float(transaccion.monto)
+        # Procesar cada fila
+        for concepto_id, compania_id, cuenta_id, monto in filas:
+            monto = float(monto)
             
             # Determinar área
             area = "tesoreria" if concepto_id <= 51 else "pagaduria"
             
             # Encontrar todas las cuentas-moneda que corresponden a esta transacción
-            cuentas_coincidentes = [
-                c for c in cuentas_expandidas 
-                if c["id"] == cuenta_id and c["compania_id"] == compania_id
-            ]
+            cuentas_coincidentes = cuentas_por_clave.get((cuenta_id, compania_id))
             
             if not cuentas_coincidentes:
                 # Si no encuentra cuenta específica, crear una por defecto
@@ -343,7 +415,7 @@ async def obtener_informe_consolidado_multi_moneda(
                 "fecha_trm": fecha_fin.isoformat()
             },
             "metadata": {
-                "total_transacciones": len(transacciones),
+                "total_transacciones": len(transacciones) + sum(s.resumen["total_transacciones"] for s in snapshots),
                 "cuentas_expandidas": len(cuentas_expandidas),
                 "companias": [{"id": c.id, "nombre": c.nombre} for c in companias],
                 "conceptos_tesoreria": [{"id": c.id, "nombre": c.nombre} for c in conceptos if c.id <= 51],
@@ -354,7 +426,7 @@ async def obtener_informe_consolidado_multi_moneda(
         }
         
         print(f"✅ INFORME MULTI-MONEDA GENERADO EXITOSAMENTE")
-        return respuesta
+        return respuesta_json(request, respuesta)
         
     except Exception as e:
         print(f"❌ ERROR EN INFORME MULTI-MONEDA: {str(e)}")
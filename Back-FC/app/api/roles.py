@@ -5,6 +5,8 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 from app.core.database import get_db
+from app.core.principal_cache import principal_cache
+from app.core.rbac_cache import permisos_registry
 from app.models.roles import Rol, Permiso
 from app.models.usuarios import Usuario
 from app.schemas.roles import (
@@ -16,6 +18,12 @@ from sqlalchemy import func
 
 router = APIRouter()
 
+
+def _refrescar_caches_rbac(db: Session):
+    """Recompilar permisos por rol e invalidar los principales cacheados tras una escritura"""
+    permisos_registry.recargar(db)
+    principal_cache.invalidar_todo()
+
 # ========== ENDPOINTS DE ROLES ==========
 
 @router.get("/roles", response_model=List[RolSimple], tags=["Roles"])
@@ -106,6 +114,7 @@ def crear_rol(rol_data: RolCreate, db: Session = Depends(get_db)):
     
     db.add(nuevo_rol)
     db.commit()
+    _refrescar_caches_rbac(db)
     db.refresh(nuevo_rol)
     
     return RolResponse(**nuevo_rol.to_dict())
@@ -148,6 +157,7 @@ def actualizar_rol(rol_id: int, rol_data: RolUpdate, db: Session = Depends(get_d
         rol.permisos = permisos
     
     db.commit()
+    _refrescar_caches_rbac(db)
     db.refresh(rol)
     
     return RolResponse(**rol.to_dict())
@@ -181,6 +191,7 @@ def eliminar_rol(rol_id: int, db: Session = Depends(get_db)):
     
     db.delete(rol)
     db.commit()
+    _refrescar_caches_rbac(db)
 
 
 # ========== ENDPOINTS DE PERMISOS ==========
@@ -261,6 +272,7 @@ def crear_permiso(permiso_data: PermisoCreate, db: Session = Depends(get_db)):
     
     db.add(nuevo_permiso)
     db.commit()
+    _refrescar_caches_rbac(db)
     db.refresh(nuevo_permiso)
     
     return PermisoResponse(**nuevo_permiso.to_dict())
@@ -288,6 +300,7 @@ def actualizar_permiso(permiso_id: int, permiso_data: PermisoUpdate, db: Session
         permiso.activo = permiso_data.activo
     
     db.commit()
+    _refrescar_caches_rbac(db)
     db.refresh(permiso)
     
     return PermisoResponse(**permiso.to_dict())
@@ -314,6 +327,7 @@ def eliminar_permiso(permiso_id: int, db: Session = Depends(get_db)):
     
     db.delete(permiso)
     db.commit()
+    _refrescar_caches_rbac(db)
 
 
 # ========== ASIGNACIÓN DE PERMISOS A ROLES ==========
@@ -344,6 +358,7 @@ def asignar_permisos_a_rol(rol_id: int, request: AsignarPermisosRequest, db: Ses
             rol.permisos.append(permiso)
     
     db.commit()
+    _refrescar_caches_rbac(db)
     db.refresh(rol)
     
     return RolResponse(**rol.to_dict())
@@ -364,6 +379,7 @@ def remover_permisos_de_rol(rol_id: int, request: RemoverPermisosRequest, db: Se
     rol.permisos = [p for p in rol.permisos if p.id not in request.permisos_ids]
     
     db.commit()
+    _refrescar_caches_rbac(db)
     db.refresh(rol)
     
     return RolResponse(**rol.to_dict())
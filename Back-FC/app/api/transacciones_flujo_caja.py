@@ -5,13 +5,16 @@ import logging
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query, WebSocket, WebSocketDisconnect, Request
 from sqlalchemy.orm import Session
-from datetime import date
+from datetime import date, datetime
 import json
 
 logger = logging.getLogger(__name__)
 
-from ..core.database import get_db
+from ..core.database import get_db, get_read_db
+from ..core.serializacion import respuesta_json
+from ..core.etag import verificar_version
 from ..models import TransaccionFlujoCaja, AreaTransaccion
+from ..models.version_datos import CLAVE_GLOBAL, claves_transacciones
 from ..schemas.flujo_caja import (
     TransaccionFlujoCajaCreate,
     TransaccionFlujoCajaUpdate, 
@@ -19,20 +22,48 @@ from ..schemas.flujo_caja import (
     FlujoCajaDiarioResponse,
     FlujoCajaResumenResponse,
     AreaTransaccionSchema,
-    AreaConceptoSchema
+    AreaConceptoSchema,
+    LoteCeldasRequest,
+    LoteCeldasResponse,
+    HistorialCeldaResponse
 )
-from ..services.transaccion_flujo_caja_service import TransaccionFlujoCajaService
+from ..services.transaccion_flujo_caja_service import TransaccionFlujoCajaService, LoteInvalidoError, ConflictoVersionError
+from ..services.cierre_dia_service import CierreDiaService, DiaCerradoError
 from ..services.dependencias_flujo_caja_service import DependenciasFlujoCajaService
+from ..services.proyeccion_flujo_caja_service import MAX_HORIZONTE, ProyeccionFlujoCajaService, ProyeccionObsoletaError
 from ..services.concepto_flujo_caja_service import ConceptoFlujoCajaService
 from ..core.concepto_utils import es_concepto_auto_calculado
 from ..api.auth import get_current_user
 from ..core.websocket import websocket_manager
 from ..services.auditoria_service import log_transaccion_flujo_caja
+from ..services.exportacion_service import ENCABEZADOS_GRILLA, en_sesion_propia, filas_grilla, respuesta_exportacion
 import asyncio
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/transacciones-flujo-caja", tags=["Transacciones Flujo de Caja"])
 
+def _conflicto_version(e: ConflictoVersionError) -> HTTPException:
+    """409 con la versión vigente para que el cliente recargue la celda"""
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail={
+            "mensaje": str(e),
+            "transaccion_id": e.transaccion_id,
+            "version_actual": e.version_actual
+        }
+    )
+
+def _dia_cerrado(e: DiaCerradoError) -> HTTPException:
+    """423: la conciliación del día está cerrada; hay que reabrirla para editar"""
+    return HTTPException(
+        status_code=status.HTTP_423_LOCKED,
+        detail={
+            "mensaje": str(e),
+            "fecha": e.fecha.isoformat(),
+            "compania_id": e.compania_id
+        }
+    )
+
 @router.post("/", response_model=TransaccionFlujoCajaResponse, status_code=status.HTTP_201_CREATED)
 async def crear_transaccion(
     transaccion_data: TransaccionFlujoCajaCreate,
@@ -88,7 +119,6 @@ async def crear_transaccion(
                 fecha=transaccion_data.fecha,
                 concepto_modificado_id=transaccion_data.concepto_id,
                 cuenta_id=transaccion_data.cuenta_id,
-                compania_id=getattr(current_user, "compania_id", 1),
                 usuario_id=current_user.id
             )
             
@@ -123,6 +153,8 @@ async def crear_transaccion(
         
         print(f"✅ Transacción creada exitosamente: ID {transaccion.id}")
         return transaccion
+    except DiaCerradoError as e:
+        raise _dia_cerrado(e)
     except ValueError as e:
         print(f"❌ Error de validación: {str(e)}")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
@@ -135,12 +167,20 @@ async def crear_transaccion(
 
 @router.get("/fecha/{fecha}", response_model=List[TransaccionFlujoCajaResponse])
 def obtener_transacciones_por_fecha(
+    request: Request,
     fecha: date,
     area: Optional[AreaTransaccionSchema] = Query(None, description="Filtrar por área"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user = Depends(get_current_user)
 ):
-    """Obtener todas las transacciones de una fecha específica"""
+    """
+    Obtener todas las transacciones de una fecha específica.
+    Ruta rápida: tuplas de columnas → orjson (con gzip/brotli), misma forma que `TransaccionFlujoCajaResponse`.
+    Responde 304 si el cliente ya tiene la versión actual del día/área (ETag).
+    """
+    verificar_version(
+        request, db, [*claves_transacciones(fecha, area.value if area else None), ("conceptos", CLAVE_GLOBAL)]
+    )
     service = TransaccionFlujoCajaService(db)
     
     # 🔥 AUTO-INICIALIZACIÓN DESHABILITADA TEMPORALMENTE
@@ -158,8 +198,129 @@ def obtener_transacciones_por_fecha(
     #     import logging
     #     logging.warning(f"Error en auto-inicialización SALDO INICIAL para {fecha}: {e}")
     
-    transacciones = service.obtener_transacciones_por_fecha(fecha, area)
-    return transacciones
+    # Las compañías con el día cerrado se sirven desde su snapshot
+    cierre = CierreDiaService(db)
+    cerradas = cierre.companias_cerradas(fecha)
+    transacciones = service.listar_por_fecha_serializadas(fecha, area, companias_excluidas=cerradas)
+    if cerradas:
+        transacciones.extend(cierre.transacciones_snapshot(fecha, cerradas, area.value if area else None))
+    return respuesta_json(request, transacciones)
+
+@router.get("/historial-celda", response_model=HistorialCeldaResponse)
+def obtener_historial_celda(
+    fecha: date,
+    concepto_id: int,
+    cuenta_id: Optional[int] = Query(None, description="Cuenta de la celda (vacío para celdas sin cuenta)"),
+    antes_de: Optional[int] = Query(None, description="Cursor: id del último cambio de la página anterior"),
+    limite: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """📜 Historial de cambios de monto de una celda, del más reciente al más antiguo"""
+    service = TransaccionFlujoCajaService(db)
+    cambios, siguiente = service.obtener_historial_celda(fecha, concepto_id, cuenta_id, antes_de, limite)
+    return HistorialCeldaResponse(
+        fecha=fecha,
+        concepto_id=concepto_id,
+        cuenta_id=cuenta_id,
+        items=cambios,
+        siguiente_antes_de=siguiente
+    )
+
+@router.get("/exportar")
+def exportar_grilla(
+    request: Request,
+    fecha_inicio: date,
+    fecha_fin: date,
+    area: Optional[AreaTransaccionSchema] = Query(None, description="Grilla de tesorería o pagaduría (ambas si se omite)"),
+    formato: str = Query("xlsx", description="xlsx o csv"),
+    current_user = Depends(get_current_user)
+):
+    """
+    Exporta las celdas de las grillas diarias del rango en streaming (Excel o CSV).
+    La memoria no depende del rango; el CSV se comprime con gzip si el cliente lo acepta.
+    """
+    if fecha_fin < fecha_inicio:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="fecha_fin debe ser mayor o igual a fecha_inicio")
+    
+    area_valor = area.value if area else None
+    nombre = f"flujo_caja_{area_valor or 'todas'}_{fecha_inicio.isoformat()}_{fecha_fin.isoformat()}"
+    return respuesta_exportacion(
+        request,
+        en_sesion_propia(filas_grilla, fecha_inicio, fecha_fin, area_valor),
+        ENCABEZADOS_GRILLA,
+        formato,
+        nombre
+    )
+
+@router.get("/proyeccion")
+def obtener_proyeccion(
+    fecha_inicio: date,
+    horizonte: int = Query(20, description=f"Días hábiles a proyectar (máximo {MAX_HORIZONTE})"),
+    cuenta_id: Optional[int] = None,
+    compania_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Proyecta los saldos de las cuentas `horizonte` días hábiles hacia adelante, en memoria.
+    SALDO FINAL CUENTAS pasa a SALDO INICIAL y SALDO TOTAL EN BANCOS a SALDO DIA ANTERIOR
+    del siguiente día hábil; no se guarda nada.
+    """
+    try:
+        return ProyeccionFlujoCajaService(db).proyectar(fecha_inicio, horizonte, cuenta_id, compania_id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except LookupError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+@router.post("/proyeccion/confirmar")
+async def confirmar_proyeccion(
+    fecha_inicio: date,
+    horizonte: int = Query(20, description=f"Días hábiles a proyectar (máximo {MAX_HORIZONTE})"),
+    cuenta_id: Optional[int] = None,
+    compania_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Recalcula la proyección y guarda en lote las celdas calculadas que cambian (día por día,
+    con los bloqueos de recálculo de cada día). Los días cerrados no se modifican.
+    Se notifica por WebSocket `dependencias_procesadas` cada fecha escrita. Si un día choca con
+    otra sesión se responde 409; los días anteriores ya confirmados se notifican igual y se
+    devuelven en `cuentas_por_fecha`.
+    """
+    try:
+        resultado = await asyncio.to_thread(
+            ProyeccionFlujoCajaService(db).confirmar,
+            fecha_inicio, horizonte, current_user.id, cuenta_id, compania_id
+        )
+    except ProyeccionObsoletaError as e:
+        await _notificar_proyeccion(e.cuentas_por_fecha)
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail={
+            "mensaje": str(e), "fecha": e.fecha.isoformat(), "cuentas_por_fecha": e.cuentas_por_fecha
+        })
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except LookupError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+    await _notificar_proyeccion(resultado["cuentas_por_fecha"])
+    return resultado
+
+async def _notificar_proyeccion(cuentas_por_fecha: dict):
+    """`dependencias_procesadas` por cada fecha confirmada de una proyección"""
+    for fecha, cuentas in cuentas_por_fecha.items():
+        try:
+            await websocket_manager.broadcast_update({
+                "type": "dependencias_procesadas",
+                "fecha": fecha,
+                "cuentas": cuentas,
+                "proyeccion": True,
+                "timestamp": datetime.now().isoformat()
+            })
+        except Exception as ws_error:
+            logger.warning(f"⚠️ Error en notificación WebSocket: {ws_error}")
 
 @router.get("/{transaccion_id}", response_model=TransaccionFlujoCajaResponse)
 def obtener_transaccion(
@@ -176,6 +337,54 @@ def obtener_transaccion(
     
     return transaccion
 
+@router.post("/guardar-lote/{fecha}", response_model=LoteCeldasResponse)
+async def guardar_lote_celdas(
+    fecha: date,
+    lote: LoteCeldasRequest,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    📦 Guardar varias celdas de una fecha en una sola petición (pegar columnas, ediciones múltiples).
+    
+    Valida todo el lote antes de escribir, aplica las operaciones y su auditoría en una
+    sola transacción y programa un único recálculo por cada cuenta afectada. Al terminar
+    se notifica por WebSocket `dependencias_procesadas`.
+    """
+    try:
+        service = TransaccionFlujoCajaService(db)
+        resultado = service.guardar_lote(
+            fecha=fecha,
+            operaciones=lote.operaciones,
+            usuario=current_user,
+            request=request
+        )
+    except LoteInvalidoError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT if e.conflicto else status.HTTP_400_BAD_REQUEST,
+            detail={"mensaje": "El lote no se aplicó", "errores": e.errores}
+        )
+    except DiaCerradoError as e:
+        raise _dia_cerrado(e)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ Error guardando lote para {fecha}: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+    
+    cuentas_afectadas = resultado.pop("cuentas_afectadas")
+    
+    # Un solo recálculo por (fecha, cuenta) en background
+    from app.services.optimized_transaction_service import optimized_service
+    asyncio.create_task(
+        optimized_service.procesar_lote_async(fecha, cuentas_afectadas, current_user.id)
+    )
+    
+    return LoteCeldasResponse(
+        **resultado,
+        cuentas_recalculo=sorted(cuentas_afectadas, key=lambda c: (c is None, c or 0))
+    )
+
 @router.put("/{transaccion_id}/quick", response_model=TransaccionFlujoCajaResponse)
 async def actualizar_transaccion_rapida(
     transaccion_id: int,
@@ -186,7 +395,8 @@ async def actualizar_transaccion_rapida(
 ):
     """🚀 OPTIMIZADO: Actualizar transacción con respuesta inmediata"""
     logger.info(f"🚀 API PUT RÁPIDO /transacciones/{transaccion_id}/quick LLAMADO")
-    logger.info(f"📋 Datos: {transaccion_data.model_dump()}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("📋 Datos: %s", transaccion_data)
     
     try:
         # Validación rápida de concepto auto-calculado
@@ -257,6 +467,10 @@ async def actualizar_transaccion_rapida(
         
     except HTTPException:
         raise
+    except ConflictoVersionError as e:
+        raise _conflicto_version(e)
+    except DiaCerradoError as e:
+        raise _dia_cerrado(e)
     except Exception as e:
         logger.error(f"❌ Error en actualización rápida: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -271,7 +485,8 @@ async def actualizar_transaccion(
 ):
     """Actualizar una transacción existente (método completo tradicional)"""
     logger.info(f"🚨🚨🚨 API PUT /transacciones/{transaccion_id} LLAMADO 🚨🚨🚨")
-    logger.info(f"📋 Datos recibidos: {transaccion_data.model_dump()}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("📋 Datos recibidos: %s", transaccion_data)
     logger.info(f"👤 Usuario: {current_user.id if hasattr(current_user, 'id') else 'Unknown'}")
     try:
         # � VALIDACIÓN: Verificar si es un concepto auto-calculado
@@ -331,7 +546,6 @@ async def actualizar_transaccion(
                 fecha=transaccion.fecha,
                 concepto_modificado_id=transaccion.concepto_id,
                 cuenta_id=transaccion.cuenta_id,
-                compania_id=getattr(current_user, "compania_id", 1),
                 usuario_id=current_user.id
             )
             
@@ -366,6 +580,12 @@ async def actualizar_transaccion(
         
         print(f"✅ Transacción actualizada exitosamente: ID {transaccion.id}")
         return transaccion
+    except HTTPException:
+        raise
+    except ConflictoVersionError as e:
+        raise _conflicto_version(e)
+    except DiaCerradoError as e:
+        raise _dia_cerrado(e)
     except ValueError as e:
         print(f"❌ Error de validación en actualización: {str(e)}")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
@@ -394,8 +614,6 @@ def recalcular_rango_fechas(
     - SALDO FINAL del día N debe pasar a SALDO INICIAL del día N+1
     """
     try:
-        from datetime import timedelta
-        
         print(f"🔄 Iniciando recálculo de rango: {fecha_inicio} a {fecha_fin}")
         
         if fecha_fin < fecha_inicio:
@@ -408,17 +626,14 @@ def recalcular_rango_fechas(
         resultados_por_fecha = {}
         total_actualizaciones = 0
         
-        # Procesar día por día en orden cronológico
-        fecha_actual = fecha_inicio
-        while fecha_actual <= fecha_fin:
-            print(f"  📅 Procesando {fecha_actual}...")
-            
-            resultado_dia = dependencias_service.procesar_dependencias_completas_ambos_dashboards(
-                fecha=fecha_actual,
-                compania_id=getattr(current_user, "compania_id", 1),
-                usuario_id=current_user.id
-            )
-            
+        # Día por día en orden cronológico; las cuentas se reparten en el pool de recálculo
+        resultados_rango = dependencias_service.procesar_rango_fechas(
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin,
+            usuario_id=current_user.id
+        )
+        
+        for fecha_actual, resultado_dia in resultados_rango.items():
             updates_dia = (
                 len(resultado_dia.get("tesoreria", [])) + 
                 len(resultado_dia.get("pagaduria", [])) + 
@@ -437,12 +652,14 @@ def recalcular_rango_fechas(
             }
             
             total_actualizaciones += updates_dia
-            fecha_actual += timedelta(days=1)
         
         resultado = {
             "mensaje": f"Recálculo de rango completado: {fecha_inicio} a {fecha_fin}",
             "total_actualizaciones": total_actualizaciones,
+            "paralelismo": dependencias_service.paralelismo,
             "dias_procesados": len(resultados_por_fecha),
+            "dias_cerrados_omitidos": (fecha_fin - fecha_inicio).days + 1 - len(resultados_por_fecha),
+            "metricas": dependencias_service.metricas,
             "resultados_por_fecha": resultados_por_fecha
         }
         
@@ -474,7 +691,6 @@ def recalcular_dependencias_fecha(
         dependencias_service = DependenciasFlujoCajaService(db)
         resultados_completos = dependencias_service.procesar_dependencias_completas_ambos_dashboards(
             fecha=fecha,
-            compania_id=getattr(current_user, "compania_id", 1),
             usuario_id=current_user.id
         )
         
@@ -495,6 +711,7 @@ def recalcular_dependencias_fecha(
                 "cross_dashboard_updates": len(resultados_completos.get("cross_dashboard", [])),
                 "propagacion_dia_siguiente": len(resultados_completos.get("propagacion_dia_siguiente", []))
             },
+            "metricas": dependencias_service.metricas,
             "resultados_completos": resultados_completos
         }
         
@@ -531,7 +748,10 @@ def eliminar_transaccion(
     cuenta_id = transaccion_existente.cuenta_id
     
     # Eliminar la transacción
-    eliminado = service.eliminar_transaccion(transaccion_id, current_user.id)
+    try:
+        eliminado = service.eliminar_transaccion(transaccion_id, current_user.id)
+    except DiaCerradoError as e:
+        raise _dia_cerrado(e)
     
     if not eliminado:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transacción no encontrada")
@@ -570,7 +790,7 @@ def eliminar_transaccion(
 def obtener_flujo_caja_diario(
     fecha: date,
     area: AreaConceptoSchema,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user = Depends(get_current_user)
 ):
     """Obtener el flujo de caja completo de un día específico para un área"""
@@ -583,7 +803,7 @@ def obtener_resumen_periodo(
     fecha_inicio: date,
     fecha_fin: date,
     area: AreaConceptoSchema,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user = Depends(get_current_user)
 ):
     """Obtener resumen del flujo de caja para un período específico"""
@@ -601,7 +821,7 @@ def obtener_resumen_periodo(
 @router.get("/dashboard/tesoreria/{fecha}", response_model=FlujoCajaDiarioResponse)
 def obtener_dashboard_tesoreria(
     fecha: date,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user = Depends(get_current_user)
 ):
     """Obtener datos específicos para el dashboard de tesorería"""
@@ -612,7 +832,7 @@ def obtener_dashboard_tesoreria(
 @router.get("/dashboard/pagaduria/{fecha}", response_model=FlujoCajaDiarioResponse)
 def obtener_dashboard_pagaduria(
     fecha: date,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user = Depends(get_current_user)
 ):
     """Obtener datos específicos para el dashboard de pagaduría"""
@@ -678,14 +898,19 @@ def eliminar_transacciones_fecha(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Debe confirmar la eliminación con el parámetro 'confirmar=true'")
     
     service = TransaccionFlujoCajaService(db)
-    transacciones = service.obtener_transacciones_por_fecha(fecha, area)
+    # Las compañías con el día cerrado no se tocan
+    cerradas = CierreDiaService(db).companias_cerradas(fecha)
+    transacciones = service.obtener_transacciones_por_fecha(fecha, area, companias_excluidas=cerradas)
     
     eliminadas = 0
     for transaccion in transacciones:
         if service.eliminar_transaccion(transaccion.id, current_user.id):
             eliminadas += 1
     
-    return {"message": f"Se eliminaron {eliminadas} transacciones de la fecha {fecha}"}
+    return {
+        "message": f"Se eliminaron {eliminadas} transacciones de la fecha {fecha}",
+        "companias_cerradas_omitidas": sorted(cerradas)
+    }
 
 # ============================================
 # WEBSOCKET PARA ACTUALIZACIONES EN TIEMPO REAL
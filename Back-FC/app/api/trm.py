@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from sqlalchemy import desc
 from typing import List, Optional
 from datetime import date, datetime
 from decimal import Decimal
 
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
+from app.core.etag import VersionCondicionalLectura
+from app.core.serializacion import respuesta_json
 from app.models.trm import TRM
 from pydantic import BaseModel
 from app.services.trm_service import trm_service
@@ -26,16 +28,16 @@ class TRMResponse(BaseModel):
         from_attributes = True
 
 # Endpoints
-@router.get("/current", response_model=TRMResponse)
-def get_current_trm(db: Session = Depends(get_db)):
+@router.get("/current", response_model=TRMResponse, dependencies=[Depends(VersionCondicionalLectura("trm"))])
+def get_current_trm(db: Session = Depends(get_read_db)):
     """Obtener la TRM más reciente"""
     trm = db.query(TRM).order_by(desc(TRM.fecha)).first()
     if not trm:
         raise HTTPException(status_code=404, detail="No se encontró información de TRM")
     return trm
 
-@router.get("/by-date/{fecha}", response_model=TRMResponse)
-def get_trm_by_date(fecha: date, db: Session = Depends(get_db)):
+@router.get("/by-date/{fecha}", response_model=TRMResponse, dependencies=[Depends(VersionCondicionalLectura("trm"))])
+def get_trm_by_date(fecha: date, db: Session = Depends(get_read_db)):
     """Obtener la TRM por fecha específica"""
     trm = db.query(TRM).filter(TRM.fecha == fecha).first()
     if not trm:
@@ -63,15 +65,16 @@ def obtener_trm_fecha(fecha: date):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error obteniendo TRM: {str(e)}")
 
-@router.get("/range", response_model=List[TRMResponse])
+@router.get("/range", response_model=List[TRMResponse], dependencies=[Depends(VersionCondicionalLectura("trm"))])
 def get_trm_range(
+    request: Request,
     fecha_inicio: Optional[date] = None,
     fecha_fin: Optional[date] = None,
     limit: int = 30,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    """Obtener rango de TRM"""
-    query = db.query(TRM)
+    """Obtener rango de TRM (tuplas de columnas serializadas con orjson)"""
+    query = db.query(TRM.fecha, TRM.valor, TRM.fecha_creacion)
     
     if fecha_inicio:
         query = query.filter(TRM.fecha >= fecha_inicio)
@@ -79,7 +82,7 @@ def get_trm_range(
         query = query.filter(TRM.fecha <= fecha_fin)
     
     trm_list = query.order_by(desc(TRM.fecha)).limit(limit).all()
-    return trm_list
+    return respuesta_json(request, [fila._asdict() for fila in trm_list])
 
 @router.post("/", response_model=TRMResponse)
 def create_trm(trm_data: TRMCreate, db: Session = Depends(get_db)):
@@ -4,6 +4,7 @@ from sqlalchemy.orm import Session
 import logging
 
 from ..core.database import get_db
+from ..core.principal_cache import principal_cache
 from ..models.usuarios import Usuario
 from ..schemas.auth import UserResponse, UserCreate, UserUpdate
 from ..services.auth_service import get_current_user, check_user_role, get_password_hash
@@ -73,6 +74,7 @@ async def update_user(
     
     db.commit()
     db.refresh(user)
+    principal_cache.invalidar_usuario(user.id)
     
     # 📝 AUDITORÍA: Registrar actualización de usuario
     try:
@@ -127,8 +129,10 @@ async def delete_user(
     email_eliminado = user.email
     rol_eliminado = user.rol
     
+    usuario_eliminado_id = user.id
     db.delete(user)
     db.commit()
+    principal_cache.invalidar_usuario(usuario_eliminado_id)
     
     # 📝 AUDITORÍA: Registrar eliminación de usuario
     try:
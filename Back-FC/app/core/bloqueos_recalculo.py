@@ -0,0 +1,197 @@
+"""
+Bloqueos de recálculo por (fecha, cuenta).
+
+El recálculo de dependencias de un día (subtotales, GMF, 4x1000, propagación al día
+siguiente) lee y escribe varias filas de la misma fecha y cuenta. Si dos recálculos
+del mismo día se intercalan, los subtotales quedan desactualizados. Este módulo los
+serializa por (fecha, cuenta) mientras días o cuentas distintas siguen en paralelo:
+
+- En proceso: una tabla de locks por clave, reentrante por hilo.
+- Entre workers: `GET_LOCK` de MySQL sobre una conexión dedicada (backend "auto"/"mysql").
+  No puede ser la conexión de la sesión: el trabajo hace commit dentro del bloqueo y la
+  sesión devuelve su conexión al pool con el lock tomado. Cada hilo abre una sola
+  conexión de bloqueos y la comparte entre sus bloqueos anidados (la propagación al día
+  siguiente no toma otra), así que un hilo de recálculo usa dos conexiones del pool;
+  `paralelismo_recalculo` limita los hilos a un tercio del pool por eso.
+
+`ejecutar_unico` además agrupa las peticiones repetidas: si ya hay un recálculo del
+mismo tipo esperando turno para esa clave, la nueva petición no encola otro, porque
+el que espera leerá el estado más reciente al ejecutarse.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import text
+
+from .config import get_settings
+
+logger = logging.getLogger(__name__)
+
+Clave = Tuple[date, Optional[int]]
+
+
+class BloqueoNoDisponibleError(TimeoutError):
+    """No se obtuvo el bloqueo de (fecha, cuenta) dentro del tiempo configurado"""
+
+
+class _EntradaBloqueo:
+    __slots__ = ("lock", "usuarios")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.usuarios = 0
+
+
+class BloqueosRecalculo:
+    """Tabla de bloqueos por (fecha, cuenta) con respaldo opcional en MySQL"""
+
+    def __init__(self, timeout_seconds: float = 60, backend: str = "auto"):
+        self.timeout_seconds = timeout_seconds
+        self.backend = backend
+        self._entradas: Dict[Clave, _EntradaBloqueo] = {}
+        self._pendientes = set()
+        self._guard = threading.Lock()
+        self._local = threading.local()
+        self._stats = {"adquisiciones": 0, "con_espera": 0, "timeouts": 0, "coalescidas": 0}
+
+    @staticmethod
+    def nombre_bloqueo(fecha: date, cuenta_id: Optional[int]) -> str:
+        return f"flujo_caja:{fecha.isoformat()}:{cuenta_id if cuenta_id is not None else 'todas'}"
+
+    def _usar_mysql(self, engine) -> bool:
+        if self.backend == "local":
+            return False
+        return engine.dialect.name == "mysql"
+
+    def _retenidos(self) -> Dict[Clave, int]:
+        if not hasattr(self._local, "retenidos"):
+            self._local.retenidos = {}
+        return self._local.retenidos
+
+    def _tomar_conexion(self, engine):
+        """Conexión de bloqueos del hilo para `engine`; se abre con el primer bloqueo"""
+        if not hasattr(self._local, "conexiones"):
+            self._local.conexiones = {}
+        entrada = self._local.conexiones.get(engine)
+        if entrada is None:
+            entrada = self._local.conexiones[engine] = [engine.connect(), 0]
+        entrada[1] += 1
+        return entrada[0]
+
+    def _soltar_conexion(self, engine) -> None:
+        """Cierra la conexión de bloqueos del hilo al soltar su último bloqueo"""
+        entrada = self._local.conexiones[engine]
+        entrada[1] -= 1
+        if entrada[1] == 0:
+            del self._local.conexiones[engine]
+            entrada[0].close()
+
+    def _liberar_entrada(self, clave: Clave, entrada: _EntradaBloqueo) -> None:
+        with self._guard:
+            entrada.usuarios -= 1
+            if entrada.usuarios == 0:
+                self._entradas.pop(clave, None)
+
+    @contextmanager
+    def bloquear(self, fecha: date, cuenta_id: Optional[int], bind=None):
+        """
+        Sección crítica para el recálculo de (fecha, cuenta); reentrante en el mismo hilo.
+        
+        `bind` es el engine de la sesión que hará el trabajo (por defecto el de la app);
+        define si se usa GET_LOCK.
+        """
+        clave = (fecha, cuenta_id)
+        retenidos = self._retenidos()
+        if retenidos.get(clave):
+            retenidos[clave] += 1
+            try:
+                yield
+            finally:
+                retenidos[clave] -= 1
+            return
+
+        with self._guard:
+            entrada = self._entradas.setdefault(clave, _EntradaBloqueo())
+            entrada.usuarios += 1
+
+        inicio = time.monotonic()
+        adquirido = entrada.lock.acquire(blocking=False)
+        if not adquirido:
+            self._stats["con_espera"] += 1
+            adquirido = entrada.lock.acquire(timeout=self.timeout_seconds)
+        if not adquirido:
+            self._stats["timeouts"] += 1
+            self._liberar_entrada(clave, entrada)
+            raise BloqueoNoDisponibleError(f"Recálculo de {fecha} cuenta {cuenta_id} ocupado")
+
+        conexion = None
+        nombre = self.nombre_bloqueo(fecha, cuenta_id)
+        try:
+            if bind is None:
+                from .database import engine as bind
+            engine = getattr(bind, "engine", bind)
+            if self._usar_mysql(engine):
+                restante = max(1, int(self.timeout_seconds - (time.monotonic() - inicio)))
+                conexion = self._tomar_conexion(engine)
+                obtenido = conexion.execute(
+                    text("SELECT GET_LOCK(:nombre, :timeout)"), {"nombre": nombre, "timeout": restante}
+                ).scalar()
+                if obtenido != 1:
+                    self._stats["timeouts"] += 1
+                    raise BloqueoNoDisponibleError(f"GET_LOCK('{nombre}') no disponible")
+
+            self._stats["adquisiciones"] += 1
+            retenidos[clave] = 1
+            try:
+                yield
+            finally:
+                retenidos.pop(clave, None)
+        finally:
+            if conexion is not None:
+                try:
+                    conexion.execute(text("SELECT RELEASE_LOCK(:nombre)"), {"nombre": nombre})
+                except Exception as e:
+                    logger.warning(f"⚠️ No se pudo liberar {nombre}: {e}")
+                finally:
+                    self._soltar_conexion(engine)
+            entrada.lock.release()
+            self._liberar_entrada(clave, entrada)
+
+    def ejecutar_unico(self, tipo: str, fecha: date, cuenta_id: Optional[int], fn: Callable[[], Any]) -> Optional[Any]:
+        """
+        Ejecuta `fn` bajo el bloqueo de (fecha, cuenta).
+
+        Si ya hay un trabajo del mismo `tipo` esperando turno para esa clave, retorna
+        None sin ejecutar: ese trabajo cubre también esta petición.
+        """
+        marca = (tipo, fecha, cuenta_id)
+        with self._guard:
+            if marca in self._pendientes:
+                self._stats["coalescidas"] += 1
+                logger.info(f"🔁 Recálculo {tipo} {fecha} cuenta {cuenta_id} agrupado con uno pendiente")
+                return None
+            self._pendientes.add(marca)
+        try:
+            with self.bloquear(fecha, cuenta_id):
+                with self._guard:
+                    self._pendientes.discard(marca)
+                return fn()
+        finally:
+            with self._guard:
+                self._pendientes.discard(marca)
+
+    def stats(self) -> Dict[str, int]:
+        with self._guard:
+            return {**self._stats, "claves_activas": len(self._entradas), "pendientes": len(self._pendientes)}
+
+
+# Instancia global
+_settings = get_settings()
+bloqueos_recalculo = BloqueosRecalculo(
+    timeout_seconds=_settings.recalculo_lock_timeout_seconds,
+    backend=_settings.recalculo_lock_backend,
+)
@@ -0,0 +1,103 @@
+"""
+Caché en memoria del catálogo de conceptos y cuentas bancarias.
+
+Las validaciones de edición (concepto activo, auto-calculado, signo por código,
+cuenta existente) se resuelven contra esta copia en lugar de consultar la BD en
+cada celda. Se recarga al vencer el TTL y se invalida desde los endpoints que
+modifican conceptos o cuentas.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from sqlalchemy.orm import Session, joinedload
+
+from .config import get_settings
+
+# Conceptos que nunca se editan manualmente (se calculan en el motor de dependencias)
+CONCEPTOS_AUTO_CALCULADOS = frozenset({2, 52, 54, 82, 83, 84, 85})
+
+
+@dataclass(frozen=True)
+class ConceptoMeta:
+    id: int
+    nombre: str
+    codigo: str
+    area: str
+    activo: bool
+    auto_calculado: bool
+
+
+@dataclass(frozen=True)
+class CuentaMeta:
+    id: int
+    etiqueta: str
+    compania_id: int
+
+
+class CatalogoCache:
+    """Copia de conceptos y cuentas con TTL, recargada completa en un solo paso"""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._conceptos: Dict[int, ConceptoMeta] = {}
+        self._cuentas: Dict[int, CuentaMeta] = {}
+        self._expira = 0.0
+        self._lock = threading.Lock()
+
+    def _cargar(self, db: Session) -> None:
+        from ..models.conceptos_flujo_caja import ConceptoFlujoCaja
+        from ..models.cuentas_bancarias import CuentaBancaria
+        from .concepto_utils import es_concepto_auto_calculado
+
+        conceptos = {
+            c.id: ConceptoMeta(
+                id=c.id,
+                nombre=c.nombre,
+                codigo=c.codigo or "",
+                area=c.area.value if hasattr(c.area, "value") else str(c.area),
+                activo=bool(c.activo),
+                auto_calculado=c.id in CONCEPTOS_AUTO_CALCULADOS or es_concepto_auto_calculado(c),
+            )
+            for c in db.query(ConceptoFlujoCaja).all()
+        }
+        cuentas = {
+            c.id: CuentaMeta(
+                id=c.id,
+                etiqueta=f"{c.banco.nombre} - {c.numero_cuenta}" if c.banco else c.numero_cuenta,
+                compania_id=c.compania_id,
+            )
+            for c in db.query(CuentaBancaria).options(joinedload(CuentaBancaria.banco)).all()
+        }
+        self._conceptos = conceptos
+        self._cuentas = cuentas
+        self._expira = time.monotonic() + self.ttl_seconds
+
+    def _asegurar(self, db: Session) -> None:
+        if time.monotonic() < self._expira:
+            return
+        with self._lock:
+            if time.monotonic() >= self._expira:
+                self._cargar(db)
+
+    def conceptos(self, db: Session) -> Dict[int, ConceptoMeta]:
+        self._asegurar(db)
+        return self._conceptos
+
+    def cuentas(self, db: Session) -> Dict[int, CuentaMeta]:
+        self._asegurar(db)
+        return self._cuentas
+
+    def concepto(self, db: Session, concepto_id: int) -> Optional[ConceptoMeta]:
+        return self.conceptos(db).get(concepto_id)
+
+    def cuenta(self, db: Session, cuenta_id: int) -> Optional[CuentaMeta]:
+        return self.cuentas(db).get(cuenta_id)
+
+    def invalidar(self) -> None:
+        self._expira = 0.0
+
+
+# Instancia global
+catalogo_cache = CatalogoCache(ttl_seconds=get_settings().catalogo_cache_ttl_seconds)
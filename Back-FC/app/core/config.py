@@ -14,12 +14,56 @@ class Settings(BaseSettings):
     db_password: str = os.getenv("DB_PASSWORD", "")
     db_name: str = os.getenv("DB_NAME", "flujo_caja")
     database_url_env: Optional[str] = os.getenv("DATABASE_URL")
+    # Pool de conexiones
+    db_pool_size: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    db_max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    db_pool_timeout: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+    db_pool_recycle: int = int(os.getenv("DB_POOL_RECYCLE", "300"))
+    # Log de SQL; si no se define sigue a `debug`
+    db_echo: Optional[bool] = (os.getenv("DB_ECHO").lower() in ("1", "true")) if os.getenv("DB_ECHO") else None
+    # Réplica de lectura opcional para informes, auditoría y GETs del dashboard (vacío = todo al primario)
+    database_read_url_env: Optional[str] = os.getenv("DATABASE_READ_URL")
+    # Segundos tras una escritura de un cliente en los que sus lecturas siguen yendo al primario
+    db_read_lag_window_seconds: float = float(os.getenv("DB_READ_LAG_WINDOW_SECONDS", "5"))
+    # Lag máximo tolerado de la réplica; por encima (o si no replica) se lee del primario
+    db_read_max_lag_seconds: float = float(os.getenv("DB_READ_MAX_LAG_SECONDS", "30"))
+    # Cada cuánto se vuelve a medir el lag de la réplica
+    db_read_lag_check_seconds: float = float(os.getenv("DB_READ_LAG_CHECK_SECONDS", "5"))
     
     # Security
     secret_key: str = os.getenv("SECRET_KEY", "your-secret-key-here")
     algorithm: str = os.getenv("ALGORITHM", "HS256")
     access_token_expire_minutes: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))  # 1 hora para coincidir con frontend
-    
+    # TTL del caché de usuario autenticado (se limita por debajo de la expiración del token)
+    principal_cache_ttl_seconds: int = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "120"))
+    # Cada cuánto cada worker compara la versión de roles/permisos para recargar el registro RBAC
+    rbac_verificar_segundos: float = float(os.getenv("RBAC_VERIFICAR_SEGUNDOS", "5"))
+
+    # TTL del caché de conceptos y cuentas usado en validaciones de edición
+    catalogo_cache_ttl_seconds: int = int(os.getenv("CATALOGO_CACHE_TTL_SECONDS", "300"))
+
+    # Bloqueos de recálculo por (fecha, cuenta): "auto" usa GET_LOCK en MySQL, "local" solo en proceso
+    recalculo_lock_backend: str = os.getenv("RECALCULO_LOCK_BACKEND", "auto")
+    recalculo_lock_timeout_seconds: int = int(os.getenv("RECALCULO_LOCK_TIMEOUT_SECONDS", "60"))
+    # Hilos para recalcular cuentas en paralelo (día completo y rangos); 0 = según CPUs.
+    # Siempre se limita a un tercio de DB_POOL_SIZE + DB_MAX_OVERFLOW (cada hilo usa dos conexiones)
+    recalculo_paralelismo: int = int(os.getenv("RECALCULO_PARALELISMO", "0"))
+
+    # TRM: backfill y scheduler en segundo plano
+    trm_startup_backfill_days: int = int(os.getenv("TRM_STARTUP_BACKFILL_DAYS", "30"))
+    trm_job_max_workers: int = int(os.getenv("TRM_JOB_MAX_WORKERS", "1"))
+    trm_job_max_retries: int = int(os.getenv("TRM_JOB_MAX_RETRIES", "3"))
+    trm_job_retry_base_seconds: float = float(os.getenv("TRM_JOB_RETRY_BASE_SECONDS", "5"))
+    trm_daily_job_time: str = os.getenv("TRM_DAILY_JOB_TIME", "19:00")
+
+    # Perfilado de requests (SQL por request, fases del recálculo, N+1); expuesto en /debug/perf
+    perf_profiling_enabled: bool = os.getenv("PERF_PROFILING_ENABLED", "false").lower() in ("1", "true")
+    # Repeticiones de una misma sentencia en una request a partir de las cuales se marca como posible N+1
+    perf_n_mas_1_umbral: int = int(os.getenv("PERF_N_MAS_1_UMBRAL", "5"))
+
+    # Particiones mensuales de transacciones_flujo_caja (MySQL): meses futuros que deben existir siempre
+    particiones_meses_adelante: int = int(os.getenv("PARTICIONES_MESES_ADELANTE", "3"))
+
     # CORS
     # Permitir configurar orígenes por variable de entorno separada por comas
     allowed_origins: list = ["http://localhost:5000", "http://127.0.0.1:5000"]
@@ -37,6 +81,12 @@ class Settings(BaseSettings):
         # Fallback: construir URL MySQL a partir de variables por partes
         return f"mysql+pymysql://{self.db_user}:{self.db_password}@{self.db_host}:{self.db_port}/{self.db_name}"
 
+    @property
+    def database_read_url(self) -> Optional[str]:
+        if self.database_read_url_env and self.database_read_url_env.strip():
+            return self.database_read_url_env.strip()
+        return None
+
     @property
     def cors_allowed_origins(self) -> List[str]:
         env_val = os.getenv("ALLOWED_ORIGINS")
@@ -1,17 +1,48 @@
-from sqlalchemy import create_engine
+import logging
+import math
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
 from .config import get_settings
+from .metricas import lecturas_db, replica_lag
+from .pool_metrics import InstrumentedQueuePool
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def _crear_engine(url: str, poolclass=InstrumentedQueuePool):
+    """Engine con las opciones del pool (SQLite no usa QueuePool)"""
+    pool_options = {}
+    if not url.startswith("sqlite"):
+        pool_options = {
+            "poolclass": poolclass,
+            "pool_size": settings.db_pool_size,
+            "max_overflow": settings.db_max_overflow,
+            "pool_timeout": settings.db_pool_timeout,
+            "pool_recycle": settings.db_pool_recycle,
+        }
+    return create_engine(
+        url,
+        echo=settings.db_echo if settings.db_echo is not None else settings.debug,
+        pool_pre_ping=True,
+        **pool_options
+    )
+
 
 # Crear el engine de SQLAlchemy
-engine = create_engine(
-    settings.database_url,
-    echo=settings.debug,
-    pool_pre_ping=True,
-    pool_recycle=300
-)
+engine = _crear_engine(settings.database_url)
+
+# Réplica de lectura opcional (pool sin instrumentar: las métricas del pool son las del primario)
+read_engine = _crear_engine(settings.database_read_url, QueuePool) if settings.database_read_url else engine
 
 # Crear la sesión
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -25,4 +56,310 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+@contextmanager
+def session_scope():
+    """Sesión para trabajo fuera de una request (tareas en segundo plano, jobs, middleware).
+
+    Hace rollback si hay una excepción y siempre devuelve la conexión al pool.
+    El commit sigue siendo responsabilidad del llamador.
+    """
+    db = SessionLocal()
+    try:
+        yield db
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+# ---------------------------------------------------------------------------
+# Sesiones de solo lectura (réplica con respaldo en el primario)
+# ---------------------------------------------------------------------------
+
+_SOLO_LECTURA = "solo_lectura"
+_ESCRIBIO = "escribio_en_primario"
+_ENRUTADORES: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()  # engine primario → enrutador
+
+SIN_RESPUESTA = float("inf")
+
+# Marca de la última escritura del cliente de la request en curso ({"escritura": epoch}),
+# leída y devuelta por MiddlewareMarcaEscritura; fuera de una request no hay marca
+_marca_cliente: ContextVar[Optional[dict]] = ContextVar("marca_escritura_cliente", default=None)
+COOKIE_MARCA_ESCRITURA = "fc_ultima_escritura"
+HEADER_MARCA_ESCRITURA = "x-ultima-escritura"
+
+
+class EnrutadorLectura:
+    """
+    Decide a qué engine va cada sesión de solo lectura.
+
+    Se usa la réplica salvo que:
+    - el cliente de la request haya escrito en el primario hace menos de `ventana` segundos
+      (o menos que el último lag medido), para que quien acaba de guardar vea su cambio al
+      recargar. La hora del commit viaja con el cliente (cookie o header, ver
+      `MiddlewareMarcaEscritura`), así que vale en cualquier worker;
+    - el lag medido supere `lag_maximo`, la replicación esté detenida o la réplica no responda.
+
+    El lag se mide en un hilo de fondo cada `intervalo` segundos (SHOW REPLICA STATUS en
+    MySQL, replay de WAL en PostgreSQL); las requests solo leen el último valor, así que
+    una réplica caída no bloquea ninguna. Hasta la primera medición se lee del primario.
+    Si la base no informa lag (p. ej. dos instancias independientes en desarrollo) solo se
+    aplica la ventana.
+    """
+
+    def __init__(self, primario, replica, ventana: float, lag_maximo: float, intervalo: float):
+        self.primario = primario
+        self.replica = replica
+        self.ventana = ventana
+        self.lag_maximo = lag_maximo
+        self.intervalo = intervalo
+        self._sesiones = {
+            False: sessionmaker(autocommit=False, autoflush=False, bind=primario),
+            True: sessionmaker(autocommit=False, autoflush=False, bind=replica),
+        }
+        self._lock = threading.Lock()
+        self._lag: Optional[float] = SIN_RESPUESTA
+        self._hilo: Optional[threading.Thread] = None
+        self._detener = threading.Event()
+        _ENRUTADORES[primario] = self
+
+    @property
+    def configurado(self) -> bool:
+        return self.replica is not self.primario
+
+    @property
+    def duracion_marca(self) -> int:
+        """Segundos que la marca de escritura puede desviar lecturas al primario"""
+        return math.ceil(max(self.ventana, self.lag_maximo))
+
+    def registrar_escritura(self) -> None:
+        """Anota la hora del commit en la request en curso; el middleware la devuelve al cliente"""
+        marca = _marca_cliente.get()
+        if marca is not None:
+            marca["escritura"] = time.time()
+
+    def usar_replica(self) -> bool:
+        if not self.configurado:
+            return False
+        lag = self.lag()
+        if lag is not None and lag > self.lag_maximo:
+            return False
+        marca = _marca_cliente.get()
+        ultima = marca.get("escritura") if marca else None
+        return ultima is None or time.time() - ultima >= max(self.ventana, lag or 0.0)
+
+    def lag(self) -> Optional[float]:
+        """Último lag medido en segundos (None si la base no lo informa, inf si no responde o no replica)"""
+        self.iniciar_medicion()
+        return self._lag
+
+    def iniciar_medicion(self) -> None:
+        """Arranca (una vez por proceso) el hilo que mide el lag cada `intervalo` segundos"""
+        if not self.configurado or self.intervalo <= 0 or self._hilo is not None:
+            return
+        with self._lock:
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._medir_periodicamente, name="lag_replica", daemon=True)
+                self._hilo.start()
+
+    def detener(self) -> None:
+        self._detener.set()
+
+    def _medir_periodicamente(self) -> None:
+        while not self._detener.is_set():
+            self.medir()
+            self._detener.wait(self.intervalo)
+
+    def medir(self) -> Optional[float]:
+        """Mide el lag ahora (lo hace el hilo de fondo; también sirve para forzar una medición)"""
+        lag = self._medir_lag()
+        if (lag is not None and lag > self.lag_maximo) and not (self._lag is not None and self._lag > self.lag_maximo):
+            logger.warning(f"⚠️ Réplica de lectura atrasada o sin respuesta (lag={lag}); las lecturas van al primario")
+        self._lag = lag
+        replica_lag.set(-1 if lag is None else lag)
+        return lag
+
+    def _medir_lag(self) -> Optional[float]:
+        try:
+            with self.replica.connect() as conexion:
+                dialecto = conexion.dialect.name
+                if dialecto == "mysql":
+                    return self._lag_mysql(conexion)
+                if dialecto == "postgresql":
+                    valor = conexion.execute(text(
+                        "SELECT CASE WHEN NOT pg_is_in_recovery() THEN NULL "
+                        "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                        "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+                    )).scalar()
+                    return float(valor) if valor is not None else None
+                conexion.execute(text("SELECT 1"))
+                return None
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo consultar la réplica de lectura: {e}")
+            return SIN_RESPUESTA
+
+    @staticmethod
+    def _lag_mysql(conexion) -> Optional[float]:
+        """Seconds_Behind_Source (MySQL 8.0.22+) o Seconds_Behind_Master; NULL = replicación detenida"""
+        for sentencia, columna in (
+            ("SHOW REPLICA STATUS", "Seconds_Behind_Source"),
+            ("SHOW SLAVE STATUS", "Seconds_Behind_Master"),
+        ):
+            try:
+                fila = conexion.execute(text(sentencia)).mappings().first()
+            except Exception:
+                continue  # Versión sin la sentencia o usuario sin REPLICATION CLIENT
+            if fila is None:
+                return None  # La instancia no es réplica de nadie
+            valor = fila.get(columna)
+            # El valor es entero y trunca (0 con la réplica hasta 1 s atrás): se redondea hacia arriba
+            return float(valor) + 1 if valor is not None else SIN_RESPUESTA
+        return None
+
+    def sesion(self) -> Session:
+        """Sesión marcada como de solo lectura sobre la réplica o, si no conviene, sobre el primario"""
+        replica = self.usar_replica()
+        db = self._sesiones[replica]()
+        db.info[_SOLO_LECTURA] = True
+        lecturas_db.labels(destino="replica" if replica else "primario").inc()
+        return db
+
+    def estado(self) -> dict:
+        marca = _marca_cliente.get()
+        ultima = marca.get("escritura") if marca else None
+        lag = self.lag() if self.configurado else None
+        return {
+            "configurada": self.configurado,
+            "usando_replica": self.usar_replica(),
+            "lag_segundos": None if lag is None or lag == SIN_RESPUESTA else round(lag, 3),
+            "responde": lag != SIN_RESPUESTA,
+            "ultima_escritura_hace_segundos": round(time.time() - ultima, 3) if ultima is not None else None,
+        }
+
+
+def _leer_marca(scope) -> Optional[float]:
+    """Hora de la última escritura que envía el cliente (header o cookie); None si no hay o no es válida"""
+    valor = None
+    for nombre, contenido in scope.get("headers", []):
+        nombre = nombre.decode("latin-1").lower()
+        if nombre == HEADER_MARCA_ESCRITURA:
+            valor = contenido.decode("latin-1").strip()
+            break
+        if nombre == "cookie" and valor is None:
+            for galleta in contenido.decode("latin-1").split(";"):
+                clave, _, dato = galleta.strip().partition("=")
+                if clave == COOKIE_MARCA_ESCRITURA:
+                    valor = dato
+    try:
+        marca = float(valor) if valor else None
+    except ValueError:
+        return None
+    # Una marca del futuro (reloj del cliente o valor manipulado) cuenta como "ahora"
+    return min(marca, time.time()) if marca is not None and math.isfinite(marca) else None
+
+
+class MiddlewareMarcaEscritura:
+    """
+    Middleware ASGI: lleva la marca de la última escritura del cliente entre requests.
+
+    Lee la marca del header `X-Ultima-Escritura` o de la cookie `fc_ultima_escritura`.
+    Si la request confirma una escritura en el primario, responde con la nueva hora de
+    commit en ambos. Así las lecturas siguientes de ese cliente van al primario durante
+    la ventana, las atienda el worker que las atienda.
+    """
+
+    def __init__(self, app, enrutador: "EnrutadorLectura" = None):
+        self.app = app
+        self.enrutador = enrutador
+
+    async def __call__(self, scope, receive, send):
+        enrutador = self.enrutador or enrutador_lectura
+        if scope["type"] != "http" or not enrutador.configurado:
+            await self.app(scope, receive, send)
+            return
+
+        recibida = _leer_marca(scope)
+        marca = {"escritura": recibida}
+        token = _marca_cliente.set(marca)
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start" and marca["escritura"] != recibida:
+                valor = f"{marca['escritura']:.3f}"
+                cookie = (f"{COOKIE_MARCA_ESCRITURA}={valor}; Max-Age={enrutador.duracion_marca}; "
+                          "Path=/; SameSite=Lax; HttpOnly")
+                mensaje = {**mensaje, "headers": [
+                    *mensaje.get("headers", []),
+                    (HEADER_MARCA_ESCRITURA.encode(), valor.encode()),
+                    (b"set-cookie", cookie.encode()),
+                ]}
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _marca_cliente.reset(token)
+
+
+enrutador_lectura = EnrutadorLectura(
+    engine,
+    read_engine,
+    ventana=settings.db_read_lag_window_seconds,
+    lag_maximo=settings.db_read_max_lag_seconds,
+    intervalo=settings.db_read_lag_check_seconds,
+)
+
+
+def get_read_db():
+    """Dependency para endpoints de solo lectura (informes, auditoría, TRM, GETs del dashboard)"""
+    db = enrutador_lectura.sesion()
+    try:
+        yield db
+    finally:
+        db.close()
+
+@contextmanager
+def read_session_scope():
+    """Como session_scope, pero de solo lectura y enrutada a la réplica cuando está disponible"""
+    db = enrutador_lectura.sesion()
+    try:
+        yield db
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _rechazar_en_solo_lectura(session) -> None:
+    if session.info.get(_SOLO_LECTURA):
+        raise RuntimeError("Escritura en una sesión de solo lectura (get_read_db): use get_db")
+
+
+@event.listens_for(Session, "before_flush")
+def _marcar_flush(session, flush_context, instances):
+    if session.new or session.deleted or any(session.is_modified(obj) for obj in session.dirty):
+        _rechazar_en_solo_lectura(session)
+        session.info[_ESCRIBIO] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _marcar_sentencia(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _rechazar_en_solo_lectura(orm_execute_state.session)
+        orm_execute_state.session.info[_ESCRIBIO] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _registrar_escritura(session):
+    if session.info.pop(_ESCRIBIO, False):
+        enrutador = _ENRUTADORES.get(session.bind) if session.bind is not None else None
+        if enrutador is not None:
+            enrutador.registrar_escritura()
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_escritura(session):
+    session.info.pop(_ESCRIBIO, None)
@@ -0,0 +1,104 @@
+"""
+GET condicionales con ETag derivado de los contadores de `versiones_datos`.
+
+El ETag se calcula leyendo solo los contadores de los dominios de los que depende
+la respuesta; si coincide con `If-None-Match` se responde 304 sin consultar las
+tablas de datos. `Cache-Control: no-cache` hace que el navegador revalide siempre
+y reutilice su copia al recibir el 304, sin cambios en el frontend. El 304 se lanza
+como `NoModificado` y `responder_no_modificado` lo convierte en una respuesta sin
+cuerpo con las cabeceras de versión (un 304 con cuerpo rompe la conexión en h11).
+"""
+import hashlib
+from datetime import date
+from typing import Iterable, List, Tuple
+
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy.orm import Session
+
+from .database import get_db, get_read_db
+from ..models.version_datos import CLAVE_GLOBAL, leer_versiones
+
+# Cambiar si cambia la forma de las respuestas: invalida las copias de los clientes
+FORMATO_ETAG = "v1"
+CACHE_CONTROL = "private, no-cache"
+
+
+class NoModificado(HTTPException):
+    """El cliente ya tiene la versión vigente: 304 sin cuerpo"""
+
+    def __init__(self, cabeceras: dict):
+        super().__init__(status_code=304, headers=cabeceras)
+
+
+async def responder_no_modificado(request: Request, exc: NoModificado) -> Response:
+    """Handler de `NoModificado` para la app (registrado antes que el handler global de HTTPException)"""
+    return Response(status_code=304, headers=exc.headers)
+
+
+def calcular_etag(claves: List[Tuple[str, str]], versiones: List[int], variante: str = "") -> str:
+    huella = repr((FORMATO_ETAG, variante, claves, versiones)).encode("utf-8")
+    return f'W/"{hashlib.sha1(huella).hexdigest()[:20]}"'
+
+
+def coincide(if_none_match: str, etag: str) -> bool:
+    """Comparación débil de If-None-Match (lista separada por comas o '*')"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    buscado = etag[2:] if etag.startswith("W/") else etag
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if (candidato[2:] if candidato.startswith("W/") else candidato) == buscado:
+            return True
+    return False
+
+
+def verificar_version(
+    request: Request,
+    db: Session,
+    claves: Iterable[Tuple[str, str]],
+    response: Response = None,
+    variante: str = ""
+) -> str:
+    """
+    Calcula el ETag de las claves; lanza `NoModificado` (304) si el cliente ya tiene esa versión.
+    `variante` distingue respuestas que dependen de algo más que los datos (p. ej. la fecha de hoy).
+    Las cabeceras quedan en `response` (si se pasa) y en `request.state` para `respuesta_json`.
+    Debe llamarse fuera de los try/except genéricos del endpoint para que el 304 no se convierta en 500.
+    """
+    claves = list(claves)
+    versiones = leer_versiones(db, claves)
+    if versiones is None:
+        return ""  # Sin contadores no hay ETag confiable: respuesta completa siempre
+    etag = calcular_etag(claves, versiones, variante)
+    cabeceras = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if coincide(request.headers.get("if-none-match", ""), etag):
+        raise NoModificado(cabeceras)
+    request.state.cabeceras_version = cabeceras
+    if response is not None:
+        response.headers.update(cabeceras)
+    return etag
+
+
+class VersionCondicional:
+    """Dependencia para GET que solo dependen de dominios de catálogo completos"""
+
+    def __init__(self, *dominios: str, por_dia: bool = False):
+        self.claves = [(dominio, CLAVE_GLOBAL) for dominio in dominios]
+        self.por_dia = por_dia  # La respuesta usa la fecha de hoy (TRM vigente, /hoy)
+
+    def __call__(self, request: Request, response: Response, db: Session = Depends(get_db)) -> str:
+        variante = date.today().isoformat() if self.por_dia else ""
+        return verificar_version(request, db, self.claves, response, variante)
+
+
+class VersionCondicionalLectura(VersionCondicional):
+    """
+    Igual que VersionCondicional para endpoints que leen con get_read_db: los contadores
+    se leen de la misma sesión que los datos, así el ETag nunca anuncia una versión que
+    la réplica todavía no tiene.
+    """
+
+    def __call__(self, request: Request, response: Response, db: Session = Depends(get_read_db)) -> str:
+        return super().__call__(request, response, db)
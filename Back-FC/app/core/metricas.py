@@ -0,0 +1,167 @@
+"""
+Métricas Prometheus de la API, el motor de recálculo, el pool de BD, la TRM, las
+importaciones, la auditoría y los WebSockets, expuestas en /metrics.
+
+Con varios workers de uvicorn se define PROMETHEUS_MULTIPROC_DIR (directorio compartido,
+vacío al arrancar): cada proceso escribe sus valores en archivos mmap y /metrics suma los
+de todos los workers. Sin la variable se exponen solo los del proceso.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+
+PREFIJO = "flujo_caja"
+BUCKETS_RAPIDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_LENTOS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# --- API ---
+http_duracion = Histogram(
+    f"{PREFIJO}_http_request_duration_seconds", "Latencia de las requests por ruta",
+    ["method", "route", "status"], buckets=BUCKETS_RAPIDOS
+)
+
+# --- Motor de recálculo ---
+recalculo_duracion = Histogram(
+    f"{PREFIJO}_recalculo_duration_seconds", "Duración de un recálculo completo",
+    ["alcance"], buckets=BUCKETS_LENTOS
+)
+recalculo_celdas = Counter(
+    f"{PREFIJO}_recalculo_celdas_total", "Celdas evaluadas por el recálculo según resultado", ["resultado"]
+)
+recalculos_pendientes = Gauge(
+    f"{PREFIJO}_recalculos_pendientes", "Recálculos asíncronos en cola o en curso", multiprocess_mode="livesum"
+)
+
+# --- Pool de conexiones ---
+pool_checkouts = Counter(f"{PREFIJO}_db_pool_checkouts_total", "Conexiones tomadas del pool", ["overflow"])
+pool_timeouts = Counter(f"{PREFIJO}_db_pool_timeouts_total", "Checkouts que agotaron pool_timeout")
+pool_espera = Histogram(
+    f"{PREFIJO}_db_pool_wait_seconds", "Espera para obtener una conexión del pool", buckets=BUCKETS_RAPIDOS
+)
+pool_en_uso = Gauge(f"{PREFIJO}_db_pool_in_use", "Conexiones prestadas en este momento", multiprocess_mode="livesum")
+lecturas_db = Counter(f"{PREFIJO}_db_read_sessions_total", "Sesiones de solo lectura según el engine usado", ["destino"])
+replica_lag = Gauge(
+    f"{PREFIJO}_db_replica_lag_seconds", "Último lag medido de la réplica de lectura (-1 si no se puede medir, +Inf si no responde)",
+    multiprocess_mode="max"
+)
+
+# --- TRM ---
+trm_consultas = Counter(
+    f"{PREFIJO}_trm_fetch_total", "Consultas de TRM a la fuente externa", ["operacion", "resultado"]
+)
+trm_duracion = Histogram(
+    f"{PREFIJO}_trm_fetch_duration_seconds", "Duración de las consultas de TRM", ["operacion"], buckets=BUCKETS_LENTOS
+)
+
+# --- Importaciones ---
+importacion_filas = Counter(f"{PREFIJO}_importacion_filas_total", "Filas escritas por importaciones", ["tipo"])
+importacion_duracion = Histogram(
+    f"{PREFIJO}_importacion_duration_seconds", "Duración de una importación", ["tipo"], buckets=BUCKETS_LENTOS
+)
+importacion_filas_por_segundo = Gauge(
+    f"{PREFIJO}_importacion_filas_por_segundo", "Throughput de la última importación", ["tipo"],
+    multiprocess_mode="mostrecent"
+)
+
+# --- Auditoría ---
+auditoria_en_curso = Gauge(
+    f"{PREFIJO}_auditoria_escrituras_en_curso", "Registros de auditoría esperando su commit",
+    multiprocess_mode="livesum"
+)
+auditoria_duracion = Histogram(
+    f"{PREFIJO}_auditoria_escritura_duration_seconds", "Duración de la escritura de un registro de auditoría",
+    buckets=BUCKETS_RAPIDOS
+)
+
+# --- WebSockets ---
+websocket_conexiones = Gauge(
+    f"{PREFIJO}_websocket_connections", "Conexiones WebSocket activas", multiprocess_mode="livesum"
+)
+websocket_broadcast_duracion = Histogram(
+    f"{PREFIJO}_websocket_broadcast_duration_seconds", "Tiempo en enviar un broadcast a todas las conexiones",
+    buckets=BUCKETS_RAPIDOS
+)
+websocket_broadcast_destinatarios = Histogram(
+    f"{PREFIJO}_websocket_broadcast_fanout", "Conexiones alcanzadas por cada broadcast",
+    buckets=(0, 1, 2, 5, 10, 25, 50, 100, 250)
+)
+
+
+def _directorio_multiproceso() -> str:
+    return os.environ.get("PROMETHEUS_MULTIPROC_DIR") or os.environ.get("prometheus_multiproc_dir") or ""
+
+
+def generar_metricas() -> bytes:
+    """Texto de exposición de Prometheus; en modo multiproceso agrega los archivos de todos los workers"""
+    if _directorio_multiproceso():
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+        return generate_latest(registro)
+    return generate_latest(REGISTRY)
+
+
+def registrar_importacion(tipo: str, filas: int, inicio: float) -> None:
+    """Filas, duración y filas/s de una importación que empezó en `inicio` (time.perf_counter)"""
+    duracion = time.perf_counter() - inicio
+    importacion_filas.labels(tipo=tipo).inc(filas)
+    importacion_duracion.labels(tipo=tipo).observe(duracion)
+    if duracion > 0:
+        importacion_filas_por_segundo.labels(tipo=tipo).set(filas / duracion)
+
+
+def marcar_proceso_terminado() -> None:
+    """Descarta los gauges 'live' del worker que se apaga"""
+    if _directorio_multiproceso():
+        multiprocess.mark_process_dead(os.getpid())
+
+
+@contextmanager
+def medir(histograma: Histogram, contador: Counter = None, **etiquetas):
+    """
+    Observa la duración del bloque en `histograma` y, si se pasa, cuenta el resultado
+    en `contador` con la etiqueta resultado=exito|error. Una excepción cuenta como error;
+    el bloque también puede marcar el fallo con `medicion["exito"] = False`.
+    """
+    medicion = {"exito": True}
+    inicio = time.perf_counter()
+    try:
+        yield medicion
+    except Exception:
+        medicion["exito"] = False
+        raise
+    finally:
+        (histograma.labels(**etiquetas) if etiquetas else histograma).observe(time.perf_counter() - inicio)
+        if contador is not None:
+            contador.labels(resultado="exito" if medicion["exito"] else "error", **etiquetas).inc()
+
+
+class MiddlewareMetricas:
+    """Middleware ASGI: latencia por (método, plantilla de ruta, clase de status)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        status = [500]
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                status[0] = mensaje["status"]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            ruta = getattr(scope.get("route"), "path", None) or "(sin ruta)"
+            http_duracion.labels(
+                method=scope.get("method", ""), route=ruta, status=f"{status[0] // 100}xx"
+            ).observe(time.perf_counter() - inicio)
@@ -0,0 +1,233 @@
+"""
+Perfilado opcional de requests: SQL por request, fases del recálculo y patrones N+1.
+
+Se activa con PERF_PROFILING_ENABLED=true. Desactivado no se registran listeners ni
+middleware y `fase()` solo consulta una ContextVar, así que el costo es prácticamente nulo.
+Cada respuesta lleva `Server-Timing` (visible en la pestaña Network del navegador) y los
+acumulados por endpoint se consultan en /debug/perf. Los acumulados son por proceso:
+con varios workers cada uno expone los suyos.
+"""
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+# Patrones N+1 que se conservan por endpoint (los de más repeticiones)
+MAX_PATRONES_N_MAS_1 = 20
+LARGO_SENTENCIA = 300
+
+_perfil_actual: ContextVar[Optional["PerfilRequest"]] = ContextVar("perfil_request", default=None)
+_fases_activas: ContextVar[frozenset] = ContextVar("fases_activas", default=frozenset())
+
+_MARCADOR = r"(?:\?|%s|%\(\w+\)s|:\w+)"
+_LISTA_MARCADORES = re.compile(rf"\(\s*{_MARCADOR}(?:\s*,\s*{_MARCADOR})+\s*\)")
+_ESPACIOS = re.compile(r"\s+")
+
+
+def normalizar_sentencia(sentencia: str) -> str:
+    """Misma forma para la misma consulta: espacios colapsados y listas IN de cualquier largo como (?)"""
+    return _LISTA_MARCADORES.sub("(?)", _ESPACIOS.sub(" ", sentencia).strip())
+
+
+class PerfilRequest:
+    """SQL y fases de una request; los hilos del recálculo paralelo escriben en el mismo perfil"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.inicio = time.perf_counter()
+        self.sql_total = 0
+        self.sql_ms = 0.0
+        self.sentencias: Dict[str, int] = {}
+        self.fases: Dict[str, float] = {}
+
+    def registrar_sql(self, sentencia: str, duracion_ms: float) -> None:
+        clave = normalizar_sentencia(sentencia)
+        with self._lock:
+            self.sql_total += 1
+            self.sql_ms += duracion_ms
+            self.sentencias[clave] = self.sentencias.get(clave, 0) + 1
+
+    def registrar_fase(self, nombre: str, duracion_ms: float) -> None:
+        with self._lock:
+            self.fases[nombre] = self.fases.get(nombre, 0.0) + duracion_ms
+
+    def n_mas_1(self, umbral: int) -> Dict[str, int]:
+        """Sentencias con la misma forma repetidas al menos `umbral` veces en la request"""
+        with self._lock:
+            return {sentencia: veces for sentencia, veces in self.sentencias.items() if veces >= umbral}
+
+    def server_timing(self, total_ms: float, umbral: int) -> str:
+        partes = [f'db;dur={self.sql_ms:.1f};desc="{self.sql_total} SQL"']
+        partes += [f"{nombre};dur={ms:.1f}" for nombre, ms in self.fases.items()]
+        patrones = len(self.n_mas_1(umbral))
+        if patrones:
+            partes.append(f'n1;desc="{patrones} posibles N+1"')
+        partes.append(f"total;dur={total_ms:.1f}")
+        return ", ".join(partes)
+
+
+class RegistroPerfil:
+    """Acumulados thread-safe por endpoint (método + plantilla de ruta)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._endpoints: Dict[str, dict] = {}
+
+    def registrar(self, endpoint: str, perfil: PerfilRequest, total_ms: float, umbral: int) -> None:
+        patrones = perfil.n_mas_1(umbral)
+        with self._lock:
+            datos = self._endpoints.setdefault(endpoint, {
+                "requests": 0, "total_ms": 0.0, "max_ms": 0.0,
+                "sql": 0, "sql_ms": 0.0, "sql_max": 0, "fases_ms": {}, "n_mas_1": {},
+            })
+            datos["requests"] += 1
+            datos["total_ms"] += total_ms
+            datos["max_ms"] = max(datos["max_ms"], total_ms)
+            datos["sql"] += perfil.sql_total
+            datos["sql_ms"] += perfil.sql_ms
+            datos["sql_max"] = max(datos["sql_max"], perfil.sql_total)
+            for nombre, ms in perfil.fases.items():
+                datos["fases_ms"][nombre] = datos["fases_ms"].get(nombre, 0.0) + ms
+            for sentencia, veces in patrones.items():
+                patron = datos["n_mas_1"].setdefault(sentencia, {"requests": 0, "max_repeticiones": 0})
+                patron["requests"] += 1
+                patron["max_repeticiones"] = max(patron["max_repeticiones"], veces)
+            if len(datos["n_mas_1"]) > MAX_PATRONES_N_MAS_1:
+                conservar = sorted(datos["n_mas_1"].items(), key=lambda p: p[1]["max_repeticiones"], reverse=True)
+                datos["n_mas_1"] = dict(conservar[:MAX_PATRONES_N_MAS_1])
+
+    def snapshot(self) -> list:
+        """Endpoints ordenados por tiempo total acumulado"""
+        with self._lock:
+            filas = []
+            for endpoint, datos in self._endpoints.items():
+                n = datos["requests"]
+                filas.append({
+                    "endpoint": endpoint,
+                    "requests": n,
+                    "total_ms": round(datos["total_ms"], 3),
+                    "avg_ms": round(datos["total_ms"] / n, 3),
+                    "max_ms": round(datos["max_ms"], 3),
+                    "sql_avg": round(datos["sql"] / n, 2),
+                    "sql_max": datos["sql_max"],
+                    "sql_avg_ms": round(datos["sql_ms"] / n, 3),
+                    "fases_avg_ms": {nombre: round(ms / n, 3) for nombre, ms in datos["fases_ms"].items()},
+                    "n_mas_1": [
+                        {"sentencia": sentencia[:LARGO_SENTENCIA], **patron}
+                        for sentencia, patron in sorted(
+                            datos["n_mas_1"].items(), key=lambda p: p[1]["max_repeticiones"], reverse=True
+                        )
+                    ],
+                })
+        return sorted(filas, key=lambda fila: fila["total_ms"], reverse=True)
+
+
+registro_perfil = RegistroPerfil()
+
+
+def perfil_actual() -> Optional[PerfilRequest]:
+    return _perfil_actual.get()
+
+
+@contextmanager
+def fase(nombre: str):
+    """
+    Mide una fase con nombre dentro de la request perfilada.
+    Una fase anidada en sí misma (cascada al día siguiente) se cuenta una sola vez.
+    """
+    perfil = _perfil_actual.get()
+    activas = _fases_activas.get()
+    if perfil is None or nombre in activas:
+        yield
+        return
+    token = _fases_activas.set(activas | {nombre})
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        perfil.registrar_fase(nombre, (time.perf_counter() - inicio) * 1000)
+        _fases_activas.reset(token)
+
+
+@contextmanager
+def adoptar(perfil: Optional[PerfilRequest]):
+    """Asocia el perfil de la request a un hilo del pool (las ContextVar no se heredan en ThreadPoolExecutor)"""
+    if perfil is None:
+        yield
+        return
+    token = _perfil_actual.set(perfil)
+    try:
+        yield
+    finally:
+        _perfil_actual.reset(token)
+
+
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _perfil_actual.get() is not None:
+        context._perfil_inicio = time.perf_counter()
+
+
+def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    inicio = getattr(context, "_perfil_inicio", None)
+    perfil = _perfil_actual.get()
+    if inicio is not None and perfil is not None:
+        perfil.registrar_sql(statement, (time.perf_counter() - inicio) * 1000)
+
+
+def instrumentar_engine(engine) -> None:
+    """Cuenta y cronometra cada sentencia del engine que se ejecute dentro de una request perfilada"""
+    if not event.contains(engine, "before_cursor_execute", _antes_de_ejecutar):
+        event.listen(engine, "before_cursor_execute", _antes_de_ejecutar)
+        event.listen(engine, "after_cursor_execute", _despues_de_ejecutar)
+
+
+def _endpoint(scope) -> str:
+    ruta = scope.get("route")
+    plantilla = getattr(ruta, "path", None) or "(sin ruta)"
+    return f"{scope.get('method', '')} {plantilla}"
+
+
+class MiddlewarePerfilado:
+    """Middleware ASGI: abre el perfil de la request, agrega Server-Timing y acumula por endpoint"""
+
+    def __init__(self, app, umbral_n_mas_1: int = 5, registro: RegistroPerfil = None):
+        self.app = app
+        self.umbral = umbral_n_mas_1
+        self.registro = registro or registro_perfil
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        perfil = PerfilRequest()
+        token = _perfil_actual.set(perfil)
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                total_ms = (time.perf_counter() - perfil.inicio) * 1000
+                MutableHeaders(scope=mensaje).append("Server-Timing", perfil.server_timing(total_ms, self.umbral))
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _perfil_actual.reset(token)
+            self.registro.registrar(
+                _endpoint(scope), perfil, (time.perf_counter() - perfil.inicio) * 1000, self.umbral
+            )
+
+
+def instalar_perfilado(app, engine, umbral_n_mas_1: int) -> None:
+    """Registra listeners y middleware; solo se llama con PERF_PROFILING_ENABLED activo"""
+    instrumentar_engine(engine)
+    app.add_middleware(MiddlewarePerfilado, umbral_n_mas_1=umbral_n_mas_1)
@@ -0,0 +1,87 @@
+"""
+Métricas del pool de conexiones de SQLAlchemy.
+
+``InstrumentedQueuePool`` mide el tiempo de espera de cada checkout (incluye la
+espera cuando el pool está agotado), cuenta los checkouts que usan conexiones
+de overflow y los timeouts (``QueuePool limit ... reached``). Los mismos datos se
+exportan a Prometheus (``/metrics``), agregados entre workers.
+"""
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+from .metricas import pool_checkouts, pool_en_uso, pool_espera, pool_timeouts
+
+
+class PoolMetrics:
+    """Acumulados thread-safe de uso del pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.checkouts = 0
+        self.overflow_checkouts = 0
+        self.timeouts = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+
+    def registrar_checkout(self, espera_ms: float, en_overflow: bool) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total_ms += espera_ms
+            self.wait_max_ms = max(self.wait_max_ms, espera_ms)
+            if en_overflow:
+                self.overflow_checkouts += 1
+
+    def registrar_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self, pool=None) -> dict:
+        with self._lock:
+            datos = {
+                "checkouts": self.checkouts,
+                "overflow_checkouts": self.overflow_checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(self.wait_total_ms / self.checkouts, 3) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max_ms, 3),
+            }
+        if isinstance(pool, QueuePool):
+            datos.update({
+                "pool_size": pool.size(),
+                "in_use": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "overflow": max(0, pool.overflow()),
+            })
+        return datos
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool que registra la espera de cada checkout en ``pool_metrics``"""
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexion = super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.registrar_timeout()
+            pool_timeouts.inc()
+            raise
+        espera = time.perf_counter() - inicio
+        en_overflow = self.checkedout() > self.size()
+        pool_metrics.registrar_checkout(espera * 1000, en_overflow=en_overflow)
+        pool_checkouts.labels(overflow=str(en_overflow).lower()).inc()
+        pool_espera.observe(espera)
+        pool_en_uso.inc()
+        return conexion
+
+    def _do_return_conn(self, record):
+        pool_en_uso.dec()
+        super()._do_return_conn(record)
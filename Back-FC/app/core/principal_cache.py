@@ -0,0 +1,126 @@
+"""
+Caché en memoria del usuario autenticado (principal) resuelto desde el JWT.
+
+Cada request autenticada decodificaba el token y consultaba la tabla usuarios
+(más el rol y sus permisos). El principal se guarda aquí indexado por el
+``sub`` del token con un TTL menor a la expiración del token, y se invalida
+desde los endpoints que modifican usuarios, roles o permisos.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+
+from .config import get_settings
+from .rbac_cache import permisos_registry
+
+
+@dataclass(frozen=True)
+class UsuarioPrincipal:
+    """Vista inmutable y liviana del usuario autenticado"""
+
+    id: int
+    nombre: str
+    email: str
+    rol: Optional[str]
+    rol_id: Optional[int]
+    estado: bool
+    permisos: FrozenSet[str] = frozenset()
+
+    @classmethod
+    def desde_usuario(cls, usuario) -> "UsuarioPrincipal":
+        """Construir el principal a partir de una instancia de Usuario"""
+        try:
+            if permisos_registry.cargado:
+                permisos = permisos_registry.permisos_de_rol(usuario.rol_id)
+            else:
+                permisos = frozenset(usuario.obtener_permisos())
+        except Exception:
+            # Instalaciones sin las tablas RBAC: el usuario queda sin permisos granulares
+            permisos = frozenset()
+        return cls(
+            id=usuario.id,
+            nombre=usuario.nombre,
+            email=usuario.email,
+            rol=usuario.rol,
+            rol_id=usuario.rol_id,
+            estado=bool(usuario.estado),
+            permisos=permisos,
+        )
+
+    def tiene_permiso(self, codigo_permiso: str) -> bool:
+        return codigo_permiso in self.permisos
+
+    def tiene_cualquier_permiso(self, codigos_permisos: Iterable[str]) -> bool:
+        return any(codigo in self.permisos for codigo in codigos_permisos)
+
+    def obtener_permisos(self) -> list:
+        return sorted(self.permisos)
+
+
+class PrincipalCache:
+    """Caché thread-safe con TTL de principales indexados por el ``sub`` del token"""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[str, Tuple[float, UsuarioPrincipal]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, sub: str) -> Optional[UsuarioPrincipal]:
+        ahora = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(sub)
+            if entry is None:
+                self.misses += 1
+                return None
+            expira, principal = entry
+            if expira <= ahora:
+                del self._entries[sub]
+                self.misses += 1
+                return None
+            self.hits += 1
+            return principal
+
+    def set(self, sub: str, principal: UsuarioPrincipal) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[sub] = (time.monotonic() + self.ttl_seconds, principal)
+
+    def invalidar(self, sub: str) -> None:
+        """Invalidar el principal de un ``sub`` (email) concreto"""
+        with self._lock:
+            self._entries.pop(sub, None)
+
+    def invalidar_usuario(self, usuario_id: int) -> None:
+        """Invalidar todas las entradas de un usuario, aunque haya cambiado su email"""
+        with self._lock:
+            for sub in [s for s, (_, p) in self._entries.items() if p.id == usuario_id]:
+                del self._entries[sub]
+
+    def invalidar_todo(self) -> None:
+        """Invalidar todo el caché (cambios en roles o permisos)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entradas": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+
+def _calcular_ttl() -> float:
+    """TTL configurado, siempre por debajo de la expiración del token"""
+    settings = get_settings()
+    expiracion_token = settings.access_token_expire_minutes * 60
+    return max(0, min(settings.principal_cache_ttl_seconds, expiracion_token - 1))
+
+
+# Instancia global
+principal_cache = PrincipalCache(ttl_seconds=_calcular_ttl())
@@ -0,0 +1,109 @@
+"""
+Permisos RBAC compilados en memoria.
+
+Los permisos activos de cada rol activo se cargan con una sola consulta al
+arrancar y se guardan como ``frozenset`` por rol, de modo que verificar un
+permiso es una búsqueda O(1) sin tocar la base de datos. Los endpoints que
+modifican roles o permisos recargan el registro del worker que atendió la
+escritura; los demás workers comparan cada pocos segundos la versión ``rbac``
+de ``versiones_datos`` y recargan cuando cambia (sin esa tabla, recargan en
+cada intervalo).
+"""
+import logging
+import threading
+import time
+from typing import Dict, FrozenSet, Optional
+
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+
+def normalizar_codigo_permiso(codigo: str) -> str:
+    """Aceptar tanto 'modulo:accion' como el formato almacenado 'modulo.accion'"""
+    return codigo.strip().replace(":", ".")
+
+
+class PermisosRegistry:
+    """Registro de permisos por rol, reemplazado atómicamente en cada recarga"""
+
+    def __init__(self, intervalo: Optional[float] = None):
+        if intervalo is None:
+            from .config import get_settings
+            intervalo = get_settings().rbac_verificar_segundos
+        self.intervalo = intervalo
+        self._por_rol: Dict[int, FrozenSet[str]] = {}
+        self.cargado = False
+        self.version: Optional[int] = None
+        self._verificado = 0.0
+        self._lock = threading.Lock()
+
+    def cargar(self, db: Session) -> None:
+        """Compilar los permisos activos de todos los roles activos en una sola consulta"""
+        from ..models.roles import Permiso, Rol, rol_permiso
+
+        # La versión se lee antes que los permisos: una escritura intermedia fuerza otra recarga
+        version = self._version_actual(db)
+
+        filas = (
+            db.query(rol_permiso.c.rol_id, Permiso.codigo)
+            .join(Permiso, Permiso.id == rol_permiso.c.permiso_id)
+            .join(Rol, Rol.id == rol_permiso.c.rol_id)
+            .filter(Rol.activo == True, Permiso.activo == True)
+            .all()
+        )
+
+        agrupados: Dict[int, set] = {}
+        for rol_id, codigo in filas:
+            agrupados.setdefault(rol_id, set()).add(codigo)
+
+        self._por_rol = {rol_id: frozenset(codigos) for rol_id, codigos in agrupados.items()}
+        self.version = version
+        self._verificado = time.monotonic()
+        self.cargado = True
+        logger.info(f"🔐 Permisos RBAC compilados: {len(self._por_rol)} roles, {len(filas)} asignaciones")
+
+    def recargar(self, db: Session) -> None:
+        """Recargar tras una escritura en roles/permisos; si falla se invalida el registro"""
+        try:
+            self.cargar(db)
+        except Exception as e:
+            self.cargado = False
+            logger.error(f"❌ Error recargando permisos RBAC: {e}")
+
+    def sincronizar(self, db: Session) -> bool:
+        """Recargar si otro worker cambió roles o permisos; True si el registro se recargó"""
+        if not self.cargado:
+            return False
+        ahora = time.monotonic()
+        with self._lock:
+            if ahora - self._verificado < self.intervalo:
+                return False
+            self._verificado = ahora
+        version = self._version_actual(db)
+        if version is not None and version == self.version:
+            return False
+        self.recargar(db)
+        return True
+
+    @staticmethod
+    def _version_actual(db: Session) -> Optional[int]:
+        from ..models.version_datos import CLAVE_GLOBAL, leer_versiones
+
+        try:
+            versiones = leer_versiones(db, [("rbac", CLAVE_GLOBAL)])
+        except Exception:
+            return None
+        return versiones[0] if versiones else None
+
+    def permisos_de_rol(self, rol_id: Optional[int]) -> FrozenSet[str]:
+        if rol_id is None:
+            return frozenset()
+        return self._por_rol.get(rol_id, frozenset())
+
+    def tiene_permiso(self, rol_id: Optional[int], codigo: str) -> bool:
+        return codigo in self.permisos_de_rol(rol_id)
+
+
+# Instancia global
+permisos_registry = PermisosRegistry()
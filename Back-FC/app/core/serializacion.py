@@ -0,0 +1,83 @@
+"""
+Serialización JSON rápida para los listados grandes.
+
+Los endpoints de listados arman diccionarios directamente desde las filas de la consulta
+(sin instanciar modelos ORM ni validar con Pydantic) y los serializan con orjson.
+Los Decimal se emiten como texto, igual que `model_dump(mode="json")`, para no
+perder precisión ni cambiar el contrato con el frontend.
+La respuesta se comprime con brotli (si está instalado) o gzip cuando el cliente lo acepta.
+"""
+import gzip
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+import orjson
+from fastapi import Request
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin brotli se negocia solo gzip
+    brotli = None
+
+UMBRAL_COMPRESION = 1024  # bytes; por debajo comprimir cuesta más de lo que ahorra
+NIVEL_GZIP = 6
+CALIDAD_BROTLI = 5
+
+
+def _por_defecto(valor: Any) -> Any:
+    """Tipos que orjson no serializa de forma nativa"""
+    if isinstance(valor, Decimal):
+        return str(valor)
+    if isinstance(valor, BaseModel):
+        return valor.model_dump(mode="json")
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+
+def dumps(contenido: Any) -> bytes:
+    """JSON en bytes; fechas en ISO 8601, Decimal como texto y llaves no textuales (p. ej. int) permitidas"""
+    return orjson.dumps(contenido, default=_por_defecto, option=orjson.OPT_NON_STR_KEYS)
+
+
+def codificacion_aceptada(request: Request) -> Optional[str]:
+    """'br' o 'gzip' según Accept-Encoding (se ignoran las codificaciones con q=0)"""
+    aceptadas = set()
+    for parte in request.headers.get("accept-encoding", "").lower().split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        if parametros.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        aceptadas.add(nombre.strip())
+    if brotli is not None and "br" in aceptadas:
+        return "br"
+    if "gzip" in aceptadas:
+        return "gzip"
+    return None
+
+
+def comprimir(cuerpo: bytes, codificacion: str) -> bytes:
+    if codificacion == "br":
+        return brotli.compress(cuerpo, quality=CALIDAD_BROTLI)
+    return gzip.compress(cuerpo, compresslevel=NIVEL_GZIP)
+
+
+def respuesta_json(
+    request: Request,
+    contenido: Any,
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """
+    Serializa `contenido` con orjson y lo comprime si el cliente lo acepta y vale la pena.
+    Al retornar una Response, FastAPI omite la validación de `response_model` del endpoint.
+    """
+    cuerpo = dumps(contenido)
+    # ETag/Cache-Control que dejó `verificar_version` (el Response inyectado no aplica al retornar una Response)
+    cabeceras = dict(getattr(getattr(request, "state", None), "cabeceras_version", None) or {})
+    cabeceras.update(headers or {})
+    cabeceras["Vary"] = "Accept-Encoding"
+    codificacion = codificacion_aceptada(request) if len(cuerpo) >= UMBRAL_COMPRESION else None
+    if codificacion:
+        cuerpo = comprimir(cuerpo, codificacion)
+        cabeceras["Content-Encoding"] = codificacion
+    return Response(content=cuerpo, status_code=status_code, headers=cabeceras, media_type="application/json")
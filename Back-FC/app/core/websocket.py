@@ -7,8 +7,11 @@ from fastapi import WebSocket, WebSocketDisconnect
 from typing import List, Dict
 import json
 import logging
+import time
 from datetime import datetime
 
+from .metricas import websocket_broadcast_destinatarios, websocket_broadcast_duracion, websocket_conexiones
+
 logger = logging.getLogger(__name__)
 
 class ConnectionManager:
@@ -26,6 +29,7 @@ class ConnectionManager:
         try:
             await websocket.accept()
             self.active_connections.append(websocket)
+            websocket_conexiones.inc()
             
             if user_id:
                 self.user_connections[websocket] = user_id
@@ -41,6 +45,7 @@ class ConnectionManager:
         try:
             if websocket in self.active_connections:
                 self.active_connections.remove(websocket)
+                websocket_conexiones.dec()
             
             user_id = self.user_connections.pop(websocket, "Unknown")
             
@@ -64,7 +69,8 @@ class ConnectionManager:
         Limpia automáticamente conexiones cerradas
         """
         if not self.active_connections:
-            logger.info("📡 No hay conexiones activas para enviar actualización")
+            logger.debug("📡 No hay conexiones activas para enviar actualización")
+            websocket_broadcast_destinatarios.observe(0)
             return
             
         # Lista de conexiones a remover (cerradas)
@@ -74,20 +80,25 @@ class ConnectionManager:
         message["timestamp"] = datetime.now().isoformat()
         
         logger.info(f"📡 Enviando actualización a {len(self.active_connections)} conexiones")
-        logger.info(f"📋 Mensaje: {message}")
+        logger.debug("📋 Mensaje: %s", message)  # Formateo diferido: el mensaje completo solo en DEBUG
         
+        inicio = time.perf_counter()
+        texto = json.dumps(message)
         for connection in self.active_connections:
             try:
-                await connection.send_text(json.dumps(message))
+                await connection.send_text(texto)
             except Exception as e:
                 logger.warning(f"⚠️ Conexión cerrada detectada: {e}")
                 disconnected.append(connection)
         
+        success_count = len(self.active_connections) - len(disconnected)
+        
         # Remover conexiones cerradas
         for conn in disconnected:
             self.disconnect(conn)
         
-        success_count = len(self.active_connections) - len(disconnected)
+        websocket_broadcast_duracion.observe(time.perf_counter() - inicio)
+        websocket_broadcast_destinatarios.observe(success_count)
         logger.info(f"✅ Actualización enviada exitosamente a {success_count} conexiones")
     
     async def broadcast_to_area(self, message: dict, area: str):
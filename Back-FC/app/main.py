@@ -1,12 +1,18 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import uvicorn
 import logging
+import asyncio
 
 from .core.config import get_settings
-from .core.database import engine, Base, SessionLocal
+from .core.database import MiddlewareMarcaEscritura, engine, enrutador_lectura, session_scope
+from .core.etag import NoModificado, responder_no_modificado
+from .core.pool_metrics import pool_metrics
+from .core.perfilado import instalar_perfilado
+from .core.metricas import CONTENT_TYPE_LATEST, MiddlewareMetricas, generar_metricas, marcar_proceso_terminado
 from .api import api_router
+from .api.debug import router as debug_router
 from fastapi import UploadFile, File, Form
 # from .api.auditoria import router as auditoria_router  # Ya incluido en api_router
 # from .middleware.auditoria_middleware import AuditoriaMiddleware  # Comentado temporalmente
@@ -20,9 +26,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Crear las tablas en la base de datos
-Base.metadata.create_all(bind=engine)
-
 # Crear la aplicación FastAPI
 app = FastAPI(
     title=settings.app_name,
@@ -39,110 +42,63 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Ultima-Escritura"],
 )
 
+# Latencia por ruta para /metrics
+app.add_middleware(MiddlewareMetricas)
+
+# Quien acaba de guardar lee del primario (marca de escritura por cliente)
+app.add_middleware(MiddlewareMarcaEscritura)
+
+# Perfilado opcional (Server-Timing y /debug/perf); desactivado no agrega ningún costo
+if settings.perf_profiling_enabled:
+    instalar_perfilado(app, engine, settings.perf_n_mas_1_umbral)
+    logger.info("⏱️ Perfilado de requests activo (ver /debug/perf)")
+
 # Incluir las rutas de la API
 app.include_router(api_router)
+app.include_router(debug_router)
+
+# Tarea del scheduler TRM (se cancela en shutdown)
+_scheduler_trm_task = None
+
+def cargar_permisos_rbac():
+    """Cargar los permisos de cada rol en el registro en memoria"""
+    from app.core.rbac_cache import permisos_registry
+
+    try:
+        with session_scope() as db:
+            permisos_registry.cargar(db)
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudieron compilar los permisos RBAC (se consultarán por usuario): {e}")
 
 @app.on_event("startup")
 async def startup_event():
     """Eventos que se ejecutan al iniciar el servidor"""
     logger.info("🚀 Iniciando servidor FastAPI...")
     
-    # Verificar TRMs faltantes al iniciar (en background)
-    import asyncio
-    # Ejecutar verificación de TRM de forma síncrona para asegurar recuperación inmediata
-    await verificar_trms_startup()
+    # Compilar permisos RBAC por rol en memoria
+    cargar_permisos_rbac()
+    
+    # Encolar backfill de TRMs faltantes (no bloquea el arranque)
+    from app.services.trm_scheduler import encolar_backfill_startup, iniciar_scheduler_trm
+    encolar_backfill_startup()
     
     # Iniciar scheduler de TRM en background
-    asyncio.create_task(iniciar_scheduler_trm())
+    global _scheduler_trm_task
+    _scheduler_trm_task = asyncio.create_task(iniciar_scheduler_trm())
 
-async def verificar_trms_startup():
-    """Verificar TRMs faltantes en background al iniciar"""
-    try:
-        logger.info("=" * 70)
-        logger.info("🔍 VERIFICANDO TRMs FALTANTES AL INICIAR SERVIDOR")
-        logger.info("=" * 70)
-        
-        from app.services.trm_service import trm_service
-        
-        # Verificar últimos 30 días
-        logger.info("� Revisando últimos 30 días para TRMs faltantes...")
-        resultado = trm_service.verificar_trms_faltantes(days_back=30)
-        
-        if resultado["success"]:
-            logger.info("")
-            logger.info("📊 RESUMEN DE RECUPERACIÓN DE TRMs:")
-            logger.info(f"   - Fechas faltantes encontradas: {resultado['missing_count']}")
-            logger.info(f"   - TRMs actualizadas exitosamente: {resultado['updated_count']}")
-            logger.info(f"   - Actualizaciones fallidas: {resultado['failed_count']}")
-            
-            if resultado["updated_count"] > 0:
-                logger.info(f"   🎉 Se recuperaron {resultado['updated_count']} TRMs faltantes")
-            
-            if resultado["errors"] and len(resultado["errors"]) > 0:
-                logger.warning("")
-                logger.warning("⚠️ Algunos TRMs no se pudieron obtener:")
-                for error in resultado["errors"][:3]:
-                    logger.warning(f"   - {error}")
-        else:
-            logger.error(f"❌ Error en verificación: {resultado.get('error', 'Error desconocido')}")
-        
-        logger.info("=" * 70)
-        logger.info("✅ VERIFICACIÓN DE TRMs COMPLETADA")
-        logger.info("=" * 70)
-            
-    except Exception as e:
-        logger.error(f"❌ Error en verificación de TRMs: {e}")
-
-async def iniciar_scheduler_trm():
-    """Iniciar scheduler de TRM en background para ejecución diaria a las 7:00 PM"""
-    try:
-        import asyncio
-        import schedule
-        import time
-        from datetime import date
-        
-        logger.info("=" * 70)
-        logger.info("⏰ INICIANDO SCHEDULER TRM - Ejecución diaria a las 7:00 PM")
-        logger.info("=" * 70)
-        
-        def job_trm_diaria():
-            """Job que se ejecuta diariamente a las 7:00 PM"""
-            try:
-                logger.info("🌙 Ejecutando actualización TRM diaria - 7:00 PM")
-                
-                from app.services.trm_service import trm_service
-                
-                hoy = date.today()
-                exito = trm_service.obtener_trm_fecha(hoy)
-                
-                if exito:
-                    logger.info(f"✅ TRM actualizada exitosamente para {hoy}")
-                    # Verificar fechas faltantes después de actualizar
-                    resultado = trm_service.verificar_trms_faltantes(days_back=7)
-                    if resultado["updated_count"] > 0:
-                        logger.info(f"✅ Se recuperaron {resultado['updated_count']} TRMs adicionales")
-                else:
-                    logger.warning(f"⚠️ No se pudo obtener TRM para {hoy}")
-                    
-            except Exception as e:
-                logger.error(f"❌ Error en job diario de TRM: {e}")
-        
-        # Programar ejecución diaria a las 7:00 PM
-        schedule.every().day.at("19:00").do(job_trm_diaria)
-        
-        logger.info("✅ Scheduler TRM configurado correctamente")
-        logger.info("   - Próxima ejecución: Hoy a las 7:00 PM (19:00)")
-        logger.info("=" * 70)
-        
-        # Loop del scheduler en background
-        while True:
-            schedule.run_pending()
-            await asyncio.sleep(60)  # Verificar cada minuto
-            
-    except Exception as e:
-        logger.error(f"❌ Error iniciando scheduler de TRM: {e}")
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Detener tareas en segundo plano al apagar el servidor"""
+    from app.services.trm_scheduler import trm_job_runner
+    
+    if _scheduler_trm_task is not None:
+        _scheduler_trm_task.cancel()
+    trm_job_runner.detener()
+    enrutador_lectura.detener()
+    marcar_proceso_terminado()
 
 @app.get("/")
 async def root():
@@ -162,12 +118,30 @@ async def health_check():
         "version": settings.version
     }
 
+@app.get("/health/db-pool")
+def db_pool_metrics():
+    """Métricas del pool de conexiones: conexiones en uso, overflow, timeouts y espera de checkout"""
+    return {**pool_metrics.snapshot(engine.pool), "replica_lectura": enrutador_lectura.estado()}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Métricas en formato Prometheus (agregadas entre workers si PROMETHEUS_MULTIPROC_DIR está definido)"""
+    return Response(generar_metricas(), media_type=CONTENT_TYPE_LATEST)
+
+# GET condicionales: 304 sin cuerpo y con ETag / Cache-Control
+app.add_exception_handler(NoModificado, responder_no_modificado)
+
 # Manejador global de excepciones
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
+    headers = getattr(exc, "headers", None)
+    if exc.status_code in (204, 304):
+        # Estas respuestas no pueden llevar cuerpo
+        return Response(status_code=exc.status_code, headers=headers)
     return JSONResponse(
         status_code=exc.status_code,
-        content={"detail": exc.detail, "status_code": exc.status_code}
+        content={"detail": exc.detail, "status_code": exc.status_code},
+        headers=headers
     )
 
 if __name__ == "__main__":
@@ -6,7 +6,7 @@ import json
 from typing import Callable
 import asyncio
 
-from ..core.database import get_db
+from ..core.database import session_scope
 from ..services.auditoria_service import AuditoriaService
 from ..services.auth_service import get_current_user_from_token
 
@@ -162,12 +162,8 @@ class AuditoriaMiddleware:
             token = authorization.split(" ")[1]
             
             # Usar sesión de DB
-            db = next(get_db())
-            try:
-                usuario = get_current_user_from_token(token, db)
-                return usuario
-            finally:
-                db.close()
+            with session_scope() as db:
+                return get_current_user_from_token(token, db)
                 
         except Exception:
             return None
@@ -197,8 +193,7 @@ class AuditoriaMiddleware:
             descripcion = self._generar_descripcion(config, metodo, path, body_data)
             
             # Registrar en base de datos
-            db = next(get_db())
-            try:
+            with session_scope() as db:
                 AuditoriaService.registrar_accion(
                     db=db,
                     usuario=usuario,
@@ -211,8 +206,6 @@ class AuditoriaMiddleware:
                     resultado="EXITOSO",
                     valores_nuevos=body_data if body_data else None
                 )
-            finally:
-                db.close()
                 
         except Exception as e:
             # Si falla la auditoría, no fallar la operación principal
@@ -237,8 +230,7 @@ class AuditoriaMiddleware:
             
             descripcion = f"Error en {config['entidad'].lower()}: {error_msg[:200]}"
             
-            db = next(get_db())
-            try:
+            with session_scope() as db:
                 AuditoriaService.registrar_accion(
                     db=db,
                     usuario=usuario,
@@ -251,8 +243,6 @@ class AuditoriaMiddleware:
                     resultado="ERROR",
                     mensaje_error=error_msg
                 )
-            finally:
-                db.close()
                 
         except Exception as e:
             print(f"Error en auditoría de error: {e}")
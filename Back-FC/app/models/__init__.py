@@ -11,6 +11,10 @@ from .trm import TRM
 from .conciliacion_contable import ConciliacionContable
 from .gmf_config import GMFConfig
 from .cuatro_por_mil_config import CuatroPorMilConfig
+from .snapshot_dia import SnapshotDiaCerrado
+from .transaccion_historial import TransaccionHistorial
+from .version_datos import VersionDatos
+from .escenario_flujo_caja import EscenarioFlujoCaja
 
 __all__ = [
     "Usuario",
@@ -25,5 +29,9 @@ __all__ = [
     "TRM",
     "ConciliacionContable",
     "GMFConfig",
-    "CuatroPorMilConfig"
+    "CuatroPorMilConfig",
+    "SnapshotDiaCerrado",
+    "TransaccionHistorial",
+    "VersionDatos",
+    "EscenarioFlujoCaja"
 ]
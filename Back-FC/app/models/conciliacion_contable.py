@@ -1,7 +1,7 @@
 """
 Modelo para la conciliación contable diaria
 """
-from sqlalchemy import Column, Integer, String, Date, DECIMAL, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Date, DECIMAL, DateTime, ForeignKey, Text, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -12,6 +12,9 @@ class ConciliacionContable(Base):
     Modelo para manejar las conciliaciones contables diarias por empresa
     """
     __tablename__ = "conciliaciones_contables"
+    __table_args__ = (
+        UniqueConstraint("fecha", "empresa_id", name="uq_conciliacion_fecha_empresa"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     fecha = Column(Date, nullable=False, index=True)
@@ -0,0 +1,33 @@
+"""
+Modelo de escenarios "qué pasaría si" sobre el flujo de caja
+Un escenario guarda solo sus ajustes de celdas; las transacciones reales no se tocan
+"""
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, ForeignKey, JSON, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class EscenarioFlujoCaja(Base):
+    """Capa de ajustes (fecha, cuenta, área, concepto) que se evalúa en memoria sobre los datos reales
+
+    `ajustes` es una lista de {fecha, cuenta_id, area, concepto_id, modo, monto}; modo
+    'fijar' reemplaza la celda, 'sumar' le suma el monto y 'eliminar' la quita.
+    """
+    __tablename__ = "escenarios_flujo_caja"
+    __table_args__ = (
+        Index("idx_escenario_usuario", "usuario_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    nombre = Column(String(120), nullable=False)
+    descripcion = Column(Text, nullable=True)
+    fecha_inicio = Column(Date, nullable=False)
+    horizonte = Column(Integer, nullable=False)  # Días hábiles evaluados desde fecha_inicio
+    cuenta_id = Column(Integer, ForeignKey("cuentas_bancarias.id", ondelete="CASCADE"), nullable=True)  # NULL = todas
+    compania_id = Column(Integer, ForeignKey("companias.id", ondelete="CASCADE"), nullable=True)  # NULL = todas
+    ajustes = Column(JSON, nullable=False)
+    usuario_id = Column(Integer, ForeignKey("usuarios.id", ondelete="SET NULL"), nullable=True)
+    fecha_creacion = Column(DateTime(timezone=True), server_default=func.now())
+    fecha_actualizacion = Column(DateTime(timezone=True), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<EscenarioFlujoCaja(id={self.id}, nombre='{self.nombre}', ajustes={len(self.ajustes or [])})>"
@@ -0,0 +1,32 @@
+"""
+Modelo para la foto inmutable de un día cerrado (fecha, compañía)
+Se crea al cerrar la conciliación y se elimina al reabrirla
+"""
+from sqlalchemy import Column, Integer, Date, DateTime, ForeignKey, String, Text, JSON, UniqueConstraint
+from sqlalchemy.dialects.mysql import LONGTEXT
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class SnapshotDiaCerrado(Base):
+    """Transacciones y agregados de un día cerrado, serializados una sola vez
+
+    Mientras exista el registro, las transacciones de (fecha, compania_id) no se
+    modifican, el motor de recálculo omite el día y las lecturas se sirven de aquí.
+    """
+    __tablename__ = "snapshots_dia_cerrado"
+    __table_args__ = (
+        UniqueConstraint("fecha", "compania_id", name="uq_snapshot_fecha_compania"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    fecha = Column(Date, nullable=False, index=True)
+    compania_id = Column(Integer, ForeignKey("companias.id", ondelete="CASCADE"), nullable=False)
+    transacciones = Column(Text().with_variant(LONGTEXT, "mysql"), nullable=False)  # JSON con la respuesta de /fecha/{fecha} de la partición
+    agregados = Column(JSON, nullable=False)  # [[concepto_id, compania_id, cuenta_id, monto]] para informes
+    resumen = Column(JSON, nullable=False)  # total_transacciones, total_ingresos, total_gastos
+    checksum = Column(String(64), nullable=False)  # sha256 de `transacciones`
+    usuario_id = Column(Integer, ForeignKey("usuarios.id", ondelete="SET NULL"), nullable=True)
+    fecha_creacion = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<SnapshotDiaCerrado(fecha={self.fecha}, compania_id={self.compania_id}, transacciones={self.resumen.get('total_transacciones') if self.resumen else 0})>"
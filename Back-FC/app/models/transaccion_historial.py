@@ -0,0 +1,133 @@
+"""
+Historial append-only de cambios de monto de las transacciones de flujo de caja.
+
+Las filas se generan en cada flush de la sesión: un solo INSERT con todas las
+transacciones creadas, cuyo monto cambió o que se eliminaron. La columna
+`TransaccionFlujoCaja.auditoria` queda como resumen de tamaño fijo del último cambio.
+Una fila eliminada ya no tiene auditoría propia: quien elimina se registra en la
+sesión con `registrar_usuario` antes del flush.
+"""
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import BigInteger, Column, Integer, Date, DateTime, DECIMAL, String, Index, event, inspect
+from sqlalchemy.orm import Session
+
+from app.core.database import Base
+from .transacciones_flujo_caja import TransaccionFlujoCaja
+
+_PENDIENTES = "historial_transacciones_pendiente"
+_USUARIO = "historial_usuario_id"
+
+
+class TransaccionHistorial(Base):
+    """Un cambio de monto de una celda (fecha, concepto, cuenta)"""
+    __tablename__ = "transacciones_historial"
+    __table_args__ = (
+        Index("idx_historial_celda", "fecha", "concepto_id", "cuenta_id", "id"),
+        Index("idx_historial_transaccion", "transaccion_id", "id"),
+    )
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    transaccion_id = Column(Integer, nullable=False)  # Sin FK: el historial sobrevive a la eliminación
+    fecha = Column(Date, nullable=False)
+    concepto_id = Column(Integer, nullable=False)
+    cuenta_id = Column(Integer, nullable=True)
+    ts = Column(DateTime, nullable=False)
+    usuario_id = Column(Integer, nullable=True)
+    monto_anterior = Column(DECIMAL(18, 2), nullable=True)  # NULL en creaciones
+    monto_nuevo = Column(DECIMAL(18, 2), nullable=True)  # NULL en eliminaciones
+    origen = Column(String(60), nullable=False)  # `accion` del resumen (recálculo, edición, importación...)
+
+    def __repr__(self):
+        return f"<TransaccionHistorial(transaccion_id={self.transaccion_id}, {self.monto_anterior} → {self.monto_nuevo}, origen='{self.origen}')>"
+
+
+def ultimo_cambio(accion: str, usuario_id: Optional[int] = None) -> dict:
+    """Resumen del último cambio para `TransaccionFlujoCaja.auditoria`; los montos los completa el flush"""
+    return {"accion": accion, "usuario_id": usuario_id, "timestamp": datetime.now().isoformat()}
+
+
+def registrar_usuario(session: Session, usuario_id: Optional[int]) -> None:
+    """Usuario que actúa en la sesión; se usa en las eliminaciones del historial"""
+    session.info[_USUARIO] = usuario_id
+
+
+def _monto(valor) -> Optional[Decimal]:
+    if valor is None:
+        return None
+    return Decimal(str(valor)).quantize(Decimal("0.01"))
+
+
+def _resumen(auditoria, accion_defecto: str, anterior, nuevo) -> dict:
+    """Recorta cualquier auditoría al resumen de tamaño fijo (accion, usuario_id, timestamp, montos)"""
+    auditoria = auditoria if isinstance(auditoria, dict) else {}
+    return {
+        "accion": auditoria.get("accion") or accion_defecto,
+        "usuario_id": auditoria.get("usuario_id"),
+        "timestamp": auditoria.get("timestamp") or datetime.now().isoformat(),
+        "monto_anterior": float(anterior) if anterior is not None else None,
+        "monto_nuevo": float(nuevo) if nuevo is not None else None,
+    }
+
+
+@event.listens_for(Session, "before_flush")
+def _capturar_cambios(session, flush_context, instances):
+    """Anota los cambios de monto de este flush y normaliza el resumen de auditoría"""
+    pendientes = []
+    session.info[_PENDIENTES] = pendientes
+
+    for obj in session.new:
+        if isinstance(obj, TransaccionFlujoCaja):
+            resumen = _resumen(obj.auditoria, "creacion", None, _monto(obj.monto))
+            obj.auditoria = resumen
+            pendientes.append((obj, resumen, None, _monto(obj.monto)))
+
+    for obj in session.dirty:
+        if not isinstance(obj, TransaccionFlujoCaja):
+            continue
+        estado = inspect(obj)
+        historial_monto = estado.attrs.monto.history
+        anterior = _monto(historial_monto.deleted[0]) if historial_monto.deleted else None
+        nuevo = _monto(obj.monto)
+        cambio_monto = historial_monto.has_changes() and anterior != nuevo
+        historial_auditoria = estado.attrs.auditoria.history
+        if not cambio_monto and not historial_auditoria.has_changes():
+            continue
+        if cambio_monto:
+            resumen = _resumen(obj.auditoria, "actualizacion", anterior, nuevo)
+            pendientes.append((obj, resumen, anterior, nuevo))
+        else:
+            # Solo cambió la auditoría (p. ej. la descripción): se conservan los montos del último cambio
+            previo = historial_auditoria.deleted
+            previo = previo[0] if previo and isinstance(previo[0], dict) else {}
+            resumen = _resumen(obj.auditoria, "actualizacion", previo.get("monto_anterior"), previo.get("monto_nuevo"))
+        obj.auditoria = resumen
+
+    for obj in session.deleted:
+        if isinstance(obj, TransaccionFlujoCaja):
+            pendientes.append((obj, {"accion": "eliminacion", "usuario_id": session.info.get(_USUARIO)}, _monto(obj.monto), None))
+
+
+@event.listens_for(Session, "after_flush")
+def _escribir_historial(session, flush_context):
+    """Un solo INSERT con todos los cambios del flush (los ids de las nuevas ya existen)"""
+    pendientes = session.info.pop(_PENDIENTES, None)
+    if not pendientes:
+        return
+    ahora = datetime.now()
+    session.connection().execute(TransaccionHistorial.__table__.insert(), [
+        {
+            "transaccion_id": obj.id,
+            "fecha": obj.fecha,
+            "concepto_id": obj.concepto_id,
+            "cuenta_id": obj.cuenta_id,
+            "ts": ahora,
+            "usuario_id": resumen.get("usuario_id"),
+            "monto_anterior": anterior,
+            "monto_nuevo": nuevo,
+            "origen": resumen.get("accion") or "actualizacion",
+        }
+        for obj, resumen, anterior, nuevo in pendientes
+    ])
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Date, DECIMAL, Text, Boolean, DateTime, Enum, JSON
+from sqlalchemy import Column, Integer, String, ForeignKey, Date, DECIMAL, Text, Boolean, DateTime, Enum, JSON, event, inspect, select
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import Session, relationship, column_property
 from ..core.database import Base
+from .cuentas_bancarias import CuentaBancaria
 import enum
 
 class AreaTransaccion(enum.Enum):
@@ -13,27 +14,63 @@ class TransaccionFlujoCaja(Base):
     
     # Campos básicos
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    fecha = Column(Date, nullable=False, index=True)
+    # active_history: al mover una transacción de día/área se conoce el origen (versiones_datos)
+    fecha = column_property(Column(Date, nullable=False, index=True), active_history=True)
     concepto_id = Column(Integer, ForeignKey("conceptos_flujo_caja.id", ondelete="CASCADE"), nullable=False)
     cuenta_id = Column(Integer, ForeignKey("cuentas_bancarias.id", ondelete="CASCADE"), nullable=True)
-    monto = Column(DECIMAL(18, 2), nullable=False, default=0.00)
+    # active_history: el valor anterior se conserva aunque el objeto esté expirado (historial de cambios)
+    monto = column_property(Column(DECIMAL(18, 2), nullable=False, default=0.00), active_history=True)
     descripcion = Column(Text, nullable=True)
     usuario_id = Column(Integer, ForeignKey("usuarios.id", ondelete="SET NULL"), nullable=True)
     
     # Configuración de área
-    area = Column(Enum(AreaTransaccion), nullable=False, default=AreaTransaccion.tesoreria)
+    area = column_property(Column(Enum(AreaTransaccion), nullable=False, default=AreaTransaccion.tesoreria), active_history=True)
     compania_id = Column(Integer, ForeignKey("companias.id", ondelete="SET NULL"), nullable=True)
     
     # Campos de auditoría y automatización
-    auditoria = Column(JSON, nullable=True)  # Info de auditoría (quién, cuándo, qué)
+    auditoria = column_property(Column(JSON, nullable=True), active_history=True)  # Resumen del último cambio (ver transacciones_historial)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
+    # Control de concurrencia optimista: se incrementa en cada UPDATE y se verifica en el WHERE
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    
     # Relaciones
     concepto = relationship("ConceptoFlujoCaja", back_populates="transacciones")
     cuenta = relationship("CuentaBancaria", back_populates="transacciones")
     usuario = relationship("Usuario")
     compania = relationship("Compania")
     
+    # Identidad (id, fecha): cada UPDATE/DELETE del ORM lleva la fecha en el WHERE y, con la tabla
+    # particionada por mes (PK (id, fecha)), toca una sola partición. session.get recibe (id, fecha).
+    __mapper_args__ = {"version_id_col": version, "primary_key": [id, fecha.columns[0]]}
+    
     def __repr__(self):
-        return f"<TransaccionFlujoCaja(id={self.id}, fecha='{self.fecha}', concepto='{self.concepto.nombre if self.concepto else 'N/A'}', monto={self.monto})>"
\ No newline at end of file
+        return f"<TransaccionFlujoCaja(id={self.id}, fecha='{self.fecha}', concepto='{self.concepto.nombre if self.concepto else 'N/A'}', monto={self.monto})>"
+
+
+@event.listens_for(Session, "before_flush")
+def _compania_de_la_cuenta(session, flush_context, instances):
+    """
+    Una fila con cuenta pertenece a la compañía de su cuenta: es la partición (fecha, compañía)
+    con la que el cierre de día congela, el motor omite y las lecturas filtran.
+    """
+    filas = [
+        obj for obj in session.new
+        if isinstance(obj, TransaccionFlujoCaja) and obj.cuenta_id is not None
+    ]
+    for obj in session.dirty:
+        if isinstance(obj, TransaccionFlujoCaja) and obj.cuenta_id is not None:
+            estado = inspect(obj)
+            if estado.attrs.cuenta_id.history.has_changes() or estado.attrs.compania_id.history.has_changes():
+                filas.append(obj)
+    if not filas:
+        return
+    companias = dict(session.execute(
+        select(CuentaBancaria.id, CuentaBancaria.compania_id).where(
+            CuentaBancaria.id.in_({obj.cuenta_id for obj in filas})
+        )
+    ).all())
+    for obj in filas:
+        if obj.cuenta_id in companias and obj.compania_id != companias[obj.cuenta_id]:
+            obj.compania_id = companias[obj.cuenta_id]
@@ -0,0 +1,200 @@
+"""
+Contadores de versión por dominio de datos, base de los ETag de los GET.
+
+Cada flush que crea, modifica o elimina filas de un dominio anota sus claves en la
+sesión; al confirmar, los contadores se incrementan en una transacción corta propia.
+Así el bloqueo de la fila del contador no se retiene mientras dura la escritura (los
+recálculos en paralelo de un mismo día no se serializan en ella ni se cruzan en un
+deadlock). Durante ese instante el ETag es más viejo que los datos, lo que solo demora
+un 200. Si la escritura se revierte, las claves se descartan. Las transacciones se
+versionan por (fecha, área); las sentencias masivas (`query.update/delete`, INSERT
+ORM) incrementan la clave global del dominio. Los contadores viven en la BD para que
+todos los workers vean la misma versión.
+"""
+import logging
+import weakref
+from datetime import date
+from typing import Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import BigInteger, Column, String, event, inspect, tuple_
+from sqlalchemy.orm import Session
+
+from app.core.database import Base
+
+logger = logging.getLogger(__name__)
+
+_PENDIENTES = "versiones_datos_pendientes"
+_POR_CONFIRMAR = "versiones_datos_por_confirmar"
+_TABLA_POR_ENGINE: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+CLAVE_GLOBAL = ""
+AREAS = ("tesoreria", "pagaduria")
+
+# Tabla → dominio para los catálogos (una sola clave global por dominio)
+_DOMINIOS_POR_TABLA = {
+    "conceptos_flujo_caja": "conceptos",
+    "cuentas_bancarias": "cuentas",
+    "cuenta_moneda": "cuentas",
+    "bancos": "cuentas",
+    "companias": "companias",
+    "trm": "trm",
+    "dias_festivos": "festivos",
+    "roles": "rbac",
+    "permisos": "rbac",
+}
+_TABLAS_TRANSACCIONES = {"transacciones_flujo_caja", "snapshots_dia_cerrado"}
+
+
+class VersionDatos(Base):
+    """Versión monótona de (dominio, clave); clave vacía = todo el dominio"""
+    __tablename__ = "versiones_datos"
+
+    dominio = Column(String(30), primary_key=True)
+    clave = Column(String(40), primary_key=True, default=CLAVE_GLOBAL)
+    version = Column(BigInteger, nullable=False, default=1)
+
+    def __repr__(self):
+        return f"<VersionDatos({self.dominio}:{self.clave} v{self.version})>"
+
+
+def clave_transacciones(fecha: date, area: str) -> Tuple[str, str]:
+    return ("transacciones", f"{fecha.isoformat()}:{area}")
+
+
+def claves_transacciones(fecha: date, area: str = None) -> List[Tuple[str, str]]:
+    """Claves de las que depende la lectura de un día (una o ambas áreas, más la global)"""
+    areas = [area] if area else AREAS
+    return [("transacciones", CLAVE_GLOBAL)] + [clave_transacciones(fecha, a) for a in areas]
+
+
+def leer_versiones(db: Session, claves: Iterable[Tuple[str, str]]) -> Optional[List[int]]:
+    """Versión actual de cada clave, en el mismo orden (0 si nunca se ha escrito); None sin la tabla"""
+    claves = list(claves)
+    if not _tabla_disponible(db.connection()):
+        return None
+    filas = dict(
+        ((dominio, clave), version)
+        for dominio, clave, version in db.query(VersionDatos.dominio, VersionDatos.clave, VersionDatos.version).filter(
+            tuple_(VersionDatos.dominio, VersionDatos.clave).in_(claves)
+        )
+    )
+    return [filas.get(c, 0) for c in claves]
+
+
+def _tabla_disponible(conexion) -> bool:
+    """Sin la migración aplicada las escrituras siguen funcionando (solo se pierden los 304)"""
+    engine = conexion.engine
+    disponible = _TABLA_POR_ENGINE.get(engine)
+    if disponible is None:
+        disponible = inspect(conexion).has_table(VersionDatos.__tablename__)
+        _TABLA_POR_ENGINE[engine] = disponible
+        if not disponible:
+            logger.warning("⚠️ Tabla versiones_datos inexistente: los ETag no se actualizarán (ver scripts/migrations)")
+    return disponible
+
+
+def incrementar(conexion, claves: Iterable[Tuple[str, str]]) -> None:
+    """INSERT ... ON DUPLICATE KEY UPDATE version = version + 1 (ON CONFLICT en SQLite/PostgreSQL)"""
+    filas = [{"dominio": d, "clave": c, "version": 1} for d, c in sorted(set(claves))]  # Orden fijo: sin deadlocks
+    if not filas or not _tabla_disponible(conexion):
+        return
+    tabla = VersionDatos.__table__
+    dialecto = conexion.dialect.name
+    if dialecto == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(tabla)
+        stmt = stmt.on_duplicate_key_update(version=tabla.c.version + 1)
+    else:
+        if dialecto == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(tabla)
+        stmt = stmt.on_conflict_do_update(index_elements=["dominio", "clave"], set_={"version": tabla.c.version + 1})
+    conexion.execute(stmt, filas)
+
+
+def _area(valor) -> str:
+    return valor.value if hasattr(valor, "value") else str(valor)
+
+
+def _claves_objeto(obj, modificado: bool) -> Set[Tuple[str, str]]:
+    tabla = getattr(obj, "__tablename__", None)
+    if tabla in _DOMINIOS_POR_TABLA:
+        return {(_DOMINIOS_POR_TABLA[tabla], CLAVE_GLOBAL)}
+    if tabla not in _TABLAS_TRANSACCIONES:
+        return set()
+    if tabla == "snapshots_dia_cerrado":
+        # Cerrar o reabrir cambia la fuente de lectura del día en ambas áreas
+        return {clave_transacciones(obj.fecha, a) for a in AREAS}
+
+    fechas, areas = {obj.fecha}, {_area(obj.area)}
+    if modificado:
+        # Mover una transacción de día o de área invalida también el origen
+        estado = inspect(obj)
+        fechas.update(estado.attrs.fecha.history.deleted)
+        areas.update(_area(a) for a in estado.attrs.area.history.deleted)
+    return {clave_transacciones(f, a) for f in fechas if f is not None for a in areas}
+
+
+@event.listens_for(Session, "before_flush")
+def _capturar_dominios(session, flush_context, instances):
+    claves = set()
+    for obj in session.new:
+        claves |= _claves_objeto(obj, False)
+    for obj in session.dirty:
+        # En los catálogos cuentan también las colecciones (p. ej. los permisos de un rol)
+        catalogo = getattr(obj, "__tablename__", None) in _DOMINIOS_POR_TABLA
+        if session.is_modified(obj, include_collections=catalogo):
+            claves |= _claves_objeto(obj, True)
+    for obj in session.deleted:
+        claves |= _claves_objeto(obj, False)
+    session.info[_PENDIENTES] = claves
+
+
+def _anotar(session, claves) -> None:
+    """Acumula claves hasta el commit, junto con el engine donde se escribieron"""
+    engine, acumuladas = session.info.setdefault(_POR_CONFIRMAR, (session.connection().engine, set()))
+    acumuladas.update(claves)
+
+
+@event.listens_for(Session, "after_flush")
+def _anotar_versiones(session, flush_context):
+    claves = session.info.pop(_PENDIENTES, None)
+    if claves:
+        _anotar(session, claves)
+
+
+@event.listens_for(Session, "after_commit")
+def _incrementar_versiones(session):
+    engine, claves = session.info.pop(_POR_CONFIRMAR, (None, None))
+    if not claves:
+        return
+    try:
+        with engine.begin() as conexion:
+            incrementar(conexion, claves)
+    except Exception as e:
+        # Los datos ya están confirmados: un ETag desactualizado no debe fallar la escritura
+        logger.warning(f"⚠️ No se pudieron incrementar las versiones {sorted(claves)}: {e}")
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _descartar_versiones(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop(_POR_CONFIRMAR, None)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _sentencias_masivas(orm_execute_state):
+    """UPDATE/DELETE/INSERT ORM sin pasar por el flush: se incrementa la clave global del dominio"""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    mapper = orm_execute_state.bind_mapper
+    tabla = getattr(mapper.class_, "__tablename__", None) if mapper is not None else None
+    if tabla in _DOMINIOS_POR_TABLA:
+        dominio = _DOMINIOS_POR_TABLA[tabla]
+    elif tabla in _TABLAS_TRANSACCIONES:
+        dominio = "transacciones"
+    else:
+        return
+    _anotar(orm_execute_state.session, [(dominio, CLAVE_GLOBAL)])
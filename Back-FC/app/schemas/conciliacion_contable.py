@@ -68,4 +68,15 @@ class ConciliacionFechaResponse(BaseModel):
     empresas: List[EmpresaConciliacionResponse]
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class ConciliacionRangoRequest(BaseModel):
+    """Request para conciliar todas las empresas en un rango de fechas (p. ej. cierre de mes)"""
+    fecha_inicio: date = Field(..., description="Primera fecha del rango")
+    fecha_fin: date = Field(..., description="Última fecha del rango (inclusive)")
+
+class ConciliacionRangoResponse(BaseModel):
+    """Response con la conciliación de cada fecha del rango"""
+    fecha_inicio: date
+    fecha_fin: date
+    fechas: List[ConciliacionFechaResponse]
@@ -0,0 +1,69 @@
+"""
+Schemas Pydantic para escenarios "qué pasaría si" del flujo de caja
+"""
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, model_validator
+
+from app.schemas.flujo_caja import AreaTransaccionSchema
+
+
+class ModoAjusteSchema(str, Enum):
+    fijar = "fijar"  # La celda toma `monto`
+    sumar = "sumar"  # Se suma `monto` a lo que tenga la celda (mover un pago = -x un día, +x otro)
+    eliminar = "eliminar"  # La celda desaparece
+
+
+class AjusteCelda(BaseModel):
+    """Un cambio sobre una celda real (fecha, cuenta, área, concepto)"""
+    fecha: date
+    cuenta_id: int
+    area: AreaTransaccionSchema
+    concepto_id: int
+    modo: ModoAjusteSchema = ModoAjusteSchema.fijar
+    monto: Optional[Decimal] = Field(None, description="Requerido salvo en modo 'eliminar'")
+
+    @model_validator(mode="after")
+    def validar_monto(self):
+        if self.modo != ModoAjusteSchema.eliminar and self.monto is None:
+            raise ValueError(f"El ajuste en modo '{self.modo.value}' requiere monto")
+        return self
+
+
+class EscenarioBase(BaseModel):
+    """Ventana evaluada y ajustes del escenario"""
+    fecha_inicio: date
+    horizonte: int = Field(20, ge=1, description="Días hábiles evaluados desde fecha_inicio")
+    cuenta_id: Optional[int] = None
+    compania_id: Optional[int] = None
+    ajustes: List[AjusteCelda] = Field(default_factory=list)
+
+
+class EscenarioCreate(EscenarioBase):
+    nombre: str = Field(..., max_length=120)
+    descripcion: Optional[str] = None
+
+
+class EscenarioUpdate(BaseModel):
+    nombre: Optional[str] = Field(None, max_length=120)
+    descripcion: Optional[str] = None
+    fecha_inicio: Optional[date] = None
+    horizonte: Optional[int] = Field(None, ge=1)
+    cuenta_id: Optional[int] = None
+    compania_id: Optional[int] = None
+    ajustes: Optional[List[AjusteCelda]] = None
+
+
+class EscenarioResponse(EscenarioBase):
+    id: int
+    nombre: str
+    descripcion: Optional[str] = None
+    usuario_id: Optional[int] = None
+    fecha_creacion: Optional[datetime] = None
+    fecha_actualizacion: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -117,6 +117,7 @@ class TransaccionFlujoCajaUpdate(BaseModel):
     descripcion: Optional[str] = None
     area: Optional[AreaTransaccionSchema] = None
     compania_id: Optional[int] = None
+    version: Optional[int] = Field(None, description="Versión leída por el cliente; si ya cambió se responde 409")
     
     class Config:
         from_attributes = True
@@ -126,6 +127,7 @@ class TransaccionFlujoCajaResponse(TransaccionFlujoCajaBase):
     id: int
     usuario_id: Optional[int] = None
     auditoria: Optional[Dict[str, Any]] = None
+    version: Optional[int] = None
     created_at: datetime
     updated_at: datetime
     
@@ -135,6 +137,57 @@ class TransaccionFlujoCajaResponse(TransaccionFlujoCajaBase):
     class Config:
         from_attributes = True
 
+class AccionCeldaSchema(str, Enum):
+    crear = "crear"
+    actualizar = "actualizar"
+    eliminar = "eliminar"
+
+class OperacionCeldaSchema(BaseModel):
+    """Edición de una celda del dashboard dentro de un lote"""
+    accion: AccionCeldaSchema
+    transaccion_id: Optional[int] = Field(None, description="Requerido para actualizar y eliminar")
+    concepto_id: Optional[int] = Field(None, description="Requerido para crear")
+    cuenta_id: Optional[int] = Field(None, description="ID de la cuenta bancaria (crear)")
+    monto: Optional[Decimal] = Field(None, description="Monto de la celda (crear y actualizar)")
+    descripcion: Optional[str] = None
+    area: AreaTransaccionSchema = Field(AreaTransaccionSchema.tesoreria, description="Área (crear)")
+    compania_id: Optional[int] = None
+    version: Optional[int] = Field(None, description="Versión leída por el cliente (actualizar y eliminar)")
+
+class LoteCeldasRequest(BaseModel):
+    """Lote de ediciones de celdas para una misma fecha"""
+    operaciones: List[OperacionCeldaSchema] = Field(..., min_length=1, max_length=500)
+
+class LoteCeldasResponse(BaseModel):
+    """Resultado de aplicar un lote de ediciones"""
+    fecha: date
+    creadas: int
+    actualizadas: int
+    eliminadas: int
+    transacciones: List[TransaccionFlujoCajaResponse]
+    cuentas_recalculo: List[Optional[int]]
+
+class TransaccionHistorialResponse(BaseModel):
+    """Un cambio de monto de una celda"""
+    id: int
+    transaccion_id: int
+    ts: datetime
+    usuario_id: Optional[int] = None
+    monto_anterior: Optional[Decimal] = None
+    monto_nuevo: Optional[Decimal] = None
+    origen: str
+    
+    class Config:
+        from_attributes = True
+
+class HistorialCeldaResponse(BaseModel):
+    """Página del historial de una celda (más reciente primero)"""
+    fecha: date
+    concepto_id: int
+    cuenta_id: Optional[int] = None
+    items: List[TransaccionHistorialResponse]
+    siguiente_antes_de: Optional[int] = Field(None, description="Pasar como `antes_de` para la siguiente página")
+
 # ============================================
 # SCHEMAS PARA REPORTES Y DASHBOARDS
 # ============================================
@@ -7,12 +7,30 @@ from fastapi import Request
 import time
 
 from ..models.auditoria import RegistroAuditoria
-from ..models.usuarios import Usuario
+from ..core.principal_cache import UsuarioPrincipal
+from ..schemas.auditoria import RegistroAuditoriaResponse
 from ..core.database import get_db
+from ..core.metricas import auditoria_duracion, auditoria_en_curso
+
+# Columnas de `RegistroAuditoriaResponse` (listado rápido)
+_COLUMNAS_RESPUESTA = [getattr(RegistroAuditoria, campo) for campo in RegistroAuditoriaResponse.model_fields]
 
 # Zona horaria de Colombia (UTC-5)
 COLOMBIA_TZ = timezone(timedelta(hours=-5))
 
+def guardar_registro(db: Session, registro: RegistroAuditoria) -> RegistroAuditoria:
+    """Inserta y confirma un registro; las escrituras en curso y su duración van a /metrics"""
+    auditoria_en_curso.inc()
+    inicio = time.perf_counter()
+    try:
+        db.add(registro)
+        db.commit()
+        db.refresh(registro)
+    finally:
+        auditoria_duracion.observe(time.perf_counter() - inicio)
+        auditoria_en_curso.dec()
+    return registro
+
 def obtener_hora_colombia() -> datetime:
     """Obtiene la hora actual en zona horaria de Colombia (UTC-5)"""
     return datetime.now(COLOMBIA_TZ)
@@ -21,9 +39,8 @@ class AuditoriaService:
     """Servicio para manejar el registro de auditoría del sistema"""
     
     @staticmethod
-    def registrar_accion(
-        db: Session,
-        usuario: Usuario,
+    def construir_registro(
+        usuario: UsuarioPrincipal,
         accion: str,
         modulo: str,
         entidad: str,
@@ -38,7 +55,7 @@ class AuditoriaService:
         resultado: str = "EXITOSO",
         mensaje_error: str = None
     ) -> RegistroAuditoria:
-        """Registra una acción de auditoría en la base de datos"""
+        """Construye un registro de auditoría sin agregarlo a la sesión (para lotes en una sola transacción)"""
         
         # Obtener IP del cliente
         ip_address = "127.0.0.1"
@@ -70,7 +87,7 @@ class AuditoriaService:
                 metodo_http = request.method
 
         # Crear registro de auditoría
-        registro = RegistroAuditoria(
+        return RegistroAuditoria(
             usuario_id=usuario.id,
             usuario_nombre=usuario.nombre,
             usuario_email=usuario.email,
@@ -90,12 +107,43 @@ class AuditoriaService:
             resultado=resultado.upper(),
             mensaje_error=mensaje_error
         )
-        
-        db.add(registro)
-        db.commit()
-        db.refresh(registro)
-        
-        return registro
+
+    @staticmethod
+    def registrar_accion(
+        db: Session,
+        usuario: UsuarioPrincipal,
+        accion: str,
+        modulo: str,
+        entidad: str,
+        descripcion: str,
+        request: Request = None,
+        entidad_id: str = None,
+        valores_anteriores: Dict[str, Any] = None,
+        valores_nuevos: Dict[str, Any] = None,
+        endpoint: str = None,
+        metodo_http: str = None,
+        duracion_ms: int = None,
+        resultado: str = "EXITOSO",
+        mensaje_error: str = None
+    ) -> RegistroAuditoria:
+        """Registra una acción de auditoría en la base de datos"""
+        registro = AuditoriaService.construir_registro(
+            usuario=usuario,
+            accion=accion,
+            modulo=modulo,
+            entidad=entidad,
+            descripcion=descripcion,
+            request=request,
+            entidad_id=entidad_id,
+            valores_anteriores=valores_anteriores,
+            valores_nuevos=valores_nuevos,
+            endpoint=endpoint,
+            metodo_http=metodo_http,
+            duracion_ms=duracion_ms,
+            resultado=resultado,
+            mensaje_error=mensaje_error
+        )
+        return guardar_registro(db, registro)
 
     @staticmethod
     def obtener_registros(
@@ -111,9 +159,53 @@ class AuditoriaService:
     ) -> tuple[List[RegistroAuditoria], int]:
         """Obtiene registros de auditoría con filtros opcionales"""
         
-        query = db.query(RegistroAuditoria)
+        query = AuditoriaService.filtrar_registros(
+            db.query(RegistroAuditoria),
+            usuario_id=usuario_id,
+            accion=accion,
+            modulo=modulo,
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin,
+            busqueda=busqueda
+        )
+        
+        # Contar total
+        total = query.count()
         
-        # Filtros
+        # Ordenar por fecha descendente y paginar
+        registros = query.order_by(desc(RegistroAuditoria.fecha_hora)).offset(skip).limit(limit).all()
+        
+        return registros, total
+
+    @staticmethod
+    def obtener_registros_serializados(
+        db: Session,
+        skip: int = 0,
+        limit: int = 100,
+        **filtros
+    ) -> tuple[List[Dict[str, Any]], int]:
+        """
+        Igual que `obtener_registros`, pero lee solo las columnas de `RegistroAuditoriaResponse`
+        como tuplas y las retorna como dicts listos para serializar (sin instanciar el ORM)
+        """
+        query = AuditoriaService.filtrar_registros(db.query(RegistroAuditoria), **filtros)
+        total = query.count()
+        filas = query.with_entities(*_COLUMNAS_RESPUESTA).order_by(
+            desc(RegistroAuditoria.fecha_hora)
+        ).offset(skip).limit(limit).all()
+        return [fila._asdict() for fila in filas], total
+
+    @staticmethod
+    def filtrar_registros(
+        query,
+        usuario_id: int = None,
+        accion: str = None,
+        modulo: str = None,
+        fecha_inicio: datetime = None,
+        fecha_fin: datetime = None,
+        busqueda: str = None
+    ):
+        """Aplica los filtros del listado de auditoría (compartidos con la exportación)"""
         if usuario_id:
             query = query.filter(RegistroAuditoria.usuario_id == usuario_id)
         
@@ -137,13 +229,7 @@ class AuditoriaService:
             )
             query = query.filter(search_filter)
         
-        # Contar total
-        total = query.count()
-        
-        # Ordenar por fecha descendente y paginar
-        registros = query.order_by(desc(RegistroAuditoria.fecha_hora)).offset(skip).limit(limit).all()
-        
-        return registros, total
+        return query
 
     @staticmethod
     def obtener_estadisticas(
@@ -229,9 +315,8 @@ class AuditoriaService:
 
 # Funciones helper para logging específico de cada módulo
 
-def log_transaccion_flujo_caja(
-    db: Session,
-    usuario: Usuario,
+def construir_registro_transaccion_flujo_caja(
+    usuario: UsuarioPrincipal,
     accion: str,
     fecha: str,
     concepto: str,
@@ -239,8 +324,8 @@ def log_transaccion_flujo_caja(
     valor_anterior: float = None,
     valor_nuevo: float = None,
     request: Request = None
-):
-    """Log específico para transacciones de flujo de caja"""
+) -> RegistroAuditoria:
+    """Registro de auditoría de una transacción de flujo de caja, sin agregarlo a la sesión"""
     
     descripcion = f"{accion} transacción: {concepto} en {cuenta}"
     if valor_anterior is not None and valor_nuevo is not None:
@@ -251,8 +336,7 @@ def log_transaccion_flujo_caja(
     valores_anteriores = {"valor": valor_anterior} if valor_anterior is not None else None
     valores_nuevos = {"valor": valor_nuevo} if valor_nuevo is not None else None
     
-    return AuditoriaService.registrar_accion(
-        db=db,
+    return AuditoriaService.construir_registro(
         usuario=usuario,
         accion=accion,
         modulo="FLUJO_CAJA",
@@ -264,9 +348,33 @@ def log_transaccion_flujo_caja(
         request=request
     )
 
+def log_transaccion_flujo_caja(
+    db: Session,
+    usuario: UsuarioPrincipal,
+    accion: str,
+    fecha: str,
+    concepto: str,
+    cuenta: str,
+    valor_anterior: float = None,
+    valor_nuevo: float = None,
+    request: Request = None
+):
+    """Log específico para transacciones de flujo de caja"""
+    registro = construir_registro_transaccion_flujo_caja(
+        usuario=usuario,
+        accion=accion,
+        fecha=fecha,
+        concepto=concepto,
+        cuenta=cuenta,
+        valor_anterior=valor_anterior,
+        valor_nuevo=valor_nuevo,
+        request=request
+    )
+    return guardar_registro(db, registro)
+
 def log_gestion_empresa(
     db: Session,
-    usuario: Usuario,
+    usuario: UsuarioPrincipal,
     accion: str,
     empresa_id: int,
     empresa_nombre: str,
@@ -293,7 +401,7 @@ def log_gestion_empresa(
 
 def log_gestion_cuenta(
     db: Session,
-    usuario: Usuario,
+    usuario: UsuarioPrincipal,
     accion: str,
     cuenta_id: int,
     numero_cuenta: str,
@@ -321,7 +429,7 @@ def log_gestion_cuenta(
 
 def log_accion_usuario(
     db: Session,
-    usuario_admin: Usuario,
+    usuario_admin: UsuarioPrincipal,
     accion: str,
     usuario_afectado_id: int,
     usuario_afectado_nombre: str,
@@ -348,7 +456,7 @@ def log_accion_usuario(
 
 def log_reporte(
     db: Session,
-    usuario: Usuario,
+    usuario: UsuarioPrincipal,
     tipo_reporte: str,
     parametros: Dict = None,
     request: Request = None
@@ -8,6 +8,8 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 from ..core.config import get_settings
 from ..core.database import get_db
+from ..core.principal_cache import UsuarioPrincipal, principal_cache
+from ..core.rbac_cache import normalizar_codigo_permiso, permisos_registry
 from ..models.usuarios import Usuario
 from ..schemas.auth import TokenData
 
@@ -39,6 +41,22 @@ def authenticate_user(db: Session, email: str, password: str) -> Optional[Usuari
         return None
     return user
 
+def resolver_principal(email: str, db: Session) -> Optional[UsuarioPrincipal]:
+    """Resolver el usuario del token usando el caché de principales; consulta la BD solo en un miss"""
+    if permisos_registry.sincronizar(db):
+        # Los principales cacheados se armaron con los permisos anteriores
+        principal_cache.invalidar_todo()
+    principal = principal_cache.get(email)
+    if principal is not None:
+        return principal
+
+    user = db.query(Usuario).filter(Usuario.email == email).first()
+    if user is None:
+        return None
+    principal = UsuarioPrincipal.desde_usuario(user)
+    principal_cache.set(email, principal)
+    return principal
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Crear token de acceso"""
     to_encode = data.copy()
@@ -54,7 +72,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
-) -> Usuario:
+) -> UsuarioPrincipal:
     """Obtener usuario actual desde el token"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -72,7 +90,7 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
     
-    user = db.query(Usuario).filter(Usuario.email == token_data.email).first()
+    user = resolver_principal(token_data.email, db)
     if user is None:
         raise credentials_exception
     return user
@@ -80,7 +98,7 @@ async def get_current_user(
 async def get_current_user_optional(
     request,
     db: Session
-) -> Optional[Usuario]:
+) -> Optional[UsuarioPrincipal]:
     """Obtener usuario actual de manera opcional (sin lanzar excepción si no está autenticado)"""
     try:
         # Intentar obtener el token del header Authorization
@@ -94,14 +112,13 @@ async def get_current_user_optional(
         if email is None:
             return None
             
-        user = db.query(Usuario).filter(Usuario.email == email).first()
-        return user
+        return resolver_principal(email, db)
     except:
         return None
 
 def check_user_role(required_roles: list[str]):
     """Decorador para verificar roles de usuario"""
-    def role_checker(current_user: Usuario = Depends(get_current_user)):
+    def role_checker(current_user: UsuarioPrincipal = Depends(get_current_user)):
         if current_user.rol not in required_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -110,7 +127,24 @@ def check_user_role(required_roles: list[str]):
         return current_user
     return role_checker
 
-def get_current_user_from_token(token: str, db: Session) -> Optional[Usuario]:
+def require_permission(codigo_permiso: str):
+    """Dependencia que exige un permiso RBAC ('modulo:accion' o 'modulo.accion') sin consultar la BD"""
+    codigo = normalizar_codigo_permiso(codigo_permiso)
+
+    def permission_checker(current_user: UsuarioPrincipal = Depends(get_current_user)):
+        if permisos_registry.cargado:
+            permitido = permisos_registry.tiene_permiso(current_user.rol_id, codigo)
+        else:
+            permitido = current_user.tiene_permiso(codigo)
+        if not permitido:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"No tienes el permiso requerido: {codigo}"
+            )
+        return current_user
+    return permission_checker
+
+def get_current_user_from_token(token: str, db: Session) -> Optional[UsuarioPrincipal]:
     """Obtener usuario desde token sin usar FastAPI dependencies"""
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
@@ -118,7 +152,6 @@ def get_current_user_from_token(token: str, db: Session) -> Optional[Usuario]:
         if email is None:
             return None
         
-        user = db.query(Usuario).filter(Usuario.email == email).first()
-        return user
+        return resolver_principal(email, db)
     except JWTError:
         return None
\ No newline at end of file
@@ -0,0 +1,285 @@
+"""
+Servicio de cierre de día: congela la partición (fecha, compañía) al cerrar la conciliación.
+
+Al cerrar se guarda una foto inmutable con las transacciones ya serializadas y los
+agregados que usan los informes. Mientras el día esté cerrado:
+- las escrituras sobre la partición se rechazan (DiaCerradoError),
+- el motor de recálculo omite la fecha,
+- las lecturas por fecha y los informes mensuales se sirven desde la foto.
+Reabrir el día elimina la foto de forma explícita.
+
+Una fila con cuenta pertenece a la compañía de su cuenta (se guarda así en cada flush);
+`alinear_companias` corrige las filas anteriores a esa regla.
+"""
+import hashlib
+import json
+import logging
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Session, joinedload
+
+from ..models.cuentas_bancarias import CuentaBancaria
+from ..models.snapshot_dia import SnapshotDiaCerrado
+from ..models.transacciones_flujo_caja import TransaccionFlujoCaja
+
+logger = logging.getLogger(__name__)
+
+# Las transacciones sin compañía pertenecen a la compañía por defecto
+COMPANIA_POR_DEFECTO = 1
+
+
+class DiaCerradoError(ValueError):
+    """Escritura sobre un día cuya conciliación está cerrada"""
+
+    def __init__(self, fecha: date, compania_id: int):
+        super().__init__(
+            f"El día {fecha} está cerrado para la compañía {compania_id}; reabra la conciliación para modificarlo"
+        )
+        self.fecha = fecha
+        self.compania_id = compania_id
+
+
+def compania_de(compania_id: Optional[int]) -> int:
+    return compania_id or COMPANIA_POR_DEFECTO
+
+
+def compania_transaccion():
+    """Expresión SQL de la compañía de una transacción (NULL -> compañía por defecto)"""
+    return func.coalesce(TransaccionFlujoCaja.compania_id, COMPANIA_POR_DEFECTO)
+
+
+def excluir_particiones(query, particiones: Iterable[Tuple[date, int]]):
+    """Filtra de `query` las transacciones que pertenecen a particiones cerradas"""
+    particiones = list(particiones)
+    if not particiones:
+        return query
+    return query.filter(~tuple_(TransaccionFlujoCaja.fecha, compania_transaccion()).in_(particiones))
+
+
+class CierreDiaService:
+    """Gestión de las fotos de días cerrados"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ------------------------------------------------------------------
+    # Consultas de estado
+    # ------------------------------------------------------------------
+
+    def dia_cerrado(self, fecha: date, compania_id: Optional[int]) -> bool:
+        return self.db.query(SnapshotDiaCerrado.id).filter(
+            SnapshotDiaCerrado.fecha == fecha,
+            SnapshotDiaCerrado.compania_id == compania_de(compania_id)
+        ).first() is not None
+
+    def verificar_abierto(self, fecha: date, compania_id: Optional[int]) -> None:
+        if self.dia_cerrado(fecha, compania_id):
+            raise DiaCerradoError(fecha, compania_de(compania_id))
+
+    def verificar_abiertas(self, fecha: date, companias: Iterable[Optional[int]]) -> None:
+        """Rechaza una escritura en lote si alguna de sus compañías tiene el día cerrado"""
+        cerradas = self.companias_cerradas(fecha)
+        for compania_id in sorted({compania_de(c) for c in companias}):
+            if compania_id in cerradas:
+                raise DiaCerradoError(fecha, compania_id)
+
+    def companias_cerradas(self, fecha: date) -> Set[int]:
+        return {
+            compania_id for (compania_id,) in self.db.query(SnapshotDiaCerrado.compania_id).filter(
+                SnapshotDiaCerrado.fecha == fecha
+            ).all()
+        }
+
+    def fechas_cerradas(self, desde: date, hasta: date, compania_id: Optional[int]) -> Set[date]:
+        return {
+            fecha for (fecha,) in self.db.query(SnapshotDiaCerrado.fecha).filter(
+                SnapshotDiaCerrado.fecha >= desde,
+                SnapshotDiaCerrado.fecha <= hasta,
+                SnapshotDiaCerrado.compania_id == compania_de(compania_id)
+            ).all()
+        }
+
+    def particiones_cerradas(self, desde: date, hasta: date) -> Set[Tuple[date, int]]:
+        return {
+            (fecha, compania_id) for fecha, compania_id in self.db.query(
+                SnapshotDiaCerrado.fecha, SnapshotDiaCerrado.compania_id
+            ).filter(
+                SnapshotDiaCerrado.fecha >= desde,
+                SnapshotDiaCerrado.fecha <= hasta
+            ).all()
+        }
+
+    def companias_de_cuentas(self) -> Dict[int, int]:
+        """Compañía de cada cuenta bancaria: es la que define la partición de sus filas"""
+        return {
+            cuenta_id: compania_de(compania_id)
+            for cuenta_id, compania_id in self.db.query(CuentaBancaria.id, CuentaBancaria.compania_id).all()
+        }
+
+    def compania_de_cuenta(self, cuenta_id: Optional[int], compania_id: Optional[int] = None) -> int:
+        """Compañía de la cuenta; sin cuenta (o si no existe) se usa `compania_id`"""
+        if cuenta_id is not None:
+            fila = self.db.query(CuentaBancaria.compania_id).filter(CuentaBancaria.id == cuenta_id).first()
+            if fila is not None:
+                return compania_de(fila[0])
+        return compania_de(compania_id)
+
+    def filas_fuera_de_su_cuenta(self) -> List[Tuple[int, date, int, int]]:
+        """(id, fecha, compañía guardada, compañía de la cuenta) de las filas guardadas en otra partición"""
+        return [
+            (id_, fecha, compania_guardada, compania_cuenta)
+            for id_, fecha, compania_guardada, compania_cuenta in self.db.query(
+                TransaccionFlujoCaja.id, TransaccionFlujoCaja.fecha, compania_transaccion(), CuentaBancaria.compania_id
+            ).join(CuentaBancaria, CuentaBancaria.id == TransaccionFlujoCaja.cuenta_id).filter(
+                compania_transaccion() != CuentaBancaria.compania_id
+            ).order_by(TransaccionFlujoCaja.fecha, TransaccionFlujoCaja.id).all()
+        ]
+
+    def alinear_companias(self, rehacer_cerrados: bool = False) -> Dict[str, list]:
+        """
+        Mueve cada fila con cuenta a la partición de su cuenta (filas anteriores a esa regla).
+
+        Si la partición de origen o la de destino está cerrada, la fila se omite salvo con
+        `rehacer_cerrados`: entonces se mueve y las fotos de esas particiones se rehacen con
+        los datos actuales. El commit queda a cargo del llamador.
+        """
+        filas = self.filas_fuera_de_su_cuenta()
+        if not filas:
+            return {"alineadas": [], "omitidas": [], "fotos_rehechas": []}
+        fechas = [fecha for _, fecha, _, _ in filas]
+        cerradas = self.particiones_cerradas(min(fechas), max(fechas))
+
+        alineadas, omitidas = defaultdict(list), []
+        rehacer: Set[Tuple[date, int]] = set()
+        for id_, fecha, origen, destino in filas:
+            afectadas = {(fecha, origen), (fecha, destino)} & cerradas
+            if afectadas and not rehacer_cerrados:
+                omitidas.append((id_, fecha, origen, destino))
+                continue
+            alineadas[destino].append(id_)
+            rehacer |= afectadas
+
+        for compania_id, ids in alineadas.items():
+            self.db.query(TransaccionFlujoCaja).filter(TransaccionFlujoCaja.id.in_(ids)).update(
+                {
+                    TransaccionFlujoCaja.compania_id: compania_id,
+                    TransaccionFlujoCaja.version: TransaccionFlujoCaja.version + 1,
+                },
+                synchronize_session=False
+            )
+        for fecha, compania_id in sorted(rehacer):
+            self.cerrar_dia(fecha, compania_id)
+        return {
+            "alineadas": sorted(id_ for ids in alineadas.values() for id_ in ids),
+            "omitidas": omitidas,
+            "fotos_rehechas": sorted(rehacer),
+        }
+
+    def snapshots_en_rango(self, desde: date, hasta: date) -> List[SnapshotDiaCerrado]:
+        return self.db.query(SnapshotDiaCerrado).filter(
+            SnapshotDiaCerrado.fecha >= desde,
+            SnapshotDiaCerrado.fecha <= hasta
+        ).order_by(SnapshotDiaCerrado.fecha, SnapshotDiaCerrado.compania_id).all()
+
+    # ------------------------------------------------------------------
+    # Cierre y reapertura
+    # ------------------------------------------------------------------
+
+    def construir_snapshot(self, fecha: date, compania_id: int, usuario_id: Optional[int] = None) -> SnapshotDiaCerrado:
+        """Serializa la partición tal como la devuelve la API, más los agregados para informes"""
+        from ..schemas.flujo_caja import TransaccionFlujoCajaResponse
+
+        transacciones = self.db.query(TransaccionFlujoCaja).options(
+            joinedload(TransaccionFlujoCaja.concepto)
+        ).filter(
+            TransaccionFlujoCaja.fecha == fecha,
+            compania_transaccion() == compania_id
+        ).order_by(TransaccionFlujoCaja.id).all()
+
+        serializadas = [
+            TransaccionFlujoCajaResponse.model_validate(t).model_dump(mode="json") for t in transacciones
+        ]
+        contenido = json.dumps(serializadas, ensure_ascii=False, separators=(",", ":"))
+
+        sumas: Dict[Tuple[int, int, int], Decimal] = defaultdict(Decimal)
+        total_ingresos = Decimal("0")
+        total_gastos = Decimal("0")
+        for t in transacciones:
+            monto = Decimal(t.monto or 0)
+            sumas[(t.concepto_id, t.compania_id or 0, t.cuenta_id or 0)] += monto
+            if monto > 0:
+                total_ingresos += monto
+            elif monto < 0:
+                total_gastos += -monto
+
+        return SnapshotDiaCerrado(
+            fecha=fecha,
+            compania_id=compania_id,
+            transacciones=contenido,
+            agregados=[[c, comp, cta, str(monto)] for (c, comp, cta), monto in sorted(sumas.items())],
+            resumen={
+                "total_transacciones": len(transacciones),
+                "total_ingresos": str(total_ingresos),
+                "total_gastos": str(total_gastos)
+            },
+            checksum=hashlib.sha256(contenido.encode("utf-8")).hexdigest(),
+            usuario_id=usuario_id
+        )
+
+    def cerrar_dia(self, fecha: date, compania_id: Optional[int], usuario_id: Optional[int] = None) -> SnapshotDiaCerrado:
+        """Crea (o rehace) la foto del día. El commit queda a cargo del llamador."""
+        compania_id = compania_de(compania_id)
+        self.db.query(SnapshotDiaCerrado).filter(
+            SnapshotDiaCerrado.fecha == fecha,
+            SnapshotDiaCerrado.compania_id == compania_id
+        ).delete(synchronize_session=False)
+        snapshot = self.construir_snapshot(fecha, compania_id, usuario_id)
+        self.db.add(snapshot)
+        self.db.flush()
+        logger.info(f"🔒 Día {fecha} cerrado para compañía {compania_id}: {snapshot.resumen['total_transacciones']} transacciones congeladas")
+        return snapshot
+
+    def reabrir_dia(self, fecha: date, compania_id: Optional[int]) -> bool:
+        """Elimina la foto del día; retorna False si el día no estaba cerrado"""
+        compania_id = compania_de(compania_id)
+        eliminados = self.db.query(SnapshotDiaCerrado).filter(
+            SnapshotDiaCerrado.fecha == fecha,
+            SnapshotDiaCerrado.compania_id == compania_id
+        ).delete(synchronize_session=False)
+        self.db.flush()
+        if eliminados:
+            logger.info(f"🔓 Día {fecha} reabierto para compañía {compania_id}: snapshot invalidado")
+        return bool(eliminados)
+
+    def reabrir_particiones(self, particiones: Iterable[Tuple[date, int]]) -> int:
+        """Elimina en una sola sentencia las fotos de varias (fecha, compañía)"""
+        particiones = [(fecha, compania_de(compania_id)) for fecha, compania_id in particiones]
+        if not particiones:
+            return 0
+        eliminados = self.db.query(SnapshotDiaCerrado).filter(
+            tuple_(SnapshotDiaCerrado.fecha, SnapshotDiaCerrado.compania_id).in_(particiones)
+        ).delete(synchronize_session=False)
+        self.db.flush()
+        if eliminados:
+            logger.info(f"🔓 {eliminados} días reabiertos: snapshots invalidados")
+        return eliminados
+
+    # ------------------------------------------------------------------
+    # Lecturas servidas desde la foto
+    # ------------------------------------------------------------------
+
+    def transacciones_snapshot(self, fecha: date, companias: Iterable[int], area: Optional[str] = None) -> List[dict]:
+        """Transacciones congeladas de las compañías indicadas, opcionalmente filtradas por área"""
+        filas = []
+        for snapshot in self.db.query(SnapshotDiaCerrado).filter(
+            SnapshotDiaCerrado.fecha == fecha,
+            SnapshotDiaCerrado.compania_id.in_(list(companias))
+        ).order_by(SnapshotDiaCerrado.compania_id).all():
+            filas.extend(json.loads(snapshot.transacciones))
+        if area is not None:
+            filas = [f for f in filas if f.get("area") == area]
+        return filas
@@ -3,13 +3,15 @@ Servicio para manejar la lógica de conciliaciones contables
 """
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_
-from typing import List, Optional, Dict
-from datetime import date
+from typing import List, Optional, Dict, Tuple
+from datetime import date, timedelta
 from decimal import Decimal
 
 from ..models.conciliacion_contable import ConciliacionContable
 from ..models.companias import Compania
 from ..models.transacciones_flujo_caja import TransaccionFlujoCaja, AreaTransaccion
+from .cierre_dia_service import CierreDiaService
+from .dias_habiles_service import DiasHabilesService
 from ..schemas.conciliacion_contable import (
     ConciliacionContableCreate,
     ConciliacionContableUpdate,
@@ -18,141 +20,197 @@ from ..schemas.conciliacion_contable import (
     CompaniaResponse
 )
 
+CONCEPTO_SUBTOTAL_TESORERIA = 50  # SUB-TOTAL TESORERÍA
+CONCEPTO_SUBTOTAL_PAGADURIA = 82  # SUBTOTAL MOVIMIENTO PAGADURIA
+
+
+def _a_decimal(valor) -> Decimal:
+    return Decimal(str(valor or 0)).quantize(Decimal('0.01'))
+
+
 class ConciliacionContableService:
     """
     Servicio para manejar conciliaciones contables
     """
     
     @staticmethod
-    def calcular_totales_por_area(db: Session, empresa_id: int, fecha: date) -> Dict[str, Decimal]:
+    def totales_por_compania(
+        db: Session,
+        fecha_inicio: date,
+        fecha_fin: Optional[date] = None,
+        empresa_ids: Optional[List[int]] = None
+    ) -> Dict[Tuple[date, int], Dict[str, Decimal]]:
         """
-        Calcula los totales de Pagaduría y Tesorería para una empresa en una fecha específica
-        Los valores se obtienen de los conceptos de subtotal específicos:
+        Totales de Pagaduría y Tesorería por (fecha, compañía) en una sola consulta.
+        Los valores son los de la fila de subtotal guardada para la compañía y la fecha:
         - SUB-TOTAL TESORERÍA (concepto_id = 50)
         - SUBTOTAL MOVIMIENTO PAGADURIA (concepto_id = 82)
+        Si hay varias, se toma la primera (menor id). Las filas sin compañía son de la
+        compañía 1, como en `compania_de`.
         """
-        # Total Pagaduría - buscar concepto SUBTOTAL MOVIMIENTO PAGADURIA (ID 82)
-        transaccion_pagaduria = db.query(TransaccionFlujoCaja).filter(
-            and_(
-                TransaccionFlujoCaja.compania_id == empresa_id,
-                TransaccionFlujoCaja.fecha == fecha,
-                TransaccionFlujoCaja.concepto_id == 82  # SUBTOTAL MOVIMIENTO PAGADURIA
-            )
-        ).first()
-        
-        total_pagaduria = transaccion_pagaduria.monto if transaccion_pagaduria else Decimal('0.00')
-        
-        # Total Tesorería - buscar concepto SUB-TOTAL TESORERÍA (ID 50)
-        transaccion_tesoreria = db.query(TransaccionFlujoCaja).filter(
-            and_(
-                TransaccionFlujoCaja.compania_id == empresa_id,
-                TransaccionFlujoCaja.fecha == fecha,
-                TransaccionFlujoCaja.concepto_id == 50  # SUB-TOTAL TESORERÍA
-            )
-        ).first()
+        fecha_fin = fecha_fin or fecha_inicio
+        compania = func.coalesce(TransaccionFlujoCaja.compania_id, 1)
+        filtros = [
+            TransaccionFlujoCaja.fecha >= fecha_inicio,
+            TransaccionFlujoCaja.fecha <= fecha_fin,
+            TransaccionFlujoCaja.concepto_id.in_([CONCEPTO_SUBTOTAL_TESORERIA, CONCEPTO_SUBTOTAL_PAGADURIA])
+        ]
+        if empresa_ids is not None:
+            filtros.append(compania.in_(empresa_ids))
+        primeras = db.query(func.min(TransaccionFlujoCaja.id)).filter(*filtros).group_by(
+            TransaccionFlujoCaja.fecha, compania, TransaccionFlujoCaja.concepto_id
+        )
         
-        total_tesoreria = transaccion_tesoreria.monto if transaccion_tesoreria else Decimal('0.00')
+        totales: Dict[Tuple[date, int], Dict[str, Decimal]] = {}
+        for fecha, compania_id, concepto_id, monto in db.query(
+            TransaccionFlujoCaja.fecha, compania, TransaccionFlujoCaja.concepto_id, TransaccionFlujoCaja.monto
+        ).filter(TransaccionFlujoCaja.id.in_(primeras.scalar_subquery())):
+            fila = totales.setdefault((fecha, compania_id), {"pagaduria": Decimal('0.00'), "tesoreria": Decimal('0.00')})
+            area = "pagaduria" if concepto_id == CONCEPTO_SUBTOTAL_PAGADURIA else "tesoreria"
+            fila[area] = _a_decimal(monto)
+        return totales
+    
+    @staticmethod
+    def calcular_totales_por_area(db: Session, empresa_id: int, fecha: date) -> Dict[str, Decimal]:
+        """
+        Calcula los totales de Pagaduría y Tesorería para una empresa en una fecha específica
+        (ver `totales_por_compania`)
+        """
+        totales = ConciliacionContableService.totales_por_compania(
+            db, fecha, empresa_ids=[empresa_id]
+        ).get((fecha, empresa_id), {"pagaduria": Decimal('0.00'), "tesoreria": Decimal('0.00')})
         
         return {
-            "pagaduria": total_pagaduria,
-            "tesoreria": total_tesoreria,
-            "total": total_pagaduria + total_tesoreria
+            "pagaduria": totales["pagaduria"],
+            "tesoreria": totales["tesoreria"],
+            "total": totales["pagaduria"] + totales["tesoreria"]
         }
     
     @staticmethod
-    def obtener_conciliacion_por_fecha(db: Session, fecha: date) -> ConciliacionFechaResponse:
+    def _empresas_conciliables(db: Session) -> List[Compania]:
+        """Las primeras 3 empresas (Capitalizadora, Seguros Bolívar, Comerciales)"""
+        return db.query(Compania).order_by(Compania.id).limit(3).all()
+    
+    @staticmethod
+    def _upsert_totales(db: Session, filas: List[Dict]) -> None:
         """
-        Obtiene todas las empresas con sus datos de conciliación para una fecha específica
+        Inserta o actualiza los totales calculados de varias conciliaciones en un solo
+        INSERT ... ON DUPLICATE KEY UPDATE (ON CONFLICT en SQLite/PostgreSQL).
+        En las existentes solo se tocan los totales; estado y centralizadora se conservan.
+        """
+        if not filas:
+            return
+        tabla = ConciliacionContable.__table__
+        dialecto = db.get_bind().dialect.name
+        if dialecto == "mysql":
+            from sqlalchemy.dialects.mysql import insert
+            stmt = insert(tabla)
+            stmt = stmt.on_duplicate_key_update(
+                total_pagaduria=stmt.inserted.total_pagaduria,
+                total_tesoreria=stmt.inserted.total_tesoreria
+            )
+        else:
+            if dialecto == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            stmt = insert(tabla)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["fecha", "empresa_id"],
+                set_={
+                    "total_pagaduria": stmt.excluded.total_pagaduria,
+                    "total_tesoreria": stmt.excluded.total_tesoreria
+                }
+            )
+        db.execute(stmt, filas)
+    
+    @staticmethod
+    def conciliar_rango(
+        db: Session,
+        fecha_inicio: date,
+        fecha_fin: date,
+        solo_dias_habiles: bool = True
+    ) -> List[ConciliacionFechaResponse]:
+        """
+        Calcula y guarda la conciliación de todas las empresas para cada día hábil del
+        rango (con `solo_dias_habiles=False`, para todas las fechas).
+        
+        Son cinco sentencias sin importar el tamaño del rango: festivos, empresas,
+        totales, upsert masivo y lectura de las conciliaciones resultantes.
         """
         import logging
         logger = logging.getLogger(__name__)
         
-        logger.info(f"📊 Iniciando obtención de conciliación para fecha: {fecha}")
+        if solo_dias_habiles:
+            fechas = DiasHabilesService(db).obtener_dias_habiles_rango(fecha_inicio, fecha_fin)
+        else:
+            fechas = [fecha_inicio + timedelta(days=i) for i in range((fecha_fin - fecha_inicio).days + 1)]
+        if not fechas:
+            return []
         
-        # Obtener las primeras 3 empresas (Capitalizadora, Seguros Bolívar, Comerciales)
-        empresas = db.query(Compania).limit(3).all()
-        logger.info(f"🏢 Empresas encontradas: {len(empresas)}")
+        # (id, nombre) se copian antes del commit para no recargar cada empresa después
+        empresas = [
+            CompaniaResponse(id=e.id, nombre=e.nombre)
+            for e in ConciliacionContableService._empresas_conciliables(db)
+        ]
+        empresa_ids = [e.id for e in empresas]
+        logger.info(f"📊 Conciliación {fecha_inicio} → {fecha_fin}: {len(empresas)} empresas")
         
-        empresas_conciliacion = []
+        totales = ConciliacionContableService.totales_por_compania(db, fecha_inicio, fecha_fin, empresa_ids)
+        ceros = {"pagaduria": Decimal('0.00'), "tesoreria": Decimal('0.00')}
         
-        for empresa in empresas:
-            logger.info(f"  📋 Procesando empresa: {empresa.nombre} (ID: {empresa.id})")
-            
-            # Buscar conciliación existente
-            conciliacion = db.query(ConciliacionContable).filter(
-                and_(
-                    ConciliacionContable.empresa_id == empresa.id,
-                    ConciliacionContable.fecha == fecha
-                )
-            ).first()
-            
-            # Calcular totales automáticamente desde transacciones
-            totales = ConciliacionContableService.calcular_totales_por_area(
-                db, empresa.id, fecha
-            )
-            
-            # Si existe conciliación, usar esos datos
-            if conciliacion:
-                # Actualizar totales calculados
-                conciliacion.total_pagaduria = totales["pagaduria"]
-                conciliacion.total_tesoreria = totales["tesoreria"]
-                
-                # Calcular diferencia: tratar total_centralizadora como 0 si es None
+        ConciliacionContableService._upsert_totales(db, [
+            {
+                "fecha": fecha,
+                "empresa_id": empresa_id,
+                "total_pagaduria": totales.get((fecha, empresa_id), ceros)["pagaduria"],
+                "total_tesoreria": totales.get((fecha, empresa_id), ceros)["tesoreria"],
+                "total_centralizadora": Decimal('0.00'),  # Inicializar en 0.00 en lugar de None
+                "estado": "Pendiente"
+            }
+            for fecha in fechas
+            for empresa_id in empresa_ids
+        ])
+        db.commit()
+        
+        conciliaciones = {
+            (c.fecha, c.empresa_id): c
+            for c in db.query(ConciliacionContable).filter(
+                ConciliacionContable.fecha >= fecha_inicio,
+                ConciliacionContable.fecha <= fecha_fin,
+                ConciliacionContable.empresa_id.in_(empresa_ids)
+            ).all()
+        }
+        
+        respuestas = []
+        for fecha in fechas:
+            empresas_conciliacion = []
+            for empresa in empresas:
+                conciliacion = conciliaciones[(fecha, empresa.id)]
                 # Diferencia = Total Calculado - (Total Centralizadora o 0)
                 centralizadora = conciliacion.total_centralizadora or Decimal('0.00')
-                diferencia = conciliacion.total_calculado - centralizadora
-                
-                db.commit()
-                
-                empresa_data = EmpresaConciliacionResponse(
+                empresas_conciliacion.append(EmpresaConciliacionResponse(
                     id=conciliacion.id,
                     compania_id=empresa.id,
-                    compania=CompaniaResponse(id=empresa.id, nombre=empresa.nombre),
+                    compania=empresa,
                     total_pagaduria=conciliacion.total_pagaduria,
                     total_tesoreria=conciliacion.total_tesoreria,
                     total_calculado=conciliacion.total_calculado,
                     total_centralizadora=conciliacion.total_centralizadora,
-                    diferencia=diferencia,
+                    diferencia=conciliacion.total_calculado - centralizadora,
                     estado=conciliacion.estado,
                     observaciones=conciliacion.observaciones
-                )
-            else:
-                # Crear nueva entrada con totales calculados
-                nueva_conciliacion = ConciliacionContable(
-                    fecha=fecha,
-                    empresa_id=empresa.id,
-                    total_pagaduria=totales["pagaduria"],
-                    total_tesoreria=totales["tesoreria"],
-                    total_centralizadora=Decimal('0.00'),  # Inicializar en 0.00 en lugar de None
-                    estado="Pendiente"
-                )
-                
-                db.add(nueva_conciliacion)
-                db.commit()
-                db.refresh(nueva_conciliacion)
-                
-                total_calculado = totales["pagaduria"] + totales["tesoreria"]
-                diferencia_calculada = total_calculado - (nueva_conciliacion.total_centralizadora or Decimal('0.00'))
-                
-                empresa_data = EmpresaConciliacionResponse(
-                    id=nueva_conciliacion.id,
-                    compania_id=empresa.id,
-                    compania=CompaniaResponse(id=empresa.id, nombre=empresa.nombre),
-                    total_pagaduria=totales["pagaduria"],
-                    total_tesoreria=totales["tesoreria"],
-                    total_calculado=total_calculado,
-                    total_centralizadora=nueva_conciliacion.total_centralizadora,
-                    diferencia=diferencia_calculada,
-                    estado="pendiente",
-                    observaciones=None
-                )
-            
-            empresas_conciliacion.append(empresa_data)
+                ))
+            respuestas.append(ConciliacionFechaResponse(fecha=fecha, empresas=empresas_conciliacion))
         
-        return ConciliacionFechaResponse(
-            fecha=fecha,
-            empresas=empresas_conciliacion
-        )
+        return respuestas
+    
+    @staticmethod
+    def obtener_conciliacion_por_fecha(db: Session, fecha: date) -> ConciliacionFechaResponse:
+        """
+        Obtiene todas las empresas con sus datos de conciliación para una fecha específica
+        """
+        return ConciliacionContableService.conciliar_rango(db, fecha, fecha, solo_dias_habiles=False)[0]
     
     @staticmethod
     def actualizar_total_centralizadora(
@@ -228,7 +286,9 @@ class ConciliacionContableService:
         if not conciliacion:
             raise ValueError("No existe conciliación para evaluar")
         
-        # Permitir cambio desde cualquier estado
+        # Permitir cambio desde cualquier estado; salir de Cerrado reabre el día
+        if conciliacion.estado == "Cerrado":
+            CierreDiaService(db).reabrir_dia(fecha, empresa_id)
         conciliacion.estado = "Evaluado"
         db.commit()
         db.refresh(conciliacion)
@@ -254,7 +314,9 @@ class ConciliacionContableService:
         if not conciliacion:
             raise ValueError("No existe conciliación para confirmar")
         
-        # Permitir cambio desde cualquier estado
+        # Permitir cambio desde cualquier estado; salir de Cerrado reabre el día
+        if conciliacion.estado == "Cerrado":
+            CierreDiaService(db).reabrir_dia(fecha, empresa_id)
         conciliacion.estado = "Confirmado"
         db.commit()
         db.refresh(conciliacion)
@@ -265,10 +327,12 @@ class ConciliacionContableService:
     def cerrar_conciliacion(
         db: Session, 
         empresa_id: int, 
-        fecha: date
+        fecha: date,
+        usuario_id: Optional[int] = None
     ) -> ConciliacionContable:
         """
-        Cierra una conciliación (cambia estado a Cerrado)
+        Cierra una conciliación (cambia estado a Cerrado) y congela el día de la empresa
+        en el mismo commit: desde aquí las transacciones se sirven desde el snapshot
         """
         conciliacion = db.query(ConciliacionContable).filter(
             and_(
@@ -282,6 +346,35 @@ class ConciliacionContableService:
         
         # Permitir cambio desde cualquier estado
         conciliacion.estado = "Cerrado"
+        CierreDiaService(db).cerrar_dia(fecha, empresa_id, usuario_id)
+        db.commit()
+        db.refresh(conciliacion)
+        
+        return conciliacion
+    
+    @staticmethod
+    def reabrir_conciliacion(
+        db: Session, 
+        empresa_id: int, 
+        fecha: date
+    ) -> ConciliacionContable:
+        """
+        Reabre una conciliación cerrada (vuelve a Confirmado) e invalida el snapshot del día
+        """
+        conciliacion = db.query(ConciliacionContable).filter(
+            and_(
+                ConciliacionContable.empresa_id == empresa_id,
+                ConciliacionContable.fecha == fecha
+            )
+        ).first()
+        
+        if not conciliacion:
+            raise ValueError("No existe conciliación para reabrir")
+        if conciliacion.estado != "Cerrado":
+            raise ValueError("La conciliación no está cerrada")
+        
+        CierreDiaService(db).reabrir_dia(fecha, empresa_id)
+        conciliacion.estado = "Confirmado"
         db.commit()
         db.refresh(conciliacion)
         
@@ -296,10 +389,39 @@ class ConciliacionContableService:
             ConciliacionContable.fecha == fecha
         ).all()
         
+        # Las que salen de Cerrado reabren su día en una sola sentencia
+        CierreDiaService(db).reabrir_particiones(
+            (c.fecha, c.empresa_id) for c in conciliaciones
+            if c.total_centralizadora is not None and c.estado == "Cerrado"
+        )
         for conciliacion in conciliaciones:
             if conciliacion.total_centralizadora is not None:
                 conciliacion.estado = "Evaluado"
         
         db.commit()
         
-        return conciliaciones
\ No newline at end of file
+        return conciliaciones
+    
+    @staticmethod
+    def confirmar_todas_conciliaciones(db: Session, fecha_inicio: date, fecha_fin: Optional[date] = None) -> int:
+        """
+        Confirma en bloque las conciliaciones del rango que tienen total centralizadora.
+        Las que estaban cerradas reabren su día. Retorna cuántas se confirmaron.
+        """
+        fecha_fin = fecha_fin or fecha_inicio
+        filtro = [
+            ConciliacionContable.fecha >= fecha_inicio,
+            ConciliacionContable.fecha <= fecha_fin,
+            ConciliacionContable.total_centralizadora.isnot(None)
+        ]
+        cerradas = db.query(ConciliacionContable.fecha, ConciliacionContable.empresa_id).filter(
+            *filtro, ConciliacionContable.estado == "Cerrado"
+        ).all()
+        CierreDiaService(db).reabrir_particiones(cerradas)
+        
+        confirmadas = db.query(ConciliacionContable).filter(*filtro).update(
+            {ConciliacionContable.estado: "Confirmado"}, synchronize_session=False
+        )
+        db.commit()
+        
+        return confirmadas
@@ -3,31 +3,107 @@ Servicio avanzado para el manejo de dependencias entre conceptos de flujo de caj
 Soporta múltiples conceptos, cálculos complejos y notificaciones en tiempo real.
 """
 
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional, Tuple
 from decimal import Decimal
 from datetime import date, timedelta, datetime
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy import and_, or_
 import logging
 
 from app.models.conceptos_flujo_caja import ConceptoFlujoCaja, TipoDependencia, AreaConcepto
 from app.models.transacciones_flujo_caja import TransaccionFlujoCaja, AreaTransaccion
+from app.models.transaccion_historial import ultimo_cambio
 from app.models.gmf_config import GMFConfig
 from app.models.cuatro_por_mil_config import CuatroPorMilConfig
 from app.models.cuentas_bancarias import CuentaBancaria
 from app.schemas.flujo_caja import AreaTransaccionSchema
 from app.services.dias_habiles_service import DiasHabilesService
+from app.core.bloqueos_recalculo import bloqueos_recalculo
+from app.core.perfilado import adoptar, fase, perfil_actual
+from app.core.metricas import recalculo_celdas, recalculo_duracion
+from app.services.cierre_dia_service import CierreDiaService, compania_de
+from app.core.config import get_settings
 
 logger = logging.getLogger(__name__)
 
+def paralelismo_recalculo() -> int:
+    """
+    Hilos para recalcular cuentas en paralelo: RECALCULO_PARALELISMO o el número de CPUs,
+    como máximo un tercio del pool (pool_size + max_overflow). Cada hilo ocupa dos
+    conexiones (su sesión y la de GET_LOCK) y el resto queda para las demás requests.
+    """
+    settings = get_settings()
+    if settings.database_url.startswith("sqlite"):
+        return settings.recalculo_paralelismo or 1
+    limite = max(1, (settings.db_pool_size + settings.db_max_overflow) // 3)
+    if settings.recalculo_paralelismo > 0:
+        if settings.recalculo_paralelismo > limite:
+            logger.warning(f"⚠️ RECALCULO_PARALELISMO={settings.recalculo_paralelismo} excede el pool; se usan {limite} hilos")
+        return min(settings.recalculo_paralelismo, limite)
+    return max(1, min(os.cpu_count() or 1, limite))
+
+def _mismo_monto(actual, nuevo) -> bool:
+    """Compara montos a la precisión de la columna (DECIMAL 18,2)"""
+    centavo = Decimal("0.01")
+    return Decimal(str(actual or 0)).quantize(centavo) == Decimal(str(nuevo or 0)).quantize(centavo)
+
 class DependenciasFlujoCajaService:
     """
     Servicio especializado para manejar dependencias complejas entre conceptos.
     """
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, paralelismo: Optional[int] = None):
         self.db = db
         self.dias_habiles_service = DiasHabilesService(db)
+        # Con cuenta_id=None, las reglas por cuenta se reparten en este número de hilos
+        self.paralelismo = paralelismo if paralelismo is not None else paralelismo_recalculo()
+        # Celdas calculadas evaluadas / escritas / omitidas por no cambiar (acumulado de la instancia)
+        self.metricas = {"evaluadas": 0, "cambiadas": 0, "omitidas": 0}
+    
+    def _aplicar_monto(
+        self,
+        transaccion: TransaccionFlujoCaja,
+        nuevo_monto: Decimal,
+        descripcion: Optional[str],
+        accion: str,
+        usuario_id: Optional[int] = None
+    ) -> bool:
+        """
+        Escribe monto, descripción y auditoría solo si el monto calculado difiere del
+        almacenado. Devuelve True si hubo escritura; las celdas iguales no se tocan
+        (no ensucian la sesión, no cambian `updated_at` ni disparan cascadas).
+        """
+        self.metricas["evaluadas"] += 1
+        if _mismo_monto(transaccion.monto, nuevo_monto):
+            self.metricas["omitidas"] += 1
+            return False
+        transaccion.monto = nuevo_monto
+        if descripcion is not None:
+            transaccion.descripcion = descripcion
+        transaccion.auditoria = ultimo_cambio(accion, usuario_id or 1)
+        self.metricas["cambiadas"] += 1
+        return True
+    
+    def _registrar_creacion(self):
+        """Una celda calculada que no existía cuenta como evaluada y cambiada"""
+        self.metricas["evaluadas"] += 1
+        self.metricas["cambiadas"] += 1
+    
+    def _sumar_metricas(self, otras: Dict[str, int]):
+        """Acumula los conteos de otra instancia (hilos del recálculo paralelo)"""
+        for clave, valor in otras.items():
+            self.metricas[clave] += valor
+    
+    def _exportar_corrida(self, previas: Dict[str, int], alcance: str, inicio: float) -> Dict[str, int]:
+        """Conteos de la corrida (diferencia con `previas`) y su duración hacia /metrics"""
+        corrida = {clave: valor - previas[clave] for clave, valor in self.metricas.items()}
+        for resultado, valor in corrida.items():
+            recalculo_celdas.labels(resultado=resultado).inc(valor)
+        recalculo_duracion.labels(alcance=alcance).observe(time.perf_counter() - inicio)
+        return corrida
     
     def _convertir_area_a_enum(self, area: AreaTransaccionSchema) -> AreaTransaccion:
         """Convierte área de transacción schema a enum de base de datos"""
@@ -89,27 +165,9 @@ class DependenciasFlujoCajaService:
 
             if trans_existente:
                 monto_anterior = trans_existente.monto
-                if monto_anterior != saldo_neto_inicial:
-                    trans_existente.monto = saldo_neto_inicial
-                    trans_existente.descripcion = "Auto-calculado directo: SALDO INICIAL + CONSUMO + VENTANILLA"
-                    auditoria_actual = trans_existente.auditoria or {}
-                    auditoria_actual.update({
-                        "accion": "actualizacion_automatica_directa",
-                        "usuario_id": usuario_id or 1,
-                        "timestamp": datetime.now().isoformat(),
-                        "cambio": {
-                            "monto_anterior": float(monto_anterior),
-                            "monto_nuevo": float(saldo_neto_inicial),
-                            "componentes": {
-                                "saldo_inicial_id1": float(monto_saldo_inicial),
-                                "consumo_id2": float(monto_consumo),
-                                "ventanilla_id3": float(monto_ventanilla)
-                            },
-                            "formula": "ID1 + ID2 + ID3"
-                        },
-                        "tipo": "saldo_neto_inicial_pagaduria_directo"
-                    })
-                    trans_existente.auditoria = auditoria_actual
+                if self._aplicar_monto(trans_existente, saldo_neto_inicial,
+                                       "Auto-calculado directo: SALDO INICIAL + CONSUMO + VENTANILLA",
+                                       "actualizacion_automatica_directa", usuario_id):
                     logger.info(f"✅ (Directo) SALDO NETO INICIAL PAGADURÍA actualizado cuenta {cuenta_id}: {monto_anterior} → {saldo_neto_inicial}")
             else:
                 nueva = TransaccionFlujoCaja(
@@ -121,21 +179,10 @@ class DependenciasFlujoCajaService:
                     usuario_id=usuario_id or 1,
                     area=AreaTransaccion.tesoreria,
                     compania_id=compania_id or 1,
-                    auditoria={
-                        "accion": "creacion_automatica_directa",
-                        "usuario_id": usuario_id or 1,
-                        "timestamp": datetime.now().isoformat(),
-                        "componentes": {
-                            "saldo_inicial_id1": float(monto_saldo_inicial),
-                            "consumo_id2": float(monto_consumo),
-                            "ventanilla_id3": float(monto_ventanilla)
-                        },
-                        "formula": "ID1 + ID2 + ID3",
-                        "monto_calculado": float(saldo_neto_inicial),
-                        "tipo": "saldo_neto_inicial_pagaduria_directo"
-                    }
+                    auditoria=ultimo_cambio("creacion_automatica_directa", usuario_id or 1)
                 )
                 self.db.add(nueva)
+                self._registrar_creacion()
                 logger.info(f"✅ (Directo) SALDO NETO INICIAL PAGADURÍA creado cuenta {cuenta_id}: {saldo_neto_inicial}")
 
             self.db.flush()
@@ -257,23 +304,8 @@ class DependenciasFlujoCajaService:
 
             if trans_gmf:
                 monto_anterior = trans_gmf.monto
-                if monto_anterior != gmf_calculado:
-                    trans_gmf.monto = gmf_calculado
-                    trans_gmf.descripcion = "Auto-calculado GMF"
-                    auditoria_actual = trans_gmf.auditoria or {}
-                    auditoria_actual.update({
-                        "accion": "actualizacion_automatica_gmf",
-                        "usuario_id": usuario_id or 1,
-                        "timestamp": datetime.now().isoformat(),
-                        "cambio": {
-                            "monto_anterior": float(monto_anterior),
-                            "monto_nuevo": float(gmf_calculado),
-                            "componentes": componentes_montos,
-                            "formula": "SUM(componentes_con_signo)*4/1000"
-                        },
-                        "tipo": "gmf_automatico"
-                    })
-                    trans_gmf.auditoria = auditoria_actual
+                if self._aplicar_monto(trans_gmf, gmf_calculado, "Auto-calculado GMF",
+                                       "actualizacion_automatica_gmf", usuario_id):
                     logger.info(f"✅ GMF actualizado cuenta {cuenta_id}: {monto_anterior} → {gmf_calculado}")
             else:
                 nueva_gmf = TransaccionFlujoCaja(
@@ -285,17 +317,10 @@ class DependenciasFlujoCajaService:
                     usuario_id=usuario_id or 1,
                     area=AreaTransaccion.tesoreria,
                     compania_id=compania_id or 1,
-                    auditoria={
-                        "accion": "creacion_automatica_gmf",
-                        "usuario_id": usuario_id or 1,
-                        "timestamp": datetime.now().isoformat(),
-                        "componentes": componentes_montos,
-                        "formula": "SUM(componentes_con_signo)*4/1000",
-                        "monto_calculado": float(gmf_calculado),
-                        "tipo": "gmf_automatico"
-                    }
+                    auditoria=ultimo_cambio("creacion_automatica_gmf", usuario_id or 1)
                 )
                 self.db.add(nueva_gmf)
+                self._registrar_creacion()
                 logger.info(f"✅ GMF creado cuenta {cuenta_id}: {gmf_calculado}")
 
             self.db.flush()
@@ -390,23 +415,8 @@ class DependenciasFlujoCajaService:
 
             if trans_cpm:
                 monto_anterior = trans_cpm.monto
-                if monto_anterior != cuatro_por_mil_final:
-                    trans_cpm.monto = cuatro_por_mil_final
-                    trans_cpm.descripcion = "Auto-calculado 4x1000"
-                    auditoria_actual = trans_cpm.auditoria or {}
-                    auditoria_actual.update({
-                        "accion": "actualizacion_automatica_4x1000",
-                        "usuario_id": usuario_id or 1,
-                        "timestamp": datetime.now().isoformat(),
-                        "cambio": {
-                            "monto_anterior": float(monto_anterior),
-                            "monto_nuevo": float(cuatro_por_mil_final),
-                            "componentes": componentes_montos,
-                            "formula": "SUM(abs(componentes))*4/1000"
-                        },
-                        "tipo": "cuatro_por_mil_automatico"
-                    })
-                    trans_cpm.auditoria = auditoria_actual
+                if self._aplicar_monto(trans_cpm, cuatro_por_mil_final, "Auto-calculado 4x1000",
+                                       "actualizacion_automatica_4x1000", usuario_id):
                     logger.info(f"✅ [4x1000] Actualizado cuenta {cuenta_id}: {monto_anterior} → {cuatro_por_mil_final}")
             else:
                 nueva_cpm = TransaccionFlujoCaja(
@@ -418,17 +428,10 @@ class DependenciasFlujoCajaService:
                     usuario_id=usuario_id or 1,
                     area=AreaTransaccion.pagaduria,
                     compania_id=compania_id or 1,
-                    auditoria={
-                        "accion": "creacion_automatica_4x1000",
-                        "usuario_id": usuario_id or 1,
-                        "timestamp": datetime.now().isoformat(),
-                        "componentes": componentes_montos,
-                        "formula": "SUM(abs(componentes))*4/1000",
-                        "monto_calculado": float(cuatro_por_mil_final),
-                        "tipo": "cuatro_por_mil_automatico"
-                    }
+                    auditoria=ultimo_cambio("creacion_automatica_4x1000", usuario_id or 1)
                 )
                 self.db.add(nueva_cpm)
+                self._registrar_creacion()
                 logger.info(f"✅ [4x1000] Creado cuenta {cuenta_id}: {cuatro_por_mil_final}")
 
             self.db.flush()
@@ -456,7 +459,55 @@ class DependenciasFlujoCajaService:
         """
         Procesa TODAS las dependencias en AMBOS dashboards (tesorería y pagaduría)
         cuando cualquier valor cambia. Esto asegura consistencia total.
+        
+        El recálculo de una misma (fecha, cuenta) es exclusivo: se toma el bloqueo del
+        día y se confirma antes de soltarlo, para que el siguiente lea valores frescos.
+        Cada cuenta se recalcula en la partición de su propia compañía y las que tienen
+        el día cerrado se omiten; `compania_id` solo aplica a las filas sin cuenta.
+        Solo se escriben las celdas cuyo monto cambió; los conteos quedan en `self.metricas`.
         """
+        if cuenta_id is not None:
+            cierre = CierreDiaService(self.db)
+            compania_id = cierre.compania_de_cuenta(cuenta_id, compania_id)
+            if cierre.dia_cerrado(fecha, compania_id):
+                logger.info(f"🔒 {fecha} está cerrado para compañía {compania_id}: se omite el recálculo de la cuenta {cuenta_id}")
+                return {"tesoreria": [], "pagaduria": [], "cross_dashboard": [], "propagacion_dia_siguiente": []}
+        
+        previas = dict(self.metricas)
+        inicio = time.perf_counter()
+        with bloqueos_recalculo.bloquear(fecha, cuenta_id, self.db.get_bind()):
+            resultados = self._procesar_dependencias_completas(
+                fecha=fecha,
+                concepto_modificado_id=concepto_modificado_id,
+                cuenta_id=cuenta_id,
+                compania_id=compania_id,
+                usuario_id=usuario_id
+            )
+            self.db.commit()
+        corrida = self._exportar_corrida(previas, "cuenta" if cuenta_id is not None else "dia", inicio)
+        logger.info(
+            f"📏 Recálculo {fecha} cuenta {cuenta_id or 'todas'}: {corrida['evaluadas']} celdas evaluadas, "
+            f"{corrida['cambiadas']} cambiadas, {corrida['omitidas']} sin cambios"
+        )
+        return resultados
+    
+    def _procesar_dependencias_completas(
+        self,
+        fecha: date,
+        concepto_modificado_id: Optional[int] = None,
+        cuenta_id: Optional[int] = None,
+        compania_id: Optional[int] = None,
+        usuario_id: Optional[int] = None
+    ) -> Dict[str, List[Dict]]:
+        """Cuerpo del recálculo completo; se ejecuta con el bloqueo de (fecha, cuenta) tomado"""
+        if cuenta_id is None:
+            return self._procesar_dia_por_cuentas(
+                fecha=fecha,
+                concepto_modificado_id=concepto_modificado_id,
+                compania_id=compania_id,
+                usuario_id=usuario_id
+            )
+        
         try:
             logger.info(f"🔄 Iniciando recálculo completo para ambos dashboards - Fecha: {fecha}")
             
@@ -469,14 +520,15 @@ class DependenciasFlujoCajaService:
             # 1. PROCESAR TESORERÍA PRIMERO (porque pagaduría depende de tesorería)
             logger.info("📊 Procesando dependencias de TESORERÍA...")
             try:
-                resultados_tesoreria = self.procesar_dependencias_avanzadas(
-                    fecha=fecha,
-                    area=AreaTransaccionSchema.tesoreria,
-                    concepto_modificado_id=concepto_modificado_id,
-                    cuenta_id=cuenta_id,
-                    compania_id=compania_id,
-                    usuario_id=usuario_id
-                )
+                with fase("tesoreria"):
+                    resultados_tesoreria = self.procesar_dependencias_avanzadas(
+                        fecha=fecha,
+                        area=AreaTransaccionSchema.tesoreria,
+                        concepto_modificado_id=concepto_modificado_id,
+                        cuenta_id=cuenta_id,
+                        compania_id=compania_id,
+                        usuario_id=usuario_id
+                    )
                 resultados["tesoreria"] = resultados_tesoreria
                 logger.info(f"✅ Tesorería procesada: {len(resultados_tesoreria)} actualizaciones")
             except Exception as e:
@@ -485,12 +537,13 @@ class DependenciasFlujoCajaService:
             # 2. PROCESAR PAGADURÍA (incluyendo cross-dependencies con tesorería)
             logger.info("📊 Procesando dependencias de PAGADURÍA...")
             try:
-                resultados_pagaduria = self._procesar_dependencias_pagaduria(
-                    fecha=fecha,
-                    cuenta_id=cuenta_id,
-                    compania_id=compania_id,
-                    usuario_id=usuario_id
-                )
+                with fase("pagaduria"):
+                    resultados_pagaduria = self._procesar_dependencias_pagaduria(
+                        fecha=fecha,
+                        cuenta_id=cuenta_id,
+                        compania_id=compania_id,
+                        usuario_id=usuario_id
+                    )
                 resultados["pagaduria"] = resultados_pagaduria
                 logger.info(f"✅ Pagaduría procesada: {len(resultados_pagaduria)} actualizaciones")
             except Exception as e:
@@ -498,23 +551,25 @@ class DependenciasFlujoCajaService:
             
             # 3. VERIFICAR CROSS-DEPENDENCIES ESPECÍFICAS
             logger.info("🔗 Verificando dependencias cruzadas...")
-            cross_updates = self._procesar_dependencias_cruzadas(
-                fecha=fecha,
-                cuenta_id=cuenta_id,
-                compania_id=compania_id,
-                usuario_id=usuario_id
-            )
-            resultados["cross_dashboard"] = cross_updates
-            
-            # 4. 🚀 PROPAGACIÓN AL DÍA SIGUIENTE: Si cambió SALDO FINAL CUENTAS, propagar al siguiente día
-            logger.info("🔗 Propagando cambios al día siguiente...")
-            try:
-                propagacion_updates = self._propagar_saldo_final_a_dia_siguiente(
+            with fase("cruzadas"):
+                cross_updates = self._procesar_dependencias_cruzadas(
                     fecha=fecha,
                     cuenta_id=cuenta_id,
                     compania_id=compania_id,
                     usuario_id=usuario_id
                 )
+            resultados["cross_dashboard"] = cross_updates
+            
+            # 4. 🚀 PROPAGACIÓN AL DÍA SIGUIENTE: Si cambió SALDO FINAL CUENTAS, propagar al siguiente día
+            logger.info("🔗 Propagando cambios al día siguiente...")
+            try:
+                with fase("propagacion"):
+                    propagacion_updates = self._propagar_saldo_final_a_dia_siguiente(
+                        fecha=fecha,
+                        cuenta_id=cuenta_id,
+                        compania_id=compania_id,
+                        usuario_id=usuario_id
+                    )
                 resultados["propagacion_dia_siguiente"] = propagacion_updates
                 logger.info(f"✅ Propagación procesada: {len(propagacion_updates)} actualizaciones al día siguiente")
             except Exception as e:
@@ -530,6 +585,197 @@ class DependenciasFlujoCajaService:
             logger.error(f"💥 Error en recálculo completo: {e}")
             return {"tesoreria": [], "pagaduria": [], "cross_dashboard": [], "propagacion_dia_siguiente": []}
     
+    def procesar_rango_fechas(
+        self,
+        fecha_inicio: date,
+        fecha_fin: date,
+        compania_id: Optional[int] = None,
+        usuario_id: Optional[int] = None
+    ) -> Dict[date, Dict[str, List[Dict]]]:
+        """
+        Recálculo completo (todas las cuentas) de cada día del rango, en orden cronológico.
+        
+        En modo paralelo cada hilo toma un grupo de cuentas y recorre el rango completo
+        para ellas; así la propagación N → N+1 de una cuenta sigue en orden mientras las
+        demás cuentas avanzan a la vez. Las (fecha, cuenta) cuya compañía tiene el día
+        cerrado no se recalculan, y los días cerrados para todas se omiten del resultado.
+        """
+        cierre = CierreDiaService(self.db)
+        cerradas = cierre.particiones_cerradas(fecha_inicio, fecha_fin)
+        companias = set(cierre.companias_de_cuentas().values()) | {compania_de(compania_id)}
+        fechas = []
+        fecha_actual = fecha_inicio
+        while fecha_actual <= fecha_fin:
+            if any((fecha_actual, compania) not in cerradas for compania in companias):
+                fechas.append(fecha_actual)
+            fecha_actual += timedelta(days=1)
+        if cerradas:
+            logger.info(f"🔒 Rango {fecha_inicio} → {fecha_fin}: {len(cerradas)} días cerrados por compañía omitidos")
+        
+        if self.paralelismo <= 1:
+            return {
+                fecha: self.procesar_dependencias_completas_ambos_dashboards(
+                    fecha=fecha, compania_id=compania_id, usuario_id=usuario_id
+                )
+                for fecha in fechas
+            }
+        
+        previas = dict(self.metricas)
+        inicio = time.perf_counter()
+        resultados = {}
+        for fecha in fechas:
+            with bloqueos_recalculo.bloquear(fecha, None, self.db.get_bind()):
+                resultados[fecha] = {"tesoreria": self._procesar_tesoreria_sin_cuenta(fecha, None, compania_id, usuario_id)}
+                self.db.commit()
+        
+        por_cuentas = self._procesar_cuentas(fechas, usuario_id)
+        for fecha in fechas:
+            resultados[fecha].update(por_cuentas[fecha])
+        self._exportar_corrida(previas, "rango", inicio)
+        return resultados
+    
+    def _procesar_dia_por_cuentas(
+        self,
+        fecha: date,
+        concepto_modificado_id: Optional[int] = None,
+        compania_id: Optional[int] = None,
+        usuario_id: Optional[int] = None
+    ) -> Dict[str, List[Dict]]:
+        """Recálculo de un día completo: filas sin cuenta y luego las reglas de cada cuenta"""
+        resultados = {
+            "tesoreria": self._procesar_tesoreria_sin_cuenta(fecha, concepto_modificado_id, compania_id, usuario_id)
+        }
+        self.db.commit()
+        resultados.update(self._procesar_cuentas([fecha], usuario_id)[fecha])
+        
+        total = sum(len(v) for v in resultados.values())
+        logger.info(f"🎉 Recálculo de {fecha} finalizado: {total} actualizaciones ({self.paralelismo} hilos)")
+        return resultados
+    
+    def _procesar_tesoreria_sin_cuenta(
+        self,
+        fecha: date,
+        concepto_modificado_id: Optional[int],
+        compania_id: Optional[int],
+        usuario_id: Optional[int]
+    ) -> List[Dict]:
+        """Dependencias de tesorería de las filas sin cuenta (no se reparten por cuenta)"""
+        if CierreDiaService(self.db).dia_cerrado(fecha, compania_id):
+            logger.info(f"🔒 {fecha} está cerrado para compañía {compania_de(compania_id)}: se omiten las filas sin cuenta")
+            return []
+        try:
+            with fase("tesoreria"):
+                return self.procesar_dependencias_avanzadas(
+                    fecha=fecha,
+                    area=AreaTransaccionSchema.tesoreria,
+                    concepto_modificado_id=concepto_modificado_id,
+                    cuenta_id=None,
+                    compania_id=compania_id,
+                    usuario_id=usuario_id
+                )
+        except Exception as e:
+            logger.error(f"❌ Error procesando tesorería: {e}")
+            return []
+    
+    def _procesar_reglas_de_cuenta(
+        self,
+        fecha: date,
+        cuenta_id: int,
+        compania_id: Optional[int],
+        usuario_id: Optional[int]
+    ) -> Dict[str, List[Dict]]:
+        """Reglas de una sola cuenta en el mismo orden que el recálculo secuencial"""
+        resultados = {"pagaduria": [], "cross_dashboard": [], "propagacion_dia_siguiente": []}
+        try:
+            with fase("pagaduria"):
+                resultados["pagaduria"] = self._procesar_dependencias_pagaduria(
+                    fecha=fecha, cuenta_id=cuenta_id, compania_id=compania_id, usuario_id=usuario_id
+                )
+        except Exception as e:
+            logger.error(f"❌ Error procesando pagaduría cuenta {cuenta_id}: {e}")
+        with fase("cruzadas"):
+            resultados["cross_dashboard"] = self._procesar_dependencias_cruzadas(
+                fecha=fecha, cuenta_id=cuenta_id, compania_id=compania_id, usuario_id=usuario_id
+            )
+        with fase("propagacion"):
+            resultados["propagacion_dia_siguiente"] = self._propagar_saldo_final_a_dia_siguiente(
+                fecha=fecha, cuenta_id=cuenta_id, compania_id=compania_id, usuario_id=usuario_id
+            )
+        return resultados
+    
+    def _procesar_cuentas(
+        self,
+        fechas: List[date],
+        usuario_id: Optional[int]
+    ) -> Dict[date, Dict[str, List[Dict]]]:
+        """
+        Reglas de cada cuenta para `fechas`, en orden. Cada cuenta escribe en la partición
+        de su compañía y se omiten las fechas que esa compañía tiene cerradas.
+        
+        Con paralelismo > 1 las cuentas se reparten en un pool acotado; cada hilo usa su
+        propia sesión y recorre `fechas` en orden para sus cuentas. Los resultados se
+        combinan por fecha en el orden de las cuentas, igual que el recorrido secuencial.
+        """
+        resultados = {
+            fecha: {"pagaduria": [], "cross_dashboard": [], "propagacion_dia_siguiente": []}
+            for fecha in fechas
+        }
+        if not fechas:
+            return resultados
+        cierre = CierreDiaService(self.db)
+        companias = cierre.companias_de_cuentas()
+        cerradas = cierre.particiones_cerradas(min(fechas), max(fechas))
+        cuentas_ids = sorted(companias)
+        if not cuentas_ids:
+            return resultados
+        
+        def recalcular_fechas(servicio: "DependenciasFlujoCajaService", cuenta_id: int) -> List[Tuple[date, Dict[str, List[Dict]]]]:
+            compania_cuenta = companias[cuenta_id]
+            parciales = []
+            for fecha in fechas:
+                if (fecha, compania_cuenta) in cerradas:
+                    continue
+                with bloqueos_recalculo.bloquear(fecha, cuenta_id, servicio.db.get_bind()):
+                    parcial = servicio._procesar_reglas_de_cuenta(fecha, cuenta_id, compania_cuenta, usuario_id)
+                    servicio.db.commit()
+                parciales.append((fecha, parcial))
+            return parciales
+        
+        def combinar(parciales: List[Tuple[date, Dict[str, List[Dict]]]]):
+            for fecha, parcial in parciales:
+                for clave, lista in parcial.items():
+                    resultados[fecha][clave].extend(lista)
+        
+        if self.paralelismo <= 1:
+            for cuenta_id in cuentas_ids:
+                combinar(recalcular_fechas(self, cuenta_id))
+            return resultados
+        
+        # Misma configuración que la sesión del llamador (autoflush cambia lo que ve cada regla)
+        fabrica_sesiones = sessionmaker(bind=self.db.get_bind(), autoflush=self.db.autoflush)
+        perfil = perfil_actual()  # Los hilos del pool no heredan el perfil de la request
+        
+        def recalcular_cuenta(cuenta_id: int) -> Tuple[List[Tuple[date, Dict[str, List[Dict]]]], Dict[str, int]]:
+            db = fabrica_sesiones()
+            try:
+                servicio = DependenciasFlujoCajaService(db, paralelismo=1)
+                with adoptar(perfil):
+                    parciales = recalcular_fechas(servicio, cuenta_id)
+                return parciales, servicio.metricas
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+        
+        hilos = max(1, min(self.paralelismo, len(cuentas_ids)))
+        logger.info(f"🧵 Recalculando {len(cuentas_ids)} cuentas x {len(fechas)} días con {hilos} hilos")
+        with ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="recalculo_cuentas") as pool:
+            for parciales, metricas in pool.map(recalcular_cuenta, cuentas_ids):
+                self._sumar_metricas(metricas)
+                combinar(parciales)
+        return resultados
+    
     def _procesar_dependencias_cruzadas(
         self,
         fecha: date,
@@ -577,26 +823,9 @@ class DependenciasFlujoCajaService:
                     if movimiento_tesoreria:
                         # Actualizar existente
                         monto_anterior = movimiento_tesoreria.monto
-                        if monto_anterior != monto_subtotal:
-                            movimiento_tesoreria.monto = monto_subtotal
-                            movimiento_tesoreria.descripcion = f"Cross-update: SUB-TOTAL TESORERÍA ({area_origen})"
-                            
-                            # Actualizar auditoría
-                            auditoria_actual = movimiento_tesoreria.auditoria or {}
-                            auditoria_actual.update({
-                                "accion": "cross_update_automatico",
-                                "usuario_id": usuario_id or 1,
-                                "timestamp": datetime.now().isoformat(),
-                                "origen": {
-                                    "concepto_id": 50,
-                                    "area_origen": area_origen,
-                                    "monto_anterior": float(monto_anterior),
-                                    "monto_nuevo": float(monto_subtotal)
-                                },
-                                "tipo": "cross_dashboard_update"
-                            })
-                            movimiento_tesoreria.auditoria = auditoria_actual
-                            
+                        if self._aplicar_monto(movimiento_tesoreria, monto_subtotal,
+                                               f"Cross-update: SUB-TOTAL TESORERÍA ({area_origen})",
+                                               "cross_update_automatico", usuario_id):
                             self.db.commit()
                             logger.info(f"🔄 Cross-update: MOVIMIENTO TESORERIA actualizado ${monto_anterior} → ${monto_subtotal}")
                             
@@ -645,13 +874,15 @@ class DependenciasFlujoCajaService:
             SALDO_FINAL_CUENTAS_ID = 51
             SALDO_INICIAL_ID = 1
             
-            # Obtener todas las cuentas si no se especifica una
+            # Obtener todas las cuentas si no se especifica una, con la compañía de cada una
+            cierre = CierreDiaService(self.db)
             if cuenta_id:
-                cuentas_ids = [cuenta_id]
+                companias = {cuenta_id: cierre.compania_de_cuenta(cuenta_id, compania_id)}
             else:
-                cuentas_ids = [c.id for c in self.db.query(CuentaBancaria).filter(CuentaBancaria.activo == 1).all()]
+                # CuentaBancaria no tiene columna `activo`: se propagan todas las cuentas
+                companias = cierre.companias_de_cuentas()
             
-            for cuenta in cuentas_ids:
+            for cuenta, compania_cuenta in companias.items():
                 # Buscar SALDO FINAL CUENTAS del día actual
                 saldo_final_hoy = self.db.query(TransaccionFlujoCaja).filter(
                     TransaccionFlujoCaja.fecha == fecha,
@@ -671,114 +902,104 @@ class DependenciasFlujoCajaService:
                 except:
                     fecha_siguiente = fecha + timedelta(days=1)
                 
-                # Verificar si existen transacciones para el día siguiente
-                transacciones_dia_siguiente = self.db.query(TransaccionFlujoCaja).filter(
-                    TransaccionFlujoCaja.fecha == fecha_siguiente,
-                    TransaccionFlujoCaja.cuenta_id == cuenta
-                ).count()
-                
-                if transacciones_dia_siguiente == 0:
-                    logger.info(f"ℹ️ No hay transacciones para {fecha_siguiente} cuenta {cuenta}, omitiendo propagación")
+                # Un día siguiente cerrado conserva su saldo inicial congelado
+                if cierre.dia_cerrado(fecha_siguiente, compania_cuenta):
+                    logger.info(f"🔒 {fecha_siguiente} está cerrado: no se propaga el saldo de la cuenta {cuenta}")
                     continue
                 
-                # Buscar/actualizar SALDO INICIAL del día siguiente
-                saldo_inicial_siguiente = self.db.query(TransaccionFlujoCaja).filter(
-                    TransaccionFlujoCaja.fecha == fecha_siguiente,
-                    TransaccionFlujoCaja.concepto_id == SALDO_INICIAL_ID,
-                    TransaccionFlujoCaja.cuenta_id == cuenta,
-                    TransaccionFlujoCaja.area == AreaTransaccion.tesoreria
-                ).first()
+                # Escribir el día siguiente con su propio bloqueo (siempre en orden ascendente de fecha)
+                with bloqueos_recalculo.bloquear(fecha_siguiente, cuenta, self.db.get_bind()):
+                    # Verificar si existen transacciones para el día siguiente
+                    transacciones_dia_siguiente = self.db.query(TransaccionFlujoCaja).filter(
+                        TransaccionFlujoCaja.fecha == fecha_siguiente,
+                        TransaccionFlujoCaja.cuenta_id == cuenta
+                    ).count()
                 
-                saldo_inicial_actualizado = False
-                monto_anterior = Decimal('0')
+                    if transacciones_dia_siguiente == 0:
+                        logger.info(f"ℹ️ No hay transacciones para {fecha_siguiente} cuenta {cuenta}, omitiendo propagación")
+                        continue
                 
-                if saldo_inicial_siguiente:
-                    monto_anterior = saldo_inicial_siguiente.monto
-                    if monto_anterior != monto_saldo_final:
-                        saldo_inicial_siguiente.monto = monto_saldo_final
-                        saldo_inicial_siguiente.descripcion = f"Propagado: SALDO FINAL CUENTAS del {fecha}"
-                        auditoria = saldo_inicial_siguiente.auditoria or {}
-                        auditoria.update({
-                            "accion": "propagacion_cascada",
-                            "usuario_id": usuario_id or 1,
-                            "timestamp": datetime.now().isoformat(),
-                            "origen": {
-                                "fecha_origen": fecha.isoformat(),
-                                "concepto_origen_id": SALDO_FINAL_CUENTAS_ID,
-                                "monto_origen": float(monto_saldo_final)
-                            },
-                            "cambio": {
-                                "monto_anterior": float(monto_anterior),
-                                "monto_nuevo": float(monto_saldo_final)
-                            }
-                        })
-                        saldo_inicial_siguiente.auditoria = auditoria
-                        saldo_inicial_actualizado = True
-                        
-                        logger.info(f"🔄 PROPAGACIÓN: SALDO INICIAL {fecha_siguiente} cuenta {cuenta}: ${monto_anterior} → ${monto_saldo_final}")
-                else:
-                    # Crear SALDO INICIAL para el día siguiente
-                    nuevo_saldo = TransaccionFlujoCaja(
-                        fecha=fecha_siguiente,
-                        concepto_id=SALDO_INICIAL_ID,
-                        cuenta_id=cuenta,
-                        monto=monto_saldo_final,
-                        descripcion=f"Propagado: SALDO FINAL CUENTAS del {fecha}",
-                        usuario_id=usuario_id or 1,
-                        area=AreaTransaccion.tesoreria,
-                        compania_id=compania_id or 1,
-                        auditoria={
-                            "accion": "creacion_propagacion_cascada",
-                            "usuario_id": usuario_id or 1,
-                            "timestamp": datetime.now().isoformat(),
-                            "origen": {
-                                "fecha_origen": fecha.isoformat(),
-                                "concepto_origen_id": SALDO_FINAL_CUENTAS_ID,
-                                "monto_origen": float(monto_saldo_final)
-                            }
-                        }
-                    )
-                    self.db.add(nuevo_saldo)
-                    saldo_inicial_actualizado = True
-                    logger.info(f"🚀 PROPAGACIÓN: SALDO INICIAL creado para {fecha_siguiente} cuenta {cuenta}: ${monto_saldo_final}")
+                    # Buscar/actualizar SALDO INICIAL del día siguiente
+                    saldo_inicial_siguiente = self.db.query(TransaccionFlujoCaja).filter(
+                        TransaccionFlujoCaja.fecha == fecha_siguiente,
+                        TransaccionFlujoCaja.concepto_id == SALDO_INICIAL_ID,
+                        TransaccionFlujoCaja.cuenta_id == cuenta,
+                        TransaccionFlujoCaja.area == AreaTransaccion.tesoreria
+                    ).first()
                 
-                if saldo_inicial_actualizado:
-                    self.db.flush()
-                    
-                    actualizaciones.append({
-                        "concepto_id": SALDO_INICIAL_ID,
-                        "concepto_nombre": "SALDO INICIAL",
-                        "fecha_destino": fecha_siguiente.isoformat(),
-                        "cuenta_id": cuenta,
-                        "monto_anterior": float(monto_anterior),
-                        "monto_nuevo": float(monto_saldo_final),
-                        "tipo": "propagacion_cascada",
-                        "origen": f"SALDO FINAL CUENTAS del {fecha}"
-                    })
-                    
-                    # 🔥 RECÁLCULO EN CASCADA: Recalcular dependientes del día siguiente
-                    logger.info(f"🔄 Recalculando dependencias para {fecha_siguiente} cuenta {cuenta}...")
-                    try:
-                        # Recalcular SALDO NETO INICIAL PAGADURÍA
-                        self.recalcular_saldo_neto_inicial_pagaduria(
-                            fecha=fecha_siguiente,
-                            cuenta_id=cuenta,
-                            usuario_id=usuario_id,
-                            compania_id=compania_id
+                    saldo_inicial_actualizado = False
+                    monto_anterior = Decimal('0')
+                
+                    if saldo_inicial_siguiente:
+                        monto_anterior = saldo_inicial_siguiente.monto
+                        saldo_inicial_actualizado = self._aplicar_monto(
+                            saldo_inicial_siguiente, monto_saldo_final,
+                            f"Propagado: SALDO FINAL CUENTAS del {fecha}",
+                            "propagacion_cascada", usuario_id
                         )
-                        
-                        # Recalcular SUB-TOTAL TESORERÍA y otros dependientes
-                        self.procesar_dependencias_avanzadas(
+                        if saldo_inicial_actualizado:
+                            logger.info(f"🔄 PROPAGACIÓN: SALDO INICIAL {fecha_siguiente} cuenta {cuenta}: ${monto_anterior} → ${monto_saldo_final}")
+                        else:
+                            # Sin cambio en el saldo inicial, el día siguiente ya está al día: no hay cascada
+                            logger.info(f"⏭️ PROPAGACIÓN: SALDO INICIAL {fecha_siguiente} cuenta {cuenta} sin cambios, se omite la cascada")
+                    else:
+                        # Crear SALDO INICIAL para el día siguiente
+                        nuevo_saldo = TransaccionFlujoCaja(
                             fecha=fecha_siguiente,
-                            area=AreaTransaccionSchema.tesoreria,
+                            concepto_id=SALDO_INICIAL_ID,
                             cuenta_id=cuenta,
-                            compania_id=compania_id,
-                            usuario_id=usuario_id
+                            monto=monto_saldo_final,
+                            descripcion=f"Propagado: SALDO FINAL CUENTAS del {fecha}",
+                            usuario_id=usuario_id or 1,
+                            area=AreaTransaccion.tesoreria,
+                            compania_id=compania_cuenta,
+                            auditoria=ultimo_cambio("creacion_propagacion_cascada", usuario_id or 1)
                         )
+                        self.db.add(nuevo_saldo)
+                        self._registrar_creacion()
+                        saldo_inicial_actualizado = True
+                        logger.info(f"🚀 PROPAGACIÓN: SALDO INICIAL creado para {fecha_siguiente} cuenta {cuenta}: ${monto_saldo_final}")
+                
+                    if saldo_inicial_actualizado:
+                        self.db.flush()
+                    
+                        actualizaciones.append({
+                            "concepto_id": SALDO_INICIAL_ID,
+                            "concepto_nombre": "SALDO INICIAL",
+                            "fecha_destino": fecha_siguiente.isoformat(),
+                            "cuenta_id": cuenta,
+                            "monto_anterior": float(monto_anterior),
+                            "monto_nuevo": float(monto_saldo_final),
+                            "tipo": "propagacion_cascada",
+                            "origen": f"SALDO FINAL CUENTAS del {fecha}"
+                        })
+                    
+                        # 🔥 RECÁLCULO EN CASCADA: Recalcular dependientes del día siguiente
+                        logger.info(f"🔄 Recalculando dependencias para {fecha_siguiente} cuenta {cuenta}...")
+                        try:
+                            # Recalcular SALDO NETO INICIAL PAGADURÍA
+                            self.recalcular_saldo_neto_inicial_pagaduria(
+                                fecha=fecha_siguiente,
+                                cuenta_id=cuenta,
+                                usuario_id=usuario_id,
+                                compania_id=compania_cuenta
+                            )
                         
-                        logger.info(f"✅ Cascada completada para {fecha_siguiente} cuenta {cuenta}")
-                    except Exception as e:
-                        logger.error(f"❌ Error en cascada para {fecha_siguiente} cuenta {cuenta}: {e}")
+                            # Recalcular SUB-TOTAL TESORERÍA y otros dependientes
+                            self.procesar_dependencias_avanzadas(
+                                fecha=fecha_siguiente,
+                                area=AreaTransaccionSchema.tesoreria,
+                                cuenta_id=cuenta,
+                                compania_id=compania_cuenta,
+                                usuario_id=usuario_id
+                            )
+                        
+                            logger.info(f"✅ Cascada completada para {fecha_siguiente} cuenta {cuenta}")
+                        except Exception as e:
+                            logger.error(f"❌ Error en cascada para {fecha_siguiente} cuenta {cuenta}: {e}")
+                        
+                        # Confirmar antes de soltar el bloqueo del día siguiente
+                        self.db.commit()
             
             if actualizaciones:
                 self.db.commit()
@@ -924,24 +1145,10 @@ class DependenciasFlujoCajaService:
             
             if transaccion_existente:
                 monto_anterior = transaccion_existente.monto
-                transaccion_existente.monto = nuevo_monto
-                transaccion_existente.descripcion = f"Actualizado automáticamente por dependencia"
-                
-                # Actualizar auditoría para transacción existente
-                from datetime import datetime
-                auditoria_actual = transaccion_existente.auditoria or {}
-                auditoria_actual.update({
-                    "ultima_modificacion": {
-                        "accion": "actualizacion_automatica",
-                        "usuario_id": usuario_id or 1,
-                        "timestamp": datetime.now().isoformat(),
-                        "monto_anterior": float(monto_anterior),
-                        "monto_nuevo": float(nuevo_monto),
-                        "formula": concepto.formula_dependencia,
-                        "tipo": "dependencia_automatica"
-                    }
-                })
-                transaccion_existente.auditoria = auditoria_actual
+                if not self._aplicar_monto(transaccion_existente, nuevo_monto,
+                                           "Actualizado automáticamente por dependencia",
+                                           "actualizacion_automatica", usuario_id):
+                    return None
                 transaccion = transaccion_existente
             else:
                 transaccion = self._crear_o_actualizar_transaccion(
@@ -953,6 +1160,8 @@ class DependenciasFlujoCajaService:
                     area=area,
                     usuario_id=usuario_id or 1
                 )
+                if transaccion:
+                    self._registrar_creacion()
                 monto_anterior = Decimal('0.00')
             
             return {
@@ -1068,15 +1277,7 @@ class DependenciasFlujoCajaService:
                 usuario_id=usuario_id or 1,
                 area=area_enum,
                 compania_id=compania_id or 1,
-                auditoria={
-                    "accion": "creacion_automatica",
-                    "usuario_id": usuario_id or 1,
-                    "timestamp": datetime.now().isoformat(),
-                    "monto_inicial": float(nuevo_monto),
-                    "formula": concepto.formula_dependencia if concepto else None,
-                    "tipo": "dependencia_automatica",
-                    "concepto_nombre": concepto.nombre if concepto else "Desconocido"
-                }
+                auditoria=ultimo_cambio("creacion_automatica", usuario_id or 1)
             )
             
             self.db.add(transaccion)
@@ -1158,13 +1359,8 @@ class DependenciasFlujoCajaService:
                 )
                 
                 if nueva_transaccion:
-                    # Modificar la auditoría para indicar que es SALDO INICIAL automático
-                    nueva_transaccion.auditoria.update({
-                        "tipo": "saldo_inicial_automatico",
-                        "saldo_final_anterior": float(saldo_final_anterior.monto),
-                        "fecha_anterior": fecha_anterior.isoformat(),
-                        "concepto_nombre": "SALDO INICIAL"
-                    })
+                    # Marcar en la auditoría que es SALDO INICIAL automático
+                    nueva_transaccion.auditoria = ultimo_cambio("saldo_inicial_automatico", usuario_id or 1)
                     
                     actualizaciones.append({
                         "concepto_id": SALDO_INICIAL_ID,
@@ -1238,32 +1434,12 @@ class DependenciasFlujoCajaService:
                     ).first()
                     
                     if consumo_existente:
-                        # Actualizar existente
+                        # Actualizar existente solo si cambió
                         monto_anterior = consumo_existente.monto
-                        consumo_existente.monto = monto_subtotal
-                        consumo_existente.descripcion = "Auto-calculado: igual a SUBTOTAL MOVIMIENTO PAGADURIA"
-                        
-                        # Actualizar auditoría
-                        auditoria_actual = consumo_existente.auditoria or {}
-                        auditoria_actual.update({
-                            "accion": "actualizacion_automatica",
-                            "usuario_id": usuario_id or 1,
-                            "timestamp": datetime.now().isoformat(),
-                            "cambio": {
-                                "monto_anterior": float(monto_anterior),
-                                "monto_nuevo": float(monto_subtotal),
-                                "origen": {
-                                    "concepto_id": 82,
-                                    "concepto_nombre": "SUBTOTAL MOVIMIENTO PAGADURIA",
-                                    "fecha_origen": fecha.isoformat(),
-                                    "monto_origen": float(monto_subtotal)
-                                },
-                                "formula": "CONSUMO = SUBTOTAL MOVIMIENTO PAGADURIA"
-                            },
-                            "tipo": "consumo_automatico"
-                        })
-                        consumo_existente.auditoria = auditoria_actual
-                        
+                        if not self._aplicar_monto(consumo_existente, monto_subtotal,
+                                                   "Auto-calculado: igual a SUBTOTAL MOVIMIENTO PAGADURIA",
+                                                   "actualizacion_automatica", usuario_id):
+                            continue
                         logger.info(f"✅ CONSUMO actualizado: Cuenta {cuenta}, ${monto_anterior} → ${monto_subtotal}")
                     else:
                         # Crear nueva transacción
@@ -1276,23 +1452,11 @@ class DependenciasFlujoCajaService:
                             usuario_id=usuario_id or 1,
                             area=AreaTransaccion.tesoreria,  # CONSUMO está en área tesorería
                             compania_id=compania_id or 1,
-                            auditoria={
-                                "accion": "creacion_automatica",
-                                "usuario_id": usuario_id or 1,
-                                "timestamp": datetime.now().isoformat(),
-                                "origen": {
-                                    "concepto_id": 82,
-                                    "concepto_nombre": "SUBTOTAL MOVIMIENTO PAGADURIA",
-                                    "fecha_origen": fecha.isoformat(),
-                                    "monto_origen": float(monto_subtotal)
-                                },
-                                "formula": "CONSUMO = SUBTOTAL MOVIMIENTO PAGADURIA",
-                                "monto_calculado": float(monto_subtotal),
-                                "tipo": "consumo_automatico"
-                            }
+                            auditoria=ultimo_cambio("creacion_automatica", usuario_id or 1)
                         )
                         
                         self.db.add(nueva_transaccion_consumo)
+                        self._registrar_creacion()
                         logger.info(f"✅ CONSUMO creado: Cuenta {cuenta}, ${monto_subtotal}")
                     
                     actualizaciones.append({
@@ -1323,6 +1487,52 @@ class DependenciasFlujoCajaService:
             logger.error(f"Error procesando VENTANILLA automático: {str(e)}")
             return []
 
+    def _proyectar_saldo(
+        self,
+        fecha_origen: date,
+        fecha_destino: date,
+        concepto_id: int,
+        area: AreaTransaccion,
+        cuenta_id: int,
+        monto: Decimal,
+        descripcion: str,
+        accion: str,
+        compania_id: Optional[int] = None,
+        usuario_id: Optional[int] = None
+    ) -> bool:
+        """
+        Proyecta un saldo del día `fecha_origen` a una celda del próximo día hábil
+        (85 → 54 en pagaduría, 51 → 1 en tesorería). Devuelve True si escribió algo.
+        """
+        existente = self.db.query(TransaccionFlujoCaja).filter(
+            TransaccionFlujoCaja.fecha == fecha_destino,
+            TransaccionFlujoCaja.concepto_id == concepto_id,
+            TransaccionFlujoCaja.cuenta_id == cuenta_id,
+            TransaccionFlujoCaja.area == area
+        ).first()
+        
+        if existente:
+            monto_anterior = existente.monto
+            if not self._aplicar_monto(existente, monto, descripcion, accion, usuario_id):
+                return False
+            logger.info(f"🔄 PROYECCIÓN (días hábiles): concepto {concepto_id} del {fecha_destino} cuenta {cuenta_id}: ${monto_anterior} → ${monto}")
+            return True
+        
+        self.db.add(TransaccionFlujoCaja(
+            fecha=fecha_destino,
+            concepto_id=concepto_id,
+            cuenta_id=cuenta_id,
+            monto=monto,
+            descripcion=descripcion,
+            usuario_id=usuario_id or 1,
+            area=area,
+            compania_id=compania_id or 1,
+            auditoria=ultimo_cambio(accion, usuario_id or 1)
+        ))
+        self._registrar_creacion()
+        logger.info(f"🚀 PROYECCIÓN (días hábiles): concepto {concepto_id} creado para {fecha_destino} cuenta {cuenta_id}: ${monto} (del {fecha_origen})")
+        return True
+
     def _procesar_dependencias_pagaduria(
         self,
         fecha: date,
@@ -1381,11 +1591,12 @@ class DependenciasFlujoCajaService:
                 ).first()
                 
                 if transaccion_diferencia:
-                    # Actualizar existente
+                    # Actualizar existente solo si cambió
                     monto_anterior = transaccion_diferencia.monto
-                    transaccion_diferencia.monto = diferencia_saldos
-                    transaccion_diferencia.descripcion = "Auto-calculado: SALDOS BANCOS - SALDO ANTERIOR"
-                    
+                    if not self._aplicar_monto(transaccion_diferencia, diferencia_saldos,
+                                               "Auto-calculado: SALDOS BANCOS - SALDO ANTERIOR",
+                                               "actualizacion_automatica", usuario_id):
+                        continue
                     logger.info(f"✅ DIFERENCIA SALDOS actualizada: Cuenta {cuenta}, ${monto_anterior} → ${diferencia_saldos}")
                 else:
                     # Crear nueva
@@ -1398,20 +1609,11 @@ class DependenciasFlujoCajaService:
                         usuario_id=usuario_id or 1,
                         area=AreaTransaccion.pagaduria,
                         compania_id=compania_id or 1,
-                        auditoria={
-                            "accion": "creacion_automatica",
-                            "usuario_id": usuario_id or 1,
-                            "timestamp": datetime.now().isoformat(),
-                            "formula": "RESTA(53,54)",
-                            "componentes": {
-                                "saldos_bancos_id53": float(monto_saldos_bancos),
-                                "saldo_anterior_id54": float(monto_saldo_anterior)
-                            },
-                            "tipo": "dependencia_pagaduria"
-                        }
+                        auditoria=ultimo_cambio("creacion_automatica", usuario_id or 1)
                     )
                     
                     self.db.add(nueva_transaccion)
+                    self._registrar_creacion()
                     logger.info(f"✅ DIFERENCIA SALDOS creada: Cuenta {cuenta}, ${diferencia_saldos}")
                 
                 actualizaciones.append({
@@ -1454,11 +1656,12 @@ class DependenciasFlujoCajaService:
                     ).first()
                     
                     if saldo_dia_anterior:
-                        # Actualizar existente
+                        # Actualizar existente solo si cambió
                         monto_anterior_saldo = saldo_dia_anterior.monto
-                        saldo_dia_anterior.monto = monto_saldo_total
-                        saldo_dia_anterior.descripcion = f"Auto-calculado: SALDO TOTAL BANCOS del {fecha_anterior}"
-                        
+                        if not self._aplicar_monto(saldo_dia_anterior, monto_saldo_total,
+                                                   f"Auto-calculado: SALDO TOTAL BANCOS del {fecha_anterior}",
+                                                   "actualizacion_automatica", usuario_id):
+                            continue
                         logger.info(f"✅ SALDO DIA ANTERIOR actualizado: Cuenta {cuenta}, ${monto_anterior_saldo} → ${monto_saldo_total}")
                     else:
                         # Crear nueva transacción
@@ -1471,21 +1674,11 @@ class DependenciasFlujoCajaService:
                             usuario_id=usuario_id or 1,
                             area=AreaTransaccion.pagaduria,
                             compania_id=compania_id or 1,
-                            auditoria={
-                                "accion": "creacion_automatica",
-                                "usuario_id": usuario_id or 1,
-                                "timestamp": datetime.now().isoformat(),
-                                "origen": {
-                                    "concepto_origen_id": 85,
-                                    "concepto_origen_nombre": "SALDO TOTAL EN BANCOS",
-                                    "fecha_origen": fecha_anterior.isoformat(),
-                                    "monto_origen": float(monto_saldo_total)
-                                },
-                                "tipo": "saldo_dia_anterior_automatico"
-                            }
+                            auditoria=ultimo_cambio("creacion_automatica", usuario_id or 1)
                         )
                         
                         self.db.add(nueva_transaccion_saldo)
+                        self._registrar_creacion()
                         logger.info(f"✅ SALDO DIA ANTERIOR creado: Cuenta {cuenta}, ${monto_saldo_total} (del {fecha_anterior})")
                     
                     actualizaciones.append({
@@ -1565,27 +1758,12 @@ class DependenciasFlujoCajaService:
                 ).first()
                 
                 if subtotal_existente:
-                    # Actualizar existente
+                    # Actualizar existente solo si cambió
                     monto_anterior = subtotal_existente.monto
-                    subtotal_existente.monto = subtotal_movimiento
-                    subtotal_existente.descripcion = f"Auto-calculado: I(+) E(-) N(±) de {len(conceptos_incluidos)} conceptos"
-                    
-                    # Actualizar auditoría
-                    auditoria_actual = subtotal_existente.auditoria or {}
-                    auditoria_actual.update({
-                        "accion": "actualizacion_automatica",
-                        "usuario_id": usuario_id or 1,
-                        "timestamp": datetime.now().isoformat(),
-                        "cambio": {
-                            "monto_anterior": float(monto_anterior),
-                            "monto_nuevo": float(subtotal_movimiento),
-                            "conceptos_incluidos": conceptos_incluidos,
-                            "formula": "SUMA respetando códigos: I(+), E(-), N(±)"
-                        },
-                        "tipo": "subtotal_movimiento_automatico"
-                    })
-                    subtotal_existente.auditoria = auditoria_actual
-                    
+                    if not self._aplicar_monto(subtotal_existente, subtotal_movimiento,
+                                               f"Auto-calculado: I(+) E(-) N(±) de {len(conceptos_incluidos)} conceptos",
+                                               "actualizacion_automatica", usuario_id):
+                        continue
                     logger.info(f"✅ SUBTOTAL MOVIMIENTO actualizado: Cuenta {cuenta}, ${monto_anterior} → ${subtotal_movimiento}")
                 else:
                     # Crear nueva transacción
@@ -1598,19 +1776,11 @@ class DependenciasFlujoCajaService:
                         usuario_id=usuario_id or 1,
                         area=AreaTransaccion.pagaduria,
                         compania_id=compania_id or 1,
-                        auditoria={
-                            "accion": "creacion_automatica",
-                            "usuario_id": usuario_id or 1,
-                            "timestamp": datetime.now().isoformat(),
-                            "conceptos_incluidos": conceptos_incluidos,
-                            "formula": "SUMA respetando códigos: I(+), E(-), N(+)",
-                            "total_conceptos": len(conceptos_incluidos),
-                            "monto_calculado": float(subtotal_movimiento),
-                            "tipo": "subtotal_movimiento_automatico"
-                        }
+                        auditoria=ultimo_cambio("creacion_automatica", usuario_id or 1)
                     )
                     
                     self.db.add(nueva_transaccion_subtotal)
+                    self._registrar_creacion()
                     logger.info(f"✅ SUBTOTAL MOVIMIENTO creado: Cuenta {cuenta}, ${subtotal_movimiento}")
                 
                 # Solo agregar a actualizaciones si hay conceptos incluidos
@@ -1671,32 +1841,12 @@ class DependenciasFlujoCajaService:
                     ).first()
                     
                     if subtotal_saldo_inicial_existente:
-                        # Actualizar existente
+                        # Actualizar existente solo si cambió
                         monto_anterior = subtotal_saldo_inicial_existente.monto
-                        subtotal_saldo_inicial_existente.monto = subtotal_saldo_inicial
-                        subtotal_saldo_inicial_existente.descripcion = f"Auto-calculado: ${monto_subtotal_movimiento} + ${monto_saldo_anterior} (parcial: {len(componentes_presentes)}/2)"
-                        
-                        # Actualizar auditoría
-                        auditoria_actual = subtotal_saldo_inicial_existente.auditoria or {}
-                        auditoria_actual.update({
-                            "accion": "actualizacion_automatica",
-                            "usuario_id": usuario_id or 1,
-                            "timestamp": datetime.now().isoformat(),
-                            "cambio": {
-                                "monto_anterior": float(monto_anterior),
-                                "monto_nuevo": float(subtotal_saldo_inicial),
-                                "componentes_disponibles": len(componentes_presentes),
-                                "componentes_total": 2,
-                                "componentes": {
-                                    "subtotal_movimiento_id82": float(monto_subtotal_movimiento),
-                                    "saldo_dia_anterior_id54": float(monto_saldo_anterior)
-                                },
-                                "formula": "ID82 + ID54 (cálculo parcial permitido)"
-                            },
-                            "tipo": "subtotal_saldo_inicial_automatico"
-                        })
-                        subtotal_saldo_inicial_existente.auditoria = auditoria_actual
-                        
+                        if not self._aplicar_monto(subtotal_saldo_inicial_existente, subtotal_saldo_inicial,
+                                                   f"Auto-calculado: ${monto_subtotal_movimiento} + ${monto_saldo_anterior} (parcial: {len(componentes_presentes)}/2)",
+                                                   "actualizacion_automatica", usuario_id):
+                            continue
                         logger.info(f"✅ SUBTOTAL SALDO INICIAL actualizado: Cuenta {cuenta}, ${monto_anterior} → ${subtotal_saldo_inicial}")
                     else:
                         # Crear nueva transacción
@@ -1709,21 +1859,11 @@ class DependenciasFlujoCajaService:
                             usuario_id=usuario_id or 1,
                             area=AreaTransaccion.pagaduria,
                             compania_id=compania_id or 1,
-                            auditoria={
-                                "accion": "creacion_automatica",
-                                "usuario_id": usuario_id or 1,
-                                "timestamp": datetime.now().isoformat(),
-                                "componentes": {
-                                    "subtotal_movimiento_id82": float(monto_subtotal_movimiento),
-                                    "saldo_dia_anterior_id54": float(monto_saldo_anterior)
-                                },
-                                "formula": "ID82 + ID54",
-                                "monto_calculado": float(subtotal_saldo_inicial),
-                                "tipo": "subtotal_saldo_inicial_automatico"
-                            }
+                            auditoria=ultimo_cambio("creacion_automatica", usuario_id or 1)
                         )
                         
                         self.db.add(nueva_transaccion_saldo_inicial)
+                        self._registrar_creacion()
                         logger.info(f"✅ SUBTOTAL SALDO INICIAL creado: Cuenta {cuenta}, ${subtotal_saldo_inicial}")
                     
                     actualizaciones.append({
@@ -1788,32 +1928,12 @@ class DependenciasFlujoCajaService:
                     ).first()
                     
                     if movimiento_tesoreria_existente:
-                        # Actualizar existente
+                        # Actualizar existente solo si cambió
                         monto_anterior = movimiento_tesoreria_existente.monto
-                        movimiento_tesoreria_existente.monto = monto_subtotal_tesoreria
-                        movimiento_tesoreria_existente.descripcion = f"Auto-calculado: igual a SUB-TOTAL TESORERÍA (área {area_origen})"
-                        
-                        # Actualizar auditoría
-                        auditoria_actual = movimiento_tesoreria_existente.auditoria or {}
-                        auditoria_actual.update({
-                            "accion": "actualizacion_automatica",
-                            "usuario_id": usuario_id or 1,
-                            "timestamp": datetime.now().isoformat(),
-                            "cambio": {
-                                "monto_anterior": float(monto_anterior),
-                                "monto_nuevo": float(monto_subtotal_tesoreria),
-                                "origen": {
-                                    "concepto_id": 50,
-                                    "concepto_nombre": "SUB-TOTAL TESORERÍA",
-                                    "area_origen": area_origen,
-                                    "monto_origen": float(monto_subtotal_tesoreria)
-                                },
-                                "formula": "MOVIMIENTO TESORERIA = SUB-TOTAL TESORERÍA"
-                            },
-                            "tipo": "movimiento_tesoreria_automatico"
-                        })
-                        movimiento_tesoreria_existente.auditoria = auditoria_actual
-                        
+                        if not self._aplicar_monto(movimiento_tesoreria_existente, monto_subtotal_tesoreria,
+                                                   f"Auto-calculado: igual a SUB-TOTAL TESORERÍA (área {area_origen})",
+                                                   "actualizacion_automatica", usuario_id):
+                            continue
                         logger.info(f"✅ MOVIMIENTO TESORERIA actualizado: Cuenta {cuenta}, ${monto_anterior} → ${monto_subtotal_tesoreria}")
                     else:
                         # Crear nueva transacción
@@ -1826,23 +1946,11 @@ class DependenciasFlujoCajaService:
                             usuario_id=usuario_id or 1,
                             area=AreaTransaccion.pagaduria,
                             compania_id=compania_id or 1,
-                            auditoria={
-                                "accion": "creacion_automatica",
-                                "usuario_id": usuario_id or 1,
-                                "timestamp": datetime.now().isoformat(),
-                                "origen": {
-                                    "concepto_id": 50,
-                                    "concepto_nombre": "SUB-TOTAL TESORERÍA",
-                                    "area_origen": area_origen,
-                                    "monto_origen": float(monto_subtotal_tesoreria)
-                                },
-                                "formula": "MOVIMIENTO TESORERIA = SUB-TOTAL TESORERÍA",
-                                "monto_calculado": float(monto_subtotal_tesoreria),
-                                "tipo": "movimiento_tesoreria_automatico"
-                            }
+                            auditoria=ultimo_cambio("creacion_automatica", usuario_id or 1)
                         )
                         
                         self.db.add(nueva_transaccion_movimiento)
+                        self._registrar_creacion()
                         logger.info(f"✅ MOVIMIENTO TESORERIA creado: Cuenta {cuenta}, ${monto_subtotal_tesoreria}")
                     
                     actualizaciones.append({
@@ -1892,26 +2000,10 @@ class DependenciasFlujoCajaService:
                     ).first()
                     if saldo_neto_existente:
                         monto_anterior = saldo_neto_existente.monto
-                        saldo_neto_existente.monto = saldo_neto_inicial
-                        saldo_neto_existente.descripcion = "Auto-calculado: SALDO INICIAL + CONSUMO + VENTANILLA"
-                        auditoria_actual = saldo_neto_existente.auditoria or {}
-                        auditoria_actual.update({
-                            "accion": "actualizacion_automatica",
-                            "usuario_id": usuario_id or 1,
-                            "timestamp": datetime.now().isoformat(),
-                            "cambio": {
-                                "monto_anterior": float(monto_anterior),
-                                "monto_nuevo": float(saldo_neto_inicial),
-                                "componentes": {
-                                    "saldo_inicial_id1": float(monto_saldo_inicial),
-                                    "consumo_id2": float(monto_consumo),
-                                    "ventanilla_id3": float(monto_ventanilla)
-                                },
-                                "formula": "ID1 + ID2 + ID3"
-                            },
-                            "tipo": "saldo_neto_inicial_pagaduria"
-                        })
-                        saldo_neto_existente.auditoria = auditoria_actual
+                        if not self._aplicar_monto(saldo_neto_existente, saldo_neto_inicial,
+                                                   "Auto-calculado: SALDO INICIAL + CONSUMO + VENTANILLA",
+                                                   "actualizacion_automatica", usuario_id):
+                            continue
                         logger.info(f"✅ SALDO NETO INICIAL PAGADURÍA actualizado: Cuenta {cuenta}, ${monto_anterior} → ${saldo_neto_inicial}")
                     else:
                         nueva_transaccion_saldo_neto = TransaccionFlujoCaja(
@@ -1923,21 +2015,10 @@ class DependenciasFlujoCajaService:
                             usuario_id=usuario_id or 1,
                             area=AreaTransaccion.tesoreria,
                             compania_id=compania_id or 1,
-                            auditoria={
-                                "accion": "creacion_automatica",
-                                "usuario_id": usuario_id or 1,
-                                "timestamp": datetime.now().isoformat(),
-                                "componentes": {
-                                    "saldo_inicial_id1": float(monto_saldo_inicial),
-                                    "consumo_id2": float(monto_consumo),
-                                    "ventanilla_id3": float(monto_ventanilla)
-                                },
-                                "formula": "ID1 + ID2 + ID3",
-                                "monto_calculado": float(saldo_neto_inicial),
-                                "tipo": "saldo_neto_inicial_pagaduria"
-                            }
+                            auditoria=ultimo_cambio("creacion_automatica", usuario_id or 1)
                         )
                         self.db.add(nueva_transaccion_saldo_neto)
+                        self._registrar_creacion()
                         logger.info(f"✅ SALDO NETO INICIAL PAGADURÍA creado: Cuenta {cuenta}, ${saldo_neto_inicial}")
                     actualizaciones.append({
                         "concepto_id": 4,
@@ -2000,108 +2081,15 @@ class DependenciasFlujoCajaService:
                     ).first()
                     
                     if saldo_total_existente:
-                        # Actualizar existente
-                        monto_anterior = saldo_total_existente.monto
-                        saldo_total_existente.monto = saldo_total_bancos
-                        saldo_total_existente.descripcion = f"Auto-calculado: ${monto_subtotal_saldo} + ${monto_movimiento_tesoreria} (parcial: {len(componentes_presentes)}/2)"
-                        
-                        # Actualizar auditoría
-                        auditoria_actual = saldo_total_existente.auditoria or {}
-                        auditoria_actual.update({
-                            "accion": "actualizacion_automatica",
-                            "usuario_id": usuario_id or 1,
-                            "timestamp": datetime.now().isoformat(),
-                            "cambio": {
-                                "monto_anterior": float(monto_anterior),
-                                "monto_nuevo": float(saldo_total_bancos),
-                                "componentes_disponibles": len(componentes_presentes),
-                                "componentes_total": 2,
-                                "componentes": {
-                                    "subtotal_saldo_inicial_id83": float(monto_subtotal_saldo),
-                                    "movimiento_tesoreria_id84": float(monto_movimiento_tesoreria)
-                                },
-                                "formula": "ID83 + ID84 (cálculo parcial permitido)"
-                            },
-                            "tipo": "saldo_total_bancos_automatico"
-                        })
-                        saldo_total_existente.auditoria = auditoria_actual
-                        
-                        logger.info(f"✅ SALDO TOTAL EN BANCOS actualizado: Cuenta {cuenta}, ${monto_anterior} → ${saldo_total_bancos}")
-                        
-                        # 🚀 LÓGICA PROACTIVA: Proyectar SALDO TOTAL EN BANCOS actualizado → SALDO DÍA ANTERIOR del próximo día hábil
-                        try:
-                            # Usar días hábiles para proyección inteligente
-                            fecha_siguiente = self.dias_habiles_service.proximo_dia_habil(fecha, incluir_fecha_actual=False)
-                            
-                            # Verificar si ya existe SALDO DÍA ANTERIOR para el día siguiente
-                            saldo_dia_siguiente = self.db.query(TransaccionFlujoCaja).filter(
-                                TransaccionFlujoCaja.fecha == fecha_siguiente,
-                                TransaccionFlujoCaja.concepto_id == 54,  # SALDO DÍA ANTERIOR
-                                TransaccionFlujoCaja.cuenta_id == cuenta,
-                                TransaccionFlujoCaja.area == AreaTransaccion.pagaduria
-                            ).first()
-                            
-                            if saldo_dia_siguiente:
-                                # Actualizar proyección existente
-                                monto_anterior_proyectado = saldo_dia_siguiente.monto
-                                saldo_dia_siguiente.monto = saldo_total_bancos
-                                saldo_dia_siguiente.descripcion = f"Auto-calculado: SALDO TOTAL BANCOS del {fecha} (próximo día hábil)"
-                                
-                                logger.info(f"🔄 PROYECCIÓN ACTUALIZADA (días hábiles): SALDO DÍA ANTERIOR del {fecha_siguiente}: ${monto_anterior_proyectado} → ${saldo_total_bancos}")
-                            else:
-                                # Crear nueva proyección
-                                nueva_proyeccion = TransaccionFlujoCaja(
-                                    fecha=fecha_siguiente,
-                                    concepto_id=54,  # SALDO DÍA ANTERIOR
-                                    cuenta_id=cuenta,
-                                    monto=saldo_total_bancos,
-                                    descripcion=f"Auto-calculado: SALDO TOTAL BANCOS del {fecha} (próximo día hábil)",
-                                    usuario_id=usuario_id or 1,
-                                    area=AreaTransaccion.pagaduria,
-                                    compania_id=compania_id or 1,
-                                    auditoria={
-                                        "accion": "proyeccion_automatica_update",
-                                        "usuario_id": usuario_id or 1,
-                                        "timestamp": datetime.now().isoformat(),
-                                        "origen": {
-                                            "concepto_origen_id": 85,
-                                            "concepto_origen_nombre": "SALDO TOTAL EN BANCOS",
-                                            "fecha_origen": fecha.isoformat(),
-                                            "monto_origen": float(saldo_total_bancos)
-                                        },
-                                        "tipo": "proyeccion_saldo_dia_anterior_update"
-                                    }
-                                )
-                                
-                                self.db.add(nueva_proyeccion)
-                                logger.info(f"🚀 PROYECCIÓN CREADA (días hábiles): SALDO DÍA ANTERIOR para {fecha_siguiente}: ${saldo_total_bancos}")
-                        except Exception as e:
-                            logger.warning(f"⚠️ Error en proyección al actualizar SALDO TOTAL EN BANCOS: {e}")
-                        
+                        # Actualizar existente solo si cambió
                         monto_anterior = saldo_total_existente.monto
-                        saldo_total_existente.monto = saldo_total_bancos
-                        saldo_total_existente.descripcion = "Auto-calculado: SUBTOTAL SALDO INICIAL + MOVIMIENTO TESORERIA"
-                        
-                        # Actualizar auditoría
-                        auditoria_actual = saldo_total_existente.auditoria or {}
-                        auditoria_actual.update({
-                            "accion": "actualizacion_automatica",
-                            "usuario_id": usuario_id or 1,
-                            "timestamp": datetime.now().isoformat(),
-                            "cambio": {
-                                "monto_anterior": float(monto_anterior),
-                                "monto_nuevo": float(saldo_total_bancos),
-                                "componentes": {
-                                    "subtotal_saldo_inicial_id83": float(monto_subtotal_saldo),
-                                    "movimiento_tesoreria_id84": float(monto_movimiento_tesoreria)
-                                },
-                                "formula": "SALDO TOTAL BANCOS = SUBTOTAL SALDO INICIAL + MOVIMIENTO TESORERIA"
-                            },
-                            "tipo": "saldo_total_bancos_automatico"
-                        })
-                        saldo_total_existente.auditoria = auditoria_actual
-                        
-                        logger.info(f"✅ SALDO TOTAL EN BANCOS actualizado: Cuenta {cuenta}, ${monto_anterior} → ${saldo_total_bancos}")
+                        saldo_total_cambio = self._aplicar_monto(
+                            saldo_total_existente, saldo_total_bancos,
+                            "Auto-calculado: SUBTOTAL SALDO INICIAL + MOVIMIENTO TESORERIA",
+                            "actualizacion_automatica", usuario_id
+                        )
+                        if saldo_total_cambio:
+                            logger.info(f"✅ SALDO TOTAL EN BANCOS actualizado: Cuenta {cuenta}, ${monto_anterior} → ${saldo_total_bancos}")
                     else:
                         # Crear nueva transacción
                         nueva_transaccion_saldo_total = TransaccionFlujoCaja(
@@ -2113,73 +2101,37 @@ class DependenciasFlujoCajaService:
                             usuario_id=usuario_id or 1,
                             area=AreaTransaccion.pagaduria,
                             compania_id=compania_id or 1,
-                            auditoria={
-                                "accion": "creacion_automatica",
-                                "usuario_id": usuario_id or 1,
-                                "timestamp": datetime.now().isoformat(),
-                                "componentes": {
-                                    "subtotal_saldo_inicial_id83": float(monto_subtotal_saldo),
-                                    "movimiento_tesoreria_id84": float(monto_movimiento_tesoreria)
-                                },
-                                "formula": "SALDO TOTAL BANCOS = SUBTOTAL SALDO INICIAL + MOVIMIENTO TESORERIA",
-                                "monto_calculado": float(saldo_total_bancos),
-                                "tipo": "saldo_total_bancos_automatico"
-                            }
+                            auditoria=ultimo_cambio("creacion_automatica", usuario_id or 1)
                         )
                         
                         self.db.add(nueva_transaccion_saldo_total)
+                        self._registrar_creacion()
+                        saldo_total_cambio = True
                         logger.info(f"✅ SALDO TOTAL EN BANCOS creado: Cuenta {cuenta}, ${saldo_total_bancos}")
                     
                     # 🚀 LÓGICA PROACTIVA: Proyectar SALDO TOTAL EN BANCOS del día actual → SALDO DÍA ANTERIOR del próximo día hábil
+                    # La proyección se evalúa aunque el 85 no cambie (el día siguiente puede estar desfasado),
+                    # pero solo se escribe si el SALDO DÍA ANTERIOR proyectado difiere
                     try:
-                        # Usar días hábiles para proyección inteligente
                         fecha_siguiente = self.dias_habiles_service.proximo_dia_habil(fecha, incluir_fecha_actual=False)
-                        
-                        # Verificar si ya existe SALDO DÍA ANTERIOR para el día siguiente
-                        saldo_dia_siguiente = self.db.query(TransaccionFlujoCaja).filter(
-                            TransaccionFlujoCaja.fecha == fecha_siguiente,
-                            TransaccionFlujoCaja.concepto_id == 54,  # SALDO DÍA ANTERIOR
-                            TransaccionFlujoCaja.cuenta_id == cuenta,
-                            TransaccionFlujoCaja.area == AreaTransaccion.pagaduria
-                        ).first()
-                        
-                        if saldo_dia_siguiente:
-                            # Actualizar existente
-                            monto_anterior_proyectado = saldo_dia_siguiente.monto
-                            saldo_dia_siguiente.monto = saldo_total_bancos
-                            saldo_dia_siguiente.descripcion = f"Auto-calculado: SALDO TOTAL BANCOS del {fecha} (próximo día hábil)"
-                            
-                            logger.info(f"🔄 PROYECCIÓN (días hábiles): SALDO DÍA ANTERIOR del {fecha_siguiente} actualizado: ${monto_anterior_proyectado} → ${saldo_total_bancos}")
-                        else:
-                            # Crear nueva proyección para el día siguiente
-                            nueva_proyeccion = TransaccionFlujoCaja(
-                                fecha=fecha_siguiente,
-                                concepto_id=54,  # SALDO DÍA ANTERIOR
-                                cuenta_id=cuenta,
-                                monto=saldo_total_bancos,
-                                descripcion=f"Auto-calculado: SALDO TOTAL BANCOS del {fecha} (próximo día hábil)",
-                                usuario_id=usuario_id or 1,
-                                area=AreaTransaccion.pagaduria,
-                                compania_id=compania_id or 1,
-                                auditoria={
-                                    "accion": "proyeccion_automatica",
-                                    "usuario_id": usuario_id or 1,
-                                    "timestamp": datetime.now().isoformat(),
-                                    "origen": {
-                                        "concepto_origen_id": 85,
-                                        "concepto_origen_nombre": "SALDO TOTAL EN BANCOS",
-                                        "fecha_origen": fecha.isoformat(),
-                                        "monto_origen": float(saldo_total_bancos)
-                                    },
-                                    "tipo": "proyeccion_saldo_dia_anterior"
-                                }
-                            )
-                            
-                            self.db.add(nueva_proyeccion)
-                            logger.info(f"🚀 PROYECCIÓN (días hábiles): SALDO DÍA ANTERIOR creado para {fecha_siguiente}: ${saldo_total_bancos}")
+                        self._proyectar_saldo(
+                            fecha_origen=fecha,
+                            fecha_destino=fecha_siguiente,
+                            concepto_id=54,  # SALDO DÍA ANTERIOR
+                            area=AreaTransaccion.pagaduria,
+                            cuenta_id=cuenta,
+                            monto=saldo_total_bancos,
+                            descripcion=f"Auto-calculado: SALDO TOTAL BANCOS del {fecha} (próximo día hábil)",
+                            accion="proyeccion_automatica",
+                            compania_id=compania_id,
+                            usuario_id=usuario_id
+                        )
                     except Exception as e:
                         logger.warning(f"⚠️ Error en proyección SALDO DÍA ANTERIOR: {e}")
                     
+                    if not saldo_total_cambio:
+                        continue
+                    
                     actualizaciones.append({
                         "concepto_id": 85,
                         "concepto_nombre": "SALDO TOTAL EN BANCOS",
@@ -2215,65 +2167,20 @@ class DependenciasFlujoCajaService:
                 
                 if saldo_final_cuentas and saldo_final_cuentas.monto != 0:
                     try:
-                        # 🔍 DEBUG: Capturar el valor ANTES de usarlo
-                        monto_original = saldo_final_cuentas.monto
-                        logger.info(f"🔍 DEBUG PROYECCIÓN TESORERÍA - Cuenta {cuenta}: Monto leído = ${monto_original}")
-                        
                         # Usar días hábiles para proyección inteligente
                         fecha_siguiente = self.dias_habiles_service.proximo_dia_habil(fecha, incluir_fecha_actual=False)
-                        
-                        # Verificar si ya existe SALDO INICIAL para el día siguiente
-                        saldo_inicial_siguiente = self.db.query(TransaccionFlujoCaja).filter(
-                            TransaccionFlujoCaja.fecha == fecha_siguiente,
-                            TransaccionFlujoCaja.concepto_id == 1,  # SALDO INICIAL
-                            TransaccionFlujoCaja.cuenta_id == cuenta,
-                            TransaccionFlujoCaja.area == AreaTransaccion.tesoreria
-                        ).first()
-                        
-                        # 🔍 DEBUG: Verificar que el monto no cambió
-                        monto_antes_asignar = saldo_final_cuentas.monto
-                        logger.info(f"🔍 DEBUG PROYECCIÓN TESORERÍA - Cuenta {cuenta}: Monto antes de asignar = ${monto_antes_asignar}")
-                        
-                        if saldo_inicial_siguiente:
-                            # Actualizar proyección existente
-                            monto_anterior_proyectado = saldo_inicial_siguiente.monto
-                            saldo_inicial_siguiente.monto = monto_original  # Usar el valor capturado
-                            saldo_inicial_siguiente.descripcion = f"Auto-calculado: SALDO FINAL CUENTAS del {fecha} (próximo día hábil)"
-                            
-                            logger.info(f"🔄 PROYECCIÓN TESORERÍA (días hábiles): SALDO INICIAL del {fecha_siguiente} actualizado: ${monto_anterior_proyectado} → ${monto_original}")
-                        else:
-                            # Crear nueva proyección para el día siguiente
-                            nueva_proyeccion = TransaccionFlujoCaja(
-                                fecha=fecha_siguiente,
-                                concepto_id=1,  # SALDO INICIAL
-                                cuenta_id=cuenta,
-                                monto=monto_original,  # Usar el valor capturado
-                                descripcion=f"Auto-calculado: SALDO FINAL CUENTAS del {fecha} (próximo día hábil)",
-                                usuario_id=usuario_id or 1,
-                                area=AreaTransaccion.tesoreria,
-                                compania_id=compania_id or 1,
-                                auditoria={
-                                    "accion": "proyeccion_automatica_tesoreria",
-                                    "usuario_id": usuario_id or 1,
-                                    "timestamp": datetime.now().isoformat(),
-                                    "origen": {
-                                        "concepto_origen_id": 51,
-                                        "concepto_origen_nombre": "SALDO FINAL CUENTAS",
-                                        "fecha_origen": fecha.isoformat(),
-                                        "monto_origen": float(monto_original)  # Usar el valor capturado
-                                    },
-                                    "destino": {
-                                        "concepto_destino_id": 1,
-                                        "concepto_destino_nombre": "SALDO INICIAL",
-                                        "fecha_destino": fecha_siguiente.isoformat()
-                                    },
-                                    "tipo": "proyeccion_dias_habiles_tesoreria"
-                                }
-                            )
-                            
-                            self.db.add(nueva_proyeccion)
-                            logger.info(f"🚀 PROYECCIÓN TESORERÍA (días hábiles): SALDO INICIAL creado para {fecha_siguiente}: ${monto_original}")
-                            
+                        self._proyectar_saldo(
+                            fecha_origen=fecha,
+                            fecha_destino=fecha_siguiente,
+                            concepto_id=1,  # SALDO INICIAL
+                            area=AreaTransaccion.tesoreria,
+                            cuenta_id=cuenta,
+                            monto=saldo_final_cuentas.monto,
+                            descripcion=f"Auto-calculado: SALDO FINAL CUENTAS del {fecha} (próximo día hábil)",
+                            accion="proyeccion_automatica_tesoreria",
+                            compania_id=compania_id,
+                            usuario_id=usuario_id
+                        )
                     except Exception as e:
                         logger.error(f"❌ Error en proyección de tesorería para cuenta {cuenta}: {e}")
             
@@ -110,11 +110,13 @@ class DiasHabilesService:
         Returns:
             Lista de fechas que son días hábiles
         """
+        # Una sola consulta de festivos para todo el rango
+        festivos = {d.fecha for d in DiaFestivo.obtener_festivos_rango(fecha_inicio, fecha_fin, self.db)}
         dias_habiles = []
         fecha_actual = fecha_inicio
         
         while fecha_actual <= fecha_fin:
-            if self.es_dia_habil(fecha_actual):
+            if fecha_actual.weekday() < 5 and fecha_actual not in festivos:
                 dias_habiles.append(fecha_actual)
             fecha_actual += timedelta(days=1)
         
@@ -10,6 +10,7 @@ from ..core.database import get_db
 from ..models.transacciones_flujo_caja import TransaccionFlujoCaja
 from ..models.conceptos_flujo_caja import ConceptoFlujoCaja
 from ..models.cuentas_bancarias import CuentaBancaria
+from .cierre_dia_service import CierreDiaService, compania_de
 
 import logging
 
@@ -150,6 +151,7 @@ class DiferenciaSaldosService:
         """
         try:
             cuentas = db.query(CuentaBancaria).all()
+            cerradas = CierreDiaService(db).companias_cerradas(fecha)
             resultados = {
                 "procesadas": 0,
                 "errores": 0,
@@ -157,6 +159,14 @@ class DiferenciaSaldosService:
             }
             
             for cuenta in cuentas:
+                # Las cuentas de compañías con el día cerrado conservan su valor congelado
+                if compania_de(cuenta.compania_id) in cerradas:
+                    resultados["cuentas"].append({
+                        "cuenta_id": cuenta.id,
+                        "numero_cuenta": cuenta.numero_cuenta,
+                        "status": "dia_cerrado"
+                    })
+                    continue
                 try:
                     transaccion = DiferenciaSaldosService.crear_o_actualizar_diferencia_saldos(
                         db, cuenta.id, fecha, usuario_id, cuenta.compania_id
@@ -0,0 +1,231 @@
+"""
+Escenarios "qué pasaría si" sobre el flujo de caja.
+
+Un escenario es una capa de ajustes de celdas superpuesta a las transacciones reales.
+Se evalúa con el motor de proyección en memoria (ProyeccionFlujoCajaService): los datos
+reales se cargan una sola vez por ventana y cada escenario solo aporta las celdas que
+cambia (copia al escribir), así que evaluar muchos escenarios no escribe en
+transacciones_flujo_caja. El resultado se compara celda a celda con la línea base.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.escenario_flujo_caja import EscenarioFlujoCaja
+from app.models.transacciones_flujo_caja import AreaTransaccion
+from app.schemas.escenario_flujo_caja import AjusteCelda, EscenarioBase, EscenarioCreate, EscenarioUpdate, ModoAjusteSchema
+from app.services.proyeccion_flujo_caja_service import (
+    MAX_HORIZONTE, PAGADURIA, TESORERIA, Ajustes, BaseProyeccion, ProyeccionFlujoCajaService
+)
+
+logger = logging.getLogger(__name__)
+
+# (fecha_inicio, horizonte, cuenta_id, compania_id)
+Ventana = Tuple[date, int, Optional[int], Optional[int]]
+
+
+def _ventana(escenario) -> Ventana:
+    return (escenario.fecha_inicio, escenario.horizonte, escenario.cuenta_id, escenario.compania_id)
+
+
+def _ajustes_json(ajustes: List[AjusteCelda]) -> List[dict]:
+    """Ajustes serializables para la columna JSON (montos como texto para no perder centavos)"""
+    return [
+        {**a.model_dump(mode="json"), "monto": str(a.monto) if a.monto is not None else None}
+        for a in ajustes
+    ]
+
+
+class EscenarioFlujoCajaService:
+    """CRUD de escenarios y su evaluación contra la línea base"""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.proyeccion = ProyeccionFlujoCajaService(db)
+
+    # ------------------------------------------------------------------
+    # CRUD (solo toca escenarios_flujo_caja)
+    # ------------------------------------------------------------------
+
+    def crear(self, datos: EscenarioCreate, usuario_id: int) -> EscenarioFlujoCaja:
+        self._validar_horizonte(datos.horizonte)
+        escenario = EscenarioFlujoCaja(
+            nombre=datos.nombre,
+            descripcion=datos.descripcion,
+            fecha_inicio=datos.fecha_inicio,
+            horizonte=datos.horizonte,
+            cuenta_id=datos.cuenta_id,
+            compania_id=datos.compania_id,
+            ajustes=_ajustes_json(datos.ajustes),
+            usuario_id=usuario_id
+        )
+        self.db.add(escenario)
+        self.db.commit()
+        self.db.refresh(escenario)
+        return escenario
+
+    def listar(self, usuario_id: Optional[int] = None) -> List[EscenarioFlujoCaja]:
+        consulta = self.db.query(EscenarioFlujoCaja)
+        if usuario_id is not None:
+            consulta = consulta.filter(EscenarioFlujoCaja.usuario_id == usuario_id)
+        return consulta.order_by(EscenarioFlujoCaja.id.desc()).all()
+
+    def obtener(self, escenario_id: int) -> Optional[EscenarioFlujoCaja]:
+        return self.db.query(EscenarioFlujoCaja).filter(EscenarioFlujoCaja.id == escenario_id).first()
+
+    def actualizar(self, escenario: EscenarioFlujoCaja, datos: EscenarioUpdate) -> EscenarioFlujoCaja:
+        cambios = datos.model_dump(exclude_unset=True)
+        if "horizonte" in cambios:
+            self._validar_horizonte(cambios["horizonte"])
+        if "ajustes" in cambios:
+            cambios["ajustes"] = _ajustes_json(datos.ajustes or [])
+        for campo, valor in cambios.items():
+            setattr(escenario, campo, valor)
+        self.db.commit()
+        self.db.refresh(escenario)
+        return escenario
+
+    def eliminar(self, escenario: EscenarioFlujoCaja) -> None:
+        self.db.delete(escenario)
+        self.db.commit()
+
+    # ------------------------------------------------------------------
+    # Evaluación (solo lectura)
+    # ------------------------------------------------------------------
+
+    def evaluar(self, escenario: EscenarioBase, incluir_grilla: bool = False) -> dict:
+        """Evalúa un escenario (guardado o no) contra la línea base de su ventana"""
+        return self.comparar([escenario], incluir_grilla)[0]
+
+    def comparar(self, escenarios: list, incluir_grilla: bool = False) -> List[dict]:
+        """
+        Evalúa varios escenarios. Los datos reales y la línea base se cargan y calculan una
+        vez por ventana (fecha_inicio, horizonte, cuenta, compañía); cada escenario solo
+        superpone sus ajustes.
+        """
+        por_ventana: Dict[Ventana, List[int]] = defaultdict(list)
+        for indice, escenario in enumerate(escenarios):
+            por_ventana[_ventana(escenario)].append(indice)
+
+        resultados: List[Optional[dict]] = [None] * len(escenarios)
+        for ventana, indices in por_ventana.items():
+            self._validar_horizonte(ventana[1])
+            base = self.proyeccion.cargar_base(*ventana)
+            linea_base, _ = self.proyeccion.evaluar(base)
+            for indice in indices:
+                escenario = escenarios[indice]
+                ajustes = [a if isinstance(a, AjusteCelda) else AjusteCelda.model_validate(a) for a in escenario.ajustes]
+                capa, ignorados = self._capa(base, ajustes)
+                grilla, _ = self.proyeccion.evaluar(base, capa)
+                resultado = {
+                    "escenario_id": getattr(escenario, "id", None),
+                    "nombre": getattr(escenario, "nombre", None),
+                    "fechas": grilla["fechas"],
+                    "ajustes_aplicados": len(ajustes) - len(ignorados),
+                    "ajustes_ignorados": ignorados,
+                    "resumen": self._resumen(linea_base, grilla),
+                    "diferencias": self._diferencias(linea_base, grilla),
+                }
+                if incluir_grilla:
+                    for clave in ("persistida", "celdas_cambiadas"):
+                        grilla.pop(clave, None)
+                    resultado["grilla"] = grilla
+                resultados[indice] = resultado
+        logger.info(f"🧪 {len(escenarios)} escenarios evaluados en {len(por_ventana)} ventanas")
+        return resultados
+
+    @staticmethod
+    def _validar_horizonte(horizonte: int) -> None:
+        if horizonte < 1 or horizonte > MAX_HORIZONTE:
+            raise ValueError(f"El horizonte debe estar entre 1 y {MAX_HORIZONTE} días hábiles")
+
+    @staticmethod
+    def _capa(base: BaseProyeccion, ajustes: List[AjusteCelda]) -> Tuple[Ajustes, List[dict]]:
+        """
+        Celdas cambiadas por los ajustes, en orden. 'sumar' parte de lo que ya tenga la capa
+        o, si no, del valor real. Los ajustes fuera de la ventana (día no hábil o fuera del
+        horizonte, cuenta no incluida) o sobre días cerrados se devuelven como ignorados.
+        Las celdas que calcula el motor se recalculan encima de la capa: ajustarlas solo tiene
+        efecto en SALDO INICIAL y SALDO DIA ANTERIOR del primer día.
+        """
+        fechas = set(base.fechas)
+        companias = dict(base.cuentas)
+        cerradas = base.contexto.get("cerradas", set())
+        filas = base.contexto.get("filas", {})
+        capa: Ajustes = defaultdict(dict)
+        ignorados = []
+        for ajuste in ajustes:
+            motivo = None
+            if ajuste.fecha not in fechas:
+                motivo = "fecha fuera de la ventana o no hábil"
+            elif ajuste.cuenta_id not in companias:
+                motivo = "cuenta fuera del escenario"
+            elif (ajuste.fecha, companias[ajuste.cuenta_id]) in cerradas:
+                motivo = "día cerrado"
+            if motivo:
+                ignorados.append({**ajuste.model_dump(mode="json"), "motivo": motivo})
+                continue
+
+            celdas = capa[(ajuste.fecha, ajuste.cuenta_id)]
+            clave = (AreaTransaccion(ajuste.area.value), ajuste.concepto_id)
+            if ajuste.modo == ModoAjusteSchema.eliminar:
+                celdas[clave] = None
+            elif ajuste.modo == ModoAjusteSchema.sumar:
+                if clave in celdas:
+                    actual = celdas[clave] or Decimal("0")
+                else:
+                    real = filas.get((ajuste.fecha, ajuste.cuenta_id), {}).get(clave)
+                    actual = Decimal(real.monto or 0) if real is not None else Decimal("0")
+                celdas[clave] = actual + ajuste.monto
+            else:
+                celdas[clave] = ajuste.monto
+        return capa, ignorados
+
+    @staticmethod
+    def _diferencias(linea_base: dict, escenario: dict) -> List[dict]:
+        """Celdas cuyo valor cambia respecto de la línea base (una celda ausente vale 0)"""
+        diferencias = []
+        for cuenta_base, cuenta_esc in zip(linea_base["cuentas"], escenario["cuentas"]):
+            for dia_base, dia_esc in zip(cuenta_base["dias"], cuenta_esc["dias"]):
+                for area in (TESORERIA.value, PAGADURIA.value):
+                    celdas_base, celdas_esc = dia_base[area], dia_esc[area]
+                    for concepto in sorted(set(celdas_base) | set(celdas_esc), key=int):
+                        antes, despues = celdas_base.get(concepto, 0.0), celdas_esc.get(concepto, 0.0)
+                        if antes != despues:
+                            diferencias.append({
+                                "cuenta_id": cuenta_base["cuenta_id"],
+                                "fecha": dia_base["fecha"],
+                                "area": area,
+                                "concepto_id": int(concepto),
+                                "base": antes,
+                                "escenario": despues,
+                                "diferencia": round(despues - antes, 2),
+                            })
+        return diferencias
+
+    @staticmethod
+    def _resumen(linea_base: dict, escenario: dict) -> List[dict]:
+        """Saldos del último día por cuenta: base, escenario y diferencia"""
+        resumen = []
+        for cuenta_base, cuenta_esc in zip(linea_base["cuentas"], escenario["cuentas"]):
+            if not cuenta_base["dias"]:
+                continue
+            ultimo_base, ultimo_esc = cuenta_base["dias"][-1], cuenta_esc["dias"][-1]
+            resumen.append({
+                "cuenta_id": cuenta_base["cuenta_id"],
+                "fecha": ultimo_base["fecha"],
+                **{
+                    campo: {
+                        "base": ultimo_base[campo],
+                        "escenario": ultimo_esc[campo],
+                        "diferencia": round(ultimo_esc[campo] - ultimo_base[campo], 2),
+                    }
+                    for campo in ("saldo_final_cuentas", "saldo_total_bancos")
+                },
+            })
+        return resumen
@@ -0,0 +1,299 @@
+"""
+Exportación en streaming (Excel / CSV) de datos de flujo de caja y auditoría.
+
+Las filas salen de un cursor del lado del servidor (`yield_per`) y se escriben por
+lotes, así la memoria no depende del tamaño del rango:
+- CSV: cada lote se codifica y se envía de inmediato (opcionalmente con gzip).
+- Excel: openpyxl en modo write-only vuelca las filas a disco mientras se generan; el
+  .xlsx resultante se envía por bloques desde un archivo temporal.
+Los días cerrados se leen de su snapshot, igual que las consultas por fecha.
+"""
+import csv
+import io
+import json
+import logging
+import tempfile
+import zlib
+from calendar import monthrange
+from datetime import date
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..core.database import read_session_scope
+from ..models.auditoria import RegistroAuditoria
+from ..models.companias import Compania
+from ..models.conceptos_flujo_caja import ConceptoFlujoCaja
+from ..models.cuentas_bancarias import CuentaBancaria
+from ..models.snapshot_dia import SnapshotDiaCerrado
+from ..models.transacciones_flujo_caja import TransaccionFlujoCaja, AreaTransaccion
+from .auditoria_service import AuditoriaService
+from .cierre_dia_service import compania_transaccion, excluir_particiones
+
+logger = logging.getLogger(__name__)
+
+# Filas por viaje al cursor del servidor y por bloque escrito en la respuesta
+TAMANO_LOTE = 1000
+TAMANO_BLOQUE = 64 * 1024
+
+FORMATOS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+}
+
+ENCABEZADOS_GRILLA = ["Fecha", "Área", "Compañía", "Cuenta", "Concepto ID", "Concepto", "Monto", "Descripción"]
+ENCABEZADOS_CONSOLIDADO = ["Área", "Concepto ID", "Concepto", "Compañía", "Cuenta", "Total"]
+ENCABEZADOS_AUDITORIA = [
+    "Fecha y hora", "Usuario", "Email", "Acción", "Módulo", "Entidad", "Entidad ID",
+    "Descripción", "Resultado", "IP", "Endpoint", "Duración (ms)",
+]
+
+
+# ----------------------------------------------------------------------
+# Escritores
+# ----------------------------------------------------------------------
+
+def escribir_csv(encabezados: Sequence[str], filas: Iterable[Sequence]) -> Iterator[bytes]:
+    """CSV UTF-8 con BOM (Excel respeta las tildes) en bloques de ~64 KB"""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    buffer.write("\ufeff")
+    escritor.writerow(encabezados)
+    for fila in filas:
+        escritor.writerow(fila)
+        if buffer.tell() >= TAMANO_BLOQUE:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def escribir_xlsx(encabezados: Sequence[str], filas: Iterable[Sequence], titulo: str) -> Iterator[bytes]:
+    """Libro write-only: las filas se vuelcan a disco al agregarlas y el archivo se envía por bloques"""
+    from openpyxl import Workbook  # Diferido: openpyxl solo se carga al exportar a Excel
+
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet(title=titulo[:31])
+    hoja.append(list(encabezados))
+    for fila in filas:
+        hoja.append(list(fila))
+    with tempfile.TemporaryFile() as archivo:
+        libro.save(archivo)
+        archivo.seek(0)
+        while True:
+            bloque = archivo.read(TAMANO_BLOQUE)
+            if not bloque:
+                break
+            yield bloque
+
+
+def comprimir_gzip(bloques: Iterable[bytes]) -> Iterator[bytes]:
+    """Comprime el flujo en formato gzip sin acumularlo"""
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for bloque in bloques:
+        comprimido = compresor.compress(bloque)
+        if comprimido:
+            yield comprimido
+    yield compresor.flush()
+
+
+def en_sesion_propia(generar_filas: Callable[..., Iterator[Sequence]], *args) -> Iterator[Sequence]:
+    """
+    Ejecuta el generador de filas con una sesión propia: el cuerpo de la respuesta se
+    produce después de que el endpoint retorna y no puede depender de la sesión de la request.
+    Las exportaciones solo leen: la sesión va a la réplica de lectura si está configurada.
+    """
+    with read_session_scope() as db:
+        yield from generar_filas(db, *args)
+
+
+def respuesta_exportacion(
+    request: Request,
+    filas: Iterable[Sequence],
+    encabezados: Sequence[str],
+    formato: str,
+    nombre: str
+) -> StreamingResponse:
+    """StreamingResponse del formato pedido; el CSV se envía con gzip si el cliente lo acepta"""
+    if formato not in FORMATOS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Formato no soportado: {formato}. Use {', '.join(FORMATOS)}"
+        )
+    media_type, extension = FORMATOS[formato]
+    headers = {"Content-Disposition": f'attachment; filename="{nombre}.{extension}"'}
+
+    if formato == "xlsx":
+        # El .xlsx ya es un zip: comprimirlo otra vez solo gasta CPU
+        return StreamingResponse(escribir_xlsx(encabezados, filas, nombre), media_type=media_type, headers=headers)
+
+    cuerpo = escribir_csv(encabezados, filas)
+    headers["Vary"] = "Accept-Encoding"
+    if "gzip" in request.headers.get("accept-encoding", "").lower():
+        headers["Content-Encoding"] = "gzip"
+        cuerpo = comprimir_gzip(cuerpo)
+    return StreamingResponse(cuerpo, media_type=media_type, headers=headers)
+
+
+# ----------------------------------------------------------------------
+# Generadores de filas
+# ----------------------------------------------------------------------
+
+def _catalogos(db: Session) -> Tuple[Dict[int, str], Dict[int, str], Dict[int, str]]:
+    """Nombres de conceptos, cuentas y compañías (catálogos pequeños, independientes del rango)"""
+    conceptos = dict(db.query(ConceptoFlujoCaja.id, ConceptoFlujoCaja.nombre).all())
+    cuentas = dict(db.query(CuentaBancaria.id, CuentaBancaria.numero_cuenta).all())
+    companias = dict(db.query(Compania.id, Compania.nombre).all())
+    return conceptos, cuentas, companias
+
+
+def _a_numero(monto) -> Optional[Decimal]:
+    return Decimal(str(monto)) if monto is not None else None
+
+
+def filas_grilla(db: Session, desde: date, hasta: date, area: Optional[str] = None) -> Iterator[List]:
+    """
+    Celdas de las grillas diarias de tesorería/pagaduría entre `desde` y `hasta`.
+
+    Las particiones abiertas se leen en streaming ordenadas por fecha; las cerradas se
+    intercalan desde su snapshot al llegar a su fecha, una partición a la vez. Los
+    snapshots del rango se leen antes de abrir el stream: con un cursor sin buffer
+    (pymysql + yield_per) otra consulta en la misma conexión descarta el resto del stream.
+    Se guarda el JSON sin decodificar y cada uno se decodifica al intercalarlo.
+    """
+    conceptos, cuentas, companias = _catalogos(db)
+    snapshots = db.query(
+        SnapshotDiaCerrado.fecha, SnapshotDiaCerrado.compania_id, SnapshotDiaCerrado.transacciones
+    ).filter(
+        SnapshotDiaCerrado.fecha >= desde,
+        SnapshotDiaCerrado.fecha <= hasta
+    ).order_by(SnapshotDiaCerrado.fecha, SnapshotDiaCerrado.compania_id).all()
+    cerradas = [(fecha, compania_id) for fecha, compania_id, _ in snapshots]
+
+    def fila(fecha, area_valor, compania_id, cuenta_id, concepto_id, monto, descripcion):
+        return [
+            fecha, area_valor, companias.get(compania_id, ""), cuentas.get(cuenta_id, ""),
+            concepto_id, conceptos.get(concepto_id, ""), _a_numero(monto), descripcion or "",
+        ]
+
+    pendientes = iter(snapshots)
+    siguiente = next(pendientes, None)
+
+    def cerradas_hasta(limite: Optional[date]) -> Iterator[List]:
+        nonlocal siguiente
+        while siguiente is not None and (limite is None or siguiente[0] <= limite):
+            _, compania_id, transacciones = siguiente
+            for t in json.loads(transacciones):
+                if area is not None and t.get("area") != area:
+                    continue
+                yield fila(date.fromisoformat(str(t["fecha"])), t.get("area"), t.get("compania_id") or compania_id,
+                           t.get("cuenta_id"), t.get("concepto_id"), t.get("monto"), t.get("descripcion"))
+            siguiente = next(pendientes, None)
+
+    query = excluir_particiones(
+        db.query(
+            TransaccionFlujoCaja.fecha,
+            TransaccionFlujoCaja.area,
+            compania_transaccion(),
+            TransaccionFlujoCaja.cuenta_id,
+            TransaccionFlujoCaja.concepto_id,
+            TransaccionFlujoCaja.monto,
+            TransaccionFlujoCaja.descripcion,
+        ).filter(
+            TransaccionFlujoCaja.fecha >= desde,
+            TransaccionFlujoCaja.fecha <= hasta
+        ),
+        cerradas
+    )
+    if area is not None:
+        query = query.filter(TransaccionFlujoCaja.area == AreaTransaccion(area))
+    query = query.order_by(
+        TransaccionFlujoCaja.fecha, compania_transaccion(), TransaccionFlujoCaja.cuenta_id, TransaccionFlujoCaja.concepto_id
+    ).yield_per(TAMANO_LOTE)
+
+    for fecha, area_enum, compania_id, cuenta_id, concepto_id, monto, descripcion in query:
+        yield from cerradas_hasta(fecha)
+        yield fila(fecha, area_enum.value, compania_id, cuenta_id, concepto_id, monto, descripcion)
+    yield from cerradas_hasta(None)
+
+
+def filas_consolidado_mensual(db: Session, año: int, mes: int) -> Iterator[List]:
+    """
+    Totales del mes por (área, concepto, compañía, cuenta), igual que /informes-consolidados/mensual.
+
+    La suma de los días abiertos se agrupa en la BD; de los días cerrados solo se leen los
+    agregados del snapshot. El resultado tiene a lo sumo conceptos × cuentas filas.
+    """
+    _, ultimo_dia = monthrange(año, mes)
+    desde, hasta = date(año, mes, 1), date(año, mes, ultimo_dia)
+    conceptos, cuentas, companias = _catalogos(db)
+
+    cerradas = db.query(SnapshotDiaCerrado.fecha, SnapshotDiaCerrado.compania_id).filter(
+        SnapshotDiaCerrado.fecha >= desde,
+        SnapshotDiaCerrado.fecha <= hasta
+    ).all()
+    totales: Dict[Tuple[int, int, int], Decimal] = {}
+
+    agrupado = excluir_particiones(
+        db.query(
+            TransaccionFlujoCaja.concepto_id,
+            func.coalesce(TransaccionFlujoCaja.compania_id, 0),
+            func.coalesce(TransaccionFlujoCaja.cuenta_id, 0),
+            func.sum(TransaccionFlujoCaja.monto),
+        ).filter(
+            TransaccionFlujoCaja.fecha >= desde,
+            TransaccionFlujoCaja.fecha <= hasta
+        ),
+        [tuple(c) for c in cerradas]
+    ).group_by(
+        TransaccionFlujoCaja.concepto_id,
+        func.coalesce(TransaccionFlujoCaja.compania_id, 0),
+        func.coalesce(TransaccionFlujoCaja.cuenta_id, 0),
+    ).yield_per(TAMANO_LOTE)
+    for concepto_id, compania_id, cuenta_id, total in agrupado:
+        totales[(concepto_id, compania_id, cuenta_id)] = _a_numero(total) or Decimal("0")
+
+    for (agregados,) in db.query(SnapshotDiaCerrado.agregados).filter(
+        SnapshotDiaCerrado.fecha >= desde,
+        SnapshotDiaCerrado.fecha <= hasta
+    ).yield_per(TAMANO_LOTE):
+        for concepto_id, compania_id, cuenta_id, monto in agregados:
+            clave = (concepto_id, compania_id, cuenta_id)
+            totales[clave] = totales.get(clave, Decimal("0")) + Decimal(str(monto))
+
+    for concepto_id, compania_id, cuenta_id in sorted(totales, key=lambda c: (c[0] > 51, c)):
+        yield [
+            "tesoreria" if concepto_id <= 51 else "pagaduria",
+            concepto_id,
+            conceptos.get(concepto_id, ""),
+            companias.get(compania_id, ""),
+            cuentas.get(cuenta_id, ""),
+            totales[(concepto_id, compania_id, cuenta_id)],
+        ]
+
+
+def filas_auditoria(db: Session, filtros: dict, incluir_valores: bool = False) -> Iterator[List]:
+    """Registros de auditoría con los mismos filtros del listado, del más reciente al más antiguo"""
+    query = AuditoriaService.filtrar_registros(db.query(RegistroAuditoria), **filtros)
+    for r in query.order_by(RegistroAuditoria.fecha_hora.desc(), RegistroAuditoria.id.desc()).yield_per(TAMANO_LOTE):
+        fila = [
+            r.fecha_hora, r.usuario_nombre, r.usuario_email, r.accion, r.modulo, r.entidad, r.entidad_id or "",
+            r.descripcion, r.resultado, r.ip_address, r.endpoint or "", r.duracion_ms,
+        ]
+        if incluir_valores:
+            fila += [
+                json.dumps(r.valores_anteriores, ensure_ascii=False, default=str) if r.valores_anteriores else "",
+                json.dumps(r.valores_nuevos, ensure_ascii=False, default=str) if r.valores_nuevos else "",
+            ]
+        yield fila
+
+
+def encabezados_auditoria(incluir_valores: bool) -> List[str]:
+    if incluir_valores:
+        return ENCABEZADOS_AUDITORIA + ["Valores anteriores", "Valores nuevos"]
+    return ENCABEZADOS_AUDITORIA
@@ -6,14 +6,16 @@ from datetime import date, datetime, timedelta
 from typing import Dict, List, Tuple, Optional
 from decimal import Decimal
 import re
+import time
 
-from openpyxl import load_workbook
 from sqlalchemy.orm import Session
 
 from app.models.transacciones_flujo_caja import TransaccionFlujoCaja, AreaTransaccion
 from app.models.conceptos_flujo_caja import ConceptoFlujoCaja
 from app.models.cuentas_bancarias import CuentaBancaria
 from app.models.trm import TRM
+from app.core.metricas import registrar_importacion
+from app.services.cierre_dia_service import CierreDiaService, compania_de
 
 
 class ImportadorSaldosResult:
@@ -60,6 +62,8 @@ class ImportadorSaldosService:
         logger = logging.getLogger(__name__)
         logger.info(f"=== PARSE MULTI-HOJA: Buscando '{etiqueta_fila_objetivo}' ===")
         
+        from openpyxl import load_workbook  # Diferido: solo se carga al importar un Excel
+
         wb = load_workbook(io.BytesIO(xls_bytes), data_only=True)
         logger.info(f"Excel abierto con {len(wb.sheetnames)} hojas: {wb.sheetnames[:5]}...")
         
@@ -201,6 +205,7 @@ class ImportadorSaldosService:
         archivo_excel: bytes,
         usuario_id: int = 1
     ) -> Dict:
+        inicio = time.perf_counter()
         resultado = ImportadorSaldosResult()
         resultado.tipo_carga = tipo_carga
         resultado.mes = mes
@@ -262,6 +267,7 @@ class ImportadorSaldosService:
         cuentas_bancarias = db.query(CuentaBancaria).all()
         cuentas_map: Dict[str, CuentaBancaria] = {c.numero_cuenta: c for c in cuentas_bancarias if c.numero_cuenta}
         logger.info(f"Total cuentas en BD: {len(cuentas_map)}")
+        cierre = CierreDiaService(db)
 
         for dia_trabajo in dias_a_procesar:
             trm_valor = ImportadorSaldosService._obtener_trm(db, dia_trabajo)
@@ -275,6 +281,9 @@ class ImportadorSaldosService:
             
             mapa_valores, usd_flags = datos_por_fecha[dia_trabajo]
             logger.info(f"Día {dia_trabajo}: procesando {len(mapa_valores)} cuentas")
+            cerradas = cierre.companias_cerradas(dia_trabajo)
+            for compania_cerrada in sorted(cerradas):
+                resultado.errores.append(f"{dia_trabajo}: día cerrado para la compañía {compania_cerrada}, sus cuentas se omitieron")
             
             for numero_cuenta, valor in mapa_valores.items():
                 cuenta = cuentas_map.get(numero_cuenta)
@@ -282,6 +291,8 @@ class ImportadorSaldosService:
                     if numero_cuenta not in resultado.cuentas_sin_match:
                         resultado.cuentas_sin_match.append(numero_cuenta)
                     continue
+                if compania_de(cuenta.compania_id) in cerradas:
+                    continue
                 
                 es_usd = usd_flags.get(numero_cuenta, False)
                 monto_insertar = valor * trm_valor / 1000 if es_usd else valor
@@ -343,4 +354,5 @@ class ImportadorSaldosService:
         resultado.cuentas_procesadas = resultado.cuentas_tesoreria + resultado.cuentas_pagaduria
         
         db.commit()
+        registrar_importacion("saldos_excel", resultado.cuentas_procesadas, inicio)
         return resultado.to_dict()
@@ -1,9 +1,12 @@
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Set
 import logging
 from datetime import datetime
 
+from ..core.bloqueos_recalculo import bloqueos_recalculo, BloqueoNoDisponibleError
+from ..core.metricas import recalculos_pendientes
+
 logger = logging.getLogger(__name__)
 
 class OptimizedTransactionService:
@@ -12,6 +15,33 @@ class OptimizedTransactionService:
     def __init__(self):
         self.executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="transaction_deps")
     
+    async def _en_pool(self, fn, *args):
+        """Ejecuta `fn` en el pool del servicio; mientras espera o corre cuenta como recálculo pendiente"""
+        recalculos_pendientes.inc()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            recalculos_pendientes.dec()
+    
+    def _recalcular_dependencias(self, fecha, concepto_id: int, cuenta_id: int, user_id: int) -> int:
+        """Recálculo completo de una (fecha, cuenta) en un hilo del pool, con su propia sesión"""
+        from ..services.dependencias_flujo_caja_service import DependenciasFlujoCajaService
+        from ..core.database import session_scope
+        
+        with session_scope() as db:
+            dependencias_service = DependenciasFlujoCajaService(db)
+            resultados = dependencias_service.procesar_dependencias_completas_ambos_dashboards(
+                fecha=fecha,
+                concepto_modificado_id=concepto_id,
+                cuenta_id=cuenta_id,
+                usuario_id=user_id
+            )
+            return (
+                len(resultados.get("tesoreria", [])) + 
+                len(resultados.get("pagaduria", [])) + 
+                len(resultados.get("cross_dashboard", []))
+            )
+    
     async def procesar_dependencias_async(
         self,
         fecha,
@@ -20,58 +50,138 @@ class OptimizedTransactionService:
         user_id: int,
         db_session
     ):
-        """Procesa dependencias de forma asíncrona"""
+        """
+        Procesa dependencias de forma asíncrona.
+        
+        El recálculo corre en el pool del servicio bajo el bloqueo de (fecha, cuenta):
+        días distintos avanzan en paralelo y las ediciones repetidas del mismo día se
+        agrupan en un solo recálculo pendiente.
+        """
         try:
             # Usar un pequeño delay para permitir que la respuesta HTTP se envíe primero
             await asyncio.sleep(0.1)
             
             logger.info(f"� ASYNC: Procesando dependencias para concepto {concepto_id}")
             
-            # Importación dinámica para evitar dependencias circulares
-            from ..services.dependencias_flujo_caja_service import DependenciasFlujoCajaService
-            
-            # Crear nueva sesión de DB para el hilo de fondo
-            from ..core.database import get_db
-            db = next(get_db())
+            total_updates = await self._en_pool(
+                bloqueos_recalculo.ejecutar_unico,
+                "dependencias",
+                fecha,
+                cuenta_id,
+                lambda: self._recalcular_dependencias(fecha, concepto_id, cuenta_id, user_id)
+            )
+            if total_updates is None:
+                # Otro recálculo de la misma (fecha, cuenta) ya estaba en cola y cubre este cambio
+                return
+                
+            logger.info(f"✅ ASYNC: {total_updates} dependencias procesadas correctamente")
             
+            # Notificación WebSocket opcional (la conexión ya volvió al pool)
             try:
-                dependencias_service = DependenciasFlujoCajaService(db)
-                resultados = dependencias_service.procesar_dependencias_completas_ambos_dashboards(
-                    fecha=fecha,
-                    concepto_modificado_id=concepto_id,
-                    cuenta_id=cuenta_id,
-                    compania_id=1,
-                    usuario_id=user_id
-                )
-                
-                total_updates = (
-                    len(resultados.get("tesoreria", [])) + 
-                    len(resultados.get("pagaduria", [])) + 
-                    len(resultados.get("cross_dashboard", []))
-                )
-                
-                logger.info(f"✅ ASYNC: {total_updates} dependencias procesadas correctamente")
-                
-                # Notificación WebSocket opcional
-                try:
-                    from ..core.websocket import websocket_manager
-                    await websocket_manager.broadcast_update({
-                        "type": "dependencias_procesadas",
-                        "concepto_id": concepto_id,
-                        "fecha": fecha.isoformat() if hasattr(fecha, 'isoformat') else str(fecha),
-                        "total_actualizaciones": total_updates,
-                        "timestamp": datetime.now().isoformat()
-                    })
-                except Exception as ws_error:
-                    logger.warning(f"⚠️ Error en notificación WebSocket: {ws_error}")
-                
-            finally:
-                db.close()
-                
+                from ..core.websocket import websocket_manager
+                await websocket_manager.broadcast_update({
+                    "type": "dependencias_procesadas",
+                    "concepto_id": concepto_id,
+                    "cuenta_id": cuenta_id,
+                    "fecha": fecha.isoformat() if hasattr(fecha, 'isoformat') else str(fecha),
+                    "total_actualizaciones": total_updates,
+                    "timestamp": datetime.now().isoformat()
+                })
+            except Exception as ws_error:
+                logger.warning(f"⚠️ Error en notificación WebSocket: {ws_error}")
+
         except Exception as e:
             logger.error(f"❌ Error en procesamiento asíncrono de dependencias: {e}")
             import traceback
             logger.error(f"❌ Traceback: {traceback.format_exc()}")
 
+    def _recalcular_lote(
+        self,
+        fecha,
+        cuentas_afectadas: Dict[Optional[int], Set[int]],
+        user_id: int,
+        compania_id: Optional[int] = None
+    ) -> int:
+        """Recalcula cada cuenta del lote bajo su bloqueo de (fecha, cuenta)"""
+        from ..services.dependencias_flujo_caja_service import DependenciasFlujoCajaService
+        from ..services.cierre_dia_service import CierreDiaService
+        from ..core.database import session_scope
+        
+        total_updates = 0
+        with session_scope() as db:
+            dependencias_service = DependenciasFlujoCajaService(db)
+            cierre = CierreDiaService(db)
+            for cuenta_id, conceptos in cuentas_afectadas.items():
+                # Cada cuenta se recalcula en la partición de su compañía (sin cuenta: el motor decide por cuenta)
+                compania_cuenta = cierre.compania_de_cuenta(cuenta_id, compania_id)
+                if cuenta_id is not None and cierre.dia_cerrado(fecha, compania_cuenta):
+                    logger.info(f"🔒 ASYNC LOTE: {fecha} cerrado para compañía {compania_cuenta}; se omite la cuenta {cuenta_id}")
+                    continue
+                try:
+                    with bloqueos_recalculo.bloquear(fecha, cuenta_id, db.get_bind()):
+                        if cuenta_id is not None:
+                            # Recálculos directos antes de subtotales (mismo orden que la creación individual)
+                            if conceptos & {1, 2, 3}:
+                                dependencias_service.recalcular_saldo_neto_inicial_pagaduria(
+                                    fecha=fecha, cuenta_id=cuenta_id, usuario_id=user_id, compania_id=compania_cuenta
+                                )
+                            dependencias_service.recalcular_gmf(
+                                fecha=fecha, cuenta_id=cuenta_id, usuario_id=user_id, compania_id=compania_cuenta
+                            )
+                            dependencias_service.recalcular_cuatro_por_mil(
+                                fecha=fecha, cuenta_id=cuenta_id, usuario_id=user_id, compania_id=compania_cuenta
+                            )
+                            db.commit()
+                        
+                        resultados = dependencias_service.procesar_dependencias_completas_ambos_dashboards(
+                            fecha=fecha,
+                            concepto_modificado_id=min(conceptos),
+                            cuenta_id=cuenta_id,
+                            compania_id=compania_cuenta,
+                            usuario_id=user_id
+                        )
+                except BloqueoNoDisponibleError as e:
+                    logger.warning(f"⏳ ASYNC LOTE: {e}; se omite la cuenta {cuenta_id}")
+                    continue
+                total_updates += (
+                    len(resultados.get("tesoreria", [])) +
+                    len(resultados.get("pagaduria", [])) +
+                    len(resultados.get("cross_dashboard", []))
+                )
+        return total_updates
+
+    async def procesar_lote_async(
+        self,
+        fecha,
+        cuentas_afectadas: Dict[Optional[int], Set[int]],
+        user_id: int,
+        compania_id: Optional[int] = None
+    ):
+        """Recalcula una sola vez cada (fecha, cuenta) afectada por un lote de ediciones"""
+        try:
+            await asyncio.sleep(0.1)
+            
+            total_updates = await self._en_pool(
+                self._recalcular_lote, fecha, cuentas_afectadas, user_id, compania_id
+            )
+            
+            logger.info(f"✅ ASYNC LOTE: {len(cuentas_afectadas)} cuentas recalculadas, {total_updates} dependencias")
+            
+            try:
+                from ..core.websocket import websocket_manager
+                await websocket_manager.broadcast_update({
+                    "type": "dependencias_procesadas",
+                    "fecha": fecha.isoformat() if hasattr(fecha, 'isoformat') else str(fecha),
+                    "cuentas": sorted(c for c in cuentas_afectadas if c is not None),
+                    "total_actualizaciones": total_updates,
+                    "lote": True,
+                    "timestamp": datetime.now().isoformat()
+                })
+            except Exception as ws_error:
+                logger.warning(f"⚠️ Error en notificación WebSocket: {ws_error}")
+        
+        except Exception as e:
+            logger.error(f"❌ Error en recálculo asíncrono del lote: {e}")
+
 # Instancia global del servicio optimizado
 optimized_service = OptimizedTransactionService()
\ No newline at end of file
@@ -0,0 +1,288 @@
+"""
+Particionado mensual de transacciones_flujo_caja (MySQL, PARTITION BY RANGE (TO_DAYS(fecha))).
+
+Cada mes vive en su propia partición (p202503 = marzo de 2025) y `pmax` recibe lo que
+caiga más allá de la última. Las consultas del dashboard y del recálculo filtran por
+fecha y MySQL solo lee las particiones de esos meses; los informes sobre meses viejos
+siguen funcionando igual porque la tabla es una sola. No se borra ni se mueve historia.
+
+Restricciones de MySQL que impone el particionado (las resuelve la migración
+scripts/migrations/particionar_transacciones_flujo_caja.py):
+- toda clave única, incluida la PK, debe contener `fecha`: la PK pasa a (id, fecha);
+- una tabla particionada no admite llaves foráneas (ni propias ni que la referencien):
+  se eliminan y el ON DELETE de cada una se reemplaza por un trigger generado a partir
+  de la llave encontrada (CASCADE, SET NULL o RESTRICT/NO ACTION). Solo se reemplaza el
+  borrado: las inserciones dejan de validarse contra la tabla padre.
+
+Pérdida conocida: las autorreferencias (p. ej. `transaccion_origen_id -> id ON DELETE
+SET NULL`) no tienen reemplazo, porque un trigger de MySQL no puede modificar la tabla
+sobre la que se dispara. Tras la migración, borrar una transacción deja colgando las
+filas que la referencian. La aplicación no escribe `transaccion_origen_id` (no está en
+el modelo), así que la columna solo conserva valores históricos.
+
+El mantenimiento mensual (scripts/maintenance/rotar_particiones.py) divide `pmax`
+para que siempre existan las particiones de los próximos meses.
+"""
+
+import logging
+import re
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+TABLA = "transacciones_flujo_caja"
+PARTICION_MAX = "pmax"
+_NOMBRE = re.compile(r"^p(\d{4})(\d{2})$")
+
+
+
+@dataclass
+class LlaveForanea:
+    """Llave foránea leída de information_schema (una o varias columnas)"""
+
+    tabla: str
+    nombre: str
+    tabla_padre: str
+    regla_borrado: str
+    columnas: List[str] = field(default_factory=list)
+    columnas_padre: List[str] = field(default_factory=list)
+
+    @property
+    def autorreferencia(self) -> bool:
+        return self.tabla == self.tabla_padre
+
+
+def inicio_mes(fecha: date) -> date:
+    return fecha.replace(day=1)
+
+
+def mes_siguiente(mes: date) -> date:
+    return date(mes.year + 1, 1, 1) if mes.month == 12 else date(mes.year, mes.month + 1, 1)
+
+
+def meses(desde: date, hasta: date) -> List[date]:
+    """Primer día de cada mes entre `desde` y `hasta` (ambos incluidos)"""
+    resultado, mes = [], inicio_mes(desde)
+    while mes <= inicio_mes(hasta):
+        resultado.append(mes)
+        mes = mes_siguiente(mes)
+    return resultado
+
+
+def sumar_meses(fecha: date, n: int) -> date:
+    total = fecha.year * 12 + fecha.month - 1 + n
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def nombre_particion(mes: date) -> str:
+    return f"p{mes.year:04d}{mes.month:02d}"
+
+
+def mes_de_particion(nombre: str) -> Optional[date]:
+    """Mes de una partición mensual (None para pmax u otros nombres)"""
+    coincidencia = _NOMBRE.match(nombre or "")
+    return date(int(coincidencia.group(1)), int(coincidencia.group(2)), 1) if coincidencia else None
+
+
+def definicion_particion(mes: date) -> str:
+    return f"PARTITION {nombre_particion(mes)} VALUES LESS THAN (TO_DAYS('{mes_siguiente(mes).isoformat()}'))"
+
+
+def _definiciones(lista_meses: Iterable[date]) -> str:
+    return ",\n    ".join(
+        [definicion_particion(mes) for mes in lista_meses] + [f"PARTITION {PARTICION_MAX} VALUES LESS THAN MAXVALUE"]
+    )
+
+
+def sql_particionar(lista_meses: List[date]) -> str:
+    """
+    PK (id, fecha) y particiones iniciales en una sola reconstrucción de la tabla.
+    El modelo TransaccionFlujoCaja usa la misma identidad, así sus UPDATE/DELETE podan particiones.
+    """
+    return (
+        f"ALTER TABLE {TABLA}\n"
+        f"    DROP PRIMARY KEY, ADD PRIMARY KEY (id, fecha)\n"
+        f"PARTITION BY RANGE (TO_DAYS(fecha)) (\n    {_definiciones(lista_meses)}\n)"
+    )
+
+
+def sql_reorganizar(meses_nuevos: List[date]) -> str:
+    """Divide pmax en los meses nuevos; pmax suele estar vacía, así que no mueve filas"""
+    return (
+        f"ALTER TABLE {TABLA} REORGANIZE PARTITION {PARTICION_MAX} INTO (\n    {_definiciones(meses_nuevos)}\n)"
+    )
+
+
+def trigger_integridad(llave: LlaveForanea) -> Optional[Tuple[str, str]]:
+    """
+    (nombre, CREATE TRIGGER) que reemplaza el ON DELETE de la llave sobre su tabla padre.
+    None para autorreferencias: MySQL no deja que un trigger modifique su propia tabla.
+    """
+    if llave.autorreferencia:
+        return None
+    nombre = f"trg_{llave.nombre}_borrar"[:64]
+    condicion = " AND ".join(
+        f"`{columna}` = OLD.`{padre}`" for columna, padre in zip(llave.columnas, llave.columnas_padre)
+    )
+    regla = llave.regla_borrado.upper()
+    if regla == "CASCADE":
+        momento, cuerpo = "AFTER", f"DELETE FROM `{llave.tabla}` WHERE {condicion}"
+    elif regla == "SET NULL":
+        nulos = ", ".join(f"`{columna}` = NULL" for columna in llave.columnas)
+        momento, cuerpo = "AFTER", f"UPDATE `{llave.tabla}` SET {nulos} WHERE {condicion}"
+    else:
+        # RESTRICT / NO ACTION: rechazar el borrado del padre si aún hay filas que lo referencian
+        momento, cuerpo = "BEFORE", (
+            f"BEGIN IF EXISTS (SELECT 1 FROM `{llave.tabla}` WHERE {condicion}) THEN "
+            f"SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Fila referenciada desde {llave.tabla} ({llave.nombre})'; "
+            f"END IF; END"
+        )
+    return nombre, f"CREATE TRIGGER `{nombre}` {momento} DELETE ON `{llave.tabla_padre}` FOR EACH ROW {cuerpo}"
+
+
+def meses_faltantes(existentes: Iterable[str], hasta: date) -> List[date]:
+    """Meses posteriores a la última partición mensual existente, hasta `hasta` inclusive"""
+    meses_existentes = [m for m in (mes_de_particion(nombre) for nombre in existentes) if m]
+    if not meses_existentes:
+        return []
+    return meses(mes_siguiente(max(meses_existentes)), hasta)
+
+
+class ParticionesMensualesService:
+    """Consulta, migración inicial y rotación de las particiones mensuales"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def disponible(self) -> bool:
+        return self.db.get_bind().dialect.name == "mysql"
+
+    def particiones(self) -> List[dict]:
+        """Particiones actuales en orden, con filas estimadas por InnoDB (vacío si no está particionada)"""
+        if not self.disponible():
+            return []
+        filas = self.db.execute(text(
+            "SELECT PARTITION_NAME, TABLE_ROWS FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :tabla AND PARTITION_NAME IS NOT NULL "
+            "ORDER BY PARTITION_ORDINAL_POSITION"
+        ), {"tabla": TABLA}).all()
+        return [
+            {"nombre": nombre, "mes": mes_de_particion(nombre), "filas_estimadas": int(filas_tabla or 0)}
+            for nombre, filas_tabla in filas
+        ]
+
+    # ------------------------------------------------------------------
+    # Migración inicial
+    # ------------------------------------------------------------------
+
+    def plan_migracion(self, hoy: Optional[date] = None, meses_adelante: Optional[int] = None) -> List[str]:
+        """
+        Sentencias para particionar la tabla: quitar llaves foráneas, crear un trigger por
+        cada una según su regla ON DELETE y reconstruir con PK (id, fecha) y un mes por
+        partición desde la primera fecha con datos hasta `meses_adelante` meses después
+        de hoy. Las autorreferencias se eliminan sin reemplazo (ver `llaves_sin_reemplazo`).
+        """
+        if not self.disponible():
+            raise ValueError("El particionado mensual solo está soportado en MySQL")
+        if self.particiones():
+            raise ValueError(f"{TABLA} ya está particionada; use la rotación mensual")
+
+        unicas_sin_fecha = self._claves_unicas_sin_fecha()
+        if unicas_sin_fecha:
+            raise ValueError(
+                f"Las claves únicas {', '.join(unicas_sin_fecha)} no incluyen 'fecha'; "
+                "MySQL no permite particionar la tabla hasta agregarla"
+            )
+
+        hoy = hoy or date.today()
+        meses_adelante = settings.particiones_meses_adelante if meses_adelante is None else meses_adelante
+        primera = self.db.execute(text(f"SELECT MIN(fecha) FROM {TABLA}")).scalar() or hoy
+        llaves = self._llaves_foraneas()
+        sentencias = [f"ALTER TABLE `{llave.tabla}` DROP FOREIGN KEY `{llave.nombre}`" for llave in llaves]
+        for llave in llaves:
+            trigger = trigger_integridad(llave)
+            if trigger is None:
+                logger.warning(
+                    f"⚠️ {llave.nombre} ({llave.tabla}.{', '.join(llave.columnas)} ON DELETE {llave.regla_borrado}) "
+                    "es una autorreferencia: se elimina sin reemplazo"
+                )
+                continue
+            nombre, crear = trigger
+            sentencias.append(f"DROP TRIGGER IF EXISTS `{nombre}`")
+            sentencias.append(crear)
+        sentencias.append(sql_particionar(meses(primera, sumar_meses(hoy, meses_adelante))))
+        return sentencias
+
+    def llaves_sin_reemplazo(self) -> List[LlaveForanea]:
+        """Llaves que la migración elimina sin trigger equivalente (autorreferencias)"""
+        if not self.disponible():
+            return []
+        return [llave for llave in self._llaves_foraneas() if trigger_integridad(llave) is None]
+
+    def _llaves_foraneas(self) -> List[LlaveForanea]:
+        """Llaves foráneas de la tabla y de las que la referencian, con columnas y regla ON DELETE"""
+        filas = self.db.execute(text(
+            "SELECT rc.TABLE_NAME, rc.CONSTRAINT_NAME, rc.REFERENCED_TABLE_NAME, rc.DELETE_RULE, "
+            "k.COLUMN_NAME, k.REFERENCED_COLUMN_NAME "
+            "FROM information_schema.REFERENTIAL_CONSTRAINTS rc "
+            "JOIN information_schema.KEY_COLUMN_USAGE k ON k.CONSTRAINT_SCHEMA = rc.CONSTRAINT_SCHEMA "
+            "AND k.TABLE_NAME = rc.TABLE_NAME AND k.CONSTRAINT_NAME = rc.CONSTRAINT_NAME "
+            "WHERE rc.CONSTRAINT_SCHEMA = DATABASE() AND (rc.TABLE_NAME = :tabla OR rc.REFERENCED_TABLE_NAME = :tabla) "
+            "ORDER BY rc.TABLE_NAME, rc.CONSTRAINT_NAME, k.ORDINAL_POSITION"
+        ), {"tabla": TABLA}).all()
+        llaves = {}
+        for tabla, nombre, tabla_padre, regla, columna, columna_padre in filas:
+            llave = llaves.setdefault((tabla, nombre), LlaveForanea(tabla, nombre, tabla_padre, regla))
+            llave.columnas.append(columna)
+            llave.columnas_padre.append(columna_padre)
+        return list(llaves.values())
+
+    def _claves_unicas_sin_fecha(self) -> List[str]:
+        filas = self.db.execute(text(
+            "SELECT INDEX_NAME, SUM(COLUMN_NAME = 'fecha') FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :tabla AND NON_UNIQUE = 0 "
+            "AND INDEX_NAME <> 'PRIMARY' GROUP BY INDEX_NAME"
+        ), {"tabla": TABLA}).all()
+        return [nombre for nombre, con_fecha in filas if not con_fecha]
+
+    # ------------------------------------------------------------------
+    # Rotación mensual
+    # ------------------------------------------------------------------
+
+    def rotar(self, hoy: Optional[date] = None, meses_adelante: Optional[int] = None, aplicar: bool = True) -> dict:
+        """
+        Garantiza particiones hasta `meses_adelante` meses después de hoy. Idempotente:
+        si ya existen no ejecuta DDL. Con aplicar=False solo devuelve la sentencia.
+        """
+        hoy = hoy or date.today()
+        meses_adelante = settings.particiones_meses_adelante if meses_adelante is None else meses_adelante
+        if not self.disponible():
+            return {"particionada": False, "motivo": "solo MySQL", "creadas": [], "sentencia": None}
+        actuales = self.particiones()
+        if not actuales:
+            logger.warning(f"⚠️ {TABLA} no está particionada; ejecute la migración de particionado")
+            return {"particionada": False, "motivo": "tabla sin particionar", "creadas": [], "sentencia": None}
+
+        nuevas = meses_faltantes([p["nombre"] for p in actuales], sumar_meses(hoy, meses_adelante))
+        sentencia = sql_reorganizar(nuevas) if nuevas else None
+        if sentencia and aplicar:
+            filas_pmax = next((p["filas_estimadas"] for p in actuales if p["nombre"] == PARTICION_MAX), 0)
+            if filas_pmax:
+                logger.warning(f"⚠️ {PARTICION_MAX} tiene ~{filas_pmax} filas: la rotación las redistribuye")
+            self.db.execute(text(sentencia))
+            logger.info(f"🗂️ Particiones creadas en {TABLA}: {', '.join(nombre_particion(m) for m in nuevas)}")
+        return {
+            "particionada": True,
+            "creadas": [nombre_particion(m) for m in nuevas],
+            "aplicada": bool(sentencia and aplicar),
+            "sentencia": sentencia,
+            "particiones": len(actuales) + len(nuevas),
+        }
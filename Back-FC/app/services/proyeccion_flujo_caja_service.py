@@ -0,0 +1,485 @@
+"""
+Proyección de saldos hacia adelante, calculada en memoria.
+
+A partir de una fecha y un horizonte en días hábiles se cargan de una vez las transacciones
+de las cuentas, los festivos, las configuraciones GMF / 4x1000 y los días cerrados del rango;
+luego se ruedan los saldos día a día con las mismas reglas del motor de recálculo
+(DependenciasFlujoCajaService) sin una consulta por celda. La grilla resultante no se guarda
+salvo que se confirme; al confirmar se escriben en lote solo las celdas calculadas que cambian.
+"""
+
+import json
+import logging
+from collections import defaultdict
+from contextlib import ExitStack
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.core.bloqueos_recalculo import bloqueos_recalculo
+from app.core.catalogo_cache import catalogo_cache
+from app.models.conceptos_flujo_caja import AreaConcepto, ConceptoFlujoCaja, TipoDependencia
+from app.models.cuatro_por_mil_config import CuatroPorMilConfig
+from app.models.cuentas_bancarias import CuentaBancaria
+from app.models.dias_festivos import DiaFestivo
+from app.models.gmf_config import GMFConfig
+from app.models.snapshot_dia import SnapshotDiaCerrado
+from app.models.transaccion_historial import ultimo_cambio
+from app.models.transacciones_flujo_caja import AreaTransaccion, TransaccionFlujoCaja
+from app.services.cierre_dia_service import CierreDiaService, compania_de
+from app.services.dependencias_flujo_caja_service import DependenciasFlujoCajaService, _mismo_monto
+
+logger = logging.getLogger(__name__)
+
+TESORERIA = AreaTransaccion.tesoreria
+PAGADURIA = AreaTransaccion.pagaduria
+CERO = Decimal("0.00")
+CENTAVO = Decimal("0.01")
+
+# Conceptos fijos del motor de recálculo
+SALDO_INICIAL = 1
+CONSUMO = 2
+SALDO_NETO_INICIAL = 4
+CONCEPTOS_SALDO_NETO = (1, 2, 3)
+SUBTOTAL_TESORERIA = 50
+SALDO_FINAL_CUENTAS = 51
+DIFERENCIA_SALDOS = 52
+SALDO_CONTABLE = 53
+SALDO_DIA_ANTERIOR = 54
+CONCEPTOS_MOVIMIENTO_PAGADURIA = range(55, 82)
+SUBTOTAL_MOVIMIENTO_PAGADURIA = 82
+SUBTOTAL_SALDO_INICIAL_PAGADURIA = 83
+MOVIMIENTO_TESORERIA = 84
+SALDO_TOTAL_BANCOS = 85
+
+# Unos tres meses de días hábiles
+MAX_HORIZONTE = 66
+
+Celdas = Dict[Tuple[AreaTransaccion, int], Decimal]
+# (fecha, cuenta_id) → {(área, concepto_id): monto}; None elimina la celda
+Ajustes = Dict[Tuple[date, int], Dict[Tuple[AreaTransaccion, int], Optional[Decimal]]]
+
+
+class ProyeccionObsoletaError(ValueError):
+    """
+    Otra sesión modificó celdas de la proyección mientras se confirmaba.
+
+    `cuentas_por_fecha` lleva los días anteriores que ya quedaron confirmados (fecha ISO -> cuentas).
+    """
+
+    def __init__(self, fecha: date, cuentas_por_fecha: Optional[Dict[str, List[int]]] = None):
+        super().__init__(
+            f"Las transacciones del {fecha.isoformat()} cambiaron mientras se confirmaba la proyección; "
+            "vuelva a calcularla"
+        )
+        self.fecha = fecha
+        self.cuentas_por_fecha = cuentas_por_fecha or {}
+
+
+@dataclass
+class BaseProyeccion:
+    """Datos cargados para un rango; solo lectura durante las evaluaciones"""
+    fechas: List[date]
+    cuentas: List[Tuple[int, int]]  # (cuenta_id, compania_id)
+    contexto: dict
+
+
+@dataclass
+class _Escritura:
+    fecha: date
+    cuenta_id: int
+    compania_id: int
+    area: AreaTransaccion
+    concepto_id: int
+    monto: Decimal
+    existente: Optional[TransaccionFlujoCaja]
+
+
+def _centavos(valor: Decimal) -> Decimal:
+    return Decimal(valor).quantize(CENTAVO, rounding=ROUND_HALF_UP)
+
+
+def _ids_configurados(texto: Optional[str]) -> Optional[List[int]]:
+    """IDs de `conceptos_seleccionados` (lista de enteros o de dicts con 'id'); None si no se puede leer"""
+    if not texto:
+        return None
+    try:
+        crudo = json.loads(texto)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(crudo, list):
+        return None
+    ids = []
+    for elemento in crudo:
+        try:
+            ids.append(int(elemento["id"] if isinstance(elemento, dict) else elemento))
+        except (KeyError, TypeError, ValueError):
+            continue
+    return ids
+
+
+def _vigente(configs: list, fecha: date):
+    """Config más reciente con fecha_vigencia_desde <= fecha (`configs` ordenadas por vigencia)"""
+    vigente = None
+    for config in configs:
+        if config.fecha_vigencia_desde is not None and config.fecha_vigencia_desde > fecha:
+            break
+        vigente = config
+    return vigente
+
+
+class ProyeccionFlujoCajaService:
+    """Rueda los saldos de varias cuentas sobre un horizonte de días hábiles sin tocar la base"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
+    def proyectar(
+        self,
+        fecha_inicio: date,
+        horizonte: int,
+        cuenta_id: Optional[int] = None,
+        compania_id: Optional[int] = None
+    ) -> dict:
+        """Grilla proyectada por cuenta y día hábil; no escribe nada"""
+        resultado, _ = self.evaluar(self.cargar_base(fecha_inicio, horizonte, cuenta_id, compania_id))
+        return resultado
+
+    def confirmar(
+        self,
+        fecha_inicio: date,
+        horizonte: int,
+        usuario_id: int,
+        cuenta_id: Optional[int] = None,
+        compania_id: Optional[int] = None
+    ) -> dict:
+        """
+        Calcula la proyección y escribe las celdas calculadas que difieren de lo almacenado.
+
+        Cada día se escribe con los bloqueos de recálculo de sus cuentas tomados (en orden de
+        cuenta) y en su propio commit, en orden cronológico. Los días cerrados no se tocan.
+        Si otra sesión cambió una fila leída, se deshace ese día y se lanza ProyeccionObsoletaError
+        con los días anteriores, que ya quedaron confirmados.
+        """
+        resultado, escrituras = self.evaluar(self.cargar_base(fecha_inicio, horizonte, cuenta_id, compania_id))
+        por_fecha: Dict[date, List[_Escritura]] = defaultdict(list)
+        for escritura in escrituras:
+            por_fecha[escritura.fecha].append(escritura)
+
+        bind = self.db.get_bind()
+        cierre = CierreDiaService(self.db)
+        escritas = creadas = 0
+        fechas_escritas = {}
+        for fecha in sorted(por_fecha):
+            pendientes = por_fecha[fecha]
+            cuentas = sorted({e.cuenta_id for e in pendientes})
+            try:
+                with ExitStack() as bloqueos:
+                    for cuenta in cuentas:
+                        bloqueos.enter_context(bloqueos_recalculo.bloquear(fecha, cuenta, bind))
+                    # Un cierre pudo ocurrir después de leer: se revisa con los bloqueos tomados
+                    cerradas = cierre.companias_cerradas(fecha)
+                    nuevas = []
+                    tocadas: Set[int] = set()
+                    for e in pendientes:
+                        if e.compania_id in cerradas:
+                            continue
+                        if e.existente is None:
+                            nuevas.append(TransaccionFlujoCaja(
+                                fecha=e.fecha,
+                                concepto_id=e.concepto_id,
+                                cuenta_id=e.cuenta_id,
+                                compania_id=e.compania_id,
+                                monto=e.monto,
+                                descripcion="Proyección confirmada",
+                                usuario_id=usuario_id,
+                                area=e.area,
+                                auditoria=ultimo_cambio("proyeccion_confirmada", usuario_id)
+                            ))
+                        else:
+                            e.existente.monto = e.monto
+                            e.existente.descripcion = "Proyección confirmada"
+                            e.existente.auditoria = ultimo_cambio("proyeccion_confirmada", usuario_id)
+                        tocadas.add(e.cuenta_id)
+                    self.db.add_all(nuevas)
+                    self.db.commit()
+            except StaleDataError:
+                self.db.rollback()
+                raise ProyeccionObsoletaError(fecha, fechas_escritas)
+            if tocadas:
+                escritas += sum(1 for e in pendientes if e.compania_id not in cerradas)
+                creadas += len(nuevas)
+                fechas_escritas[fecha.isoformat()] = sorted(tocadas)
+
+        logger.info(
+            f"💾 Proyección confirmada desde {resultado['fechas'][0] if resultado['fechas'] else fecha_inicio}: "
+            f"{escritas} celdas ({creadas} nuevas) en {len(fechas_escritas)} días"
+        )
+        resultado["persistida"] = True
+        resultado["celdas_escritas"] = escritas
+        resultado["celdas_creadas"] = creadas
+        resultado["cuentas_por_fecha"] = fechas_escritas
+        return resultado
+
+    # ------------------------------------------------------------------
+    # Carga y cálculo
+    # ------------------------------------------------------------------
+
+    def dias_habiles(self, fecha_inicio: date, cantidad: int) -> List[date]:
+        """Los `cantidad` días hábiles desde `fecha_inicio` (incluida si es hábil), con los festivos cargados por ventanas"""
+        fechas: List[date] = []
+        festivos: Set[date] = set()
+        actual = fecha_inicio
+        cargado_hasta = fecha_inicio - timedelta(days=1)
+        while len(fechas) < cantidad:
+            if actual > cargado_hasta:
+                cargado_hasta = actual + timedelta(days=cantidad * 2 + 14)
+                festivos.update(f.fecha for f in DiaFestivo.obtener_festivos_rango(actual, cargado_hasta, self.db))
+            if actual.weekday() < 5 and actual not in festivos:
+                fechas.append(actual)
+            actual += timedelta(days=1)
+        return fechas
+
+    def cargar_base(
+        self,
+        fecha_inicio: date,
+        horizonte: int,
+        cuenta_id: Optional[int] = None,
+        compania_id: Optional[int] = None
+    ) -> BaseProyeccion:
+        """Días hábiles, cuentas y datos del rango; se puede evaluar varias veces sin volver a la base"""
+        if horizonte < 1 or horizonte > MAX_HORIZONTE:
+            raise ValueError(f"El horizonte debe estar entre 1 y {MAX_HORIZONTE} días hábiles")
+
+        fechas = self.dias_habiles(fecha_inicio, horizonte)
+        consulta_cuentas = self.db.query(CuentaBancaria.id, CuentaBancaria.compania_id)
+        if cuenta_id is not None:
+            consulta_cuentas = consulta_cuentas.filter(CuentaBancaria.id == cuenta_id)
+        if compania_id is not None:
+            consulta_cuentas = consulta_cuentas.filter(CuentaBancaria.compania_id == compania_id)
+        cuentas = [(c_id, compania_de(c_compania)) for c_id, c_compania in consulta_cuentas.order_by(CuentaBancaria.id)]
+        if cuenta_id is not None and not cuentas:
+            raise LookupError(f"Cuenta {cuenta_id} no encontrada")
+
+        contexto = self._cargar_contexto(fechas, [c_id for c_id, _ in cuentas], {c for _, c in cuentas}) if cuentas else {}
+        return BaseProyeccion(fechas, cuentas, contexto)
+
+    def evaluar(self, base: BaseProyeccion, ajustes: Optional[Ajustes] = None) -> Tuple[dict, List[_Escritura]]:
+        """
+        Aplica las reglas sobre `base` y, si se dan, sobre los `ajustes` superpuestos por
+        (fecha, cuenta). La base no se modifica: cada día se evalúa en una copia de sus celdas.
+        Devuelve la grilla y las celdas calculadas que difieren de lo almacenado.
+        """
+        fechas, contexto = base.fechas, base.contexto
+        ajustes = ajustes or {}
+        resultado = {
+            "fecha_inicio": fechas[0].isoformat(),
+            "horizonte": len(fechas),
+            "fechas": [f.isoformat() for f in fechas],
+            "persistida": False,
+            "celdas_cambiadas": 0,
+            "cuentas": []
+        }
+
+        escrituras: List[_Escritura] = []
+        for c_id, c_compania in base.cuentas:
+            dias = []
+            anterior: Optional[Celdas] = None
+            for indice, fecha in enumerate(fechas):
+                filas = contexto["filas"].get((fecha, c_id), {})
+                celdas: Celdas = {clave: _centavos(t.monto or 0) for clave, t in filas.items()}
+                cerrado = (fecha, c_compania) in contexto["cerradas"]
+                if not cerrado:
+                    for clave, monto in ajustes.get((fecha, c_id), {}).items():
+                        if monto is None:
+                            celdas.pop(clave, None)
+                        else:
+                            celdas[clave] = _centavos(monto)
+                calculadas: Set[Tuple[AreaTransaccion, int]] = set()
+                if not cerrado:
+                    if indice > 0 and anterior is not None:
+                        calculadas |= self._arrastrar(anterior, celdas, contexto)
+                    calculadas |= self._evaluar_dia(celdas, c_id, fecha, contexto)
+                cambios = 0
+                for clave in sorted(calculadas, key=lambda k: (k[0].value, k[1])):
+                    existente = filas.get(clave)
+                    monto = celdas[clave]
+                    if existente is None and monto == CERO:
+                        continue  # Celda ausente y en cero: equivalente, no se crea
+                    if existente is not None and _mismo_monto(existente.monto, monto):
+                        continue
+                    cambios += 1
+                    escrituras.append(_Escritura(fecha, c_id, c_compania, clave[0], clave[1], monto, existente))
+                resultado["celdas_cambiadas"] += cambios
+                dias.append(self._dia_resultado(fecha, cerrado, celdas, cambios))
+                anterior = celdas
+            resultado["cuentas"].append({"cuenta_id": c_id, "compania_id": c_compania, "dias": dias})
+        return resultado, escrituras
+
+    def _cargar_contexto(self, fechas: List[date], ids_cuentas: List[int], companias: Set[int]) -> dict:
+        """Todo lo que necesitan las reglas, en una consulta por tabla"""
+        habiles = set(fechas)
+        filas: Dict[Tuple[date, int], Dict[Tuple[AreaTransaccion, int], TransaccionFlujoCaja]] = defaultdict(dict)
+        for t in self.db.query(TransaccionFlujoCaja).filter(
+            TransaccionFlujoCaja.fecha >= fechas[0],
+            TransaccionFlujoCaja.fecha <= fechas[-1],
+            TransaccionFlujoCaja.cuenta_id.in_(ids_cuentas)
+        ).order_by(TransaccionFlujoCaja.id):
+            if t.fecha in habiles:
+                # Si hay duplicados gana la primera fila, como en las consultas .first() del motor
+                filas[(t.fecha, t.cuenta_id)].setdefault((t.area, t.concepto_id), t)
+
+        gmf: Dict[int, list] = defaultdict(list)
+        for config in self.db.query(GMFConfig).filter(
+            GMFConfig.cuenta_bancaria_id.in_(ids_cuentas), GMFConfig.activo == True
+        ).order_by(GMFConfig.fecha_vigencia_desde, GMFConfig.id):
+            gmf[config.cuenta_bancaria_id].append(config)
+        cuatro_por_mil: Dict[int, list] = defaultdict(list)
+        for config in self.db.query(CuatroPorMilConfig).filter(
+            CuatroPorMilConfig.cuenta_bancaria_id.in_(ids_cuentas), CuatroPorMilConfig.activo == True
+        ).order_by(CuatroPorMilConfig.fecha_vigencia_desde, CuatroPorMilConfig.id):
+            cuatro_por_mil[config.cuenta_bancaria_id].append(config)
+
+        cerradas = set(self.db.query(SnapshotDiaCerrado.fecha, SnapshotDiaCerrado.compania_id).filter(
+            SnapshotDiaCerrado.fecha >= fechas[0],
+            SnapshotDiaCerrado.fecha <= fechas[-1],
+            SnapshotDiaCerrado.compania_id.in_(companias)
+        ).all())
+
+        catalogo = catalogo_cache.conceptos(self.db)
+        concepto_gmf = next((c.id for c in catalogo.values() if c.nombre == "GMF"), None)
+        # Mismos conceptos y orden que _obtener_conceptos_dependientes(tesorería)
+        formulas = self.db.query(ConceptoFlujoCaja).filter(
+            (ConceptoFlujoCaja.depende_de_concepto_id.isnot(None)) | (ConceptoFlujoCaja.formula_dependencia.isnot(None)),
+            ConceptoFlujoCaja.activo == True,
+            ConceptoFlujoCaja.area.in_([AreaConcepto.tesoreria, AreaConcepto.ambas])
+        ).order_by(ConceptoFlujoCaja.id).all()
+        return {
+            "filas": filas,
+            "gmf": gmf,
+            "cuatro_por_mil": cuatro_por_mil,
+            "cerradas": cerradas,
+            "existentes": set(catalogo),
+            "codigos": {c.id: c.codigo for c in catalogo.values()},
+            "concepto_gmf": concepto_gmf,
+            "formulas": formulas,
+        }
+
+    def _arrastrar(self, anterior: Celdas, celdas: Celdas, contexto: dict) -> Set[Tuple[AreaTransaccion, int]]:
+        """51 del día hábil anterior → 1 (tesorería) y 85 → 54 (pagaduría)"""
+        arrastradas = set()
+        for origen, destino in (
+            ((TESORERIA, SALDO_FINAL_CUENTAS), (TESORERIA, SALDO_INICIAL)),
+            ((PAGADURIA, SALDO_TOTAL_BANCOS), (PAGADURIA, SALDO_DIA_ANTERIOR)),
+        ):
+            if origen in anterior and destino[1] in contexto["existentes"]:
+                celdas[destino] = anterior[origen]
+                arrastradas.add(destino)
+        return arrastradas
+
+    def _evaluar_dia(self, celdas: Celdas, cuenta_id: int, fecha: date, contexto: dict) -> Set[Tuple[AreaTransaccion, int]]:
+        """Reglas de una (fecha, cuenta) en el orden del motor; devuelve las celdas calculadas"""
+        calculadas = set()
+
+        def valor(area: AreaTransaccion, concepto_id: int) -> Decimal:
+            return celdas.get((area, concepto_id), CERO)
+
+        def fijar(area: AreaTransaccion, concepto_id: Optional[int], monto: Decimal):
+            if concepto_id in contexto["existentes"]:
+                celdas[(area, concepto_id)] = _centavos(monto)
+                calculadas.add((area, concepto_id))
+
+        # GMF: montos con signo de los conceptos configurados (cualquier área) × 4/1000
+        configs = contexto["gmf"].get(cuenta_id)
+        if configs and contexto["concepto_gmf"]:
+            config = _vigente(configs, fecha) or configs[-1]
+            ids = set(_ids_configurados(config.conceptos_seleccionados) or [])
+            if ids:
+                base = sum((v for (_, c), v in celdas.items() if c in ids), CERO)
+                fijar(TESORERIA, contexto["concepto_gmf"], base * 4 / 1000)
+
+        # 4x1000: |montos| de los conceptos configurados (o los permitidos por defecto), como egreso
+        config = _vigente(contexto["cuatro_por_mil"].get(cuenta_id, []), fecha)
+        ids = _ids_configurados(config.conceptos_seleccionados) if config else None
+        if ids is None:
+            ids = DependenciasFlujoCajaService.CONCEPTOS_CUATRO_POR_MIL_PERMITIDOS
+        if ids:
+            ids = set(ids)
+            base = sum((abs(v) for (_, c), v in celdas.items() if c in ids), CERO)
+            fijar(PAGADURIA, DependenciasFlujoCajaService.CONCEPTO_CUATRO_POR_MIL_ID, -(base * 4 / 1000) if base > 0 else CERO)
+
+        # 82: movimiento de pagaduría con el signo de cada código (E −, I +, N tal cual)
+        codigos = contexto["codigos"]
+        subtotal = CERO
+        for (area, c), v in celdas.items():
+            if area == PAGADURIA and c in CONCEPTOS_MOVIMIENTO_PAGADURIA and c in codigos:
+                subtotal += -abs(v) if codigos[c] == "E" else abs(v) if codigos[c] == "I" else v
+        fijar(PAGADURIA, SUBTOTAL_MOVIMIENTO_PAGADURIA, subtotal)
+
+        # CONSUMO (tesorería) = 82 y SALDO NETO INICIAL = 1 + 2 + 3
+        fijar(TESORERIA, CONSUMO, valor(PAGADURIA, SUBTOTAL_MOVIMIENTO_PAGADURIA))
+        fijar(TESORERIA, SALDO_NETO_INICIAL, sum(
+            (v for (_, c), v in celdas.items() if c in CONCEPTOS_SALDO_NETO), CERO
+        ))
+
+        # Fórmulas del catálogo (50, 51, ...) en orden de id; 'ambas' se evalúa en pagaduría
+        for concepto in contexto["formulas"]:
+            area = TESORERIA if concepto.area == AreaConcepto.tesoreria else PAGADURIA
+            monto = self._evaluar_formula(concepto, area, celdas)
+            if monto is not None:
+                fijar(area, concepto.id, monto)
+
+        # Cruces tesorería ↔ pagaduría
+        subtotal_tesoreria = celdas.get((TESORERIA, SUBTOTAL_TESORERIA), valor(PAGADURIA, SUBTOTAL_TESORERIA))
+        fijar(PAGADURIA, MOVIMIENTO_TESORERIA, subtotal_tesoreria)
+        fijar(PAGADURIA, DIFERENCIA_SALDOS, valor(PAGADURIA, SALDO_CONTABLE) - valor(PAGADURIA, SALDO_DIA_ANTERIOR))
+        fijar(PAGADURIA, SUBTOTAL_SALDO_INICIAL_PAGADURIA,
+              valor(PAGADURIA, SUBTOTAL_MOVIMIENTO_PAGADURIA) + valor(PAGADURIA, SALDO_DIA_ANTERIOR))
+        fijar(PAGADURIA, SALDO_TOTAL_BANCOS,
+              valor(PAGADURIA, SUBTOTAL_SALDO_INICIAL_PAGADURIA) + valor(PAGADURIA, MOVIMIENTO_TESORERIA))
+        return calculadas
+
+    @staticmethod
+    def _evaluar_formula(concepto: ConceptoFlujoCaja, area: AreaTransaccion, celdas: Celdas) -> Optional[Decimal]:
+        """SUMA(...) / RESTA(...) / depende_de, igual que _procesar_concepto_dependiente"""
+        if concepto.formula_dependencia:
+            formula = concepto.formula_dependencia.strip().upper()
+            contenido = formula[formula.find("(") + 1:formula.rfind(")")]
+            ids = [int(x.strip()) for x in contenido.split(",") if x.strip().isdigit()]
+            montos = [celdas.get((area, c), CERO) for c in ids]
+            if formula.startswith("SUMA(") and formula.endswith(")"):
+                return sum(montos, CERO)
+            if formula.startswith("RESTA(") and formula.endswith(")"):
+                return montos[0] - sum(montos[1:], CERO) if montos else CERO
+            return None
+        if concepto.depende_de_concepto_id and concepto.tipo_dependencia:
+            base = celdas.get((area, concepto.depende_de_concepto_id))
+            if base is None:
+                return None
+            return base * Decimal("0.10") if concepto.tipo_dependencia == TipoDependencia.porcentaje else base
+        return None
+
+    @staticmethod
+    def _dia_resultado(fecha: date, cerrado: bool, celdas: Celdas, cambios: int) -> dict:
+        por_area = {TESORERIA: {}, PAGADURIA: {}}
+        for (area, concepto_id), monto in sorted(celdas.items(), key=lambda item: item[0][1]):
+            por_area[area][str(concepto_id)] = float(monto)
+        return {
+            "fecha": fecha.isoformat(),
+            "cerrado": cerrado,
+            "saldo_inicial": float(celdas.get((TESORERIA, SALDO_INICIAL), CERO)),
+            "saldo_final_cuentas": float(celdas.get((TESORERIA, SALDO_FINAL_CUENTAS), CERO)),
+            "saldo_dia_anterior": float(celdas.get((PAGADURIA, SALDO_DIA_ANTERIOR), CERO)),
+            "saldo_total_bancos": float(celdas.get((PAGADURIA, SALDO_TOTAL_BANCOS), CERO)),
+            "celdas_cambiadas": cambios,
+            "tesoreria": por_area[TESORERIA],
+            "pagaduria": por_area[PAGADURIA],
+        }
@@ -3,15 +3,22 @@ Servicio para calcular y guardar automáticamente el SALDO INICIAL
 basado en el SALDO FINAL del día anterior.
 """
 
-from datetime import datetime, timedelta
-from typing import Optional, List
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Optional, List, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
-from app.models.transacciones_flujo_caja import TransaccionFlujoCaja
+from app.models.transacciones_flujo_caja import TransaccionFlujoCaja, AreaTransaccion
 from app.models.conceptos_flujo_caja import ConceptoFlujoCaja
 from app.models.cuentas_bancarias import CuentaBancaria
+from app.models.cuenta_moneda import CuentaMoneda
+from app.models.transaccion_historial import ultimo_cambio
+from app.core.catalogo_cache import catalogo_cache
+from app.core.metricas import registrar_importacion
 from app.core.database import get_db
+from app.services.cierre_dia_service import CierreDiaService
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -97,6 +104,11 @@ class SaldoInicialService:
         Solo crea/actualiza si es necesario (si no existe o si el valor cambió)
         """
         try:
+            dia = fecha.date() if isinstance(fecha, datetime) else fecha
+            if CierreDiaService(db).dia_cerrado(dia, compania_id):
+                logger.info(f"🔒 {dia} está cerrado para la compañía de la cuenta {cuenta_id}: se conserva su SALDO INICIAL")
+                return None
+            
             # Buscar el concepto SALDO INICIAL
             concepto_saldo_inicial = db.query(ConceptoFlujoCaja).filter(
                 ConceptoFlujoCaja.nombre == 'SALDO INICIAL'
@@ -199,3 +211,135 @@ class SaldoInicialService:
         except Exception as e:
             logger.error(f"Error procesando saldos iniciales para fecha: {e}")
             return []
+
+    # ------------------------------------------------------------------
+    # Cargue inicial manual (pantalla de saldos iniciales)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def conceptos_cargue_inicial(db: Session) -> Tuple[Optional[int], Optional[int]]:
+        """IDs de SALDO INICIAL (tesorería) y SALDO DIA ANTERIOR (pagaduría), desde el catálogo en memoria"""
+        por_nombre = {(c.nombre, c.area): c.id for c in catalogo_cache.conceptos(db).values()}
+        return por_nombre.get(("SALDO INICIAL", "tesoreria")), por_nombre.get(("SALDO DIA ANTERIOR", "pagaduria"))
+
+    @staticmethod
+    def guardar_cargue_inicial(
+        fecha: date,
+        modificaciones: List[dict],
+        db: Session,
+        usuario_id: int = 1
+    ) -> int:
+        """
+        Guarda SALDO INICIAL (tesorería) y SALDO DIA ANTERIOR (pagaduría) de varias cuentas.
+
+        `cuenta_id` de cada modificación es el id de cuenta_moneda. Se resuelven todas las
+        compañías en una consulta y, por concepto, se leen las filas existentes en otra;
+        luego se actualizan las que cambiaron y se insertan las nuevas en lote (sin commit).
+        Si alguna compañía del lote tiene el día cerrado no se escribe nada (DiaCerradoError).
+        Retorna el número de transacciones creadas.
+        """
+        inicio = time.perf_counter()
+        concepto_saldo_inicial, concepto_saldo_dia_anterior = SaldoInicialService.conceptos_cargue_inicial(db)
+        if not concepto_saldo_inicial or not concepto_saldo_dia_anterior:
+            raise LookupError("Conceptos SALDO INICIAL o SALDO DIA ANTERIOR no encontrados")
+
+        ids = {m.get("cuenta_id") for m in modificaciones if m.get("cuenta_id") is not None}
+        companias: Dict[int, int] = dict(
+            db.query(CuentaMoneda.id, CuentaBancaria.compania_id)
+            .join(CuentaBancaria, CuentaBancaria.id == CuentaMoneda.id_cuenta)
+            .filter(CuentaMoneda.id.in_(ids))
+            .all()
+        ) if ids else {}
+        CierreDiaService(db).verificar_abiertas(fecha, companias.values())
+
+        creadas = procesadas = 0
+        for concepto_id, area, campo in (
+            (concepto_saldo_inicial, AreaTransaccion.tesoreria, "saldo_inicial"),
+            (concepto_saldo_dia_anterior, AreaTransaccion.pagaduria, "saldo_dia_anterior"),
+        ):
+            # Cuentas inexistentes y montos vacíos o en cero se omiten; si una cuenta se repite gana la última
+            montos = {
+                m["cuenta_id"]: Decimal(str(m[campo]))
+                for m in modificaciones
+                if m.get("cuenta_id") in companias and m.get(campo) is not None and m.get(campo) != 0
+            }
+            creadas += SaldoInicialService._upsert_saldos(db, fecha, concepto_id, area, montos, companias, usuario_id)
+            procesadas += len(montos)
+        registrar_importacion("cargue_inicial", procesadas, inicio)
+        return creadas
+
+    @staticmethod
+    def _upsert_saldos(
+        db: Session,
+        fecha: date,
+        concepto_id: int,
+        area: AreaTransaccion,
+        montos: Dict[int, Decimal],
+        companias: Dict[int, int],
+        usuario_id: int
+    ) -> int:
+        """Una lectura de las filas existentes del concepto y un INSERT en lote de las faltantes"""
+        if not montos:
+            return 0
+        existentes: Dict[int, TransaccionFlujoCaja] = {}
+        for transaccion in db.query(TransaccionFlujoCaja).filter(
+            TransaccionFlujoCaja.fecha == fecha,
+            TransaccionFlujoCaja.concepto_id == concepto_id,
+            TransaccionFlujoCaja.area == area,
+            TransaccionFlujoCaja.cuenta_id.in_(list(montos))
+        ).order_by(TransaccionFlujoCaja.id):
+            existentes.setdefault(transaccion.cuenta_id, transaccion)
+
+        nuevas = []
+        for cuenta_id, monto in montos.items():
+            transaccion = existentes.get(cuenta_id)
+            if transaccion is None:
+                nuevas.append(TransaccionFlujoCaja(
+                    concepto_id=concepto_id,
+                    cuenta_id=cuenta_id,
+                    compania_id=companias[cuenta_id],
+                    fecha=fecha,
+                    monto=monto,
+                    descripcion="Cargue inicial manual",
+                    usuario_id=usuario_id,
+                    area=area,
+                    auditoria=ultimo_cambio("cargue_inicial", usuario_id)
+                ))
+            elif Decimal(transaccion.monto or 0).quantize(Decimal("0.01")) != monto.quantize(Decimal("0.01")):
+                transaccion.monto = monto
+                transaccion.descripcion = "Cargue inicial manual - Actualizado"
+                transaccion.auditoria = ultimo_cambio("cargue_inicial", usuario_id)
+        db.add_all(nuevas)
+        return len(nuevas)
+
+    @staticmethod
+    def obtener_saldos_cargue(fecha: date, db: Session) -> List[dict]:
+        """Saldos del cargue inicial por cuenta: una sola consulta para ambos conceptos, unidos por cuenta"""
+        concepto_saldo_inicial, concepto_saldo_dia_anterior = SaldoInicialService.conceptos_cargue_inicial(db)
+        filtros = []
+        if concepto_saldo_inicial:
+            filtros.append(and_(
+                TransaccionFlujoCaja.concepto_id == concepto_saldo_inicial,
+                TransaccionFlujoCaja.area == AreaTransaccion.tesoreria
+            ))
+        if concepto_saldo_dia_anterior:
+            filtros.append(and_(
+                TransaccionFlujoCaja.concepto_id == concepto_saldo_dia_anterior,
+                TransaccionFlujoCaja.area == AreaTransaccion.pagaduria
+            ))
+        if not filtros:
+            return []
+
+        filas = db.query(
+            TransaccionFlujoCaja.cuenta_id, TransaccionFlujoCaja.area, TransaccionFlujoCaja.monto
+        ).filter(TransaccionFlujoCaja.fecha == fecha, or_(*filtros)).order_by(TransaccionFlujoCaja.id).all()
+
+        # Primero las cuentas con saldo de tesorería y luego las que solo tienen pagaduría (orden histórico)
+        saldos: Dict[int, dict] = {}
+        for area, campo in ((AreaTransaccion.tesoreria, "saldo_inicial"), (AreaTransaccion.pagaduria, "saldo_dia_anterior")):
+            for cuenta_id, area_fila, monto in filas:
+                if area_fila != area:
+                    continue
+                saldo = saldos.setdefault(cuenta_id, {"cuenta_id": cuenta_id, "saldo_inicial": 0, "saldo_dia_anterior": 0})
+                saldo[campo] = float(monto)
+        return list(saldos.values())
@@ -5,6 +5,7 @@ Lógica de negocio para CRUD, cálculos automáticos y reportes
 import logging
 from typing import List, Optional, Dict, Any, Tuple
 from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm.exc import StaleDataError
 from sqlalchemy import and_, or_, func, desc
 from datetime import date, datetime
 from decimal import Decimal
@@ -16,6 +17,7 @@ from ..models import (
     AreaConcepto, AreaTransaccion, TipoMovimiento, TipoDependencia
 )
 from ..models.gmf_config import GMFConfig
+from ..models.transaccion_historial import TransaccionHistorial, registrar_usuario, ultimo_cambio
 from ..schemas.flujo_caja import (
     TransaccionFlujoCajaCreate, 
     TransaccionFlujoCajaUpdate, 
@@ -24,9 +26,59 @@ from ..schemas.flujo_caja import (
     FlujoCajaResumenResponse,
     AreaConceptoSchema,
     AreaTransaccionSchema,
-    TipoMovimientoSchema
+    TipoMovimientoSchema,
+    AccionCeldaSchema,
+    OperacionCeldaSchema,
+    ConceptoFlujoCajaResponse
 )
 from .dependencias_flujo_caja_service import DependenciasFlujoCajaService
+from ..core.bloqueos_recalculo import bloqueos_recalculo, BloqueoNoDisponibleError
+from .cierre_dia_service import CierreDiaService, DiaCerradoError, compania_de, excluir_particiones
+
+# Columnas de `TransaccionFlujoCajaResponse` en el orden del schema (ruta rápida de listados)
+_COLUMNAS_RESPUESTA = (
+    TransaccionFlujoCaja.fecha, TransaccionFlujoCaja.concepto_id, TransaccionFlujoCaja.cuenta_id,
+    TransaccionFlujoCaja.monto, TransaccionFlujoCaja.descripcion, TransaccionFlujoCaja.area,
+    TransaccionFlujoCaja.compania_id, TransaccionFlujoCaja.id, TransaccionFlujoCaja.usuario_id,
+    TransaccionFlujoCaja.auditoria, TransaccionFlujoCaja.version,
+    TransaccionFlujoCaja.created_at, TransaccionFlujoCaja.updated_at,
+)
+
+
+def fila_a_respuesta(fila, concepto: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Tupla de `_COLUMNAS_RESPUESTA` → dict con las llaves de `TransaccionFlujoCajaResponse` (lista para orjson)"""
+    respuesta = fila._asdict()
+    respuesta["area"] = fila.area.value
+    respuesta["concepto"] = concepto
+    return respuesta
+
+class LoteInvalidoError(ValueError):
+    """Lote de ediciones rechazado completo; contiene todos los errores de validación"""
+    
+    def __init__(self, errores: List[str], conflicto: bool = False):
+        super().__init__("; ".join(errores))
+        self.errores = errores
+        self.conflicto = conflicto
+
+class ConflictoVersionError(ValueError):
+    """La transacción cambió desde que el cliente la leyó (concurrencia optimista)"""
+    
+    def __init__(self, transaccion_id: int, version_esperada: Optional[int], version_actual: Optional[int]):
+        super().__init__(
+            f"La transacción ID {transaccion_id} fue modificada por otro usuario "
+            f"(versión enviada {version_esperada}, versión actual {version_actual})"
+        )
+        self.transaccion_id = transaccion_id
+        self.version_esperada = version_esperada
+        self.version_actual = version_actual
+
+def aplicar_signo_por_codigo(monto: Decimal, codigo: str) -> Decimal:
+    """Signo según el código del concepto: I siempre positivo, E siempre negativo, N mantiene el del usuario"""
+    if codigo == "I":
+        return abs(monto)
+    if codigo == "E":
+        return -abs(monto)
+    return monto
 
 class TransaccionFlujoCajaService:
     """Servicio para gestión de transacciones de flujo de caja"""
@@ -35,6 +87,39 @@ class TransaccionFlujoCajaService:
         self.db = db
         self.dependencias_service = DependenciasFlujoCajaService(db)
     
+    @staticmethod
+    def _verificar_version(transaccion: TransaccionFlujoCaja, version_esperada: Optional[int]):
+        """Rechaza la escritura si el cliente envió una versión distinta a la almacenada"""
+        if version_esperada is not None and transaccion.version != version_esperada:
+            raise ConflictoVersionError(transaccion.id, version_esperada, transaccion.version)
+    
+    def _commit_versionado(self, transaccion: TransaccionFlujoCaja, version_esperada: Optional[int]):
+        """Commit que traduce el choque de versión detectado en el UPDATE a ConflictoVersionError"""
+        try:
+            self.db.commit()
+        except StaleDataError:
+            self.db.rollback()
+            actual = self.db.query(TransaccionFlujoCaja.version).filter(
+                TransaccionFlujoCaja.id == transaccion.id
+            ).scalar()
+            raise ConflictoVersionError(transaccion.id, version_esperada, actual)
+    
+    def _verificar_dia_abierto(self, fecha: date, compania_id: Optional[int]):
+        """Rechaza escrituras sobre un día cuya conciliación está cerrada (DiaCerradoError)"""
+        CierreDiaService(self.db).verificar_abierto(fecha, compania_id)
+    
+    def _verificar_destino_abierto(self, transaccion: TransaccionFlujoCaja, update_data: Dict[str, Any]):
+        """La partición de origen y, si la edición mueve la fila, la de destino deben estar abiertas"""
+        cierre = CierreDiaService(self.db)
+        cierre.verificar_abierto(transaccion.fecha, transaccion.compania_id)
+        fecha = update_data.get("fecha") or transaccion.fecha
+        compania_id = cierre.compania_de_cuenta(
+            update_data.get("cuenta_id", transaccion.cuenta_id),
+            update_data.get("compania_id", transaccion.compania_id)
+        )
+        if (fecha, compania_id) != (transaccion.fecha, compania_de(transaccion.compania_id)):
+            cierre.verificar_abierto(fecha, compania_id)
+    
     def _aplicar_signo_por_tipo_concepto(self, monto: float, concepto_id: int) -> float:
         """
         Aplica el signo correcto al monto según el CODIGO del concepto:
@@ -96,11 +181,15 @@ class TransaccionFlujoCajaService:
         if not concepto:
             raise ValueError(f"El concepto ID {transaccion_data.concepto_id} no existe o no está activo")
         
-        # Validar que la cuenta existe si se especifica
+        # Validar que la cuenta existe si se especifica; la fila queda en la partición de su cuenta
+        compania_id = transaccion_data.compania_id
         if transaccion_data.cuenta_id:
             cuenta = self.db.query(CuentaBancaria).filter(CuentaBancaria.id == transaccion_data.cuenta_id).first()
             if not cuenta:
                 raise ValueError(f"La cuenta ID {transaccion_data.cuenta_id} no existe")
+            compania_id = cuenta.compania_id
+        
+        self._verificar_dia_abierto(transaccion_data.fecha, compania_id)
         
         # Verificar duplicados (fecha + concepto + cuenta debe ser único)
         transaccion_existente = self.db.query(TransaccionFlujoCaja).filter(
@@ -124,71 +213,316 @@ class TransaccionFlujoCajaService:
         db_transaccion = TransaccionFlujoCaja(
             **transaccion_data_corregida,
             usuario_id=usuario_id,
-            auditoria={
-                "accion": "creacion",
-                "usuario_id": usuario_id,
-                "timestamp": datetime.now().isoformat(),
-                "ip": None  # Se puede agregar desde el endpoint
-            }
+            auditoria=ultimo_cambio("creacion", usuario_id)
         )
         
         self.db.add(db_transaccion)
         self.db.commit()
         self.db.refresh(db_transaccion)
         
-        # � RECÁLCULOS DIRECTOS CLAVE - PRIMERO (GMF y 4x1000 antes de subtotales)
-        try:
-            # Si se crea uno de los componentes base (1,2,3), recalcular SALDO NETO INICIAL PAGADURÍA (ID 4)
-            if transaccion_data.concepto_id in (1, 2, 3) and transaccion_data.cuenta_id:
-                self.dependencias_service.recalcular_saldo_neto_inicial_pagaduria(
-                    fecha=transaccion_data.fecha,
-                    cuenta_id=transaccion_data.cuenta_id,
-                    usuario_id=usuario_id,
-                    compania_id=transaccion_data.compania_id
-                )
+        # Recálculos de la (fecha, cuenta) serializados con otros usuarios del mismo día
+        with bloqueos_recalculo.bloquear(transaccion_data.fecha, transaccion_data.cuenta_id, self.db.get_bind()):
+            # � RECÁLCULOS DIRECTOS CLAVE - PRIMERO (GMF y 4x1000 antes de subtotales)
+            try:
+                # Si se crea uno de los componentes base (1,2,3), recalcular SALDO NETO INICIAL PAGADURÍA (ID 4)
+                if transaccion_data.concepto_id in (1, 2, 3) and transaccion_data.cuenta_id:
+                    self.dependencias_service.recalcular_saldo_neto_inicial_pagaduria(
+                        fecha=transaccion_data.fecha,
+                        cuenta_id=transaccion_data.cuenta_id,
+                        usuario_id=usuario_id,
+                        compania_id=transaccion_data.compania_id
+                    )
 
-            # Recalcular GMF para la cuenta/fecha según configuración vigente
-            if transaccion_data.cuenta_id:
-                self.dependencias_service.recalcular_gmf(
-                    fecha=transaccion_data.fecha,
-                    cuenta_id=transaccion_data.cuenta_id,
-                    usuario_id=usuario_id,
-                    compania_id=transaccion_data.compania_id
-                )
+                # Recalcular GMF para la cuenta/fecha según configuración vigente
+                if transaccion_data.cuenta_id:
+                    self.dependencias_service.recalcular_gmf(
+                        fecha=transaccion_data.fecha,
+                        cuenta_id=transaccion_data.cuenta_id,
+                        usuario_id=usuario_id,
+                        compania_id=transaccion_data.compania_id
+                    )
             
-            # Recalcular CUATRO POR MIL para la cuenta/fecha según configuración vigente (Pagaduría)
-            if transaccion_data.cuenta_id:
-                self.dependencias_service.recalcular_cuatro_por_mil(
-                    fecha=transaccion_data.fecha,
-                    cuenta_id=transaccion_data.cuenta_id,
-                    usuario_id=usuario_id,
-                    compania_id=transaccion_data.compania_id
-                )
-            # Asegurar escritura de GMF y 4x1000 antes de calcular subtotales
-            self.db.commit()
-        except Exception as e:
-            logger.warning(f"⚠️ Error en recálculos directos GMF/4x1000: {e}")
+                # Recalcular CUATRO POR MIL para la cuenta/fecha según configuración vigente (Pagaduría)
+                if transaccion_data.cuenta_id:
+                    self.dependencias_service.recalcular_cuatro_por_mil(
+                        fecha=transaccion_data.fecha,
+                        cuenta_id=transaccion_data.cuenta_id,
+                        usuario_id=usuario_id,
+                        compania_id=transaccion_data.compania_id
+                    )
+                # Asegurar escritura de GMF y 4x1000 antes de calcular subtotales
+                self.db.commit()
+            except Exception as e:
+                logger.warning(f"⚠️ Error en recálculos directos GMF/4x1000: {e}")
 
-        # 🔥 AUTO-RECÁLCULO COMPLETO: Procesar AMBOS dashboards DESPUÉS de GMF y 4x1000
-        # para que los subtotales incluyan los valores actualizados
-        self.dependencias_service.procesar_dependencias_completas_ambos_dashboards(
-            fecha=transaccion_data.fecha,
-            concepto_modificado_id=transaccion_data.concepto_id,
-            cuenta_id=transaccion_data.cuenta_id,
-            compania_id=transaccion_data.compania_id,
-            usuario_id=usuario_id
-        )
+            # 🔥 AUTO-RECÁLCULO COMPLETO: Procesar AMBOS dashboards DESPUÉS de GMF y 4x1000
+            # para que los subtotales incluyan los valores actualizados
+            self.dependencias_service.procesar_dependencias_completas_ambos_dashboards(
+                fecha=transaccion_data.fecha,
+                concepto_modificado_id=transaccion_data.concepto_id,
+                cuenta_id=transaccion_data.cuenta_id,
+                compania_id=transaccion_data.compania_id,
+                usuario_id=usuario_id
+            )
         
         return db_transaccion
     
-    def obtener_transacciones_por_fecha(self, fecha: date, area: Optional[AreaTransaccionSchema] = None) -> List[TransaccionFlujoCaja]:
-        """Obtener todas las transacciones de una fecha específica"""
+    def guardar_lote(
+        self,
+        fecha: date,
+        operaciones: List[OperacionCeldaSchema],
+        usuario,
+        compania_id: Optional[int] = None,
+        request=None
+    ) -> Dict[str, Any]:
+        """
+        Aplica un lote de ediciones de celdas (crear/actualizar/eliminar) de una fecha.
+        
+        Todas las operaciones se validan contra el catálogo en caché antes de escribir;
+        si alguna es inválida no se aplica ninguna. Las escrituras y sus registros de
+        auditoría se confirman en una sola transacción. El recálculo de dependencias
+        queda a cargo del llamador, una vez por cuenta afectada (ver `cuentas_afectadas`).
+        """
+        from ..core.catalogo_cache import catalogo_cache
+        from .auditoria_service import construir_registro_transaccion_flujo_caja
+        
+        conceptos = catalogo_cache.conceptos(self.db)
+        cuentas = catalogo_cache.cuentas(self.db)
+        
+        def compania_fila(cuenta_id, compania_explicita):
+            """La fila nueva queda en la partición de su cuenta; sin cuenta, en la compañía indicada"""
+            cuenta = cuentas.get(cuenta_id)
+            return cuenta.compania_id if cuenta else compania_explicita
+        
+        # Prefetch de las transacciones referenciadas y de las celdas ya ocupadas en la fecha
+        ids = [op.transaccion_id for op in operaciones if op.accion != AccionCeldaSchema.crear and op.transaccion_id]
+        existentes = {}
+        if ids:
+            existentes = {
+                t.id: t for t in self.db.query(TransaccionFlujoCaja).filter(TransaccionFlujoCaja.id.in_(ids)).all()
+            }
+        celdas_ocupadas = set()
+        if any(op.accion == AccionCeldaSchema.crear for op in operaciones):
+            celdas_ocupadas = set(
+                self.db.query(TransaccionFlujoCaja.concepto_id, TransaccionFlujoCaja.cuenta_id)
+                .filter(TransaccionFlujoCaja.fecha == fecha)
+                .all()
+            )
+        
+        # Validación completa antes de escribir
+        errores = []
+        hay_conflicto = False
+        ids_vistos = set()
+        for i, op in enumerate(operaciones):
+            prefijo = f"Operación {i + 1} ({op.accion.value})"
+            if op.accion == AccionCeldaSchema.crear:
+                concepto = conceptos.get(op.concepto_id) if op.concepto_id else None
+                if concepto is None or not concepto.activo:
+                    errores.append(f"{prefijo}: el concepto ID {op.concepto_id} no existe o no está activo")
+                elif concepto.auto_calculado:
+                    errores.append(f"{prefijo}: el concepto ID {op.concepto_id} se calcula automáticamente")
+                if op.cuenta_id is not None and op.cuenta_id not in cuentas:
+                    errores.append(f"{prefijo}: la cuenta ID {op.cuenta_id} no existe")
+                if op.monto is None:
+                    errores.append(f"{prefijo}: falta el monto")
+                celda = (op.concepto_id, op.cuenta_id)
+                if celda in celdas_ocupadas:
+                    errores.append(f"{prefijo}: ya existe una transacción para esta fecha, concepto y cuenta")
+                celdas_ocupadas.add(celda)
+            else:
+                transaccion = existentes.get(op.transaccion_id)
+                if transaccion is None or transaccion.fecha != fecha:
+                    errores.append(f"{prefijo}: la transacción ID {op.transaccion_id} no existe en la fecha {fecha}")
+                else:
+                    concepto = conceptos.get(transaccion.concepto_id)
+                    if concepto and concepto.auto_calculado:
+                        errores.append(f"{prefijo}: no se puede modificar un concepto auto-calculado")
+                    if op.version is not None and transaccion.version != op.version:
+                        hay_conflicto = True
+                        errores.append(
+                            f"{prefijo}: la transacción ID {op.transaccion_id} fue modificada por otro usuario "
+                            f"(versión enviada {op.version}, versión actual {transaccion.version})"
+                        )
+                if op.transaccion_id in ids_vistos:
+                    errores.append(f"{prefijo}: la transacción ID {op.transaccion_id} aparece más de una vez")
+                ids_vistos.add(op.transaccion_id)
+                if op.accion == AccionCeldaSchema.actualizar and op.monto is None and op.descripcion is None:
+                    errores.append(f"{prefijo}: no hay campos para actualizar")
+        
+        if errores:
+            raise LoteInvalidoError(errores, conflicto=hay_conflicto)
+        
+        # Ninguna operación puede tocar una compañía con el día cerrado
+        cerradas = CierreDiaService(self.db).companias_cerradas(fecha)
+        if cerradas:
+            for op in operaciones:
+                if op.accion == AccionCeldaSchema.crear:
+                    compania_op = compania_fila(op.cuenta_id, op.compania_id or compania_id)
+                else:
+                    compania_op = existentes[op.transaccion_id].compania_id
+                if (compania_op or 1) in cerradas:
+                    raise DiaCerradoError(fecha, compania_op or 1)
+        
+        # Aplicar en una sola transacción
+        registros_auditoria = []
+        creadas, actualizadas, eliminadas = [], [], 0
+        cuentas_afectadas: Dict[Optional[int], set] = {}
+        
+        def etiqueta_cuenta(cuenta_id):
+            cuenta = cuentas.get(cuenta_id)
+            return cuenta.etiqueta if cuenta else f"Cuenta ID {cuenta_id}"
+        
+        for op in operaciones:
+            if op.accion == AccionCeldaSchema.crear:
+                concepto = conceptos[op.concepto_id]
+                monto = aplicar_signo_por_codigo(op.monto, concepto.codigo)
+                transaccion = TransaccionFlujoCaja(
+                    fecha=fecha,
+                    concepto_id=op.concepto_id,
+                    cuenta_id=op.cuenta_id,
+                    monto=monto,
+                    descripcion=op.descripcion,
+                    area=AreaTransaccion(op.area.value),
+                    compania_id=compania_fila(op.cuenta_id, op.compania_id or compania_id),
+                    usuario_id=usuario.id,
+                    auditoria=ultimo_cambio("creacion", usuario.id)
+                )
+                self.db.add(transaccion)
+                creadas.append(transaccion)
+                registros_auditoria.append(construir_registro_transaccion_flujo_caja(
+                    usuario=usuario, accion="CREATE", fecha=str(fecha), concepto=concepto.nombre,
+                    cuenta=etiqueta_cuenta(op.cuenta_id), valor_nuevo=float(monto), request=request
+                ))
+            else:
+                transaccion = existentes[op.transaccion_id]
+                concepto = conceptos.get(transaccion.concepto_id)
+                concepto_nombre = concepto.nombre if concepto else f"Concepto ID {transaccion.concepto_id}"
+                valor_anterior = float(transaccion.monto)
+                
+                if op.accion == AccionCeldaSchema.eliminar:
+                    registrar_usuario(self.db, usuario.id)
+                    self.db.delete(transaccion)
+                    eliminadas += 1
+                    registros_auditoria.append(construir_registro_transaccion_flujo_caja(
+                        usuario=usuario, accion="DELETE", fecha=str(fecha), concepto=concepto_nombre,
+                        cuenta=etiqueta_cuenta(transaccion.cuenta_id), valor_anterior=valor_anterior, request=request
+                    ))
+                else:
+                    if op.monto is not None:
+                        transaccion.monto = aplicar_signo_por_codigo(op.monto, concepto.codigo if concepto else "")
+                    if op.descripcion is not None:
+                        transaccion.descripcion = op.descripcion
+                    transaccion.auditoria = ultimo_cambio("actualizacion_lote", usuario.id)
+                    actualizadas.append(transaccion)
+                    registros_auditoria.append(construir_registro_transaccion_flujo_caja(
+                        usuario=usuario, accion="UPDATE", fecha=str(fecha), concepto=concepto_nombre,
+                        cuenta=etiqueta_cuenta(transaccion.cuenta_id), valor_anterior=valor_anterior,
+                        valor_nuevo=float(transaccion.monto), request=request
+                    ))
+            cuentas_afectadas.setdefault(transaccion.cuenta_id, set()).add(transaccion.concepto_id)
+        
+        self.db.add_all(registros_auditoria)
+        try:
+            self.db.commit()
+        except StaleDataError:
+            # Otra sesión modificó alguna de las filas entre la validación y el UPDATE
+            self.db.rollback()
+            raise LoteInvalidoError(
+                ["Alguna transacción del lote fue modificada por otro usuario; recargue la fecha"],
+                conflicto=True
+            )
+        
+        # Recargar las transacciones escritas en una sola consulta para la respuesta
+        ids_resultado = [t.id for t in creadas + actualizadas]
+        transacciones = []
+        if ids_resultado:
+            transacciones = self.db.query(TransaccionFlujoCaja).options(
+                joinedload(TransaccionFlujoCaja.concepto)
+            ).filter(TransaccionFlujoCaja.id.in_(ids_resultado)).all()
+        
+        logger.info(
+            f"📦 Lote {fecha}: {len(creadas)} creadas, {len(actualizadas)} actualizadas, "
+            f"{eliminadas} eliminadas, {len(cuentas_afectadas)} cuentas a recalcular"
+        )
+        return {
+            "fecha": fecha,
+            "creadas": len(creadas),
+            "actualizadas": len(actualizadas),
+            "eliminadas": eliminadas,
+            "transacciones": transacciones,
+            "cuentas_afectadas": cuentas_afectadas
+        }
+    
+    def obtener_transacciones_por_fecha(
+        self,
+        fecha: date,
+        area: Optional[AreaTransaccionSchema] = None,
+        companias_excluidas: Optional[set] = None
+    ) -> List[TransaccionFlujoCaja]:
+        """Obtener todas las transacciones de una fecha específica (sin las compañías excluidas)"""
         query = self.db.query(TransaccionFlujoCaja).filter(TransaccionFlujoCaja.fecha == fecha)
         
         if area:
             query = query.filter(TransaccionFlujoCaja.area == area)
+        if companias_excluidas:
+            query = excluir_particiones(query, [(fecha, c) for c in companias_excluidas])
         
         return query.options(joinedload(TransaccionFlujoCaja.concepto)).all()
+
+    def listar_por_fecha_serializadas(
+        self,
+        fecha: date,
+        area: Optional[AreaTransaccionSchema] = None,
+        companias_excluidas: Optional[set] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Igual que `obtener_transacciones_por_fecha` pero ya en la forma de `TransaccionFlujoCajaResponse`:
+        lee tuplas de columnas (sin instanciar el ORM) y serializa cada concepto una sola vez.
+        """
+        query = self.db.query(*_COLUMNAS_RESPUESTA).filter(TransaccionFlujoCaja.fecha == fecha)
+        if area:
+            query = query.filter(TransaccionFlujoCaja.area == area)
+        if companias_excluidas:
+            query = excluir_particiones(query, [(fecha, c) for c in companias_excluidas])
+
+        filas = query.all()
+        conceptos = self._conceptos_serializados({fila.concepto_id for fila in filas})
+        return [fila_a_respuesta(fila, conceptos.get(fila.concepto_id)) for fila in filas]
+
+    def _conceptos_serializados(self, concepto_ids: set) -> Dict[int, Dict[str, Any]]:
+        """`ConceptoFlujoCajaResponse` en modo JSON por id de concepto"""
+        if not concepto_ids:
+            return {}
+        return {
+            concepto.id: ConceptoFlujoCajaResponse.model_validate(concepto).model_dump(mode="json")
+            for concepto in self.db.query(ConceptoFlujoCaja).filter(ConceptoFlujoCaja.id.in_(concepto_ids))
+        }
+
+    def obtener_historial_celda(
+        self,
+        fecha: date,
+        concepto_id: int,
+        cuenta_id: Optional[int] = None,
+        antes_de: Optional[int] = None,
+        limite: int = 50
+    ) -> Tuple[List[TransaccionHistorial], Optional[int]]:
+        """
+        Historial de cambios de una celda (fecha, concepto, cuenta), del más reciente al más antiguo.
+        
+        Paginación por clave: `antes_de` es el id del último cambio de la página anterior.
+        Retorna los cambios y el cursor de la siguiente página (None si no hay más).
+        """
+        query = self.db.query(TransaccionHistorial).filter(
+            TransaccionHistorial.fecha == fecha,
+            TransaccionHistorial.concepto_id == concepto_id,
+            TransaccionHistorial.cuenta_id.is_(None) if cuenta_id is None else TransaccionHistorial.cuenta_id == cuenta_id
+        )
+        if antes_de is not None:
+            query = query.filter(TransaccionHistorial.id < antes_de)
+        
+        cambios = query.order_by(TransaccionHistorial.id.desc()).limit(limite + 1).all()
+        siguiente = cambios[limite - 1].id if len(cambios) > limite else None
+        return cambios[:limite], siguiente
     
     def obtener_transaccion_por_id(self, transaccion_id: int) -> Optional[TransaccionFlujoCaja]:
         """Obtener transacción por ID"""
@@ -210,15 +544,6 @@ class TransaccionFlujoCajaService:
         if 'monto' in update_data:
             logger.info(f"🔍 DEBUG actualizar_transaccion: monto ORIGINAL recibido = {update_data['monto']}, concepto_id = {db_transaccion.concepto_id}")
         
-        # Guardar valores originales para auditoría
-        valores_originales = {
-            "fecha": db_transaccion.fecha,
-            "concepto_id": db_transaccion.concepto_id,
-            "cuenta_id": db_transaccion.cuenta_id,
-            "monto": str(db_transaccion.monto),
-            "descripcion": db_transaccion.descripcion
-        }
-        
         # 🔥 APLICAR SIGNO CORRECTO si se está actualizando el monto
         if 'monto' in update_data:
             monto_original = update_data['monto']
@@ -229,17 +554,7 @@ class TransaccionFlujoCajaService:
             setattr(db_transaccion, field, value)
         
         # Actualizar auditoría
-        auditoria_actual = db_transaccion.auditoria or {}
-        auditoria_actual.update({
-            "ultima_modificacion": {
-                "accion": "actualizacion",
-                "usuario_id": usuario_id,
-                "timestamp": datetime.now().isoformat(),
-                "valores_anteriores": valores_originales,
-                "ip": None
-            }
-        })
-        db_transaccion.auditoria = auditoria_actual
+        db_transaccion.auditoria = ultimo_cambio("actualizacion", usuario_id)
         
         self.db.commit()
         self.db.refresh(db_transaccion)
@@ -321,6 +636,7 @@ class TransaccionFlujoCajaService:
         area = db_transaccion.area
         concepto_id = db_transaccion.concepto_id
         
+        registrar_usuario(self.db, usuario_id)
         self.db.delete(db_transaccion)
         self.db.commit()
         
@@ -484,13 +800,7 @@ class TransaccionFlujoCajaService:
             if transaccion_dependiente:
                 # Actualizar existente
                 transaccion_dependiente.monto = nuevo_monto
-                transaccion_dependiente.auditoria = {
-                    "accion": "actualizacion_automatica",
-                    "dependencia_de": concepto_origen.id,
-                    "tipo_dependencia": concepto.tipo_dependencia.value,
-                    "timestamp": datetime.now().isoformat(),
-                    "sistema": True
-                }
+                transaccion_dependiente.auditoria = ultimo_cambio("actualizacion_automatica", usuario_id)
             else:
                 # Crear nueva
                 transaccion_dependiente = TransaccionFlujoCaja(
@@ -501,13 +811,7 @@ class TransaccionFlujoCajaService:
                     descripcion=f"Generado automáticamente desde {concepto_origen.nombre}",
                     usuario_id=usuario_id,
                     area=area,
-                    auditoria={
-                        "accion": "creacion_automatica",
-                        "dependencia_de": concepto_origen.id,
-                        "tipo_dependencia": concepto.tipo_dependencia.value,
-                        "timestamp": datetime.now().isoformat(),
-                        "sistema": True
-                    }
+                    auditoria=ultimo_cambio("creacion_automatica", usuario_id)
                 )
                 self.db.add(transaccion_dependiente)
         
@@ -528,29 +832,20 @@ class TransaccionFlujoCajaService:
         if not transaccion:
             raise ValueError("Transacción no encontrada")
         
-        # Guardar valores anteriores para auditoría
-        valores_anteriores = {
-            "monto": float(transaccion.monto),
-            "descripcion": transaccion.descripcion,
-            "fecha": transaccion.fecha.isoformat()
-        }
+        # Concurrencia optimista: la versión enviada debe coincidir con la almacenada
+        update_data = transaccion_data.dict(exclude_unset=True)
+        version_esperada = update_data.pop("version", None)
+        self._verificar_version(transaccion, version_esperada)
+        self._verificar_destino_abierto(transaccion, update_data)
         
         # Actualizar campos
-        for field, value in transaccion_data.dict(exclude_unset=True).items():
+        for field, value in update_data.items():
             setattr(transaccion, field, value)
         
         # Actualizar auditoría
-        auditoria_actual = transaccion.auditoria or {}
-        auditoria_actual.update({
-            "accion": "actualizacion",
-            "usuario_id": usuario_id,
-            "timestamp": datetime.now().isoformat(),
-            "valores_anteriores": valores_anteriores,
-            "campos_modificados": list(transaccion_data.dict(exclude_unset=True).keys())
-        })
-        transaccion.auditoria = auditoria_actual
+        transaccion.auditoria = ultimo_cambio("actualizacion", usuario_id)
         
-        self.db.commit()
+        self._commit_versionado(transaccion, version_esperada)
         self.db.refresh(transaccion)
         
         return transaccion
@@ -571,14 +866,13 @@ class TransaccionFlujoCajaService:
         if not transaccion:
             raise ValueError("Transacción no encontrada")
         
-        # Guardar valores anteriores para auditoría
-        valores_anteriores = {
-            "monto": float(transaccion.monto),
-            "descripcion": transaccion.descripcion,
-        }
+        # Concurrencia optimista: la versión enviada debe coincidir con la almacenada
+        update_data = transaccion_data.dict(exclude_unset=True)
+        version_esperada = update_data.pop("version", None)
+        self._verificar_version(transaccion, version_esperada)
+        self._verificar_destino_abierto(transaccion, update_data)
         
         # Actualizar campos con lógica de signos
-        update_data = transaccion_data.dict(exclude_unset=True)
         
         # 🔍 DEBUG: Log del monto recibido ANTES de cualquier procesamiento
         if 'monto' in update_data:
@@ -595,62 +889,59 @@ class TransaccionFlujoCajaService:
             setattr(transaccion, field, value)
         
         # Auditoría mínima
-        auditoria_actual = transaccion.auditoria or {}
-        auditoria_actual.update({
-            "accion": "actualizacion_rapida",
-            "usuario_id": usuario_id,
-            "timestamp": datetime.now().isoformat(),
-            "valores_anteriores": valores_anteriores,
-            "nota": "Actualización optimizada - dependencias en proceso"
-        })
-        transaccion.auditoria = auditoria_actual
+        transaccion.auditoria = ultimo_cambio("actualizacion_rapida", usuario_id)
         
         # Commit inmediato
-        self.db.commit()
+        self._commit_versionado(transaccion, version_esperada)
         self.db.refresh(transaccion)
         
-        # 🔄 RECÁLCULO GMF: Si se actualizó el monto y hay cuenta asociada, recalcular GMF
-        if 'monto' in update_data and transaccion.cuenta_id:
-            try:
-                logger.info(f"🔁 Recalculando GMF después de actualización simple para cuenta {transaccion.cuenta_id}")
-                self.dependencias_service.recalcular_gmf(
-                    fecha=transaccion.fecha,
-                    cuenta_id=transaccion.cuenta_id,
-                    usuario_id=usuario_id,
-                    compania_id=transaccion.compania_id
-                )
-                self.db.commit()
-            except Exception as e:
-                logger.warning(f"⚠️ Error recalculando GMF en actualización simple: {e}")
-        
-        # 🔄 RECÁLCULO 4x1000: Si se actualizó el monto y hay cuenta asociada, recalcular Cuatro por Mil
-        if 'monto' in update_data and transaccion.cuenta_id:
-            try:
-                logger.info(f"🔁 Recalculando 4x1000 después de actualización simple para cuenta {transaccion.cuenta_id}")
-                self.dependencias_service.recalcular_cuatro_por_mil(
-                    fecha=transaccion.fecha,
-                    cuenta_id=transaccion.cuenta_id,
-                    usuario_id=usuario_id,
-                    compania_id=transaccion.compania_id
-                )
-                self.db.commit()
-            except Exception as e:
-                logger.warning(f"⚠️ Error recalculando 4x1000 en actualización simple: {e}")
-        
-        # 🔄 RECÁLCULO SUBTOTALES: Después de GMF y 4x1000, recalcular dependencias completas
-        if 'monto' in update_data and transaccion.cuenta_id:
-            try:
-                logger.info(f"🔁 Recalculando subtotales después de actualización simple")
-                self.dependencias_service.procesar_dependencias_completas_ambos_dashboards(
-                    fecha=transaccion.fecha,
-                    concepto_modificado_id=transaccion.concepto_id,
-                    cuenta_id=transaccion.cuenta_id,
-                    compania_id=transaccion.compania_id,
-                    usuario_id=usuario_id
-                )
-                self.db.commit()
-            except Exception as e:
-                logger.warning(f"⚠️ Error recalculando subtotales en actualización simple: {e}")
+        # Recálculos de la (fecha, cuenta) serializados con otros usuarios del mismo día
+        try:
+            with bloqueos_recalculo.bloquear(transaccion.fecha, transaccion.cuenta_id, self.db.get_bind()):
+                # 🔄 RECÁLCULO GMF: Si se actualizó el monto y hay cuenta asociada, recalcular GMF
+                if 'monto' in update_data and transaccion.cuenta_id:
+                    try:
+                        logger.info(f"🔁 Recalculando GMF después de actualización simple para cuenta {transaccion.cuenta_id}")
+                        self.dependencias_service.recalcular_gmf(
+                            fecha=transaccion.fecha,
+                            cuenta_id=transaccion.cuenta_id,
+                            usuario_id=usuario_id,
+                            compania_id=transaccion.compania_id
+                        )
+                        self.db.commit()
+                    except Exception as e:
+                        logger.warning(f"⚠️ Error recalculando GMF en actualización simple: {e}")
+        
+                # 🔄 RECÁLCULO 4x1000: Si se actualizó el monto y hay cuenta asociada, recalcular Cuatro por Mil
+                if 'monto' in update_data and transaccion.cuenta_id:
+                    try:
+                        logger.info(f"🔁 Recalculando 4x1000 después de actualización simple para cuenta {transaccion.cuenta_id}")
+                        self.dependencias_service.recalcular_cuatro_por_mil(
+                            fecha=transaccion.fecha,
+                            cuenta_id=transaccion.cuenta_id,
+                            usuario_id=usuario_id,
+                            compania_id=transaccion.compania_id
+                        )
+                        self.db.commit()
+                    except Exception as e:
+                        logger.warning(f"⚠️ Error recalculando 4x1000 en actualización simple: {e}")
+        
+                # 🔄 RECÁLCULO SUBTOTALES: Después de GMF y 4x1000, recalcular dependencias completas
+                if 'monto' in update_data and transaccion.cuenta_id:
+                    try:
+                        logger.info(f"🔁 Recalculando subtotales después de actualización simple")
+                        self.dependencias_service.procesar_dependencias_completas_ambos_dashboards(
+                            fecha=transaccion.fecha,
+                            concepto_modificado_id=transaccion.concepto_id,
+                            cuenta_id=transaccion.cuenta_id,
+                            compania_id=transaccion.compania_id,
+                            usuario_id=usuario_id
+                        )
+                        self.db.commit()
+                    except Exception as e:
+                        logger.warning(f"⚠️ Error recalculando subtotales en actualización simple: {e}")
+        except BloqueoNoDisponibleError as e:
+            logger.warning(f"⏳ {e}; el recálculo en segundo plano completará las dependencias")
         
         return transaccion
     
@@ -663,9 +954,12 @@ class TransaccionFlujoCajaService:
         if not transaccion:
             return False
         
+        self._verificar_dia_abierto(transaccion.fecha, transaccion.compania_id)
+        
         # Auditoría de eliminación
         logger.info(f"Eliminando transacción ID {transaccion_id} por usuario {usuario_id}")
         
+        registrar_usuario(self.db, usuario_id)
         self.db.delete(transaccion)
         self.db.commit()
         
@@ -0,0 +1,146 @@
+"""
+Ejecución en segundo plano de los jobs de TRM (backfill al iniciar y actualización diaria).
+
+El arranque del servidor solo encola el backfill; los jobs corren en un pool de
+hilos acotado, con reintentos con backoff exponencial y jitter, para que ni el
+scraping ni las consultas a la BD bloqueen el event loop. Las esperas entre reintentos
+se cortan al detener el runner, así el apagado (o el `--reload`) no espera el backoff.
+"""
+import asyncio
+import logging
+import random
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date
+from typing import Callable, Dict, Optional
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class TRMJobError(Exception):
+    """Un job de TRM terminó con fechas sin registrar (se reintenta)"""
+
+
+class TRMJobRunner:
+    """Pool acotado de jobs TRM con deduplicación por nombre y reintentos con jitter"""
+
+    def __init__(self, max_workers: int = 1, max_retries: int = 3, retry_base_seconds: float = 5.0):
+        self.max_workers = max(1, max_workers)
+        self.max_retries = max(0, max_retries)
+        self.retry_base_seconds = retry_base_seconds
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._jobs: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._detenido = threading.Event()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._detenido.clear()
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="trm-job")
+        return self._executor
+
+    def encolar(self, nombre: str, fn: Callable, *args, **kwargs) -> Future:
+        """Encolar un job; si ya hay uno con el mismo nombre pendiente se reutiliza su Future"""
+        with self._lock:
+            existente = self._jobs.get(nombre)
+            if existente is not None and not existente.done():
+                logger.info(f"⏭️ Job TRM '{nombre}' ya está en cola, no se duplica")
+                return existente
+            future = self._get_executor().submit(self._ejecutar_con_reintentos, nombre, fn, *args, **kwargs)
+            self._jobs[nombre] = future
+            return future
+
+    def _ejecutar_con_reintentos(self, nombre: str, fn: Callable, *args, **kwargs):
+        intento = 0
+        while True:
+            if self._detenido.is_set():
+                logger.info(f"⏹️ Job TRM '{nombre}' cancelado: el runner se detuvo")
+                return None
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if intento >= self.max_retries:
+                    logger.error(f"❌ Job TRM '{nombre}' falló tras {intento + 1} intentos: {e}")
+                    raise
+                espera = self.retry_base_seconds * (2 ** intento) + random.uniform(0, self.retry_base_seconds)
+                intento += 1
+                logger.warning(f"⚠️ Job TRM '{nombre}' falló ({e}); reintento {intento}/{self.max_retries} en {espera:.1f}s")
+                if self._detenido.wait(espera):
+                    logger.info(f"⏹️ Job TRM '{nombre}' cancelado durante la espera del reintento")
+                    return None
+
+    def estado(self) -> dict:
+        with self._lock:
+            return {
+                nombre: ("ejecutando" if not f.done() else "error" if f.exception() else "completado")
+                for nombre, f in self._jobs.items()
+            }
+
+    def detener(self) -> None:
+        """Detener el pool sin esperar: cancela los pendientes y corta las esperas de reintento"""
+        self._detenido.set()
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+def job_backfill_trm(days_back: int) -> dict:
+    """Completar TRMs faltantes de los últimos N días; falla si quedaron fechas sin registrar"""
+    from app.services.trm_service import trm_service
+
+    resultado = trm_service.verificar_trms_faltantes(days_back=days_back)
+    logger.info(
+        f"📊 Backfill TRM: {resultado['missing_count']} faltantes, "
+        f"{resultado['updated_count']} registradas, {resultado['failed_count']} fallidas"
+    )
+    if resultado["failed_count"] > 0:
+        raise TRMJobError(f"{resultado['failed_count']} fechas sin TRM")
+    return resultado
+
+
+def job_trm_diaria() -> bool:
+    """Registrar la TRM del día y completar la última semana"""
+    from app.services.trm_service import trm_service
+
+    hoy = date.today()
+    logger.info(f"🌙 Ejecutando actualización TRM diaria para {hoy}")
+    if not trm_service.obtener_trm_fecha(hoy):
+        raise TRMJobError(f"No se pudo obtener TRM para {hoy}")
+    job_backfill_trm(days_back=7)
+    return True
+
+
+def encolar_backfill_startup() -> Future:
+    """Encolar el backfill de arranque sin bloquear el startup"""
+    logger.info(f"🔍 Encolando verificación de TRMs faltantes ({settings.trm_startup_backfill_days} días)")
+    return trm_job_runner.encolar("backfill_startup", job_backfill_trm, settings.trm_startup_backfill_days)
+
+
+async def iniciar_scheduler_trm():
+    """Loop del scheduler: los jobs programados se encolan en el pool, nunca corren en el event loop"""
+    import schedule
+
+    schedule.every().day.at(settings.trm_daily_job_time).do(
+        lambda: trm_job_runner.encolar("trm_diaria", job_trm_diaria)
+    )
+    logger.info(f"⏰ Scheduler TRM configurado - ejecución diaria a las {settings.trm_daily_job_time}")
+
+    try:
+        while True:
+            schedule.run_pending()
+            await asyncio.sleep(60)  # Verificar cada minuto
+    except asyncio.CancelledError:
+        schedule.clear()
+        raise
+
+
+# Instancia global
+trm_job_runner = TRMJobRunner(
+    max_workers=settings.trm_job_max_workers,
+    max_retries=settings.trm_job_max_retries,
+    retry_base_seconds=settings.trm_job_retry_base_seconds,
+)
@@ -5,17 +5,74 @@ Servicio para gestión automática de TRM
 import logging
 from datetime import date, timedelta
 from sqlalchemy.orm import Session
-from app.core.database import SessionLocal
+from app.core.database import session_scope
+from app.core.metricas import medir, trm_consultas, trm_duracion
 from app.models.trm import TRM
 from app.models.dias_festivos import DiaFestivo
-from typing import Optional
+from typing import Dict, List, Optional, Sequence, Tuple
+from decimal import Decimal
+from sqlalchemy import Date, literal, select, union_all
 
 logger = logging.getLogger(__name__)
 
+# Días previos al primer faltante que se consultan para conocer la vigencia que lo cubre
+VENTANA_VIGENCIA_DIAS = 10
+
+
+def completar_por_vigencia(
+    fechas: Sequence[date],
+    vigencias: Sequence[Tuple[date, Decimal]],
+    semilla: Optional[Tuple[date, Decimal]] = None,
+) -> Dict[date, Decimal]:
+    """Asignar a cada fecha el valor de la última vigencia que inicia en o antes de ella (forward-fill)"""
+    ordenadas = sorted(vigencias)
+    if semilla:
+        ordenadas.insert(0, semilla)
+    valores: Dict[date, Decimal] = {}
+    i = -1
+    actual = None
+    for f in sorted(fechas):
+        while i + 1 < len(ordenadas) and ordenadas[i + 1][0] <= f:
+            i += 1
+            actual = ordenadas[i][1]
+        if actual is not None:
+            valores[f] = actual
+    return valores
+
+
+def upsert_trms(db: Session, valores: Dict[date, Decimal]) -> None:
+    """Insertar o actualizar varias TRM en una sola sentencia (sin commit)"""
+    filas = [{"fecha": f, "valor": v} for f, v in sorted(valores.items())]
+    dialecto = db.get_bind().dialect.name
+    if dialecto == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        stmt = mysql_insert(TRM).values(filas)
+        db.execute(stmt.on_duplicate_key_update(valor=stmt.inserted.valor))
+    elif dialecto == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        stmt = sqlite_insert(TRM).values(filas)
+        db.execute(stmt.on_conflict_do_update(index_elements=[TRM.fecha], set_={"valor": stmt.excluded.valor}))
+    else:
+        for fila in filas:
+            db.merge(TRM(**fila))
+
 class TRMService:
     def __init__(self):
-        self.scraper = None
-        self._init_scraper()
+        self._scraper = None
+        self._scraper_cargado = False
+
+    @property
+    def scraper(self):
+        """Scraper de TRM; se importa en el primer uso para no cargar requests/bs4 al arrancar la API"""
+        if not self._scraper_cargado:
+            self._scraper_cargado = True
+            self._init_scraper()
+        return self._scraper
+
+    @scraper.setter
+    def scraper(self, valor):
+        self._scraper = valor
+        self._scraper_cargado = True
 
     def _init_scraper(self):
         """Inicializar el scraper de TRM"""
@@ -57,51 +114,95 @@ class TRMService:
         logger.info(f"🔍 Verificando TRMs faltantes para los últimos {days_back} días")
         
         today = date.today()
-        missing_count = 0
-        updated_count = 0
-        errors = []
+        return self.backfill_rango(today - timedelta(days=days_back), today - timedelta(days=1))
+
+    def backfill_rango(self, desde: date, hasta: date, db: Optional[Session] = None) -> dict:
+        """
+        Completa las TRM faltantes en [desde, hasta] con una sola consulta de faltantes,
+        una consulta paginada al endpoint de Datos Abiertos y un upsert masivo.
         
-        db = SessionLocal()
+        Cada día faltante toma el valor vigente a esa fecha (última vigenciadesde <= día).
+        La última TRM guardada antes del rango solo completa fines de semana y festivos:
+        un día hábil sin vigencia consultada queda como fallido para que el job reintente.
+        """
+        if db is None:
+            with session_scope() as db:
+                return self.backfill_rango(desde, hasta, db)
+
+        errors = []
+        faltantes = []
         try:
-            for i in range(days_back, 0, -1):
-                check_date = today - timedelta(days=i)
-                
-                # Verificar si existe TRM para esta fecha
-                existing_trm = db.query(TRM).filter(TRM.fecha == check_date).first()
-                
-                if not existing_trm:
-                    logger.info(f"❌ TRM faltante para {check_date}")
-                    missing_count += 1
-                    
-                    # Intentar crear TRM para la fecha (día hábil: scrapeo; fin de semana/festivo: copiar última disponible)
-                    try:
-                        if self._upsert_trm_para_fecha(check_date, db):
-                            updated_count += 1
-                            logger.info(f"✅ TRM registrada para {check_date}")
-                        else:
-                            error_msg = f"No se pudo registrar TRM para {check_date}"
-                            logger.warning(error_msg)
-                            errors.append(error_msg)
-                    except Exception as e:
-                        error_msg = f"Error generando TRM para {check_date}: {e}"
-                        logger.error(error_msg)
-                        errors.append(error_msg)
+            faltantes = self._fechas_faltantes(desde, hasta, db)
+            if not faltantes:
+                logger.info(f"✅ No hay TRMs faltantes entre {desde} y {hasta}")
+                return self._resumen_backfill(0, 0, errors)
+
+            logger.info(f"❌ {len(faltantes)} TRMs faltantes entre {faltantes[0]} y {faltantes[-1]}")
+
+            # Ampliar el inicio para conocer la vigencia que cubre el primer día faltante
+            registros = None
+            if self.scraper:
+                with medir(trm_duracion, trm_consultas, operacion="rango") as medicion:
+                    registros = self.scraper.get_trm_range_from_datos_abiertos(
+                        faltantes[0] - timedelta(days=VENTANA_VIGENCIA_DIAS), faltantes[-1]
+                    )
+                    medicion["exito"] = registros is not None
+            if registros is None:
+                errors.append("No se pudo consultar Datos Abiertos; solo se completan fines de semana y festivos")
+                registros = []
+
+            vigencias = [(r["vigenciadesde"], r["valor"]) for r in registros]
+            semilla = self._ultima_trm_antes(faltantes[0], db)
+            consultadas = completar_por_vigencia(faltantes, vigencias)
+            con_semilla = completar_por_vigencia(
+                faltantes, vigencias, (semilla.fecha, semilla.valor) if semilla else None
+            )
+            habiles = self._dias_habiles(faltantes, db)
+            valores = {f: v for f, v in con_semilla.items() if f in consultadas or f not in habiles}
+
+            for f in faltantes:
+                if f in valores:
+                    continue
+                if f in habiles and f in con_semilla:
+                    errors.append(f"Sin TRM consultada para el día hábil {f}; se reintentará")
                 else:
-                    logger.debug(f"✅ TRM ya existe para {check_date}: ${existing_trm.valor:,.2f}")
-                    
-        finally:
-            db.close()
-        
-        result = {
+                    errors.append(f"No existe TRM vigente para completar {f}")
+
+            if valores:
+                upsert_trms(db, valores)
+                db.commit()
+            return self._resumen_backfill(len(faltantes), len(valores), errors)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error en backfill de TRM {desde}..{hasta}: {e}")
+            # Cuenta como fallo para que el job reintente (aunque no se alcanzara a listar los faltantes)
+            return {"success": False, "error": str(e), "missing_count": len(faltantes), "updated_count": 0,
+                    "failed_count": max(len(faltantes), 1), "errors": [str(e)]}
+
+    def _fechas_faltantes(self, desde: date, hasta: date, db: Session) -> List[date]:
+        """Anti-join de un calendario generado contra la tabla trm (una sola consulta)"""
+        if hasta < desde:
+            return []
+        dias = [desde + timedelta(days=i) for i in range((hasta - desde).days + 1)]
+        calendario = union_all(*[select(literal(d, Date).label("fecha")) for d in dias]).cte("calendario")
+        filas = db.execute(
+            select(calendario.c.fecha)
+            .outerjoin(TRM, TRM.fecha == calendario.c.fecha)
+            .where(TRM.fecha.is_(None))
+            .order_by(calendario.c.fecha)
+        ).all()
+        return [f for (f,) in filas]
+
+    @staticmethod
+    def _resumen_backfill(missing_count: int, updated_count: int, errors: list) -> dict:
+        logger.info(f"📊 Resumen TRM: {missing_count} faltantes, {updated_count} actualizadas")
+        return {
             "success": True,
             "missing_count": missing_count,
             "updated_count": updated_count,
             "failed_count": missing_count - updated_count,
             "errors": errors
         }
-        
-        logger.info(f"📊 Resumen TRM: {missing_count} faltantes, {updated_count} actualizadas")
-        return result
 
     def obtener_trm_fecha(self, fecha: date) -> bool:
         """
@@ -115,11 +216,8 @@ class TRMService:
         """
         try:
             logger.info(f"🔄 Obteniendo/registrando TRM para fecha específica: {fecha}")
-            db = SessionLocal()
-            try:
+            with session_scope() as db:
                 return self._upsert_trm_para_fecha(fecha, db)
-            finally:
-                db.close()
         except Exception as e:
             logger.error(f"Error obteniendo TRM para {fecha}: {e}")
             return False
@@ -127,6 +225,18 @@ class TRMService:
     # ------------------------
     # Métodos internos helpers
     # ------------------------
+    def _dias_habiles(self, fechas: Sequence[date], db: Session) -> set:
+        """Fechas hábiles (ni fin de semana ni festivo) con una sola consulta de festivos"""
+        entre_semana = [f for f in fechas if f.isoweekday() < 6]
+        if not entre_semana:
+            return set()
+        try:
+            festivos = {d.fecha for d in DiaFestivo.obtener_festivos_rango(min(entre_semana), max(entre_semana), db)}
+        except Exception:
+            # Si falla la consulta de festivos, asumir hábiles: no se completan con una TRM vieja
+            festivos = set()
+        return {f for f in entre_semana if f not in festivos}
+
     def _es_dia_habil(self, f: date, db: Session) -> bool:
         if f.isoweekday() in (6, 7):  # 6=sábado, 7=domingo
             return False
@@ -165,7 +275,9 @@ class TRMService:
         if self._es_dia_habil(f, db):
             if self.scraper:
                 try:
-                    if self.scraper.update_daily_trm(f):
+                    with medir(trm_duracion, trm_consultas, operacion="diaria") as medicion:
+                        medicion["exito"] = bool(self.scraper.update_daily_trm(f))
+                    if medicion["exito"]:
                         return True
                 except Exception as e:
                     logger.warning(f"Fallo scrapeo TRM para {f}, se intenta fallback por copia: {e}")
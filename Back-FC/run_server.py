@@ -1,12 +1,14 @@
 #!/usr/bin/env python3
 """
-Script para iniciar el servidor de desarrollo con verificación automática de TRM
+Script para iniciar el servidor de desarrollo.
+
+Las TRMs faltantes no se verifican aquí: el startup de la app encola el backfill
+(`encolar_backfill_startup`) y el servidor acepta peticiones sin esperarlo.
 """
 
 import uvicorn
 import sys
 import os
-from datetime import date, timedelta
 import logging
 
 # Agregar el directorio raíz al path
@@ -19,46 +21,17 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def verificar_trm_startup():
-    """Verifica TRMs faltantes al iniciar el servidor"""
+def preparar_esquema():
+    """Crea las tablas faltantes; la API ya no lo hace al importarse"""
     try:
-        logger.info("=" * 60)
-        logger.info("🔍 VERIFICANDO TRMs FALTANTES AL INICIAR SERVIDOR")
-        logger.info("=" * 60)
-        
-        from app.services.trm_service import trm_service
-        
-        # Verificar últimos 30 días para recuperar períodos largos de inactividad
-        logger.info("📅 Revisando últimos 30 días para TRMs faltantes...")
-        resultado = trm_service.verificar_trms_faltantes(days_back=30)
-        
-        if resultado["success"]:
-            logger.info("")
-            logger.info("📊 RESUMEN DE RECUPERACIÓN DE TRMs:")
-            logger.info(f"   ✅ Fechas faltantes encontradas: {resultado['missing_count']}")
-            logger.info(f"   ✅ TRMs actualizadas exitosamente: {resultado['updated_count']}")
-            logger.info(f"   ❌ Actualizaciones fallidas: {resultado['failed_count']}")
-            
-            if resultado["updated_count"] > 0:
-                logger.info(f"   🎉 Se recuperaron {resultado['updated_count']} TRMs faltantes")
-            
-            if resultado["errors"]:
-                logger.warning("")
-                logger.warning("⚠️ Algunos TRMs no se pudieron obtener:")
-                for error in resultado["errors"][:5]:  # Mostrar solo primeros 5 errores
-                    logger.warning(f"   - {error}")
-                if len(resultado["errors"]) > 5:
-                    logger.warning(f"   ... y {len(resultado['errors']) - 5} errores más")
-        else:
-            logger.error(f"❌ Error en verificación: {resultado.get('error', 'Error desconocido')}")
-        
-        logger.info("=" * 60)
-        logger.info("✅ VERIFICACIÓN DE TRMs COMPLETADA")
-        logger.info("=" * 60)
-        
+        sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts", "setup"))
+        from crear_esquema import crear_esquema
+
+        faltantes = crear_esquema()
+        if faltantes:
+            logger.info(f"🗄️ {len(faltantes)} tablas creadas: {', '.join(sorted(faltantes))}")
     except Exception as e:
-        logger.error(f"❌ Error en verificación de TRM: {e}")
-        logger.info("⚠️ El servidor continuará sin verificación de TRM")
+        logger.error(f"❌ Error preparando el esquema: {e}")
 
 if __name__ == "__main__":
     print("=" * 70)
@@ -71,8 +44,8 @@ if __name__ == "__main__":
     print()
     print("=" * 70)
     
-    # Verificar TRMs antes de iniciar el servidor
-    verificar_trm_startup()
+    # Crear tablas faltantes antes de iniciar el servidor (el backfill de TRM lo encola la app)
+    preparar_esquema()
     print()
     
     print("=" * 70)
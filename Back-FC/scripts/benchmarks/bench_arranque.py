@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark de arranque de la API: tiempo de `import app.main` y de la primera respuesta,
+en procesos nuevos (importación en frío, sin caché de módulos).
+
+Cada repetición corre en un subproceso contra una base SQLite vacía y reporta además:
+- módulos pesados que quedaron cargados (openpyxl, scraper TRM, requests, bs4)
+- tablas que existen después de importar (debe ser 0: el esquema lo crea
+  scripts/setup/crear_esquema.py, no la importación)
+
+Uso (desde Back-FC):
+    python scripts/benchmarks/bench_arranque.py --repeticiones 10
+    python scripts/benchmarks/bench_arranque.py --repeticiones 10 --salida antes.json
+    python scripts/benchmarks/bench_arranque.py --repeticiones 10 --comparar antes.json
+    python scripts/benchmarks/bench_arranque.py --importtime 15   # módulos más lentos (python -X importtime)
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+MODULOS_PESADOS = ["openpyxl", "trm.trm_scraper", "scripts.trm.trm_scraper", "requests", "bs4", "pandas"]
+
+# Se ejecuta en el subproceso; imprime una línea JSON
+MEDICION = """
+import json, sys, time
+inicio = time.perf_counter()
+import app.main
+importado = time.perf_counter()
+from fastapi.testclient import TestClient
+respuesta = TestClient(app.main.app).get("/health")
+listo = time.perf_counter()
+from sqlalchemy import inspect
+from app.core.database import engine
+print(json.dumps({
+    "import_ms": (importado - inicio) * 1000,
+    "primera_respuesta_ms": (listo - inicio) * 1000,
+    "status": respuesta.status_code,
+    "tablas": len(inspect(engine).get_table_names()),
+    "modulos": [m for m in %r if m in sys.modules],
+}))
+""" % (MODULOS_PESADOS,)
+
+
+def _entorno(db_path: str) -> dict:
+    entorno = dict(os.environ)
+    entorno["DATABASE_URL"] = f"sqlite:///{db_path}"
+    entorno["PYTHONDONTWRITEBYTECODE"] = "1"
+    return entorno
+
+
+def medir_una(db_path: str) -> dict:
+    salida = subprocess.run(
+        [sys.executable, "-c", MEDICION], cwd=RAIZ, env=_entorno(db_path),
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def importtime(db_path: str, top: int) -> list:
+    """Módulos con mayor tiempo acumulado según python -X importtime"""
+    salida = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"], cwd=RAIZ, env=_entorno(db_path),
+        capture_output=True, text=True, check=True
+    )
+    filas = []
+    for linea in salida.stderr.splitlines():
+        if not linea.startswith("import time:") or "cumulative" in linea:
+            continue
+        _, acumulado, modulo = linea.replace("import time:", "").split("|")
+        filas.append((int(acumulado), modulo.strip()))
+    return sorted(filas, reverse=True)[:top]
+
+
+def resumir(mediciones: list) -> dict:
+    def percentiles(clave):
+        valores = sorted(m[clave] for m in mediciones)
+        return {
+            "p50": round(statistics.median(valores), 1),
+            "p95": round(valores[min(len(valores) - 1, int(len(valores) * 0.95))], 1),
+            "min": round(valores[0], 1),
+        }
+
+    return {
+        "repeticiones": len(mediciones),
+        "import_ms": percentiles("import_ms"),
+        "primera_respuesta_ms": percentiles("primera_respuesta_ms"),
+        "tablas_creadas_al_importar": max(m["tablas"] for m in mediciones),
+        "modulos_pesados_cargados": sorted({mod for m in mediciones for mod in m["modulos"]}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de arranque de la API (import en frío)")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--salida", help="Guardar el resumen en JSON")
+    parser.add_argument("--comparar", help="Resumen JSON previo para mostrar la diferencia")
+    parser.add_argument("--importtime", type=int, metavar="N", help="Listar los N módulos más lentos y salir")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        db_path = os.path.join(directorio, "arranque.db")
+        if args.importtime:
+            for acumulado, modulo in importtime(db_path, args.importtime):
+                print(f"{acumulado / 1000:9.1f} ms  {modulo}")
+            return
+
+        mediciones = []
+        for i in range(args.repeticiones):
+            mediciones.append(medir_una(db_path))
+            print(f"  #{i + 1}: import {mediciones[-1]['import_ms']:.0f} ms, "
+                  f"primera respuesta {mediciones[-1]['primera_respuesta_ms']:.0f} ms")
+
+    resumen = resumir(mediciones)
+    print(json.dumps(resumen, indent=2, ensure_ascii=False))
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            anterior = json.load(f)
+        for clave in ("import_ms", "primera_respuesta_ms"):
+            antes, despues = anterior[clave]["p50"], resumen[clave]["p50"]
+            print(f"{clave} p50: {antes} → {despues} ms ({(despues - antes) / antes * 100:+.1f}%)")
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(resumen, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
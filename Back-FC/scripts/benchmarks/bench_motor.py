@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Benchmark del motor de flujo de caja sobre datos sintéticos (ver datos_sinteticos.py).
+
+Mide latencia (p50/p95) y número de sentencias SQL de:
+- recalculo_cuenta / recalculo_dia: procesar_dependencias_completas_ambos_dashboards
+  después de editar una celda (la edición no se cronometra)
+- recalcular_rango: POST /recalcular-rango-fechas sobre los días sembrados
+- consolidado_mensual / consolidado_multi_moneda: GET /informes-consolidados/mensual[-multi-moneda]
+- importar_saldos: POST /saldo-inicial/importar-saldos con un Excel de una hoja por día
+- transacciones_*, conceptos, cuentas_expandidas: GETs con los que el dashboard carga un día
+
+El resultado se guarda en JSON para comparar antes y después de un cambio del motor:
+
+    python scripts/benchmarks/bench_motor.py --db sqlite:////tmp/bench.db --reiniciar --salida antes.json
+    # ...cambio en el motor...
+    python scripts/benchmarks/bench_motor.py --db sqlite:////tmp/bench.db --reiniciar --salida despues.json --comparar antes.json
+
+La base indicada en --db se BORRA con --reiniciar: usar una base dedicada, nunca la de producción.
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import datos_sinteticos  # noqa: E402
+from datos_sinteticos import Escala, argumentos_escala, escala_desde  # noqa: E402
+
+OPERACIONES = [
+    "recalculo_cuenta", "recalculo_dia", "recalcular_rango", "consolidado_mensual", "importar_saldos",
+    "consolidado_multi_moneda", "transacciones_tesoreria", "transacciones_pagaduria", "conceptos",
+    "cuentas_expandidas",
+]
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil por rango más cercano (sin interpolar)"""
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, int(round(p / 100 * len(ordenados) + 0.5)) - 1))
+    return ordenados[indice]
+
+
+def commit_git() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=datos_sinteticos.RAIZ
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+class Medidor:
+    """Cuenta las sentencias SQL del engine mientras se mide una operación"""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.sentencias = 0
+        event.listen(engine, "before_cursor_execute", self._contar)
+
+    def _contar(self, *args, **kwargs):
+        self.sentencias += 1
+
+    def medir(self, operacion: Callable[[], None], preparar: Optional[Callable[[], None]], repeticiones: int,
+              calentamiento: int, verboso: bool) -> Dict:
+        tiempos, sentencias = [], []
+        for i in range(calentamiento + repeticiones):
+            if preparar:
+                preparar()
+            salida = contextlib.nullcontext() if verboso else contextlib.redirect_stdout(io.StringIO())
+            with salida:
+                antes = self.sentencias
+                inicio = time.perf_counter()
+                operacion()
+                duracion = (time.perf_counter() - inicio) * 1000
+            if i >= calentamiento:
+                tiempos.append(duracion)
+                sentencias.append(self.sentencias - antes)
+        return {
+            "repeticiones": repeticiones,
+            "p50_ms": round(percentil(tiempos, 50), 2),
+            "p95_ms": round(percentil(tiempos, 95), 2),
+            "min_ms": round(min(tiempos), 2),
+            "max_ms": round(max(tiempos), 2),
+            "sql_p50": percentil(sentencias, 50),
+            "sql_max": max(sentencias),
+        }
+
+
+def construir_operaciones(escala: Escala, cliente, SessionLocal):
+    """(nombre, operación, preparación) de cada medición"""
+    from fastapi import HTTPException
+
+    from app.models import TransaccionFlujoCaja
+    from app.services.dependencias_flujo_caja_service import DependenciasFlujoCajaService
+
+    rng = random.Random(escala.semilla + 2)
+    fechas = escala.fechas()
+    total_cuentas = escala.companias * escala.cuentas
+    fecha_media = fechas[len(fechas) // 2]
+    concepto_editado = datos_sinteticos.MANUALES_TESORERIA[0]
+    excel = datos_sinteticos.excel_saldos(escala)
+    estado = {}
+
+    def editar_celda():
+        """Cambia un concepto manual de una cuenta al azar, como lo haría /quick antes de recalcular"""
+        cuenta_id = rng.randint(1, total_cuentas)
+        with SessionLocal() as db:
+            transaccion = db.query(TransaccionFlujoCaja).filter_by(
+                fecha=fecha_media, cuenta_id=cuenta_id, concepto_id=concepto_editado
+            ).one()
+            transaccion.monto = datos_sinteticos._monto(rng, "I")
+            estado.update(cuenta_id=cuenta_id, compania_id=transaccion.compania_id)
+            db.commit()
+
+    def recalcular(por_cuenta: bool):
+        def operacion():
+            with SessionLocal() as db:
+                DependenciasFlujoCajaService(db).procesar_dependencias_completas_ambos_dashboards(
+                    fecha=fecha_media,
+                    concepto_modificado_id=concepto_editado if por_cuenta else None,
+                    cuenta_id=estado["cuenta_id"] if por_cuenta else None,
+                    compania_id=estado["compania_id"] if por_cuenta else None,
+                    usuario_id=1,
+                )
+                db.commit()
+        return operacion
+
+    def pedir(metodo: str, url: str, **kwargs):
+        def operacion():
+            respuesta = cliente.request(metodo, url, **kwargs)
+            if respuesta.status_code >= 400:
+                raise HTTPException(respuesta.status_code, f"{metodo} {url}: {respuesta.text[:300]}")
+        return operacion
+
+    def importar():
+        respuesta = cliente.post(
+            "/api/v1/saldo-inicial/importar-saldos",
+            data={"tipo_carga": "mes", "mes": escala.desde.strftime("%Y-%m"), "sobrescribir": "true"},
+            files={"archivo_excel": ("saldos.xlsx", excel, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")},
+        )
+        if respuesta.status_code >= 400:
+            raise HTTPException(respuesta.status_code, f"importar-saldos: {respuesta.text[:300]}")
+
+    base = "/api/v1/api/transacciones-flujo-caja"
+    return [
+        ("recalculo_cuenta", recalcular(True), editar_celda),
+        ("recalculo_dia", recalcular(False), editar_celda),
+        ("recalcular_rango", pedir(
+            "POST", f"{base}/recalcular-rango-fechas",
+            params={"fecha_inicio": fechas[0].isoformat(), "fecha_fin": fechas[-1].isoformat()}
+        ), None),
+        ("consolidado_mensual", pedir(
+            "GET", "/api/v1/informes-consolidados/mensual",
+            params={"año": escala.desde.year, "mes": escala.desde.month}
+        ), None),
+        ("consolidado_multi_moneda", pedir(
+            "GET", "/api/v1/informes-consolidados/mensual-multi-moneda",
+            params={"año": escala.desde.year, "mes": escala.desde.month}
+        ), None),
+        ("importar_saldos", importar, None),
+        ("transacciones_tesoreria", pedir(
+            "GET", f"{base}/fecha/{fecha_media.isoformat()}", params={"area": "tesoreria"}
+        ), None),
+        ("transacciones_pagaduria", pedir(
+            "GET", f"{base}/fecha/{fecha_media.isoformat()}", params={"area": "pagaduria"}
+        ), None),
+        ("conceptos", pedir("GET", "/api/v1/api/conceptos-flujo-caja/"), None),
+        ("cuentas_expandidas", pedir("GET", "/api/v1/cuentas-multi-moneda/expandidas"), None),
+    ]
+
+
+def comparar(actual: Dict, base: Dict) -> None:
+    print(f"\n📊 Comparación contra {base['metadatos'].get('commit') or 'base'} ({base['metadatos']['fecha']})")
+    if base["metadatos"].get("escala") != actual["metadatos"]["escala"]:
+        print("⚠️ Las corridas usan escalas distintas: la comparación no es directa")
+    print(f"{'operación':<26}{'p50 antes':>11}{'p50 ahora':>11}{'Δ p50':>9}{'p95 antes':>11}{'p95 ahora':>11}{'SQL':>13}")
+    for nombre, medicion in actual["resultados"].items():
+        previa = base["resultados"].get(nombre)
+        if not previa:
+            continue
+        delta = (medicion["p50_ms"] / previa["p50_ms"] - 1) * 100 if previa["p50_ms"] else 0.0
+        print(
+            f"{nombre:<26}{previa['p50_ms']:>11.1f}{medicion['p50_ms']:>11.1f}{delta:>+8.1f}%"
+            f"{previa['p95_ms']:>11.1f}{medicion['p95_ms']:>11.1f}{previa['sql_p50']:>6} → {medicion['sql_p50']:<4}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del motor de flujo de caja sobre datos sintéticos")
+    parser.add_argument("--db", required=True, help="URL de una base DEDICADA (sqlite:///... o mysql+pymysql://...)")
+    parser.add_argument("--reiniciar", action="store_true", help="Borra las tablas y vuelve a sembrar antes de medir")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--calentamiento", type=int, default=1)
+    parser.add_argument("--solo", nargs="+", choices=OPERACIONES, help="Medir solo estas operaciones")
+    parser.add_argument("--salida", help="Guardar el resultado en este JSON")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior para mostrar la diferencia")
+    parser.add_argument("--verboso", action="store_true", help="No silenciar los print/logs de los endpoints")
+    argumentos_escala(parser)
+    args = parser.parse_args()
+    escala = escala_desde(args)
+
+    # La configuración de la app se lee al importar: fijar la base antes de cualquier import de app.*
+    os.environ["DATABASE_URL"] = args.db
+    os.environ.setdefault("DB_ECHO", "false")
+    if not args.verboso:
+        logging.disable(logging.WARNING)
+
+    if args.reiniciar:
+        print(f"🌱 Sembrando {escala.como_dict()}...")
+        inicio = time.perf_counter()
+        resumen = datos_sinteticos.preparar_base(args.db, escala, reiniciar=True)
+        print(f"✅ {resumen} en {time.perf_counter() - inicio:.1f}s")
+
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.api import api_router
+    from app.api.auth import get_current_user
+    from app.core.database import SessionLocal, engine
+    from app.core.principal_cache import UsuarioPrincipal
+    from app.services.dependencias_flujo_caja_service import paralelismo_recalculo
+
+    # Solo los routers: sin los eventos de arranque de app.main (jobs, TRM, websockets)
+    app = FastAPI()
+    app.include_router(api_router)
+    app.dependency_overrides[get_current_user] = lambda: UsuarioPrincipal(
+        id=1, nombre="Benchmark", email=datos_sinteticos.EMAIL_USUARIO, rol="administrador", rol_id=None, estado=True
+    )
+
+    medidor = Medidor(engine)
+    resultados = {}
+    with TestClient(app) as cliente:
+        for nombre, operacion, preparar in construir_operaciones(escala, cliente, SessionLocal):
+            if args.solo and nombre not in args.solo:
+                continue
+            resultados[nombre] = medidor.medir(operacion, preparar, args.repeticiones, args.calentamiento, args.verboso)
+            r = resultados[nombre]
+            print(f"⏱️ {nombre:<26} p50 {r['p50_ms']:>9.1f} ms  p95 {r['p95_ms']:>9.1f} ms  SQL {r['sql_p50']}")
+
+    actual = {
+        "metadatos": {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "commit": commit_git(),
+            "dialecto": engine.dialect.name,
+            "python": platform.python_version(),
+            "paralelismo": paralelismo_recalculo(),
+            "escala": escala.como_dict(),
+            "repeticiones": args.repeticiones,
+        },
+        "resultados": resultados,
+    }
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            json.dump(actual, archivo, indent=2, ensure_ascii=False)
+        print(f"💾 Resultado guardado en {args.salida}")
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            comparar(actual, json.load(archivo))
+
+
+if __name__ == "__main__":
+    main()
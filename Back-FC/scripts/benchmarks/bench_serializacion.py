@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark de serialización de listados grandes (p. ej. /transacciones-flujo-caja/fecha/{fecha} de un mes).
+
+Compara, sobre datos sintéticos y sin base de datos:
+- Ruta anterior: objetos ORM → response_model (Pydantic) → jsonable_encoder → json.dumps
+- Ruta rápida: tuplas de columnas → dicts → orjson (Decimal como texto), opcionalmente con gzip/brotli
+
+Uso (desde Back-FC):
+    python scripts/benchmarks/bench_serializacion.py --dias 30 --conceptos 80 --cuentas 10
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.core.serializacion import comprimir, dumps, brotli
+from app.models.transacciones_flujo_caja import AreaTransaccion
+from app.schemas.flujo_caja import ConceptoFlujoCajaResponse, TransaccionFlujoCajaResponse
+from app.services.transaccion_flujo_caja_service import _COLUMNAS_RESPUESTA, fila_a_respuesta
+
+Fila = namedtuple("Fila", [columna.key for columna in _COLUMNAS_RESPUESTA])
+
+
+def generar_datos(dias: int, conceptos: int, cuentas: int):
+    """Filas sintéticas como tuplas de columnas y como objetos con atributos (equivalente ORM)"""
+    ahora = datetime(2025, 3, 1, 8, 30)
+    lista_conceptos = [
+        SimpleNamespace(
+            id=c, nombre=f"CONCEPTO {c}", codigo="I" if c % 2 else "E", tipo=None,
+            area="tesoreria" if c <= 51 else "pagaduria", orden_display=c, activo=True,
+            depende_de_concepto_id=None, tipo_dependencia=None, created_at=ahora, updated_at=ahora,
+            concepto_dependiente=None
+        )
+        for c in range(1, conceptos + 1)
+    ]
+    filas, objetos = [], []
+    id_transaccion = 0
+    for d in range(dias):
+        fecha = date(2025, 3, 1) + timedelta(days=d)
+        for concepto in lista_conceptos:
+            for cuenta_id in range(1, cuentas + 1):
+                id_transaccion += 1
+                area = AreaTransaccion.tesoreria if concepto.id <= 51 else AreaTransaccion.pagaduria
+                fila = Fila(
+                    fecha, concepto.id, cuenta_id, Decimal(f"{id_transaccion * 1234.5 % 9999999:.2f}"),
+                    None, area, 1 + cuenta_id % 3, id_transaccion, 1,
+                    {"accion": "actualizacion", "usuario_id": 1, "timestamp": ahora.isoformat(),
+                     "monto_anterior": 0.0, "monto_nuevo": 1.0},
+                    1, ahora, ahora
+                )
+                filas.append(fila)
+                objetos.append(SimpleNamespace(**fila._asdict(), concepto=concepto))
+    return lista_conceptos, filas, objetos
+
+
+def ruta_anterior(objetos) -> bytes:
+    adaptador = TypeAdapter(List[TransaccionFlujoCajaResponse])
+    validados = adaptador.validate_python(objetos, from_attributes=True)
+    return json.dumps(jsonable_encoder(validados), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def ruta_rapida(lista_conceptos, filas) -> bytes:
+    conceptos = {
+        c.id: ConceptoFlujoCajaResponse.model_validate(c).model_dump(mode="json") for c in lista_conceptos
+    }
+    return dumps([fila_a_respuesta(fila, conceptos.get(fila.concepto_id)) for fila in filas])
+
+
+def medir(nombre: str, funcion, repeticiones: int) -> bytes:
+    resultado, tiempos = None, []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    tiempos.sort()
+    print(f"   {nombre:<38} mediana {tiempos[len(tiempos) // 2] * 1000:9.1f} ms   mínimo {tiempos[0] * 1000:9.1f} ms")
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de serialización de listados")
+    parser.add_argument("--dias", type=int, default=30)
+    parser.add_argument("--conceptos", type=int, default=80)
+    parser.add_argument("--cuentas", type=int, default=10)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    lista_conceptos, filas, objetos = generar_datos(args.dias, args.conceptos, args.cuentas)
+    print(f"📊 {len(filas)} transacciones sintéticas ({args.dias} días × {args.conceptos} conceptos × {args.cuentas} cuentas)")
+
+    anterior = medir("Pydantic + jsonable_encoder + json", lambda: ruta_anterior(objetos), args.repeticiones)
+    rapida = medir("tuplas + orjson", lambda: ruta_rapida(lista_conceptos, filas), args.repeticiones)
+    medir("tuplas + orjson + gzip", lambda: comprimir(ruta_rapida(lista_conceptos, filas), "gzip"), args.repeticiones)
+    if brotli is not None:
+        medir("tuplas + orjson + brotli", lambda: comprimir(ruta_rapida(lista_conceptos, filas), "br"), args.repeticiones)
+
+    iguales = json.loads(anterior) == json.loads(rapida)
+    print(f"{'✅' if iguales else '❌'} Mismo contenido JSON en ambas rutas")
+    print(f"📦 Tamaño: {len(rapida) / 1024:.0f} KB sin comprimir, {len(comprimir(rapida, 'gzip')) / 1024:.0f} KB con gzip")
+    if not iguales:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
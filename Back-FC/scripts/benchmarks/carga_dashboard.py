@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga HTTP + WebSocket que reproduce el tráfico de los dashboards de cierre de mes.
+
+Cada usuario virtual sigue el flujo de `useTransaccionesFlujoCaja.ts`:
+1. Abre el WebSocket de transacciones y carga el día (GET /fecha/{fecha}?area=..., con ETag)
+2. Edita una celda manual de su área con PUT /{id}/quick (enviando la versión leída)
+3. Espera el evento `dependencias_procesadas` de esa (fecha, cuenta)
+4. Recarga el día y hace una pausa antes de la siguiente edición
+
+La concurrencia sube por etapas (--etapas 1 5 10 25) y por etapa se reporta: ciclos/s y
+requests/s, latencia p50/p95/p99 por operación, propagación guardar → evento WebSocket y
+tasas de error, conflicto (409) y eventos que no llegaron a tiempo.
+
+Contra un servidor ya levantado (usuario con permisos de edición):
+    python scripts/benchmarks/carga_dashboard.py --url http://localhost:8000 --email ... --contrasena ...
+
+Levantando uvicorn sobre una base sintética DEDICADA (se borra con --reiniciar):
+    python scripts/benchmarks/carga_dashboard.py --lanzar --db sqlite:////tmp/carga.db --reiniciar \\
+        --etapas 1 5 10 25 --duracion 30 --salida carga.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+import websockets
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import datos_sinteticos  # noqa: E402
+from bench_motor import commit_git, percentil  # noqa: E402
+from datos_sinteticos import Escala, argumentos_escala, escala_desde  # noqa: E402
+
+RUTA_TRANSACCIONES = "/api/v1/api/transacciones-flujo-caja"
+OPERACIONES = ("cargar", "guardar", "recargar")
+
+
+class Etapa:
+    """Acumulados de una etapa de concurrencia"""
+
+    def __init__(self, usuarios: int):
+        self.usuarios = usuarios
+        self.latencias: Dict[str, List[float]] = defaultdict(list)
+        self.propagacion: List[float] = []
+        self.ciclos = 0
+        self.requests = 0
+        self.errores = 0
+        self.conflictos = 0
+        self.ws_perdidos = 0
+        self.no_modificados = 0
+        self.muestras_error: List[str] = []
+
+    def registrar(self, operacion: str, inicio: float, respuesta: Optional[httpx.Response]) -> None:
+        self.requests += 1
+        self.latencias[operacion].append((time.perf_counter() - inicio) * 1000)
+        if respuesta is None or respuesta.status_code >= 500 or respuesta.status_code in (400, 401, 403, 404, 423):
+            self.errores += 1
+            if len(self.muestras_error) < 5:
+                detalle = "sin respuesta" if respuesta is None else f"{respuesta.status_code} {respuesta.text[:200]}"
+                self.muestras_error.append(f"{operacion}: {detalle}")
+        elif respuesta.status_code == 409:
+            self.conflictos += 1
+        elif respuesta.status_code == 304:
+            self.no_modificados += 1
+
+    def resumen(self, duracion: float) -> Dict:
+        def tiempos(valores: List[float]) -> Dict:
+            if not valores:
+                return {"n": 0}
+            return {
+                "n": len(valores),
+                "p50_ms": round(percentil(valores, 50), 1),
+                "p95_ms": round(percentil(valores, 95), 1),
+                "p99_ms": round(percentil(valores, 99), 1),
+                "max_ms": round(max(valores), 1),
+            }
+
+        guardados = len(self.latencias["guardar"])
+        return {
+            "usuarios": self.usuarios,
+            "duracion_s": round(duracion, 1),
+            "ciclos": self.ciclos,
+            "ciclos_por_s": round(self.ciclos / duracion, 2),
+            "requests_por_s": round(self.requests / duracion, 2),
+            "tasa_error": round(self.errores / self.requests, 4) if self.requests else 0.0,
+            "tasa_conflicto": round(self.conflictos / guardados, 4) if guardados else 0.0,
+            "ws_perdidos": self.ws_perdidos,
+            "recargas_304": self.no_modificados,
+            "latencia": {operacion: tiempos(self.latencias[operacion]) for operacion in OPERACIONES},
+            "propagacion": tiempos(self.propagacion),
+            "muestras_error": self.muestras_error,
+        }
+
+
+class EventosWebSocket:
+    """Lee el WebSocket de un usuario y despierta a quien espera el recálculo de una (fecha, cuenta)"""
+
+    def __init__(self, conexion):
+        self.conexion = conexion
+        self.esperas: Dict[Tuple[str, Optional[int]], List[asyncio.Future]] = defaultdict(list)
+
+    async def leer(self) -> None:
+        async for texto in self.conexion:
+            mensaje = json.loads(texto)
+            if mensaje.get("type") != "dependencias_procesadas":
+                continue
+            # /quick informa cuenta_id; los lotes informan la lista de cuentas
+            cuentas = mensaje.get("cuentas") or [mensaje.get("cuenta_id")]
+            for cuenta_id in cuentas:
+                for futuro in self.esperas.pop((mensaje.get("fecha"), cuenta_id), []):
+                    if not futuro.done():
+                        futuro.set_result(time.perf_counter())
+
+    def esperar(self, fecha: str, cuenta_id: Optional[int]) -> asyncio.Future:
+        futuro = asyncio.get_running_loop().create_future()
+        self.esperas[(fecha, cuenta_id)].append(futuro)
+        return futuro
+
+
+async def usuario_virtual(
+    numero: int, cliente: httpx.AsyncClient, url_ws: str, fechas: List[str], fin: float,
+    etapa: Etapa, args
+) -> None:
+    rng = random.Random(args.semilla * 1000 + numero)
+    area = "tesoreria" if numero % 2 == 0 else "pagaduria"
+    manuales = set(datos_sinteticos.MANUALES_TESORERIA if area == "tesoreria" else datos_sinteticos.MANUALES_PAGADURIA)
+    fecha = fechas[numero % len(fechas)]
+    filas: List[dict] = []
+    etag = [None]
+
+    async def cargar(operacion: str) -> None:
+        nonlocal filas
+        encabezados = {"If-None-Match": etag[0]} if etag[0] else {}
+        inicio = time.perf_counter()
+        respuesta = None
+        try:
+            respuesta = await cliente.get(f"{RUTA_TRANSACCIONES}/fecha/{fecha}", params={"area": area}, headers=encabezados)
+        except httpx.HTTPError:
+            pass
+        finally:
+            etapa.registrar(operacion, inicio, respuesta)
+        if respuesta is not None and respuesta.status_code == 200:
+            filas = respuesta.json()
+            etag[0] = respuesta.headers.get("etag")
+
+    async with websockets.connect(url_ws, max_size=None) as conexion:
+        eventos = EventosWebSocket(conexion)
+        lector = asyncio.create_task(eventos.leer())
+        try:
+            await cargar("cargar")
+            while time.perf_counter() < fin:
+                editables = [f for f in filas if f["concepto_id"] in manuales]
+                if not editables:
+                    raise RuntimeError(f"No hay celdas editables de {area} el {fecha}")
+                fila = rng.choice(editables)
+                cuerpo = {"monto": str(round(rng.uniform(1_000, 50_000_000), 2)), "descripcion": f"Actualizado desde dashboard {area}"}
+                if not args.sin_version:
+                    cuerpo["version"] = fila["version"]
+
+                inicio = time.perf_counter()
+                respuesta = None
+                try:
+                    respuesta = await cliente.put(f"{RUTA_TRANSACCIONES}/{fila['id']}/quick", json=cuerpo)
+                except httpx.HTTPError:
+                    pass
+                finally:
+                    etapa.registrar("guardar", inicio, respuesta)
+
+                if respuesta is not None and respuesta.status_code == 200:
+                    fila.update(respuesta.json())
+                    try:
+                        recibido = await asyncio.wait_for(eventos.esperar(fecha, fila["cuenta_id"]), args.timeout_ws)
+                        etapa.propagacion.append((recibido - inicio) * 1000)
+                    except asyncio.TimeoutError:
+                        etapa.ws_perdidos += 1
+                await cargar("recargar")
+                etapa.ciclos += 1
+                await asyncio.sleep(rng.uniform(*args.pausa))
+        finally:
+            lector.cancel()
+
+
+async def ejecutar_etapa(usuarios: int, args, token: str, fechas: List[str]) -> Dict:
+    etapa = Etapa(usuarios)
+    url_ws = args.url.replace("http", "ws", 1) + f"{RUTA_TRANSACCIONES}/ws"
+    limites = httpx.Limits(max_connections=usuarios * 2, max_keepalive_connections=usuarios * 2)
+    async with httpx.AsyncClient(
+        base_url=args.url, headers={"Authorization": f"Bearer {token}"}, timeout=args.timeout_http, limits=limites
+    ) as cliente:
+        inicio = time.perf_counter()
+        fin = inicio + args.duracion
+        tareas = [
+            asyncio.create_task(usuario_virtual(n, cliente, url_ws, fechas, fin, etapa, args))
+            for n in range(usuarios)
+        ]
+        resultados = await asyncio.gather(*tareas, return_exceptions=True)
+        duracion = time.perf_counter() - inicio
+    for resultado in resultados:
+        if isinstance(resultado, Exception):
+            etapa.errores += 1
+            if len(etapa.muestras_error) < 5:
+                etapa.muestras_error.append(f"usuario: {type(resultado).__name__}: {resultado}")
+    return etapa.resumen(duracion)
+
+
+def iniciar_sesion(url: str, email: str, contrasena: str) -> str:
+    respuesta = httpx.post(f"{url}/api/v1/auth/login", json={"email": email, "password": contrasena}, timeout=30)
+    respuesta.raise_for_status()
+    return respuesta.json()["access_token"]
+
+
+def lanzar_servidor(args) -> subprocess.Popen:
+    """uvicorn con app.main sobre la base indicada; espera a /health"""
+    entorno = {**os.environ, "DATABASE_URL": args.db, "DB_ECHO": "false"}
+    puerto = args.url.rsplit(":", 1)[-1].split("/")[0]
+    comando = [
+        sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", puerto,
+        "--workers", str(args.workers), "--log-level", "warning",
+    ]
+    registro = open(args.log_servidor, "w", encoding="utf-8")
+    proceso = subprocess.Popen(comando, cwd=datos_sinteticos.RAIZ, env=entorno, stdout=registro, stderr=subprocess.STDOUT)
+    limite = time.time() + 60
+    while time.time() < limite:
+        if proceso.poll() is not None:
+            raise RuntimeError(f"uvicorn terminó al arrancar (ver {args.log_servidor})")
+        try:
+            if httpx.get(f"{args.url}/health", timeout=2).status_code == 200:
+                return proceso
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    proceso.terminate()
+    raise RuntimeError(f"uvicorn no respondió /health en 60 s (ver {args.log_servidor})")
+
+
+def imprimir_etapa(r: Dict) -> None:
+    lat, prop = r["latencia"], r["propagacion"]
+
+    def p(d: Dict, clave: str) -> str:
+        return f"{d[clave]:>8.0f}" if d.get("n") else f"{'-':>8}"
+
+    print(
+        f"{r['usuarios']:>8}{r['ciclos_por_s']:>9.2f}{r['requests_por_s']:>9.1f}"
+        f"{p(lat['guardar'], 'p50_ms')}{p(lat['guardar'], 'p99_ms')}{p(lat['recargar'], 'p95_ms')}"
+        f"{p(prop, 'p50_ms')}{p(prop, 'p95_ms')}{p(prop, 'p99_ms')}"
+        f"{r['tasa_error'] * 100:>7.1f}%{r['tasa_conflicto'] * 100:>7.1f}%{r['ws_perdidos']:>7}"
+    )
+    for muestra in r["muestras_error"]:
+        print(f"         ❌ {muestra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de los dashboards (HTTP + WebSocket)")
+    parser.add_argument("--url", default="http://127.0.0.1:8765", help="Servidor a probar")
+    parser.add_argument("--email", default=datos_sinteticos.EMAIL_USUARIO)
+    parser.add_argument("--contrasena", default=datos_sinteticos.CONTRASENA_USUARIO)
+    parser.add_argument("--lanzar", action="store_true", help="Levantar uvicorn (app.main) en --url sobre --db")
+    parser.add_argument("--db", help="Base DEDICADA para --lanzar (sqlite:///... o mysql+pymysql://...)")
+    parser.add_argument("--reiniciar", action="store_true", help="Con --lanzar: borrar y sembrar la base antes de arrancar")
+    parser.add_argument("--workers", type=int, default=1, help="Workers de uvicorn con --lanzar")
+    parser.add_argument("--log-servidor", default="carga_servidor.log", help="Salida de uvicorn con --lanzar")
+    parser.add_argument("--etapas", type=int, nargs="+", default=[1, 5, 10, 25], help="Usuarios concurrentes por etapa")
+    parser.add_argument("--duracion", type=float, default=30, help="Segundos por etapa")
+    parser.add_argument("--pausa", type=float, nargs=2, default=[0.5, 2.0], metavar=("MIN", "MAX"),
+                        help="Pausa entre ediciones de un usuario (s)")
+    parser.add_argument("--dias-activos", type=int, default=1,
+                        help="Días (los últimos sembrados) sobre los que trabajan los usuarios; 1 = todos en el cierre")
+    parser.add_argument("--sin-version", action="store_true",
+                        help="No enviar la versión leída en /quick (último en guardar gana; no hay 409)")
+    parser.add_argument("--timeout-http", type=float, default=60)
+    parser.add_argument("--timeout-ws", type=float, default=30, help="Espera máxima del evento dependencias_procesadas")
+    parser.add_argument("--salida", help="Guardar el resultado en este JSON")
+    argumentos_escala(parser)
+    args = parser.parse_args()
+    escala: Escala = escala_desde(args)
+    args.url = args.url.rstrip("/")
+
+    servidor = None
+    if args.lanzar:
+        if not args.db:
+            parser.error("--lanzar requiere --db")
+        if args.reiniciar:
+            print(f"🌱 Sembrando {escala.como_dict()}...")
+            print(f"✅ {datos_sinteticos.preparar_base(args.db, escala, reiniciar=True)}")
+        servidor = lanzar_servidor(args)
+        print(f"🚀 uvicorn en {args.url} ({args.workers} worker(s), log en {args.log_servidor})")
+
+    try:
+        token = iniciar_sesion(args.url, args.email, args.contrasena)
+        fechas = [f.isoformat() for f in escala.fechas()[-args.dias_activos:]]
+        print(f"📅 Días activos: {', '.join(fechas)}")
+        print(f"{'usuarios':>8}{'ciclos/s':>9}{'req/s':>9}{'PUT p50':>8}{'PUT p99':>8}{'GET p95':>8}"
+              f"{'WS p50':>8}{'WS p95':>8}{'WS p99':>8}{'error':>8}{'409':>8}{'WS ✗':>7}")
+        etapas = []
+        for usuarios in args.etapas:
+            resultado = asyncio.run(ejecutar_etapa(usuarios, args, token, fechas))
+            etapas.append(resultado)
+            imprimir_etapa(resultado)
+    finally:
+        if servidor is not None:
+            servidor.terminate()
+            servidor.wait(timeout=30)
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            json.dump({
+                "metadatos": {
+                    "fecha": datetime.now().isoformat(timespec="seconds"),
+                    "commit": commit_git(),
+                    "url": args.url,
+                    "workers": args.workers if args.lanzar else None,
+                    "escala": escala.como_dict(),
+                    "dias_activos": fechas,
+                    "duracion_s": args.duracion,
+                    "pausa_s": args.pausa,
+                    "con_version": not args.sin_version,
+                },
+                "etapas": etapas,
+            }, archivo, indent=2, ensure_ascii=False)
+        print(f"💾 Resultado guardado en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Generador de datos sintéticos para benchmarks y pruebas de carga del motor de flujo de caja.
+
+Siembra una base MySQL o SQLite con el catálogo real de conceptos: el orden de
+`crear_conceptos_tesoreria_completos.py` y `crear_conceptos_pagaduria.py` da los IDs 1-81
+(los que usa el motor de recálculo), más los subtotales calculados 82-85 y las fórmulas
+de SUB-TOTAL TESORERÍA (50) y SALDO FINAL CUENTAS (51) de producción. La escala es
+compañías × cuentas por compañía × conceptos con valor × días hábiles. Los montos salen
+de una semilla fija para que dos corridas sean comparables.
+
+Uso (desde Back-FC):
+    python scripts/benchmarks/datos_sinteticos.py --db sqlite:///bench.db --companias 3 --cuentas 5 --conceptos 20 --dias 22
+"""
+import argparse
+import io
+import json
+import os
+import random
+import sys
+from dataclasses import asdict, dataclass, field
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, List
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "scripts"))
+
+from crear_conceptos_pagaduria import CONCEPTOS_PAGADURIA  # noqa: E402
+from crear_conceptos_tesoreria_completos import CONCEPTOS_TESORERIA_COMPLETOS  # noqa: E402
+
+# Conceptos calculados por el motor que no están en los scripts de catálogo
+CONCEPTOS_CALCULADOS = [
+    {"nombre": "SUBTOTAL MOVIMIENTO PAGADURIA", "codigo": "N"},
+    {"nombre": "SUBTOTAL SALDO INICIAL PAGADURIA", "codigo": "N"},
+    {"nombre": "MOVIMIENTO TESORERIA", "codigo": "N"},
+    {"nombre": "SALDO TOTAL EN BANCOS", "codigo": "N"},
+]
+FORMULAS = {
+    50: "SUMA(" + ",".join(str(i) for i in range(5, 50)) + ")",  # SUB-TOTAL TESORERÍA
+    51: "SUMA(4,50)",  # SALDO FINAL CUENTAS
+}
+# Conceptos que el usuario digita (el resto los calcula el motor)
+MANUALES_TESORERIA = [i for i in range(5, 49)]
+MANUALES_PAGADURIA = [i for i in range(55, 80)]
+SALDO_INICIAL_ID = 1
+SALDO_DIA_ANTERIOR_ID = 54
+CODIGOS_POR_TIPO = {"ingreso": "I", "egreso": "E"}
+LOTE_INSERCION = 5000
+# Usuario administrador sembrado (id 1), para iniciar sesión contra un servidor real
+EMAIL_USUARIO = "benchmark@example.com"
+CONTRASENA_USUARIO = "benchmark"
+
+
+@dataclass
+class Escala:
+    companias: int = 3
+    cuentas: int = 5  # por compañía
+    conceptos: int = 20  # conceptos manuales con valor por cuenta, día y área
+    dias: int = 22  # días hábiles desde `desde`
+    desde: date = field(default_factory=lambda: date(2025, 3, 3))
+    semilla: int = 42
+
+    def fechas(self) -> List[date]:
+        fechas, actual = [], self.desde
+        while len(fechas) < self.dias:
+            if actual.weekday() < 5:
+                fechas.append(actual)
+            actual += timedelta(days=1)
+        return fechas
+
+    def como_dict(self) -> dict:
+        return {**asdict(self), "desde": self.desde.isoformat()}
+
+
+def catalogo_conceptos() -> List[dict]:
+    """Catálogo completo con los IDs de producción"""
+    catalogo = []
+    orden_pagaduria = 0
+    fuentes = (
+        [(c, "tesoreria") for c in CONCEPTOS_TESORERIA_COMPLETOS]
+        + [(c, "pagaduria") for c in CONCEPTOS_PAGADURIA]
+        + [(c, "pagaduria") for c in CONCEPTOS_CALCULADOS]
+    )
+    for concepto_id, (concepto, area) in enumerate(fuentes, start=1):
+        if area == "pagaduria":
+            orden_pagaduria += 1
+        catalogo.append({
+            "id": concepto_id,
+            "nombre": concepto["nombre"],
+            "codigo": concepto.get("codigo") or CODIGOS_POR_TIPO.get(concepto.get("tipo"), "N"),
+            "area": area,
+            "orden_display": concepto_id if area == "tesoreria" else orden_pagaduria,
+            "formula_dependencia": FORMULAS.get(concepto_id),
+        })
+    return catalogo
+
+
+def numero_cuenta(cuenta_id: int) -> str:
+    """Números de 10 dígitos: el importador de Excel reconoce cuentas de 6 o más dígitos"""
+    return f"{4000000000 + cuenta_id}"
+
+
+def _monto(rng: random.Random, codigo: str) -> Decimal:
+    valor = Decimal(rng.randint(1_000, 50_000_000)) / 100
+    return -valor if codigo == "E" else valor
+
+
+def sembrar(db, escala: Escala) -> Dict[str, int]:
+    """Inserta catálogo, cuentas, TRM y transacciones en una base vacía (hace commit)"""
+    from sqlalchemy import insert
+
+    from app.models import (
+        TRM, AreaConcepto, AreaTransaccion, Banco, Compania, ConceptoFlujoCaja, CuentaBancaria, CuentaMoneda,
+        GMFConfig, TipoMoneda, TransaccionFlujoCaja, Usuario
+    )
+    from app.services.auth_service import get_password_hash
+
+    if db.query(ConceptoFlujoCaja.id).first() is not None:
+        raise ValueError("La base ya tiene conceptos; use una base vacía (o --reiniciar)")
+
+    rng = random.Random(escala.semilla)
+    fechas = escala.fechas()
+    catalogo = catalogo_conceptos()
+    codigos = {c["id"]: c["codigo"] for c in catalogo}
+
+    db.add(Usuario(
+        id=1, nombre="Benchmark", email=EMAIL_USUARIO, contrasena=get_password_hash(CONTRASENA_USUARIO),
+        rol="administrador"
+    ))
+    db.add(Banco(id=1, nombre="Banco Sintético"))
+    db.add_all([Compania(id=i, nombre=f"Compañía {i}") for i in range(1, escala.companias + 1)])
+    db.add_all([
+        ConceptoFlujoCaja(
+            id=c["id"], nombre=c["nombre"], codigo=c["codigo"], area=AreaConcepto(c["area"]),
+            orden_display=c["orden_display"], activo=True, formula_dependencia=c["formula_dependencia"]
+        )
+        for c in catalogo
+    ])
+    db.flush()
+
+    cuentas = []
+    for compania_id in range(1, escala.companias + 1):
+        for _ in range(escala.cuentas):
+            cuenta_id = len(cuentas) + 1
+            cuentas.append((cuenta_id, compania_id))
+            db.add(CuentaBancaria(id=cuenta_id, numero_cuenta=numero_cuenta(cuenta_id), compania_id=compania_id, banco_id=1))
+    db.flush()
+    db.add_all([
+        CuentaMoneda(id=cuenta_id, id_cuenta=cuenta_id, moneda=TipoMoneda.USD if cuenta_id % 5 == 0 else TipoMoneda.COP)
+        for cuenta_id, _ in cuentas
+    ])
+    vigencia = fechas[0] - timedelta(days=30)
+    db.add_all([
+        GMFConfig(cuenta_bancaria_id=cuenta_id, conceptos_seleccionados=json.dumps(MANUALES_TESORERIA[:10]),
+                  activo=True, fecha_vigencia_desde=vigencia)
+        for cuenta_id, _ in cuentas
+    ])
+    dia = vigencia
+    while dia <= fechas[-1] + timedelta(days=7):
+        db.add(TRM(fecha=dia, valor=Decimal("4000") + Decimal(rng.randint(0, 40000)) / 100))
+        dia += timedelta(days=1)
+    db.commit()
+
+    tesoreria = MANUALES_TESORERIA[:escala.conceptos]
+    pagaduria = MANUALES_PAGADURIA[:escala.conceptos]
+    filas = []
+    total = 0
+
+    def volcar():
+        nonlocal filas, total
+        if filas:
+            db.execute(insert(TransaccionFlujoCaja.__table__), filas)
+            total += len(filas)
+            filas = []
+
+    for fecha in fechas:
+        for cuenta_id, compania_id in cuentas:
+            base = {"fecha": fecha, "cuenta_id": cuenta_id, "compania_id": compania_id, "usuario_id": 1, "version": 1}
+            filas.append({**base, "concepto_id": SALDO_INICIAL_ID, "area": AreaTransaccion.tesoreria,
+                          "monto": _monto(rng, "I") * 100})
+            filas.append({**base, "concepto_id": SALDO_DIA_ANTERIOR_ID, "area": AreaTransaccion.pagaduria,
+                          "monto": _monto(rng, "I") * 100})
+            for concepto_id in tesoreria:
+                filas.append({**base, "concepto_id": concepto_id, "area": AreaTransaccion.tesoreria,
+                              "monto": _monto(rng, codigos[concepto_id])})
+            for concepto_id in pagaduria:
+                filas.append({**base, "concepto_id": concepto_id, "area": AreaTransaccion.pagaduria,
+                              "monto": _monto(rng, codigos[concepto_id])})
+            if len(filas) >= LOTE_INSERCION:
+                volcar()
+    volcar()
+    db.commit()
+    return {"conceptos": len(catalogo), "cuentas": len(cuentas), "dias": len(fechas), "transacciones": total}
+
+
+def excel_saldos(escala: Escala) -> bytes:
+    """Libro con una hoja por día (nombre = número de día) en el formato que lee el importador de saldos"""
+    from openpyxl import Workbook
+
+    rng = random.Random(escala.semilla + 1)
+    total_cuentas = escala.companias * escala.cuentas
+    libro = Workbook()
+    libro.remove(libro.active)
+    for fecha in escala.fechas():
+        if fecha.month != escala.desde.month:
+            break
+        hoja = libro.create_sheet(str(fecha.day))
+        hoja.append(["MONEDA"] + ["USD" if c % 5 == 0 else "COP" for c in range(1, total_cuentas + 1)])
+        hoja.append(["CUENTA"] + [int(numero_cuenta(c)) for c in range(1, total_cuentas + 1)])
+        hoja.append(["SALDO INICIAL"] + [float(_monto(rng, "I")) for _ in range(total_cuentas)])
+    salida = io.BytesIO()
+    libro.save(salida)
+    return salida.getvalue()
+
+
+def crear_engine(url: str):
+    from sqlalchemy import create_engine
+
+    opciones = {"connect_args": {"check_same_thread": False}} if url.startswith("sqlite") else {"pool_pre_ping": True}
+    return create_engine(url, **opciones)
+
+
+def preparar_base(url: str, escala: Escala, reiniciar: bool = False) -> Dict[str, int]:
+    """Crea el esquema (opcionalmente desde cero) y siembra la escala indicada"""
+    from sqlalchemy.orm import sessionmaker
+
+    import app.models  # noqa: F401  (registra todos los modelos)
+    import app.models.auditoria  # noqa: F401
+    import app.models.dias_festivos  # noqa: F401
+    from app.core.database import Base
+
+    engine = crear_engine(url)
+    try:
+        if reiniciar:
+            Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+        with sessionmaker(bind=engine)() as db:
+            return sembrar(db, escala)
+    finally:
+        engine.dispose()
+
+
+def argumentos_escala(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--companias", type=int, default=3)
+    parser.add_argument("--cuentas", type=int, default=5, help="Cuentas por compañía")
+    parser.add_argument("--conceptos", type=int, default=20, help="Conceptos manuales con valor por área")
+    parser.add_argument("--dias", type=int, default=22, help="Días hábiles")
+    parser.add_argument("--desde", type=date.fromisoformat, default=date(2025, 3, 3))
+    parser.add_argument("--semilla", type=int, default=42)
+
+
+def escala_desde(args) -> Escala:
+    return Escala(args.companias, args.cuentas, args.conceptos, args.dias, args.desde, args.semilla)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sembrar datos sintéticos de flujo de caja")
+    parser.add_argument("--db", required=True, help="URL SQLAlchemy, p. ej. sqlite:///bench.db o mysql+pymysql://...")
+    parser.add_argument("--reiniciar", action="store_true", help="Borra y recrea todas las tablas antes de sembrar")
+    argumentos_escala(parser)
+    args = parser.parse_args()
+
+    resumen = preparar_base(args.db, escala_desde(args), args.reiniciar)
+    print(f"✅ Base sembrada: {resumen}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Mantenimiento mensual: crea las particiones de los próximos meses en transacciones_flujo_caja.
+
+Divide `pmax` para que siempre existan las particiones hasta PARTICIONES_MESES_ADELANTE
+meses después de hoy. Es idempotente (sin DDL si ya existen), así que puede correr a
+diario; con cron mensual basta:
+
+    0 3 1 * *  cd /app && python scripts/maintenance/rotar_particiones.py
+
+Uso (desde Back-FC):
+    python scripts/maintenance/rotar_particiones.py
+    python scripts/maintenance/rotar_particiones.py --dry-run --meses-adelante 6
+    python scripts/maintenance/rotar_particiones.py --listar
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+from app.core.database import session_scope
+from app.services.particiones_mensuales_service import TABLA, ParticionesMensualesService
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=f"Rotar las particiones mensuales de {TABLA}")
+    parser.add_argument("--meses-adelante", type=int, default=None, help="Meses futuros que deben existir")
+    parser.add_argument("--dry-run", action="store_true", help="Mostrar la sentencia sin ejecutarla")
+    parser.add_argument("--listar", action="store_true", help="Listar las particiones con sus filas estimadas")
+    args = parser.parse_args()
+
+    try:
+        with session_scope() as db:
+            service = ParticionesMensualesService(db)
+            if args.listar:
+                for particion in service.particiones():
+                    print(f"  {particion['nombre']:>8}  ~{particion['filas_estimadas']:,} filas")
+                return 0
+
+            resultado = service.rotar(meses_adelante=args.meses_adelante, aplicar=not args.dry_run)
+    except Exception as e:
+        print(f"❌ Error rotando particiones: {e}")
+        return 2
+
+    if not resultado["particionada"]:
+        print(f"⚠️ Sin rotación: {resultado['motivo']}")
+        return 1
+    if not resultado["creadas"]:
+        print(f"✅ Particiones al día ({resultado['particiones']})")
+        return 0
+    if args.dry_run:
+        print(f"{resultado['sentencia']};")
+        return 0
+    print(f"✅ Particiones creadas: {', '.join(resultado['creadas'])} (total {resultado['particiones']})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,16 @@
+-- Script para garantizar una sola conciliación por (fecha, empresa)
+-- Permite el upsert masivo de totales (INSERT ... ON DUPLICATE KEY UPDATE)
+
+-- Eliminar duplicados conservando la conciliación más antigua de cada (fecha, empresa)
+DELETE c1 FROM conciliaciones_contables c1
+JOIN conciliaciones_contables c2
+  ON c1.fecha = c2.fecha
+ AND c1.empresa_id = c2.empresa_id
+ AND c1.id > c2.id;
+
+-- Agregar la restricción única
+ALTER TABLE conciliaciones_contables
+ADD UNIQUE KEY uq_conciliacion_fecha_empresa (fecha, empresa_id);
+
+-- Verificar los índices
+SHOW INDEX FROM conciliaciones_contables;
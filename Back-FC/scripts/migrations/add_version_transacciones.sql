@@ -0,0 +1,10 @@
+-- Script para agregar control de concurrencia optimista a transacciones_flujo_caja
+-- Cada UPDATE incrementa `version`; la API responde 409 si el cliente envía una versión vieja
+
+-- Agregar la columna version (las filas existentes quedan en 1)
+ALTER TABLE transacciones_flujo_caja
+ADD COLUMN version INT NOT NULL DEFAULT 1
+AFTER updated_at;
+
+-- Verificar que la columna se agregó correctamente
+DESCRIBE transacciones_flujo_caja;
@@ -0,0 +1,74 @@
+"""
+Migración: guardar cada transacción con cuenta en la compañía de su cuenta.
+
+El cierre de día, las lecturas y el motor de recálculo usan la partición (fecha, compañía
+de la cuenta). Las filas creadas antes de esa regla pueden tener otra compañía (p. ej. las
+del motor, guardadas con compañía 1). Este script las mueve a la compañía de su cuenta.
+
+Las filas cuya partición de origen o destino está cerrada se omiten y se listan; con
+`--rehacer-cerrados` también se mueven y las fotos de esas particiones se rehacen con los
+datos actuales.
+
+Uso (desde Back-FC):
+    python scripts/migrations/alinear_compania_transacciones.py             # solo muestra el plan
+    python scripts/migrations/alinear_compania_transacciones.py --aplicar
+    python scripts/migrations/alinear_compania_transacciones.py --aplicar --rehacer-cerrados
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from app.core.database import SessionLocal
+from app.services.cierre_dia_service import CierreDiaService
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Alinear la compañía de las transacciones con la de su cuenta")
+    parser.add_argument("--aplicar", action="store_true", help="Actualizar las filas (por defecto solo se muestran)")
+    parser.add_argument("--rehacer-cerrados", action="store_true", help="Mover también las filas de días cerrados y rehacer sus fotos")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("🏢 Compañía de las transacciones según su cuenta")
+    print("=" * 80)
+
+    db = SessionLocal()
+    try:
+        cierre = CierreDiaService(db)
+        filas = cierre.filas_fuera_de_su_cuenta()
+        if not filas:
+            print("\n✅ Todas las transacciones con cuenta ya están en la compañía de su cuenta.")
+            return 0
+
+        for id_, fecha, origen, destino in filas:
+            print(f"   • ID {id_} ({fecha}): compañía {origen} -> {destino}")
+        if not args.aplicar:
+            print(f"\nℹ️  {len(filas)} filas por mover. Ejecutar con --aplicar para actualizarlas.")
+            return 0
+
+        resultado = cierre.alinear_companias(rehacer_cerrados=args.rehacer_cerrados)
+        db.commit()
+
+        print(f"\n✅ {len(resultado['alineadas'])} filas movidas a la compañía de su cuenta")
+        for fecha, compania_id in resultado["fotos_rehechas"]:
+            print(f"   🔒 Foto rehecha: {fecha} compañía {compania_id}")
+        if resultado["omitidas"]:
+            print(f"\n⚠️  {len(resultado['omitidas'])} filas omitidas por estar en días cerrados "
+                  "(ejecutar con --rehacer-cerrados o reabrir esos días):")
+            for id_, fecha, origen, destino in resultado["omitidas"]:
+                print(f"   • ID {id_} ({fecha}): compañía {origen} -> {destino}")
+        return 0
+    except Exception as e:
+        db.rollback()
+        print(f"\n❌ Error: {e}")
+        return 2
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,24 @@
+-- Script para crear la tabla de escenarios "qué pasaría si"
+-- Cada escenario guarda solo sus ajustes de celdas (JSON); se evalúa en memoria sobre
+-- transacciones_flujo_caja sin escribir en ella
+
+CREATE TABLE IF NOT EXISTS escenarios_flujo_caja (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    nombre VARCHAR(120) NOT NULL,
+    descripcion TEXT NULL,
+    fecha_inicio DATE NOT NULL,
+    horizonte INT NOT NULL,
+    cuenta_id INT NULL,
+    compania_id INT NULL,
+    ajustes JSON NOT NULL,
+    usuario_id INT NULL,
+    fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    fecha_actualizacion TIMESTAMP NULL ON UPDATE CURRENT_TIMESTAMP,
+    INDEX idx_escenario_usuario (usuario_id, id),
+    FOREIGN KEY (cuenta_id) REFERENCES cuentas_bancarias(id) ON DELETE CASCADE,
+    FOREIGN KEY (compania_id) REFERENCES companias(id) ON DELETE CASCADE,
+    FOREIGN KEY (usuario_id) REFERENCES usuarios(id) ON DELETE SET NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Verificar la estructura
+DESCRIBE escenarios_flujo_caja;
@@ -0,0 +1,22 @@
+-- Script para crear la tabla de snapshots de días cerrados
+-- Al cerrar la conciliación de (fecha, compañía) se guarda una foto inmutable del día;
+-- al reabrirla se elimina
+
+CREATE TABLE IF NOT EXISTS snapshots_dia_cerrado (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    fecha DATE NOT NULL,
+    compania_id INT NOT NULL,
+    transacciones LONGTEXT NOT NULL,
+    agregados JSON NOT NULL,
+    resumen JSON NOT NULL,
+    checksum VARCHAR(64) NOT NULL,
+    usuario_id INT NULL,
+    fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_snapshot_fecha_compania (fecha, compania_id),
+    INDEX idx_snapshot_fecha (fecha),
+    FOREIGN KEY (compania_id) REFERENCES companias(id) ON DELETE CASCADE,
+    FOREIGN KEY (usuario_id) REFERENCES usuarios(id) ON DELETE SET NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Verificar la estructura
+DESCRIBE snapshots_dia_cerrado;
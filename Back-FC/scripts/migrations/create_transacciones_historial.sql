@@ -0,0 +1,56 @@
+-- Script para crear el historial append-only de cambios de monto de transacciones
+-- Reemplaza el historial acumulado en el JSON `auditoria`, que queda como resumen
+-- de tamaño fijo del último cambio. Ejecutar completo: el INSERT copia el contenido
+-- actual de `auditoria` al historial antes de que el UPDATE lo recorte.
+
+CREATE TABLE IF NOT EXISTS transacciones_historial (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    transaccion_id INT NOT NULL,
+    fecha DATE NOT NULL,
+    concepto_id INT NOT NULL,
+    cuenta_id INT NULL,
+    ts DATETIME NOT NULL,
+    usuario_id INT NULL,
+    monto_anterior DECIMAL(18,2) NULL,
+    monto_nuevo DECIMAL(18,2) NULL,
+    origen VARCHAR(60) NOT NULL,
+    INDEX idx_historial_celda (fecha, concepto_id, cuenta_id, id),
+    INDEX idx_historial_transaccion (transaccion_id, id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Copiar al historial el cambio que guarda cada auditoría existente (el JSON se
+-- sobrescribía en cada cambio, así que solo contiene el último: acción, usuario,
+-- fecha y, en las actualizaciones, `cambio.monto_anterior`/`cambio.monto_nuevo`).
+-- Se omiten las transacciones que ya tienen historial para poder re-ejecutar el script.
+INSERT INTO transacciones_historial
+    (transaccion_id, fecha, concepto_id, cuenta_id, ts, usuario_id, monto_anterior, monto_nuevo, origen)
+SELECT
+    t.id,
+    t.fecha,
+    t.concepto_id,
+    t.cuenta_id,
+    COALESCE(
+        CAST(REPLACE(NULLIF(JSON_UNQUOTE(JSON_EXTRACT(t.auditoria, '$.timestamp')), 'null'), 'T', ' ') AS DATETIME),
+        t.updated_at, t.created_at, NOW()
+    ),
+    CAST(NULLIF(JSON_UNQUOTE(JSON_EXTRACT(t.auditoria, '$.usuario_id')), 'null') AS UNSIGNED),
+    CAST(NULLIF(JSON_UNQUOTE(JSON_EXTRACT(t.auditoria, '$.cambio.monto_anterior')), 'null') AS DECIMAL(18,2)),
+    COALESCE(CAST(NULLIF(JSON_UNQUOTE(JSON_EXTRACT(t.auditoria, '$.cambio.monto_nuevo')), 'null') AS DECIMAL(18,2)), t.monto),
+    LEFT(COALESCE(NULLIF(JSON_UNQUOTE(JSON_EXTRACT(t.auditoria, '$.accion')), 'null'), 'migracion'), 60)
+FROM transacciones_flujo_caja t
+WHERE t.auditoria IS NOT NULL
+  AND NOT EXISTS (SELECT 1 FROM transacciones_historial h WHERE h.transaccion_id = t.id);
+
+-- Recortar las auditorías existentes al resumen del último cambio (ya copiado arriba)
+UPDATE transacciones_flujo_caja
+SET auditoria = JSON_OBJECT(
+    'accion', JSON_UNQUOTE(JSON_EXTRACT(auditoria, '$.accion')),
+    'usuario_id', JSON_EXTRACT(auditoria, '$.usuario_id'),
+    'timestamp', JSON_UNQUOTE(JSON_EXTRACT(auditoria, '$.timestamp')),
+    'monto_anterior', JSON_EXTRACT(auditoria, '$.cambio.monto_anterior'),
+    'monto_nuevo', monto
+)
+WHERE auditoria IS NOT NULL;
+
+-- Verificar la estructura
+DESCRIBE transacciones_historial;
@@ -0,0 +1,16 @@
+-- Script para crear la tabla de contadores de versión por dominio de datos
+-- Las escrituras incrementan el contador en la misma transacción; los GET derivan de
+-- aquí su ETag y responden 304 Not Modified sin consultar las tablas de datos.
+-- Dominios: transacciones (clave 'YYYY-MM-DD:area' y clave global ''), conceptos,
+-- cuentas (incluye bancos y cuenta_moneda), companias, trm, festivos
+-- Reiniciar el backend después de crearla (la existencia de la tabla se verifica al arrancar)
+
+CREATE TABLE IF NOT EXISTS versiones_datos (
+    dominio VARCHAR(30) NOT NULL,
+    clave VARCHAR(40) NOT NULL DEFAULT '',
+    version BIGINT NOT NULL DEFAULT 1,
+    PRIMARY KEY (dominio, clave)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Verificar la estructura
+DESCRIBE versiones_datos;
@@ -0,0 +1,77 @@
+"""
+Migración: particionar transacciones_flujo_caja por mes (MySQL).
+
+Quita las llaves foráneas de la tabla (y las que la referencian), crea un trigger por
+cada una que reemplaza su ON DELETE, cambia la PK a (id, fecha) y reconstruye la tabla
+con una partición por mes desde la primera fecha con datos hasta N meses después de hoy.
+Las autorreferencias (transaccion_origen_id) se pierden sin reemplazo: el plan las lista.
+La reconstrucción copia la tabla completa: ejecutar en una ventana de mantenimiento
+y con backup. Después, scripts/maintenance/rotar_particiones.py mantiene los meses futuros.
+
+Uso (desde Back-FC):
+    python scripts/migrations/particionar_transacciones_flujo_caja.py             # solo muestra el plan
+    python scripts/migrations/particionar_transacciones_flujo_caja.py --aplicar
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from sqlalchemy import text
+
+from app.core.database import SessionLocal
+from app.services.particiones_mensuales_service import TABLA, ParticionesMensualesService
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=f"Particionar {TABLA} por mes")
+    parser.add_argument("--aplicar", action="store_true", help="Ejecutar las sentencias (por defecto solo se muestran)")
+    parser.add_argument("--meses-adelante", type=int, default=None, help="Meses futuros a crear (por defecto PARTICIONES_MESES_ADELANTE)")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print(f"🗂️ Particionado mensual de {TABLA}")
+    print("=" * 80)
+
+    db = SessionLocal()
+    try:
+        service = ParticionesMensualesService(db)
+        try:
+            sentencias = service.plan_migracion(meses_adelante=args.meses_adelante)
+        except ValueError as e:
+            print(f"\n⚠️  {e}")
+            return 1
+
+        for llave in service.llaves_sin_reemplazo():
+            print(f"\n⚠️  {llave.nombre}: {llave.tabla}.{', '.join(llave.columnas)} ON DELETE {llave.regla_borrado} "
+                  "se elimina sin reemplazo (un trigger no puede modificar su propia tabla); "
+                  "borrar una transacción dejará referencias colgantes en esa columna")
+
+        for i, sentencia in enumerate(sentencias, 1):
+            print(f"\n{i}. {sentencia};")
+        if not args.aplicar:
+            print("\nℹ️  Plan sin aplicar. Ejecutar con --aplicar para particionar.")
+            return 0
+
+        for i, sentencia in enumerate(sentencias, 1):
+            print(f"\n▶️  Ejecutando {i}/{len(sentencias)}...")
+            db.execute(text(sentencia))
+        db.commit()
+
+        particiones = service.particiones()
+        print(f"\n✅ {TABLA} particionada en {len(particiones)} particiones "
+              f"({particiones[0]['nombre']} … {particiones[-1]['nombre']})")
+        return 0
+    except Exception as e:
+        db.rollback()
+        print(f"\n❌ Error: {e}")
+        return 2
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
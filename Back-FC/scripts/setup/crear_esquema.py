@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Crea las tablas que falten a partir de los modelos (paso explícito de despliegue).
+
+La API ya no ejecuta Base.metadata.create_all al importarse: el esquema se prepara
+antes de arrancar el servidor con este script, y los cambios sobre tablas existentes
+siguen yendo por scripts/migrations/*.sql.
+
+Uso:
+    python scripts/setup/crear_esquema.py              # crea las tablas faltantes
+    python scripts/setup/crear_esquema.py --verificar  # solo informa (código 1 si faltan)
+    python scripts/setup/crear_esquema.py --db sqlite:///local.db
+"""
+import argparse
+import os
+import sys
+
+# Agregar Back-FC al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy import create_engine, inspect
+
+
+def _metadata():
+    """Registra todos los modelos (incluidos los que app.models no re-exporta) y devuelve su metadata"""
+    import app.models  # noqa: F401
+    import app.models.auditoria  # noqa: F401
+    import app.models.dias_festivos  # noqa: F401
+    from app.core.database import Base
+    return Base.metadata
+
+
+def tablas_faltantes(bind, metadata) -> list:
+    existentes = set(inspect(bind).get_table_names())
+    return [nombre for nombre in metadata.tables if nombre not in existentes]
+
+
+def crear_esquema(bind=None, verificar: bool = False) -> list:
+    """Crea (o, con verificar=True, solo lista) las tablas faltantes; devuelve sus nombres"""
+    metadata = _metadata()
+    if bind is None:
+        from app.core.database import engine
+        bind = engine
+
+    faltantes = tablas_faltantes(bind, metadata)
+    if faltantes and not verificar:
+        metadata.create_all(bind=bind, tables=[metadata.tables[nombre] for nombre in faltantes])
+    return faltantes
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Crear las tablas faltantes del sistema de flujo de caja")
+    parser.add_argument("--verificar", action="store_true", help="No ejecutar DDL; salir con código 1 si faltan tablas")
+    parser.add_argument("--db", help="URL de base de datos (por defecto la de la configuración)")
+    args = parser.parse_args()
+
+    bind = create_engine(args.db) if args.db else None
+    try:
+        faltantes = crear_esquema(bind, verificar=args.verificar)
+    except Exception as e:
+        print(f"❌ Error preparando el esquema: {e}")
+        return 2
+
+    if not faltantes:
+        print("✅ Esquema completo: no falta ninguna tabla")
+        return 0
+    if args.verificar:
+        print(f"⚠️ Faltan {len(faltantes)} tablas: {', '.join(sorted(faltantes))}")
+        return 1
+    print(f"✅ {len(faltantes)} tablas creadas: {', '.join(sorted(faltantes))}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,7 +7,7 @@ import os
 import sys
 from datetime import date, datetime
 from decimal import Decimal
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 
 import requests
 import urllib3
@@ -36,8 +36,12 @@ class TRMScraper:
         urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
         self.urls = {
-            "datos_abiertos": "https://www.datos.gov.co/resource/32sa-8pi3.json",
-            "banrep_api": "https://totoro.banrep.gov.co/estadisticas-economicas/rest/consultaDatosService/consultaMercadoCambiario",
+            # Las URLs se pueden sobrescribir por entorno (p. ej. para apuntar a un stub local en pruebas)
+            "datos_abiertos": os.getenv("TRM_DATOS_ABIERTOS_URL", "https://www.datos.gov.co/resource/32sa-8pi3.json"),
+            "banrep_api": os.getenv(
+                "TRM_BANREP_URL",
+                "https://totoro.banrep.gov.co/estadisticas-economicas/rest/consultaDatosService/consultaMercadoCambiario",
+            ),
         }
 
         self.session = requests.Session()
@@ -75,19 +79,66 @@ class TRMScraper:
             return None
 
         if data and isinstance(data, list) and len(data) > 0:
-            raw_valor = data[0].get("valor")
-            raw_vig = data[0].get("vigenciadesde")
-            if raw_valor is None or raw_vig is None:
-                return None
-            try:
-                valor = Decimal(str(raw_valor))
-            except Exception:
-                valor = Decimal(str(raw_valor).replace(",", ""))
-            vigenciadesde = datetime.strptime(str(raw_vig)[:10], "%Y-%m-%d").date()
-            return {"valor": valor, "vigenciadesde": vigenciadesde}
+            return self._parse_registro(data[0])
 
         return None
 
+    def get_trm_range_from_datos_abiertos(
+        self, desde: date, hasta: date, page_size: int = 1000
+    ) -> Optional[List[Dict[str, object]]]:
+        """Obtener todas las TRM con vigenciadesde en [desde, hasta] paginando la consulta Socrata.
+
+        Retorna la lista ordenada por vigenciadesde ascendente, o None si la consulta falla.
+        """
+        where = (
+            f"vigenciadesde between '{desde.strftime('%Y-%m-%d')}T00:00:00.000' "
+            f"and '{hasta.strftime('%Y-%m-%d')}T23:59:59.999'"
+        )
+        registros: List[Dict[str, object]] = []
+        offset = 0
+
+        logger.info(f"Consultando Datos Abiertos (vigenciadesde {desde}..{hasta})…")
+        while True:
+            params = {
+                "$select": "valor, vigenciadesde",
+                "$where": where,
+                "$order": "vigenciadesde asc",
+                "$limit": page_size,
+                "$offset": offset,
+            }
+            try:
+                r = self.session.get(self.urls["datos_abiertos"], params=params, timeout=30)
+                r.raise_for_status()
+                data = r.json()
+            except Exception as e:
+                logger.error(f"Error consultando rango en Datos Abiertos: {e}")
+                return None
+
+            if not isinstance(data, list):
+                return None
+            for item in data:
+                registro = self._parse_registro(item)
+                if registro:
+                    registros.append(registro)
+            if len(data) < page_size:
+                break
+            offset += page_size
+
+        return registros
+
+    @staticmethod
+    def _parse_registro(item: dict) -> Optional[Dict[str, object]]:
+        raw_valor = item.get("valor")
+        raw_vig = item.get("vigenciadesde")
+        if raw_valor is None or raw_vig is None:
+            return None
+        try:
+            valor = Decimal(str(raw_valor))
+        except Exception:
+            valor = Decimal(str(raw_valor).replace(",", ""))
+        vigenciadesde = datetime.strptime(str(raw_vig)[:10], "%Y-%m-%d").date()
+        return {"valor": valor, "vigenciadesde": vigenciadesde}
+
     def get_trm_from_banrep(self, fecha: Optional[date] = None) -> Optional[Decimal]:
         if fecha is None:
             fecha = date.today()
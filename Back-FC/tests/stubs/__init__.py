@@ -0,0 +1 @@
+# Stubs de servicios externos para pruebas
@@ -0,0 +1,81 @@
+"""
+Stub HTTP local del endpoint Socrata de Datos Abiertos (TRM, recurso 32sa-8pi3).
+
+Atiende ``$where vigenciadesde between '...' and '...'``, ``$order``, ``$limit``
+y ``$offset`` sobre un diccionario en memoria {fecha: valor}. Permite simular
+latencia para medir que el arranque no espera al scraping.
+"""
+import json
+import re
+import threading
+import time
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+_BETWEEN = re.compile(r"vigenciadesde\s+between\s+'([^']+)'\s+and\s+'([^']+)'", re.IGNORECASE)
+
+
+class DatosAbiertosStub:
+    """Servidor en un puerto libre de localhost; usar como context manager"""
+
+    def __init__(self, trms: Optional[Dict[date, str]] = None, delay: float = 0.0):
+        self.trms = dict(trms or {})
+        self.delay = delay
+        self.requests = []
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/resource/32sa-8pi3.json"
+
+    def _filas(self, params: dict) -> list:
+        fechas = sorted(self.trms)
+        where = params.get("$where", "")
+        match = _BETWEEN.search(where)
+        if match:
+            desde = datetime.fromisoformat(match.group(1)[:19]).date()
+            hasta = datetime.fromisoformat(match.group(2)[:19]).date()
+            fechas = [f for f in fechas if desde <= f <= hasta]
+        if "desc" in params.get("$order", "").lower():
+            fechas.reverse()
+        offset = int(params.get("$offset", 0))
+        limit = int(params.get("$limit", 1000))
+        return [
+            {"valor": str(self.trms[f]), "vigenciadesde": f"{f.isoformat()}T00:00:00.000"}
+            for f in fechas[offset:offset + limit]
+        ]
+
+    def __enter__(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                stub.requests.append(params)
+                if stub.delay:
+                    time.sleep(stub.delay)
+                if not parsed.path.endswith("32sa-8pi3.json"):
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = json.dumps(stub._filas(params)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
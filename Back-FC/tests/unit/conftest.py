@@ -0,0 +1,36 @@
+"""
+Fixtures compartidas de pruebas unitarias: base SQLite en memoria con el esquema completo
+"""
+import sys
+import os
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import app.models  # noqa: F401  (registra todos los modelos en Base.metadata)
+import app.models.auditoria  # noqa: F401
+import app.models.dias_festivos  # noqa: F401
+from app.core.catalogo_cache import catalogo_cache
+from app.core.database import Base
+
+
+@pytest.fixture
+def sqlite_engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db_sqlite(sqlite_engine):
+    """Sesión sobre SQLite en memoria; el caché de catálogo se invalida antes y después"""
+    catalogo_cache.invalidar()
+    session = sessionmaker(bind=sqlite_engine, autocommit=False, autoflush=False)()
+    yield session
+    session.close()
+    catalogo_cache.invalidar()
@@ -0,0 +1,44 @@
+"""
+Pruebas del arranque perezoso: importar la API no ejecuta DDL ni carga openpyxl o el
+scraper TRM; el esquema lo crea scripts/setup/crear_esquema.py como paso explícito
+"""
+import json
+import os
+import subprocess
+import sys
+
+from sqlalchemy import create_engine, inspect
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CREAR_ESQUEMA = os.path.join(RAIZ, "scripts", "setup", "crear_esquema.py")
+
+
+def test_importar_app_no_crea_tablas_ni_carga_modulos_pesados(tmp_path):
+    db_path = tmp_path / "arranque.db"
+    codigo = (
+        "import json, sys, app.main; "
+        "print(json.dumps([m for m in ('openpyxl', 'trm.trm_scraper', 'requests') if m in sys.modules]))"
+    )
+    salida = subprocess.run(
+        [sys.executable, "-c", codigo], cwd=RAIZ, capture_output=True, text=True, check=True,
+        env={**os.environ, "DATABASE_URL": f"sqlite:///{db_path}"}
+    )
+
+    assert json.loads(salida.stdout.strip().splitlines()[-1]) == []
+    assert inspect(create_engine(f"sqlite:///{db_path}")).get_table_names() == []
+
+
+def test_crear_esquema_crea_las_faltantes_y_verificar_no_ejecuta_ddl(tmp_path):
+    url = f"sqlite:///{tmp_path / 'esquema.db'}"
+
+    def ejecutar(*args):
+        return subprocess.run([sys.executable, CREAR_ESQUEMA, "--db", url, *args], cwd=RAIZ, capture_output=True, text=True)
+
+    assert ejecutar("--verificar").returncode == 1
+    assert inspect(create_engine(url)).get_table_names() == []
+
+    assert ejecutar().returncode == 0
+    tablas = set(inspect(create_engine(url)).get_table_names())
+    assert {"transacciones_flujo_caja", "registros_auditoria", "dias_festivos"} <= tablas
+
+    assert ejecutar("--verificar").returncode == 0
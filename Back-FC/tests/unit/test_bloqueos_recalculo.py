@@ -0,0 +1,173 @@
+"""
+Pruebas de los bloqueos de recálculo por (fecha, cuenta) y de la concurrencia optimista por versión
+"""
+import threading
+import time
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.core.bloqueos_recalculo import BloqueoNoDisponibleError, BloqueosRecalculo
+from app.models import AreaTransaccion, TransaccionFlujoCaja
+from app.schemas.flujo_caja import TransaccionFlujoCajaUpdate
+from app.services.transaccion_flujo_caja_service import ConflictoVersionError, TransaccionFlujoCajaService
+
+DIA = date(2025, 3, 4)
+OTRO_DIA = date(2025, 3, 5)
+
+
+def _ejecutar_en_hilos(*funciones):
+    hilos = [threading.Thread(target=f) for f in funciones]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join(timeout=5)
+
+
+def test_mismo_dia_serializado_y_dias_distintos_en_paralelo():
+    bloqueos = BloqueosRecalculo(timeout_seconds=5, backend="local")
+    activos = {DIA: 0, OTRO_DIA: 0}
+    maximos = {DIA: 0, OTRO_DIA: 0}
+    simultaneos = []
+    guard = threading.Lock()
+
+    def trabajo(fecha):
+        def correr():
+            with bloqueos.bloquear(fecha, 1):
+                with guard:
+                    activos[fecha] += 1
+                    maximos[fecha] = max(maximos[fecha], activos[fecha])
+                    simultaneos.append(sum(activos.values()))
+                time.sleep(0.05)
+                with guard:
+                    activos[fecha] -= 1
+        return correr
+
+    _ejecutar_en_hilos(*(trabajo(DIA) for _ in range(3)), *(trabajo(OTRO_DIA) for _ in range(3)))
+
+    assert maximos == {DIA: 1, OTRO_DIA: 1}
+    assert max(simultaneos) == 2
+    assert bloqueos.stats()["claves_activas"] == 0
+
+
+def test_reentrante_en_el_mismo_hilo_y_timeout_en_otro():
+    bloqueos = BloqueosRecalculo(timeout_seconds=0.1, backend="local")
+    errores = []
+
+    def intentar():
+        try:
+            with bloqueos.bloquear(DIA, 1):
+                pass
+        except BloqueoNoDisponibleError as e:
+            errores.append(e)
+
+    with bloqueos.bloquear(DIA, 1):
+        with bloqueos.bloquear(DIA, 1):
+            _ejecutar_en_hilos(intentar)
+
+    assert len(errores) == 1
+    assert bloqueos.stats()["timeouts"] == 1
+
+
+class _EngineMySQLFalso:
+    """Engine que solo cuenta conexiones y registra los GET_LOCK / RELEASE_LOCK"""
+
+    class dialect:
+        name = "mysql"
+
+    def __init__(self):
+        self.abiertas = 0
+        self.sentencias = []
+
+    @property
+    def engine(self):
+        return self
+
+    def connect(self):
+        engine = self
+        engine.abiertas += 1
+
+        class Conexion:
+            def execute(self, sentencia, parametros):
+                engine.sentencias.append((str(sentencia).split("(")[0], parametros["nombre"]))
+                return type("Resultado", (), {"scalar": lambda _: 1})()
+
+            def close(self):
+                engine.abiertas -= 1
+        return Conexion()
+
+
+def test_bloqueos_anidados_comparten_una_conexion_del_hilo():
+    bloqueos = BloqueosRecalculo(timeout_seconds=5, backend="auto")
+    engine = _EngineMySQLFalso()
+
+    with bloqueos.bloquear(DIA, 1, engine):
+        with bloqueos.bloquear(OTRO_DIA, 1, engine):  # Propagación al día siguiente
+            assert engine.abiertas == 1
+    assert engine.abiertas == 0
+    assert [s for s, _ in engine.sentencias] == ["SELECT GET_LOCK", "SELECT GET_LOCK", "SELECT RELEASE_LOCK", "SELECT RELEASE_LOCK"]
+
+
+def test_ejecutar_unico_agrupa_peticiones_en_espera():
+    bloqueos = BloqueosRecalculo(timeout_seconds=5, backend="local")
+    ejecuciones = []
+    liberar = threading.Event()
+
+    def primero():
+        bloqueos.ejecutar_unico("dependencias", DIA, 1, lambda: liberar.wait(2) and ejecuciones.append(1))
+
+    def siguiente():
+        bloqueos.ejecutar_unico("dependencias", DIA, 1, lambda: ejecuciones.append(1))
+
+    hilo = threading.Thread(target=primero)
+    hilo.start()
+    time.sleep(0.05)
+    en_espera = [threading.Thread(target=siguiente) for _ in range(4)]
+    for h in en_espera:
+        h.start()
+    time.sleep(0.05)
+    liberar.set()
+    for h in [hilo, *en_espera]:
+        h.join(timeout=5)
+
+    # El que corría + uno solo de los que esperaban
+    assert len(ejecuciones) == 2
+    assert bloqueos.stats()["coalescidas"] == 3
+
+
+@pytest.fixture
+def transaccion(db_sqlite):
+    t = TransaccionFlujoCaja(fecha=DIA, concepto_id=5, cuenta_id=1, monto=Decimal("10"), area=AreaTransaccion.tesoreria)
+    db_sqlite.add(t)
+    db_sqlite.commit()
+    return t
+
+
+def test_version_enviada_desactualizada_responde_conflicto(db_sqlite, transaccion):
+    service = TransaccionFlujoCajaService(db_sqlite)
+    assert transaccion.version == 1
+
+    actualizada = service.actualizar_transaccion(transaccion.id, TransaccionFlujoCajaUpdate(monto=Decimal("20"), version=1), 7)
+    assert actualizada.version == 2
+
+    with pytest.raises(ConflictoVersionError) as exc:
+        service.actualizar_transaccion(transaccion.id, TransaccionFlujoCajaUpdate(monto=Decimal("30"), version=1), 7)
+    assert exc.value.version_actual == 2
+
+
+def test_escritura_concurrente_detectada_en_el_update(sqlite_engine, db_sqlite, transaccion):
+    otra = sessionmaker(bind=sqlite_engine)()
+    service = TransaccionFlujoCajaService(db_sqlite)
+    service.obtener_transaccion_por_id(transaccion.id)
+
+    # Otra sesión escribe después de que esta leyó la fila
+    fila = otra.get(TransaccionFlujoCaja, (transaccion.id, transaccion.fecha))
+    fila.monto = Decimal("99")
+    otra.commit()
+    otra.close()
+
+    with pytest.raises(ConflictoVersionError) as exc:
+        service.actualizar_transaccion(transaccion.id, TransaccionFlujoCajaUpdate(monto=Decimal("20")), 7)
+    assert exc.value.version_actual == 2
@@ -0,0 +1,107 @@
+"""
+Pruebas del cargue inicial de saldos en lote: número de consultas constante y lectura unida por cuenta
+"""
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+from app.models import (
+    AreaConcepto, AreaTransaccion, Banco, Compania, ConceptoFlujoCaja, CuentaBancaria, CuentaMoneda, TipoMoneda,
+    TransaccionFlujoCaja
+)
+from app.services.cierre_dia_service import CierreDiaService, DiaCerradoError
+from app.services.saldo_inicial_service import SaldoInicialService
+
+FECHA = date(2025, 3, 3)
+CUENTAS = 40
+
+
+@pytest.fixture
+def db(db_sqlite):
+    db_sqlite.add_all([
+        Compania(id=1, nombre="Bolívar"),
+        Compania(id=2, nombre="Capitalizadora"),
+        Banco(id=1, nombre="Banco de Bogotá"),
+        ConceptoFlujoCaja(id=1, nombre="SALDO INICIAL", codigo="N", area=AreaConcepto.tesoreria),
+        ConceptoFlujoCaja(id=54, nombre="SALDO DIA ANTERIOR", codigo="N", area=AreaConcepto.pagaduria),
+    ])
+    db_sqlite.add_all([
+        CuentaBancaria(id=i, numero_cuenta=f"{i:03d}", compania_id=1 + i % 2, banco_id=1) for i in range(1, CUENTAS + 1)
+    ])
+    db_sqlite.add_all([CuentaMoneda(id=i, id_cuenta=i, moneda=TipoMoneda.COP) for i in range(1, CUENTAS + 1)])
+    db_sqlite.commit()
+    return db_sqlite
+
+
+def _selects(db, funcion):
+    sentencias = []
+
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            sentencias.append(statement)
+
+    event.listen(db.get_bind(), "before_cursor_execute", contar)
+    try:
+        return funcion(), sentencias
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", contar)
+
+
+def test_guardar_cargue_en_lote(db):
+    modificaciones = [
+        {"cuenta_id": i, "saldo_inicial": 1000 + i, "saldo_dia_anterior": 0 if i % 3 else 500 + i}
+        for i in range(1, CUENTAS + 1)
+    ] + [{"cuenta_id": 999, "saldo_inicial": 1}]  # Cuenta inexistente: se omite
+
+    SaldoInicialService.conceptos_cargue_inicial(db)  # Carga el catálogo en memoria
+    creadas, selects = _selects(db, lambda: SaldoInicialService.guardar_cargue_inicial(FECHA, modificaciones, db, 7))
+    db.commit()
+
+    # Cuentas + días cerrados + existentes por concepto: no depende del número de cuentas
+    assert len(selects) == 4
+    assert creadas == CUENTAS + CUENTAS // 3
+    fila = db.query(TransaccionFlujoCaja).filter_by(cuenta_id=3, concepto_id=54).one()
+    assert (fila.monto, fila.area, fila.compania_id, fila.usuario_id) == (Decimal("503.00"), AreaTransaccion.pagaduria, 2, 7)
+
+    # Segunda carga: actualiza solo lo que cambió, sin duplicar filas
+    cambios = [{"cuenta_id": 1, "saldo_inicial": 1001}, {"cuenta_id": 2, "saldo_inicial": 5}]
+    assert SaldoInicialService.guardar_cargue_inicial(FECHA, cambios, db) == 0
+    db.commit()
+    assert db.query(TransaccionFlujoCaja).filter_by(concepto_id=1).count() == CUENTAS
+    actualizada = db.query(TransaccionFlujoCaja).filter_by(cuenta_id=2, concepto_id=1).one()
+    assert (actualizada.monto, actualizada.descripcion) == (Decimal("5.00"), "Cargue inicial manual - Actualizado")
+    assert db.query(TransaccionFlujoCaja).filter_by(cuenta_id=1, concepto_id=1).one().version == 1
+
+
+def test_obtener_saldos_une_ambas_areas(db):
+    SaldoInicialService.guardar_cargue_inicial(FECHA, [
+        {"cuenta_id": 1, "saldo_inicial": 100, "saldo_dia_anterior": 90},
+        {"cuenta_id": 2, "saldo_inicial": 200},
+        {"cuenta_id": 3, "saldo_dia_anterior": 30},
+    ], db)
+    db.commit()
+
+    saldos, selects = _selects(db, lambda: SaldoInicialService.obtener_saldos_cargue(FECHA, db))
+
+    assert len(selects) == 1
+    assert saldos == [
+        {"cuenta_id": 1, "saldo_inicial": 100.0, "saldo_dia_anterior": 90.0},
+        {"cuenta_id": 2, "saldo_inicial": 200.0, "saldo_dia_anterior": 0},
+        {"cuenta_id": 3, "saldo_inicial": 0, "saldo_dia_anterior": 30.0},
+    ]
+
+
+def test_cargue_sobre_dia_cerrado_se_rechaza_completo(db):
+    CierreDiaService(db).cerrar_dia(FECHA, 2)
+    db.commit()
+
+    # La cuenta 1 es de la compañía 2 (cerrada): no se escribe ninguna fila del lote
+    with pytest.raises(DiaCerradoError):
+        SaldoInicialService.guardar_cargue_inicial(FECHA, [
+            {"cuenta_id": 2, "saldo_inicial": 200},
+            {"cuenta_id": 1, "saldo_inicial": 100},
+        ], db)
+    db.rollback()
+    assert db.query(TransaccionFlujoCaja).count() == 0
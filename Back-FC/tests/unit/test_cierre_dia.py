@@ -0,0 +1,167 @@
+"""
+Pruebas del cierre de día: snapshot al cerrar la conciliación, escrituras bloqueadas y reapertura
+"""
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from app.models import Banco, Compania, ConceptoFlujoCaja, CuentaBancaria, TransaccionFlujoCaja, AreaConcepto, AreaTransaccion
+from app.models.conciliacion_contable import ConciliacionContable
+from app.models.snapshot_dia import SnapshotDiaCerrado
+from app.schemas.flujo_caja import OperacionCeldaSchema, TransaccionFlujoCajaCreate, TransaccionFlujoCajaUpdate
+from app.services.cierre_dia_service import CierreDiaService, DiaCerradoError, excluir_particiones
+from app.services.conciliacion_contable_service import ConciliacionContableService
+from app.services.dependencias_flujo_caja_service import DependenciasFlujoCajaService
+from app.services.transaccion_flujo_caja_service import TransaccionFlujoCajaService
+
+FECHA = date(2025, 3, 4)
+USUARIO = SimpleNamespace(id=7, nombre="Tesorería", email="tesoreria@bolivar.com")
+
+
+@pytest.fixture
+def db(db_sqlite):
+    db_sqlite.add_all([
+        Compania(id=1, nombre="Bolívar"),
+        Compania(id=2, nombre="Seguros"),
+        Banco(id=1, nombre="Banco de Bogotá"),
+        CuentaBancaria(id=1, numero_cuenta="001", compania_id=1, banco_id=1),
+        CuentaBancaria(id=2, numero_cuenta="002", compania_id=2, banco_id=1),
+        ConceptoFlujoCaja(id=5, nombre="INGRESO CLIENTES", codigo="I", area=AreaConcepto.tesoreria),
+        ConceptoFlujoCaja(id=6, nombre="PAGO PROVEEDORES", codigo="E", area=AreaConcepto.tesoreria),
+    ])
+    db_sqlite.add_all([
+        # Sin compañía: pertenece a la compañía por defecto (1)
+        TransaccionFlujoCaja(id=100, fecha=FECHA, concepto_id=5, cuenta_id=1, monto=Decimal("10"), area=AreaTransaccion.tesoreria),
+        TransaccionFlujoCaja(id=101, fecha=FECHA, concepto_id=6, cuenta_id=1, monto=Decimal("-4"), area=AreaTransaccion.tesoreria, compania_id=1),
+        TransaccionFlujoCaja(id=102, fecha=FECHA, concepto_id=5, cuenta_id=2, monto=Decimal("30"), area=AreaTransaccion.tesoreria, compania_id=2),
+        ConciliacionContable(fecha=FECHA, empresa_id=1, estado="Confirmado"),
+    ])
+    db_sqlite.commit()
+    return db_sqlite
+
+
+def test_cerrar_conciliacion_congela_el_dia(db):
+    ConciliacionContableService.cerrar_conciliacion(db, empresa_id=1, fecha=FECHA, usuario_id=7)
+    cierre = CierreDiaService(db)
+
+    snapshot = db.query(SnapshotDiaCerrado).one()
+    assert (snapshot.fecha, snapshot.compania_id) == (FECHA, 1)
+    assert snapshot.resumen == {"total_transacciones": 2, "total_ingresos": "10.00", "total_gastos": "4.00"}
+    assert len(snapshot.checksum) == 64
+    assert cierre.dia_cerrado(FECHA, None) and not cierre.dia_cerrado(FECHA, 2)
+
+    # Lecturas: la compañía cerrada sale del snapshot aunque la fila cambie por fuera
+    db.query(TransaccionFlujoCaja).filter(TransaccionFlujoCaja.id == 100).update({"monto": Decimal("999")})
+    db.commit()
+    filas = cierre.transacciones_snapshot(FECHA, cierre.companias_cerradas(FECHA))
+    assert [(f["id"], f["monto"]) for f in filas] == [(100, "10.00"), (101, "-4.00")]
+    assert filas[0]["concepto"]["nombre"] == "INGRESO CLIENTES"
+    vivas = TransaccionFlujoCajaService(db).obtener_transacciones_por_fecha(FECHA, companias_excluidas={1})
+    assert [t.id for t in vivas] == [102]
+
+
+def test_escrituras_y_recalculo_sobre_dia_cerrado_se_rechazan(db):
+    ConciliacionContableService.cerrar_conciliacion(db, empresa_id=1, fecha=FECHA)
+    service = TransaccionFlujoCajaService(db)
+
+    with pytest.raises(DiaCerradoError):
+        service.actualizar_transaccion_simple(100, TransaccionFlujoCajaUpdate(monto=Decimal("1")), 7)
+    with pytest.raises(DiaCerradoError):
+        service.eliminar_transaccion(101, 7)
+    with pytest.raises(DiaCerradoError):
+        service.guardar_lote(FECHA, [OperacionCeldaSchema(accion="eliminar", transaccion_id=100)], usuario=USUARIO, compania_id=1)
+    db.rollback()
+
+    # La otra compañía sigue abierta
+    service.actualizar_transaccion_simple(102, TransaccionFlujoCajaUpdate(monto=Decimal("31")), 7)
+
+    # El recálculo del día omite las cuentas de la compañía cerrada y sigue con las demás
+    resultado = DependenciasFlujoCajaService(db, paralelismo=1).procesar_dependencias_completas_ambos_dashboards(
+        fecha=FECHA, usuario_id=7
+    )
+    assert resultado["pagaduria"] and {a["cuenta_id"] for a in resultado["pagaduria"]} == {2}
+    assert db.query(TransaccionFlujoCaja).filter(TransaccionFlujoCaja.id == 100).one().monto == Decimal("10")
+    assert db.query(TransaccionFlujoCaja).filter(TransaccionFlujoCaja.cuenta_id == 1).count() == 2
+    assert {t.compania_id for t in db.query(TransaccionFlujoCaja).filter(TransaccionFlujoCaja.cuenta_id == 2)} == {2}
+
+
+def test_recalculo_usa_la_compania_de_la_cuenta(db):
+    ConciliacionContableService.cerrar_conciliacion(db, empresa_id=1, fecha=FECHA)
+    db.add(ConciliacionContable(fecha=FECHA, empresa_id=2, estado="Confirmado"))
+    db.commit()
+    ConciliacionContableService.cerrar_conciliacion(db, empresa_id=2, fecha=FECHA)
+    filas = db.query(TransaccionFlujoCaja).count()
+
+    # Aunque el llamador indique la compañía 1, la cuenta 2 pertenece a la compañía 2 (cerrada)
+    resultado = DependenciasFlujoCajaService(db, paralelismo=1).procesar_dependencias_completas_ambos_dashboards(
+        fecha=FECHA, cuenta_id=2, compania_id=1, usuario_id=7
+    )
+    assert resultado == {"tesoreria": [], "pagaduria": [], "cross_dashboard": [], "propagacion_dia_siguiente": []}
+    DependenciasFlujoCajaService(db, paralelismo=2).procesar_dependencias_completas_ambos_dashboards(fecha=FECHA, usuario_id=7)
+    assert db.query(TransaccionFlujoCaja).count() == filas
+
+
+def test_reabrir_invalida_snapshot_y_permite_editar(db):
+    ConciliacionContableService.cerrar_conciliacion(db, empresa_id=1, fecha=FECHA)
+    conciliacion = ConciliacionContableService.reabrir_conciliacion(db, empresa_id=1, fecha=FECHA)
+
+    assert conciliacion.estado == "Confirmado"
+    assert db.query(SnapshotDiaCerrado).count() == 0
+    TransaccionFlujoCajaService(db).actualizar_transaccion_simple(100, TransaccionFlujoCajaUpdate(monto=Decimal("12")), 7)
+    assert db.query(TransaccionFlujoCaja).filter(TransaccionFlujoCaja.id == 100).one().monto == Decimal("12")
+
+    with pytest.raises(ValueError):
+        ConciliacionContableService.reabrir_conciliacion(db, empresa_id=1, fecha=FECHA)
+
+
+def test_excluir_particiones_filtra_por_fecha_y_compania(db):
+    query = excluir_particiones(db.query(TransaccionFlujoCaja), [(FECHA, 1)])
+    assert [t.id for t in query] == [102]
+    assert excluir_particiones(db.query(TransaccionFlujoCaja), []).count() == 3
+
+
+def test_la_fila_con_cuenta_queda_en_la_compania_de_su_cuenta(db):
+    CierreDiaService(db).cerrar_dia(FECHA, 2)
+    db.commit()
+    service = TransaccionFlujoCajaService(db)
+
+    # Sin compañía en el payload, la cuenta 2 ubica la fila en la compañía 2 (cerrada)
+    with pytest.raises(DiaCerradoError):
+        service.crear_transaccion(TransaccionFlujoCajaCreate(
+            fecha=FECHA, concepto_id=6, cuenta_id=2, monto=Decimal("5"), area="tesoreria"
+        ), 7)
+    # Mover una fila a una cuenta de la compañía cerrada también se rechaza
+    with pytest.raises(DiaCerradoError):
+        service.actualizar_transaccion_simple(101, TransaccionFlujoCajaUpdate(cuenta_id=2), 7)
+    db.rollback()
+
+    otra_fecha = date(2025, 3, 5)
+    db.add(TransaccionFlujoCaja(fecha=otra_fecha, concepto_id=5, cuenta_id=2, monto=Decimal("1"), compania_id=1))
+    db.commit()
+    assert db.query(TransaccionFlujoCaja.compania_id).filter(TransaccionFlujoCaja.fecha == otra_fecha).scalar() == 2
+
+
+def test_alinear_companias_mueve_filas_antiguas_y_rehace_fotos(db):
+    # Filas del motor anteriores a la regla: cuenta 2 guardada en la compañía 1
+    for id_, fecha in ((200, FECHA), (201, date(2025, 3, 5))):
+        db.execute(TransaccionFlujoCaja.__table__.insert().values(
+            id=id_, fecha=fecha, concepto_id=6, cuenta_id=2, monto=Decimal("-2"), area="tesoreria", compania_id=1, version=1
+        ))
+    cierre = CierreDiaService(db)
+    cierre.cerrar_dia(FECHA, 1)
+    db.commit()
+    assert [f[0] for f in cierre.filas_fuera_de_su_cuenta()] == [200, 201]
+
+    resultado = cierre.alinear_companias()
+    db.commit()
+    assert resultado["alineadas"] == [201]
+    assert resultado["omitidas"] == [(200, FECHA, 1, 2)]
+
+    resultado = cierre.alinear_companias(rehacer_cerrados=True)
+    db.commit()
+    assert resultado["alineadas"] == [200] and resultado["fotos_rehechas"] == [(FECHA, 1)]
+    assert cierre.filas_fuera_de_su_cuenta() == []
+    assert [f["id"] for f in cierre.transacciones_snapshot(FECHA, [1])] == [100, 101]
+    assert db.query(TransaccionFlujoCaja.version).filter(TransaccionFlujoCaja.id == 200).scalar() == 2
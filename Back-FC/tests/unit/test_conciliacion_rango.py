@@ -0,0 +1,111 @@
+"""
+Pruebas de la conciliación por rango: totales por compañía, upsert masivo, solo días hábiles
+y número fijo de sentencias
+"""
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+from app.models import Banco, Compania, ConceptoFlujoCaja, CuentaBancaria, TransaccionFlujoCaja, AreaConcepto, AreaTransaccion
+from app.models.conciliacion_contable import ConciliacionContable
+from app.models.dias_festivos import DiaFestivo
+from app.services.conciliacion_contable_service import ConciliacionContableService
+
+DIA_1 = date(2025, 3, 3)
+DIA_2 = date(2025, 3, 4)
+FESTIVO = date(2025, 3, 24)  # Lunes festivo
+
+
+@pytest.fixture
+def db(db_sqlite):
+    db_sqlite.add_all([Compania(id=i, nombre=n) for i, n in ((1, "Capitalizadora"), (2, "Seguros Bolívar"), (3, "Comerciales"))])
+    db_sqlite.add(Banco(id=1, nombre="Banco de Bogotá"))
+    db_sqlite.add_all([CuentaBancaria(id=i, numero_cuenta=f"00{i}", compania_id=1 if i < 3 else 2, banco_id=1) for i in range(1, 4)])
+    db_sqlite.add_all([
+        ConceptoFlujoCaja(id=50, nombre="SUB-TOTAL TESORERÍA", codigo="N", area=AreaConcepto.tesoreria),
+        ConceptoFlujoCaja(id=82, nombre="SUBTOTAL MOVIMIENTO PAGADURIA", codigo="N", area=AreaConcepto.pagaduria),
+    ])
+
+    def transaccion(fecha, concepto_id, cuenta_id, compania_id, monto):
+        area = AreaTransaccion.tesoreria if concepto_id == 50 else AreaTransaccion.pagaduria
+        return TransaccionFlujoCaja(fecha=fecha, concepto_id=concepto_id, cuenta_id=cuenta_id,
+                                    compania_id=compania_id, monto=Decimal(monto), area=area)
+
+    db_sqlite.add_all([
+        # Compañía 1: se toma la fila de subtotal guardada (la primera si hay varias)
+        transaccion(DIA_1, 50, 1, 1, "100.50"),
+        transaccion(DIA_1, 50, 2, 1, "200"),
+        transaccion(DIA_1, 82, 1, 1, "-40"),
+        # Sin compañía: cuenta como la compañía 1
+        transaccion(DIA_2, 82, 2, None, "15"),
+        transaccion(DIA_2, 50, 3, 2, "900"),
+        ConciliacionContable(fecha=DIA_1, empresa_id=1, total_centralizadora=Decimal("60.50"), estado="Evaluado",
+                             observaciones="revisada"),
+        DiaFestivo(fecha=FESTIVO, nombre="San José"),
+    ])
+    db_sqlite.commit()
+    return db_sqlite
+
+
+def test_totales_por_compania_usa_la_fila_de_subtotal(db):
+    totales = ConciliacionContableService.totales_por_compania(db, DIA_1, DIA_2)
+
+    assert totales[(DIA_1, 1)] == {"pagaduria": Decimal("-40.00"), "tesoreria": Decimal("100.50")}
+    assert totales[(DIA_2, 1)] == {"pagaduria": Decimal("15.00"), "tesoreria": Decimal("0.00")}
+    assert totales[(DIA_2, 2)] == {"pagaduria": Decimal("0.00"), "tesoreria": Decimal("900.00")}
+    assert ConciliacionContableService.calcular_totales_por_area(db, 1, DIA_1)["total"] == Decimal("60.50")
+    assert ConciliacionContableService.calcular_totales_por_area(db, 1, DIA_2)["pagaduria"] == Decimal("15.00")
+
+
+def test_conciliar_rango_hace_upsert_y_conserva_estado(db):
+    sentencias = []
+
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement)
+
+    event.listen(db.get_bind(), "before_cursor_execute", contar)
+    try:
+        fechas = ConciliacionContableService.conciliar_rango(db, DIA_1, DIA_2)
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", contar)
+
+    # festivos + empresas + totales + upsert + lectura, sin importar cuántas fechas
+    assert len(sentencias) == 5
+    assert [f.fecha for f in fechas] == [DIA_1, DIA_2]
+    assert db.query(ConciliacionContable).count() == 6
+
+    capitalizadora = fechas[0].empresas[0]
+    assert (capitalizadora.total_tesoreria, capitalizadora.total_pagaduria) == (Decimal("100.50"), Decimal("-40.00"))
+    assert capitalizadora.diferencia == Decimal("0.00")
+    assert (capitalizadora.estado, capitalizadora.observaciones) == ("Evaluado", "revisada")
+
+    nueva = fechas[1].empresas[1]
+    assert (nueva.compania_id, nueva.total_tesoreria, nueva.total_centralizadora, nueva.estado) == (
+        2, Decimal("900.00"), Decimal("0.00"), "Pendiente"
+    )
+
+    # Repetir no duplica filas
+    ConciliacionContableService.conciliar_rango(db, DIA_1, DIA_2)
+    assert db.query(ConciliacionContable).count() == 6
+
+
+def test_conciliar_rango_omite_fines_de_semana_y_festivos(db):
+    # Viernes 21 → martes 25 de marzo: sábado, domingo y el lunes festivo no se concilian
+    fechas = ConciliacionContableService.conciliar_rango(db, date(2025, 3, 21), date(2025, 3, 25))
+
+    assert [f.fecha for f in fechas] == [date(2025, 3, 21), date(2025, 3, 25)]
+    assert {c.fecha for c in db.query(ConciliacionContable)} == {DIA_1, date(2025, 3, 21), date(2025, 3, 25)}
+    assert ConciliacionContableService.conciliar_rango(db, date(2025, 3, 22), date(2025, 3, 23)) == []
+
+
+def test_confirmar_todas_en_bloque(db):
+    ConciliacionContableService.conciliar_rango(db, DIA_1, DIA_2)
+    ConciliacionContableService.cerrar_conciliacion(db, empresa_id=1, fecha=DIA_1)
+
+    confirmadas = ConciliacionContableService.confirmar_todas_conciliaciones(db, DIA_1, DIA_2)
+
+    assert confirmadas == 6  # las nuevas quedan con centralizadora 0.00
+    db.expire_all()
+    assert {c.estado for c in db.query(ConciliacionContable)} == {"Confirmado"}
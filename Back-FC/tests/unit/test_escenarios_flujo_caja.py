@@ -0,0 +1,105 @@
+"""
+Pruebas de escenarios "qué pasaría si": ajustes evaluados en memoria sobre los datos reales,
+diferencias contra la línea base y ninguna escritura en transacciones_flujo_caja
+"""
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+from app.models import AreaConcepto, AreaTransaccion, Banco, Compania, ConceptoFlujoCaja, CuentaBancaria, TransaccionFlujoCaja
+from app.models.dias_festivos import DiaFestivo
+from app.schemas.escenario_flujo_caja import EscenarioCreate
+from app.services.escenario_flujo_caja_service import EscenarioFlujoCajaService
+
+VIERNES = date(2025, 3, 7)
+FESTIVO = date(2025, 3, 10)
+MARTES = date(2025, 3, 11)
+
+
+@pytest.fixture
+def db(db_sqlite):
+    db_sqlite.add_all([
+        Compania(id=1, nombre="Bolívar"),
+        Banco(id=1, nombre="Banco de Bogotá"),
+        CuentaBancaria(id=1, numero_cuenta="001", compania_id=1, banco_id=1),
+        DiaFestivo(fecha=FESTIVO, nombre="San José"),
+    ])
+    db_sqlite.add_all([
+        ConceptoFlujoCaja(id=concepto_id, nombre=nombre, codigo=codigo, area=area, formula_dependencia=formula)
+        for concepto_id, nombre, codigo, area, formula in [
+            (1, "SALDO INICIAL", "N", AreaConcepto.tesoreria, None),
+            (2, "CONSUMO", "N", AreaConcepto.tesoreria, None),
+            (4, "SALDO NETO INICIAL PAGADURÍA", "N", AreaConcepto.tesoreria, None),
+            (51, "SALDO FINAL CUENTAS", "N", AreaConcepto.tesoreria, "SUMA(4)"),
+            (55, "NÓMINA", "E", AreaConcepto.pagaduria, None),
+            (82, "SUBTOTAL MOVIMIENTO PAGADURIA", "N", AreaConcepto.pagaduria, None),
+        ]
+    ])
+    db_sqlite.add_all([
+        TransaccionFlujoCaja(fecha=fecha, concepto_id=concepto_id, cuenta_id=1, monto=Decimal(monto),
+                             area=area, compania_id=1, usuario_id=1)
+        for fecha, concepto_id, area, monto in [
+            (VIERNES, 1, AreaTransaccion.tesoreria, "1000"),
+            (VIERNES, 55, AreaTransaccion.pagaduria, "200"),
+            (MARTES, 55, AreaTransaccion.pagaduria, "100"),
+        ]
+    ])
+    db_sqlite.commit()
+    return db_sqlite
+
+
+def _mover_nomina(horizonte=3):
+    """Qué pasa si la nómina del viernes se paga el martes"""
+    return EscenarioCreate(
+        nombre="Nómina al martes", fecha_inicio=VIERNES, horizonte=horizonte, cuenta_id=1,
+        ajustes=[
+            {"fecha": VIERNES, "cuenta_id": 1, "area": "pagaduria", "concepto_id": 55, "modo": "sumar", "monto": "-200"},
+            {"fecha": MARTES, "cuenta_id": 1, "area": "pagaduria", "concepto_id": 55, "modo": "sumar", "monto": "200"},
+        ]
+    )
+
+
+def test_mover_un_pago_cambia_dias_intermedios_y_no_el_cierre(db):
+    resultado = EscenarioFlujoCajaService(db).evaluar(_mover_nomina())
+
+    assert resultado["ajustes_aplicados"] == 2 and resultado["ajustes_ignorados"] == []
+    diferencias = {(d["fecha"], d["concepto_id"]): d for d in resultado["diferencias"]}
+    assert diferencias[("2025-03-07", 51)]["base"] == 800.0
+    assert diferencias[("2025-03-07", 51)]["escenario"] == 1000.0
+    assert diferencias[("2025-03-11", 55)]["diferencia"] == 200.0
+    assert ("2025-03-12", 51) not in diferencias  # El saldo final al cierre de la ventana no cambia
+    assert resultado["resumen"][0]["saldo_final_cuentas"]["diferencia"] == 0.0
+
+
+def test_evaluar_escenarios_no_escribe_transacciones(db):
+    service = EscenarioFlujoCajaService(db)
+    guardados = [service.crear(_mover_nomina(), usuario_id=1), service.crear(_mover_nomina(horizonte=2), usuario_id=1)]
+    escrituras = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        if statement.split()[0] in ("INSERT", "UPDATE", "DELETE"):
+            escrituras.append(statement)
+
+    event.listen(db.get_bind(), "before_cursor_execute", capturar)
+    try:
+        resultados = service.comparar(guardados, incluir_grilla=True)
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", capturar)
+
+    assert escrituras == []
+    assert [r["escenario_id"] for r in resultados] == [g.id for g in guardados]
+    assert resultados[1]["fechas"] == ["2025-03-07", "2025-03-11"]
+    assert resultados[0]["grilla"]["cuentas"][0]["dias"][0]["pagaduria"]["55"] == 0.0
+    assert db.query(TransaccionFlujoCaja).filter_by(fecha=VIERNES, concepto_id=55).one().monto == Decimal("200.00")
+
+
+def test_ajuste_en_dia_no_habil_se_ignora(db):
+    escenario = _mover_nomina()
+    escenario.ajustes[1].fecha = FESTIVO
+
+    resultado = EscenarioFlujoCajaService(db).evaluar(escenario)
+
+    assert resultado["ajustes_aplicados"] == 1
+    assert resultado["ajustes_ignorados"][0]["motivo"] == "fecha fuera de la ventana o no hábil"
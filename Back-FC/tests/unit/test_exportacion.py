@@ -0,0 +1,123 @@
+"""
+Pruebas de la exportación en streaming: filas de grilla y consolidado (incluidos días cerrados), CSV con gzip y Excel
+"""
+import gzip
+import io
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from openpyxl import load_workbook
+
+from app.api.informes_consolidados import router as informes_router
+from app.models import Banco, Compania, ConceptoFlujoCaja, CuentaBancaria, TransaccionFlujoCaja, AreaConcepto, AreaTransaccion
+from app.services.cierre_dia_service import CierreDiaService
+from app.services.exportacion_service import (
+    ENCABEZADOS_GRILLA, comprimir_gzip, escribir_csv, escribir_xlsx, filas_consolidado_mensual, filas_grilla, respuesta_exportacion
+)
+
+DIA_1, DIA_2, DIA_3 = date(2025, 3, 3), date(2025, 3, 4), date(2025, 3, 5)
+
+
+@pytest.fixture
+def db(db_sqlite):
+    db_sqlite.add_all([
+        Compania(id=1, nombre="Bolívar"),
+        Banco(id=1, nombre="Banco de Bogotá"),
+        CuentaBancaria(id=1, numero_cuenta="001", compania_id=1, banco_id=1),
+        ConceptoFlujoCaja(id=5, nombre="INGRESO CLIENTES", codigo="I", area=AreaConcepto.tesoreria),
+        ConceptoFlujoCaja(id=60, nombre="NÓMINA", codigo="E", area=AreaConcepto.pagaduria),
+    ])
+    db_sqlite.add_all([
+        TransaccionFlujoCaja(fecha=fecha, concepto_id=concepto_id, cuenta_id=1, compania_id=1, monto=Decimal(monto), area=area)
+        for fecha, concepto_id, monto, area in [
+            (DIA_1, 5, "10", AreaTransaccion.tesoreria),
+            (DIA_2, 5, "20", AreaTransaccion.tesoreria),
+            (DIA_2, 60, "-7", AreaTransaccion.pagaduria),
+            (DIA_3, 5, "30", AreaTransaccion.tesoreria),
+        ]
+    ])
+    db_sqlite.commit()
+    # El día 2 se cierra y luego su fila cambia por fuera: la exportación debe usar el snapshot
+    CierreDiaService(db_sqlite).cerrar_dia(DIA_2, 1, usuario_id=7)
+    db_sqlite.commit()
+    db_sqlite.query(TransaccionFlujoCaja).filter_by(fecha=DIA_2, concepto_id=5).update({"monto": Decimal("999")})
+    db_sqlite.commit()
+    return db_sqlite
+
+
+def test_grilla_intercala_dias_cerrados_en_orden(db):
+    filas = list(filas_grilla(db, DIA_1, DIA_3))
+    assert [(f[0], f[4], f[6]) for f in filas] == [
+        (DIA_1, 5, Decimal("10.00")),
+        (DIA_2, 5, Decimal("20.00")),
+        (DIA_2, 60, Decimal("-7.00")),
+        (DIA_3, 5, Decimal("30.00")),
+    ]
+    assert filas[0][1:4] == ["tesoreria", "Bolívar", "001"]
+
+    pagaduria = list(filas_grilla(db, DIA_1, DIA_3, "pagaduria"))
+    assert [(f[0], f[5]) for f in pagaduria] == [(DIA_2, "NÓMINA")]
+
+
+def test_grilla_no_consulta_con_el_stream_abierto(db):
+    """Con un cursor sin buffer (pymysql) otra consulta en la conexión truncaría el stream"""
+    sentencias = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement)
+
+    event.listen(db.get_bind(), "before_cursor_execute", registrar)
+    try:
+        filas = list(filas_grilla(db, DIA_1, DIA_3))
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", registrar)
+
+    assert len(filas) == 4
+    assert "FROM transacciones_flujo_caja" in sentencias[-1]  # El stream es la última consulta
+
+
+def test_consolidado_suma_abiertos_y_snapshots(db):
+    filas = list(filas_consolidado_mensual(db, 2025, 3))
+    assert [(f[0], f[1], f[5]) for f in filas] == [
+        ("tesoreria", 5, Decimal("60.00")),
+        ("pagaduria", 60, Decimal("-7.00")),
+    ]
+
+
+def test_csv_con_gzip_y_excel(db):
+    request = SimpleNamespace(headers={"accept-encoding": "gzip, deflate"})
+    respuesta = respuesta_exportacion(request, filas_grilla(db, DIA_1, DIA_3), ENCABEZADOS_GRILLA, "csv", "grilla")
+    assert respuesta.headers["content-encoding"] == "gzip"
+
+    filas = [list(f) for f in filas_grilla(db, DIA_1, DIA_3)]
+    csv_plano = b"".join(escribir_csv(ENCABEZADOS_GRILLA, filas))
+    texto = csv_plano.decode("utf-8-sig").splitlines()
+    assert texto[0].startswith("Fecha,Área,Compañía")
+    assert texto[2] == "2025-03-04,tesoreria,Bolívar,001,5,INGRESO CLIENTES,20.00,"
+
+    assert gzip.decompress(b"".join(comprimir_gzip(escribir_csv(ENCABEZADOS_GRILLA, filas)))) == csv_plano
+
+    libro = load_workbook(io.BytesIO(b"".join(escribir_xlsx(ENCABEZADOS_GRILLA, filas, "grilla"))), read_only=True)
+    hoja = libro["grilla"]
+    valores = list(hoja.iter_rows(values_only=True))
+    assert valores[0] == tuple(ENCABEZADOS_GRILLA)
+    assert len(valores) == 5
+    assert valores[4][4:7] == (5, "INGRESO CLIENTES", 30)
+
+
+def test_formato_no_soportado(db):
+    with pytest.raises(HTTPException) as error:
+        respuesta_exportacion(SimpleNamespace(headers={}), iter([]), ENCABEZADOS_GRILLA, "pdf", "grilla")
+    assert error.value.status_code == 400
+
+
+def test_exportar_consolidado_requiere_autenticacion():
+    app = FastAPI()
+    app.include_router(informes_router)
+    respuesta = TestClient(app).get("/informes-consolidados/mensual/exportar", params={"año": 2025, "mes": 3})
+    assert respuesta.status_code == 401
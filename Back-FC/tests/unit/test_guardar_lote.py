@@ -0,0 +1,87 @@
+"""
+Pruebas del guardado en lote de celdas (crear/actualizar/eliminar en una transacción)
+"""
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from app.models import Banco, Compania, ConceptoFlujoCaja, CuentaBancaria, TransaccionFlujoCaja, AreaConcepto, AreaTransaccion
+from app.models.auditoria import RegistroAuditoria
+from app.schemas.flujo_caja import OperacionCeldaSchema
+from app.services.transaccion_flujo_caja_service import LoteInvalidoError, TransaccionFlujoCajaService
+
+FECHA = date(2025, 3, 4)
+USUARIO = SimpleNamespace(id=7, nombre="Tesorería", email="tesoreria@bolivar.com")
+
+
+@pytest.fixture
+def db(db_sqlite):
+    db_sqlite.add_all([
+        Compania(id=1, nombre="Bolívar"),
+        Banco(id=1, nombre="Banco de Bogotá"),
+        CuentaBancaria(id=1, numero_cuenta="001", compania_id=1, banco_id=1),
+        CuentaBancaria(id=2, numero_cuenta="002", compania_id=1, banco_id=1),
+        ConceptoFlujoCaja(id=5, nombre="INGRESO CLIENTES", codigo="I", area=AreaConcepto.tesoreria),
+        ConceptoFlujoCaja(id=6, nombre="PAGO PROVEEDORES", codigo="E", area=AreaConcepto.tesoreria),
+        ConceptoFlujoCaja(id=7, nombre="AJUSTE", codigo="N", area=AreaConcepto.tesoreria),
+        ConceptoFlujoCaja(id=52, nombre="DIFERENCIA SALDOS", codigo="N", area=AreaConcepto.pagaduria),
+    ])
+    db_sqlite.add_all([
+        TransaccionFlujoCaja(id=100, fecha=FECHA, concepto_id=5, cuenta_id=1, monto=Decimal("10"), area=AreaTransaccion.tesoreria),
+        TransaccionFlujoCaja(id=101, fecha=FECHA, concepto_id=7, cuenta_id=2, monto=Decimal("20"), area=AreaTransaccion.tesoreria),
+        TransaccionFlujoCaja(id=102, fecha=FECHA, concepto_id=52, cuenta_id=2, monto=Decimal("30"), area=AreaTransaccion.pagaduria),
+    ])
+    db_sqlite.commit()
+    return db_sqlite
+
+
+def _op(**kwargs):
+    return OperacionCeldaSchema(**kwargs)
+
+
+def test_lote_aplica_todo_en_una_transaccion(db):
+    service = TransaccionFlujoCajaService(db)
+    resultado = service.guardar_lote(FECHA, [
+        _op(accion="crear", concepto_id=6, cuenta_id=1, monto=Decimal("500")),
+        _op(accion="actualizar", transaccion_id=100, monto=Decimal("-75")),
+        _op(accion="eliminar", transaccion_id=101),
+    ], usuario=USUARIO, compania_id=1)
+
+    assert (resultado["creadas"], resultado["actualizadas"], resultado["eliminadas"]) == (1, 1, 1)
+    assert resultado["cuentas_afectadas"] == {1: {5, 6}, 2: {7}}
+
+    montos = {t.concepto_id: t.monto for t in db.query(TransaccionFlujoCaja).filter(TransaccionFlujoCaja.cuenta_id == 1)}
+    assert montos[6] == Decimal("-500")  # egreso siempre negativo
+    assert montos[5] == Decimal("75")  # ingreso siempre positivo
+    assert db.query(TransaccionFlujoCaja).filter(TransaccionFlujoCaja.id == 101).first() is None
+    assert db.query(RegistroAuditoria).count() == 3
+
+
+def test_lote_invalido_no_escribe_nada(db):
+    service = TransaccionFlujoCajaService(db)
+    with pytest.raises(LoteInvalidoError) as exc:
+        service.guardar_lote(FECHA, [
+            _op(accion="actualizar", transaccion_id=100, monto=Decimal("1")),
+            _op(accion="actualizar", transaccion_id=102, monto=Decimal("1")),
+            _op(accion="crear", concepto_id=5, cuenta_id=1, monto=Decimal("1")),
+            _op(accion="crear", concepto_id=6, cuenta_id=99, monto=Decimal("1")),
+            _op(accion="eliminar", transaccion_id=999),
+        ], usuario=USUARIO)
+
+    assert len(exc.value.errores) == 4
+    assert db.query(TransaccionFlujoCaja).filter(TransaccionFlujoCaja.id == 100).first().monto == Decimal("10")
+    assert db.query(RegistroAuditoria).count() == 0
+
+
+def test_lote_con_version_vieja_es_conflicto(db):
+    service = TransaccionFlujoCajaService(db)
+    with pytest.raises(LoteInvalidoError) as exc:
+        service.guardar_lote(FECHA, [
+            _op(accion="actualizar", transaccion_id=100, monto=Decimal("1"), version=1),
+            _op(accion="eliminar", transaccion_id=101, version=3),
+        ], usuario=USUARIO)
+
+    assert exc.value.conflicto
+    assert len(exc.value.errores) == 1
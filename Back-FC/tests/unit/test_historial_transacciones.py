@@ -0,0 +1,103 @@
+"""
+Pruebas del historial de cambios de monto y del resumen fijo en `auditoria`
+"""
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+from app.models import Banco, Compania, ConceptoFlujoCaja, CuentaBancaria, TransaccionFlujoCaja, AreaConcepto, AreaTransaccion
+from app.models.transaccion_historial import TransaccionHistorial, ultimo_cambio
+from app.services.transaccion_flujo_caja_service import TransaccionFlujoCajaService
+
+FECHA = date(2025, 3, 4)
+
+
+@pytest.fixture
+def db(db_sqlite):
+    db_sqlite.add_all([
+        Compania(id=1, nombre="Bolívar"),
+        Banco(id=1, nombre="Banco de Bogotá"),
+        CuentaBancaria(id=1, numero_cuenta="001", compania_id=1, banco_id=1),
+        ConceptoFlujoCaja(id=5, nombre="INGRESO CLIENTES", codigo="I", area=AreaConcepto.tesoreria),
+        ConceptoFlujoCaja(id=50, nombre="SUB-TOTAL TESORERÍA", codigo="N", area=AreaConcepto.tesoreria),
+    ])
+    db_sqlite.commit()
+    return db_sqlite
+
+
+def _transaccion(concepto_id, monto):
+    return TransaccionFlujoCaja(fecha=FECHA, concepto_id=concepto_id, cuenta_id=1, monto=Decimal(monto),
+                                area=AreaTransaccion.tesoreria, auditoria=ultimo_cambio("creacion", 7))
+
+
+def test_un_insert_de_historial_por_flush(db):
+    inserts = []
+
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO transacciones_historial"):
+            inserts.append(parameters)
+
+    event.listen(db.get_bind(), "before_cursor_execute", contar)
+    try:
+        db.add_all([_transaccion(5, "10"), _transaccion(50, "10")])
+        db.commit()
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", contar)
+
+    assert len(inserts) == 1
+    filas = db.query(TransaccionHistorial).order_by(TransaccionHistorial.id).all()
+    assert [(f.concepto_id, f.monto_anterior, f.monto_nuevo, f.origen, f.usuario_id) for f in filas] == [
+        (5, None, Decimal("10.00"), "creacion", 7),
+        (50, None, Decimal("10.00"), "creacion", 7),
+    ]
+
+
+def test_auditoria_queda_como_resumen_de_tamano_fijo(db):
+    transaccion = _transaccion(50, "10")
+    db.add(transaccion)
+    db.commit()
+
+    for monto in ("20", "30", "30"):
+        transaccion.monto = Decimal(monto)
+        transaccion.auditoria = ultimo_cambio("actualizacion_automatica", 1)
+        db.commit()
+    transaccion.descripcion = "solo descripción"
+    transaccion.auditoria = {**ultimo_cambio("actualizacion", 9), "valores_anteriores": {"monto": 30}, "ip": "10.0.0.1"}
+    db.commit()
+
+    db.refresh(transaccion)
+    assert transaccion.auditoria["accion"] == "actualizacion"
+    assert set(transaccion.auditoria) == {"accion", "usuario_id", "timestamp", "monto_anterior", "monto_nuevo"}
+    assert (transaccion.auditoria["monto_anterior"], transaccion.auditoria["monto_nuevo"]) == (20.0, 30.0)
+
+    # creación + 10→20 + 20→30; ni el monto repetido ni la descripción generan historial
+    cambios = [(f.monto_anterior, f.monto_nuevo) for f in db.query(TransaccionHistorial).order_by(TransaccionHistorial.id)]
+    assert cambios == [(None, Decimal("10.00")), (Decimal("10.00"), Decimal("20.00")), (Decimal("20.00"), Decimal("30.00"))]
+
+    # La eliminación registra a quien elimina, no al creador de la fila
+    transaccion_id = transaccion.id
+    assert TransaccionFlujoCajaService(db).eliminar_transaccion(transaccion_id, usuario_id=9)
+    ultimo = db.query(TransaccionHistorial).order_by(TransaccionHistorial.id.desc()).first()
+    assert (ultimo.transaccion_id, ultimo.monto_anterior, ultimo.monto_nuevo, ultimo.origen, ultimo.usuario_id) == (
+        transaccion_id, Decimal("30.00"), None, "eliminacion", 9
+    )
+
+
+def test_historial_celda_paginado_por_clave(db):
+    transaccion = _transaccion(5, "1")
+    db.add(transaccion)
+    db.commit()
+    for monto in range(2, 8):
+        transaccion.monto = Decimal(monto)
+        db.commit()
+
+    service = TransaccionFlujoCajaService(db)
+    pagina, cursor = service.obtener_historial_celda(FECHA, 5, 1, limite=4)
+    assert [c.monto_nuevo for c in pagina] == [Decimal("7.00"), Decimal("6.00"), Decimal("5.00"), Decimal("4.00")]
+
+    pagina, cursor = service.obtener_historial_celda(FECHA, 5, 1, antes_de=cursor, limite=4)
+    assert [c.monto_nuevo for c in pagina] == [Decimal("3.00"), Decimal("2.00"), Decimal("1.00")]
+    assert cursor is None
+    assert service.obtener_historial_celda(FECHA, 5, None) == ([], None)
@@ -0,0 +1,55 @@
+"""
+Pruebas de /metrics: latencia por plantilla de ruta y agregación entre workers por directorio compartido
+"""
+import os
+import subprocess
+import sys
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.core.metricas import MiddlewareMetricas, generar_metricas
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def test_latencia_por_plantilla_de_ruta():
+    app = FastAPI()
+    app.add_middleware(MiddlewareMetricas)
+
+    @app.get("/prueba-metricas/{cuenta_id}")
+    def cuenta(cuenta_id: int):
+        return {"cuenta_id": cuenta_id}
+
+    etiquetas = {"method": "GET", "route": "/prueba-metricas/{cuenta_id}", "status": "2xx"}
+    antes = REGISTRY.get_sample_value("flujo_caja_http_request_duration_seconds_count", etiquetas) or 0
+    cliente = TestClient(app)
+    for cuenta_id in (1, 2, 3):
+        assert cliente.get(f"/prueba-metricas/{cuenta_id}").status_code == 200
+    cliente.get("/no-existe")
+
+    assert REGISTRY.get_sample_value("flujo_caja_http_request_duration_seconds_count", etiquetas) == antes + 3
+    assert b'route="(sin ruta)",status="4xx"' in generar_metricas()
+
+
+def test_workers_se_agregan_en_el_directorio_compartido(tmp_path):
+    entorno = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+
+    def ejecutar(codigo):
+        return subprocess.run(
+            [sys.executable, "-c", codigo], cwd=RAIZ, env=entorno, check=True, capture_output=True
+        ).stdout
+
+    for celdas in (3, 4):  # Dos "workers" que terminan
+        ejecutar(
+            "from app.core.metricas import recalculo_celdas, websocket_conexiones, marcar_proceso_terminado\n"
+            f"recalculo_celdas.labels(resultado='cambiadas').inc({celdas})\n"
+            "websocket_conexiones.inc()\n"
+            "marcar_proceso_terminado()"
+        )
+
+    salida = ejecutar("import sys; from app.core.metricas import generar_metricas; sys.stdout.buffer.write(generar_metricas())")
+    assert b'flujo_caja_recalculo_celdas_total{resultado="cambiadas"} 7.0' in salida
+    # Los gauges 'livesum' de los workers apagados ya no suman
+    assert b"flujo_caja_websocket_connections 0.0" in salida
@@ -0,0 +1,84 @@
+"""
+Pruebas del plan de particiones mensuales de transacciones_flujo_caja (el DDL solo aplica
+en MySQL; aquí se verifica la generación de sentencias y que en SQLite no se ejecute nada)
+"""
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import event
+
+from app.models import AreaTransaccion, TransaccionFlujoCaja
+from app.services.particiones_mensuales_service import (
+    LlaveForanea, ParticionesMensualesService, meses, meses_faltantes, sql_particionar, sql_reorganizar, sumar_meses,
+    trigger_integridad
+)
+
+
+def test_meses_faltantes_cruza_el_cambio_de_anio_y_no_repite_existentes():
+    existentes = ["p202410", "p202411", "pmax"]
+
+    faltantes = meses_faltantes(existentes, sumar_meses(date(2024, 11, 20), 3))
+
+    assert faltantes == [date(2024, 12, 1), date(2025, 1, 1), date(2025, 2, 1)]
+    assert meses_faltantes(existentes + ["p202502"], date(2025, 2, 1)) == []
+    assert meses_faltantes(["pmax"], date(2025, 2, 1)) == []
+
+
+def test_sentencias_de_particionado_y_rotacion():
+    particionar = sql_particionar(meses(date(2024, 12, 15), date(2025, 1, 3)))
+    assert "ADD PRIMARY KEY (id, fecha)" in particionar
+    assert "PARTITION p202412 VALUES LESS THAN (TO_DAYS('2025-01-01'))" in particionar
+    assert "PARTITION p202501 VALUES LESS THAN (TO_DAYS('2025-02-01'))" in particionar
+    assert particionar.rstrip(")").endswith("PARTITION pmax VALUES LESS THAN MAXVALUE\n")
+
+    rotar = sql_reorganizar([date(2025, 2, 1)])
+    assert rotar.startswith("ALTER TABLE transacciones_flujo_caja REORGANIZE PARTITION pmax INTO (")
+    assert "PARTITION p202502 VALUES LESS THAN (TO_DAYS('2025-03-01'))" in rotar
+
+
+def test_triggers_segun_la_regla_de_cada_llave():
+    def llave(tabla, nombre, padre, regla, columna):
+        return LlaveForanea(tabla, nombre, padre, regla, [columna], ["id"])
+
+    _, cascada = trigger_integridad(llave("transacciones_flujo_caja", "fk_cuenta", "cuentas_bancarias", "CASCADE", "cuenta_id"))
+    assert cascada == (
+        "CREATE TRIGGER `trg_fk_cuenta_borrar` AFTER DELETE ON `cuentas_bancarias` FOR EACH ROW "
+        "DELETE FROM `transacciones_flujo_caja` WHERE `cuenta_id` = OLD.`id`"
+    )
+    _, nulo = trigger_integridad(llave("transacciones_flujo_caja", "fk_usuario", "usuarios", "SET NULL", "usuario_id"))
+    assert "AFTER DELETE ON `usuarios`" in nulo and "SET `usuario_id` = NULL WHERE `usuario_id` = OLD.`id`" in nulo
+    _, restringe = trigger_integridad(llave("escenario_ajustes", "fk_transaccion", "transacciones_flujo_caja", "RESTRICT", "transaccion_id"))
+    assert "BEFORE DELETE ON `transacciones_flujo_caja`" in restringe and "SIGNAL SQLSTATE '45000'" in restringe
+
+    # Autorreferencia: un trigger no puede modificar su propia tabla, no hay reemplazo
+    assert trigger_integridad(llave("transacciones_flujo_caja", "fk_origen", "transacciones_flujo_caja", "SET NULL", "transaccion_origen_id")) is None
+
+
+def test_rotar_fuera_de_mysql_no_ejecuta_ddl(db_sqlite):
+    resultado = ParticionesMensualesService(db_sqlite).rotar(hoy=date(2025, 3, 7))
+
+    assert resultado["particionada"] is False
+    assert resultado["sentencia"] is None
+
+
+def test_update_y_delete_del_orm_filtran_por_fecha(db_sqlite):
+    fila = TransaccionFlujoCaja(fecha=date(2025, 3, 7), concepto_id=5, monto=Decimal("1"), area=AreaTransaccion.tesoreria)
+    db_sqlite.add(fila)
+    db_sqlite.commit()
+    sentencias = []
+    event.listen(db_sqlite.get_bind(), "before_cursor_execute",
+                 lambda conn, cursor, sql, params, context, executemany: sentencias.append((sql, params)))
+
+    fila.monto = Decimal("2")
+    fila.fecha = date(2025, 4, 1)
+    db_sqlite.commit()
+    assert db_sqlite.get(TransaccionFlujoCaja, (fila.id, date(2025, 4, 1))).monto == Decimal("2")
+    db_sqlite.delete(fila)
+    db_sqlite.commit()
+
+    escrituras = [(sql, params) for sql, params in sentencias if sql.startswith(("UPDATE", "DELETE"))]
+    assert len(escrituras) == 2
+    for sql, params in escrituras:
+        assert sql.split("WHERE")[1].count("fecha = ?") == 1
+    # El UPDATE ubica la fila por su fecha anterior (partición de origen)
+    assert "2025-03-07" in [str(p) for p in escrituras[0][1]]
@@ -0,0 +1,62 @@
+"""
+Pruebas del perfilado de requests: SQL por request, fases, Server-Timing y detección de N+1
+"""
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from app.core.perfilado import (
+    MiddlewarePerfilado, RegistroPerfil, fase, instrumentar_engine, normalizar_sentencia, perfil_actual
+)
+from app.models import Banco, CuentaBancaria, Compania
+
+
+def test_normalizar_colapsa_listas_in():
+    assert normalizar_sentencia("SELECT id\n  FROM t WHERE id IN (?, ?, ?)") == "SELECT id FROM t WHERE id IN (?)"
+    assert normalizar_sentencia("SELECT 1 FROM t WHERE a IN (%s,%s)") == normalizar_sentencia("SELECT 1 FROM t WHERE a IN (%s, %s, %s)")
+
+
+def test_server_timing_y_n_mas_1_por_endpoint(db_sqlite, sqlite_engine):
+    db_sqlite.add_all([Compania(id=1, nombre="Bolívar"), Banco(id=1, nombre="Banco de Bogotá")])
+    db_sqlite.add_all([CuentaBancaria(id=i, numero_cuenta=f"{i:03d}", compania_id=1, banco_id=1) for i in range(1, 9)])
+    db_sqlite.commit()
+
+    instrumentar_engine(sqlite_engine)
+    Sesion = sessionmaker(bind=sqlite_engine)
+    registro = RegistroPerfil()
+    app = FastAPI()
+    app.add_middleware(MiddlewarePerfilado, umbral_n_mas_1=5, registro=registro)
+
+    def sesion():
+        s = Sesion()
+        try:
+            yield s
+        finally:
+            s.close()
+
+    @app.get("/cuentas/{compania_id}")
+    def cuentas(compania_id: int, s=Depends(sesion)):
+        with fase("tesoreria"):
+            with fase("tesoreria"):  # Anidada en sí misma: se mide una vez
+                ids = [c.id for c in s.query(CuentaBancaria).filter_by(compania_id=compania_id)]
+        # Una consulta por cuenta: patrón N+1
+        return [s.query(CuentaBancaria.numero_cuenta).filter_by(id=i).scalar() for i in ids]
+
+    respuesta = TestClient(app).get("/cuentas/1")
+    assert respuesta.status_code == 200 and len(respuesta.json()) == 8
+
+    timing = respuesta.headers["server-timing"]
+    assert 'desc="9 SQL"' in timing  # 1 listado + 8 por cuenta
+    assert "tesoreria;dur=" in timing and 'n1;desc="1 posibles N+1"' in timing
+
+    (fila,) = registro.snapshot()
+    assert fila["endpoint"] == "GET /cuentas/{compania_id}"
+    assert (fila["requests"], fila["sql_max"]) == (1, 9)
+    assert list(fila["fases_avg_ms"]) == ["tesoreria"]
+    assert fila["n_mas_1"][0]["max_repeticiones"] == 8
+    assert "cuentas_bancarias" in fila["n_mas_1"][0]["sentencia"]
+
+    # Fuera de una request no hay perfil y las fases no registran nada
+    assert perfil_actual() is None
+    with fase("pagaduria"):
+        pass
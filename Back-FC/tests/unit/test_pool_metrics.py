@@ -0,0 +1,42 @@
+"""
+Pruebas de las métricas del pool de conexiones (checkouts, overflow y timeouts)
+"""
+import sys
+import os
+
+import pytest
+from sqlalchemy import create_engine, exc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.core.pool_metrics import InstrumentedQueuePool, pool_metrics
+
+
+def test_metricas_de_overflow_y_timeout(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.1,
+    )
+    pool_metrics.reset()
+
+    primera = engine.connect()
+    segunda = engine.connect()
+    estado = pool_metrics.snapshot(engine.pool)
+    assert estado["checkouts"] == 2
+    assert estado["overflow_checkouts"] == 1
+    assert estado["in_use"] == 2
+    assert estado["overflow"] == 1
+
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    assert pool_metrics.snapshot()["timeouts"] == 1
+
+    primera.close()
+    segunda.close()
+    estado = pool_metrics.snapshot(engine.pool)
+    assert estado["in_use"] == 0
+    assert estado["wait_max_ms"] >= 0
+    engine.dispose()
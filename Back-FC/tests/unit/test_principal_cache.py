@@ -0,0 +1,70 @@
+"""
+Pruebas del caché de principales (usuario autenticado) usado por auth_service
+"""
+import sys
+import os
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.core.principal_cache import PrincipalCache, UsuarioPrincipal
+
+
+def _usuario(id=1, email="tesoreria@bolivar.com", permisos=("transacciones.crear",)):
+    return SimpleNamespace(
+        id=id,
+        nombre="Usuario Prueba",
+        email=email,
+        rol="tesoreria",
+        rol_id=2,
+        estado=True,
+        obtener_permisos=lambda: list(permisos),
+    )
+
+
+def test_principal_desde_usuario():
+    """El principal copia los datos básicos y congela los permisos"""
+    principal = UsuarioPrincipal.desde_usuario(_usuario())
+    assert principal.id == 1
+    assert principal.rol == "tesoreria"
+    assert principal.tiene_permiso("transacciones.crear")
+    assert not principal.tiene_permiso("usuarios.eliminar")
+    assert isinstance(principal.permisos, frozenset)
+
+
+def test_cache_hit_y_expiracion():
+    """Las entradas se sirven mientras no venza el TTL"""
+    cache = PrincipalCache(ttl_seconds=60)
+    principal = UsuarioPrincipal.desde_usuario(_usuario())
+    assert cache.get(principal.email) is None
+    cache.set(principal.email, principal)
+    assert cache.get(principal.email) is principal
+
+    cache_vencido = PrincipalCache(ttl_seconds=60)
+    cache_vencido._entries[principal.email] = (0.0, principal)
+    assert cache_vencido.get(principal.email) is None
+
+
+def test_invalidacion_por_usuario_y_total():
+    """Invalidar por id elimina todas las entradas del usuario; invalidar_todo limpia el caché"""
+    cache = PrincipalCache(ttl_seconds=60)
+    uno = UsuarioPrincipal.desde_usuario(_usuario(id=1, email="a@bolivar.com"))
+    dos = UsuarioPrincipal.desde_usuario(_usuario(id=2, email="b@bolivar.com"))
+    cache.set(uno.email, uno)
+    cache.set("email-anterior@bolivar.com", uno)
+    cache.set(dos.email, dos)
+
+    cache.invalidar_usuario(1)
+    assert cache.get(uno.email) is None
+    assert cache.get("email-anterior@bolivar.com") is None
+    assert cache.get(dos.email) is dos
+
+    cache.invalidar_todo()
+    assert cache.get(dos.email) is None
+
+
+def test_ttl_cero_desactiva_cache():
+    cache = PrincipalCache(ttl_seconds=0)
+    principal = UsuarioPrincipal.desde_usuario(_usuario())
+    cache.set(principal.email, principal)
+    assert cache.get(principal.email) is None
@@ -0,0 +1,149 @@
+"""
+Pruebas de la proyección en memoria: arrastre de saldos por días hábiles, sin escrituras
+salvo al confirmar, y días cerrados intactos
+"""
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.models import AreaConcepto, AreaTransaccion, Banco, Compania, ConceptoFlujoCaja, CuentaBancaria, TransaccionFlujoCaja
+from app.models.dias_festivos import DiaFestivo
+from app.models.snapshot_dia import SnapshotDiaCerrado
+from app.api import transacciones_flujo_caja
+from app.api.auth import get_current_user
+from app.core.database import get_db
+from app.services.proyeccion_flujo_caja_service import ProyeccionFlujoCajaService
+
+VIERNES = date(2025, 3, 7)
+FESTIVO = date(2025, 3, 10)
+MARTES = date(2025, 3, 11)
+MIERCOLES = date(2025, 3, 12)
+
+
+@pytest.fixture
+def db(db_sqlite):
+    db_sqlite.add_all([
+        Compania(id=1, nombre="Bolívar"),
+        Banco(id=1, nombre="Banco de Bogotá"),
+        CuentaBancaria(id=1, numero_cuenta="001", compania_id=1, banco_id=1),
+        DiaFestivo(fecha=FESTIVO, nombre="San José"),
+    ])
+    db_sqlite.add_all([
+        ConceptoFlujoCaja(id=concepto_id, nombre=nombre, codigo=codigo, area=area, formula_dependencia=formula)
+        for concepto_id, nombre, codigo, area, formula in [
+            (1, "SALDO INICIAL", "N", AreaConcepto.tesoreria, None),
+            (2, "CONSUMO", "N", AreaConcepto.tesoreria, None),
+            (4, "SALDO NETO INICIAL PAGADURÍA", "N", AreaConcepto.tesoreria, None),
+            (5, "INGRESO", "I", AreaConcepto.tesoreria, None),
+            (50, "SUB-TOTAL TESORERÍA", "N", AreaConcepto.tesoreria, "SUMA(5)"),
+            (51, "SALDO FINAL CUENTAS", "N", AreaConcepto.tesoreria, "SUMA(4,50)"),
+            (54, "SALDO DIA ANTERIOR", "N", AreaConcepto.pagaduria, None),
+            (55, "NÓMINA", "E", AreaConcepto.pagaduria, None),
+            (82, "SUBTOTAL MOVIMIENTO PAGADURIA", "N", AreaConcepto.pagaduria, None),
+            (83, "SUBTOTAL SALDO INICIAL PAGADURIA", "N", AreaConcepto.pagaduria, None),
+            (84, "MOVIMIENTO TESORERIA", "N", AreaConcepto.pagaduria, None),
+            (85, "SALDO TOTAL EN BANCOS", "N", AreaConcepto.pagaduria, None),
+        ]
+    ])
+    db_sqlite.add_all([
+        TransaccionFlujoCaja(fecha=fecha, concepto_id=concepto_id, cuenta_id=1, monto=Decimal(monto),
+                             area=area, compania_id=1, usuario_id=1)
+        for fecha, concepto_id, area, monto in [
+            (VIERNES, 1, AreaTransaccion.tesoreria, "1000"),
+            (VIERNES, 5, AreaTransaccion.tesoreria, "300"),
+            (VIERNES, 54, AreaTransaccion.pagaduria, "500"),
+            (VIERNES, 55, AreaTransaccion.pagaduria, "200"),
+            (MARTES, 55, AreaTransaccion.pagaduria, "100"),
+        ]
+    ])
+    db_sqlite.commit()
+    return db_sqlite
+
+
+def _saldos(proyeccion):
+    return [
+        (d["fecha"], d["saldo_inicial"], d["saldo_final_cuentas"], d["saldo_dia_anterior"], d["saldo_total_bancos"])
+        for d in proyeccion["cuentas"][0]["dias"]
+    ]
+
+
+def test_proyecta_por_dias_habiles_sin_escribir(db):
+    antes = db.query(TransaccionFlujoCaja).count()
+    proyeccion = ProyeccionFlujoCajaService(db).proyectar(VIERNES, 3)
+
+    assert proyeccion["fechas"] == [VIERNES.isoformat(), MARTES.isoformat(), MIERCOLES.isoformat()]
+    assert _saldos(proyeccion) == [
+        ("2025-03-07", 1000.0, 1100.0, 500.0, 600.0),
+        ("2025-03-11", 1100.0, 1000.0, 600.0, 500.0),
+        ("2025-03-12", 1000.0, 1000.0, 500.0, 500.0),
+    ]
+    assert proyeccion["cuentas"][0]["dias"][1]["tesoreria"]["2"] == -100.0
+    assert proyeccion["celdas_cambiadas"] > 0 and not proyeccion["persistida"]
+    assert db.query(TransaccionFlujoCaja).count() == antes
+
+
+def test_confirmar_escribe_y_queda_estable(db):
+    service = ProyeccionFlujoCajaService(db)
+    resultado = service.confirmar(VIERNES, 3, usuario_id=1)
+
+    assert resultado["persistida"] and resultado["celdas_escritas"] == resultado["celdas_cambiadas"]
+    assert set(resultado["cuentas_por_fecha"]) == {"2025-03-07", "2025-03-11", "2025-03-12"}
+    saldo = db.query(TransaccionFlujoCaja).filter_by(fecha=MIERCOLES, concepto_id=1).one()
+    assert saldo.monto == Decimal("1000.00") and saldo.auditoria["accion"] == "proyeccion_confirmada"
+    assert service.proyectar(VIERNES, 3)["celdas_cambiadas"] == 0
+
+
+def test_dia_cerrado_se_arrastra_sin_modificarse(db):
+    db.add(SnapshotDiaCerrado(fecha=MARTES, compania_id=1, transacciones="[]", agregados=[], resumen={}, checksum="0"))
+    db.commit()
+
+    resultado = ProyeccionFlujoCajaService(db).confirmar(VIERNES, 3, usuario_id=1)
+
+    assert "2025-03-11" not in resultado["cuentas_por_fecha"]
+    assert db.query(TransaccionFlujoCaja).filter_by(fecha=MARTES).count() == 1
+    # El martes cerrado no tiene saldo final: el miércoles conserva lo que ya tenía (nada)
+    assert _saldos(resultado)[2] == ("2025-03-12", 0.0, 0.0, 0.0, 0.0)
+
+
+def test_horizonte_fuera_de_rango(db):
+    with pytest.raises(ValueError):
+        ProyeccionFlujoCajaService(db).proyectar(VIERNES, 0)
+
+
+def test_conflicto_a_mitad_devuelve_y_notifica_los_dias_confirmados(db, monkeypatch):
+    commit = db.commit
+    llamadas = []
+
+    def commit_con_conflicto():
+        llamadas.append(1)
+        if len(llamadas) == 2:
+            raise StaleDataError("otra sesión cambió la fila")
+        commit()
+
+    notificadas = []
+
+    async def notificar(mensaje):
+        notificadas.append(mensaje["fecha"])
+
+    monkeypatch.setattr(db, "commit", commit_con_conflicto)
+    monkeypatch.setattr(transacciones_flujo_caja.websocket_manager, "broadcast_update", notificar)
+    app = FastAPI()
+    app.include_router(transacciones_flujo_caja.router)
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=1)
+
+    respuesta = TestClient(app).post(
+        "/api/transacciones-flujo-caja/proyeccion/confirmar", params={"fecha_inicio": VIERNES.isoformat(), "horizonte": 3}
+    )
+
+    assert respuesta.status_code == 409
+    detalle = respuesta.json()["detail"]
+    assert detalle["fecha"] == "2025-03-11"
+    assert detalle["cuentas_por_fecha"] == {"2025-03-07": [1]}
+    assert notificadas == ["2025-03-07"]
+    assert db.query(TransaccionFlujoCaja).filter_by(fecha=VIERNES, concepto_id=50).one().auditoria["accion"] == "proyeccion_confirmada"
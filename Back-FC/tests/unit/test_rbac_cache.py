@@ -0,0 +1,99 @@
+"""
+Pruebas del registro de permisos RBAC compilado en memoria y de require_permission
+"""
+import sys
+import os
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.core.database import Base
+from app.core.principal_cache import UsuarioPrincipal
+from app.core.rbac_cache import PermisosRegistry, normalizar_codigo_permiso, permisos_registry
+from app.models.roles import Rol, Permiso, rol_permiso
+from app.models.version_datos import VersionDatos
+from app.services.auth_service import require_permission
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[Rol.__table__, Permiso.__table__, rol_permiso, VersionDatos.__table__])
+    session = sessionmaker(bind=engine)()
+
+    crear = Permiso(nombre="Crear", codigo="transacciones.crear", modulo="transacciones")
+    editar = Permiso(nombre="Editar", codigo="transacciones.editar", modulo="transacciones")
+    inactivo = Permiso(nombre="Borrar", codigo="transacciones.eliminar", modulo="transacciones", activo=False)
+    session.add_all([
+        Rol(id=1, nombre="Tesorería", codigo="TESORERIA", permisos=[crear, editar, inactivo]),
+        Rol(id=2, nombre="Consulta", codigo="CONSULTA", permisos=[]),
+        Rol(id=3, nombre="Inactivo", codigo="INACTIVO", activo=False, permisos=[crear]),
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+
+def test_cargar_compila_permisos_activos(db):
+    """Solo se compilan permisos activos de roles activos"""
+    registry = PermisosRegistry()
+    registry.cargar(db)
+
+    assert registry.cargado
+    assert registry.permisos_de_rol(1) == frozenset({"transacciones.crear", "transacciones.editar"})
+    assert registry.permisos_de_rol(2) == frozenset()
+    assert registry.permisos_de_rol(3) == frozenset()
+    assert registry.permisos_de_rol(None) == frozenset()
+
+
+def test_recargar_refleja_cambios(db):
+    registry = PermisosRegistry()
+    registry.cargar(db)
+
+    rol = db.query(Rol).filter(Rol.id == 1).first()
+    rol.permisos = [p for p in rol.permisos if p.codigo != "transacciones.editar"]
+    db.commit()
+    registry.recargar(db)
+
+    assert not registry.tiene_permiso(1, "transacciones.editar")
+    assert registry.tiene_permiso(1, "transacciones.crear")
+
+
+def test_otro_worker_recarga_cuando_cambia_la_version(db):
+    """Un worker que no atendió la escritura recarga al ver la nueva versión 'rbac'"""
+    escritor, otro = PermisosRegistry(intervalo=0), PermisosRegistry(intervalo=0)
+    escritor.cargar(db)
+    otro.cargar(db)
+    assert otro.sincronizar(db) is False  # Sin cambios no se recarga
+
+    rol = db.query(Rol).filter(Rol.id == 1).first()
+    rol.permisos = [p for p in rol.permisos if p.codigo != "transacciones.editar"]
+    db.commit()
+    escritor.recargar(db)
+
+    assert otro.tiene_permiso(1, "transacciones.editar")
+    assert otro.sincronizar(db) is True
+    assert not otro.tiene_permiso(1, "transacciones.editar")
+    assert otro.version == escritor.version
+
+
+def test_require_permission(db):
+    """La dependencia acepta 'modulo:accion' y responde 403 sin el permiso"""
+    assert normalizar_codigo_permiso("transacciones:crear") == "transacciones.crear"
+    permisos_registry.cargar(db)
+    try:
+        tesoreria = UsuarioPrincipal(id=1, nombre="T", email="t@b.com", rol="tesoreria", rol_id=1, estado=True)
+        consulta = UsuarioPrincipal(id=2, nombre="C", email="c@b.com", rol="consulta", rol_id=2, estado=True)
+        checker = require_permission("transacciones:crear")
+
+        assert checker(current_user=tesoreria) is tesoreria
+        with pytest.raises(HTTPException) as exc:
+            checker(current_user=consulta)
+        assert exc.value.status_code == 403
+    finally:
+        permisos_registry._por_rol = {}
+        permisos_registry.cargado = False
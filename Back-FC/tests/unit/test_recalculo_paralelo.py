@@ -0,0 +1,69 @@
+"""
+Pruebas del recálculo por cuentas en paralelo: mismo resultado que el recorrido secuencial
+"""
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.models import AreaConcepto, AreaTransaccion, Banco, Compania, ConceptoFlujoCaja, CuentaBancaria, TransaccionFlujoCaja
+from app.services.dependencias_flujo_caja_service import DependenciasFlujoCajaService
+
+DIAS = [date(2025, 3, 3), date(2025, 3, 4)]
+
+
+def _base_con_datos(ruta, autoflush):
+    engine = create_engine(f"sqlite:///{ruta}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, autoflush=autoflush)()
+    db.add_all([Compania(id=1, nombre="Bolívar"), Banco(id=1, nombre="Banco de Bogotá")])
+    db.add_all([CuentaBancaria(id=i, numero_cuenta=f"00{i}", compania_id=1, banco_id=1) for i in range(1, 6)])
+    db.add_all([
+        ConceptoFlujoCaja(id=52, nombre="DIFERENCIA SALDOS", codigo="N", area=AreaConcepto.pagaduria),
+        ConceptoFlujoCaja(id=53, nombre="SALDOS EN BANCOS", codigo="N", area=AreaConcepto.pagaduria),
+        ConceptoFlujoCaja(id=54, nombre="SALDO DIA ANTERIOR", codigo="N", area=AreaConcepto.pagaduria),
+    ])
+    for cuenta in range(1, 6):
+        for i, dia in enumerate(DIAS):
+            db.add(TransaccionFlujoCaja(
+                fecha=dia, concepto_id=53, cuenta_id=cuenta, monto=Decimal(1000 * cuenta + i), area=AreaTransaccion.pagaduria
+            ))
+            db.add(TransaccionFlujoCaja(
+                fecha=dia, concepto_id=54, cuenta_id=cuenta, monto=Decimal(10 * cuenta), area=AreaTransaccion.pagaduria
+            ))
+    db.commit()
+    return engine, db
+
+
+def _diferencias(db):
+    return sorted(
+        (t.fecha, t.cuenta_id, t.monto)
+        for t in db.query(TransaccionFlujoCaja).filter(TransaccionFlujoCaja.concepto_id == 52)
+    )
+
+
+@pytest.mark.parametrize("autoflush", [False, True])
+def test_rango_en_paralelo_equivale_al_secuencial(tmp_path, autoflush):
+    engine_a, db_a = _base_con_datos(tmp_path / "secuencial.db", autoflush)
+    engine_b, db_b = _base_con_datos(tmp_path / "paralelo.db", autoflush)
+
+    secuencial = DependenciasFlujoCajaService(db_a, paralelismo=1).procesar_rango_fechas(DIAS[0], DIAS[-1], 1, 7)
+    paralelo = DependenciasFlujoCajaService(db_b, paralelismo=3).procesar_rango_fechas(DIAS[0], DIAS[-1], 1, 7)
+
+    assert list(paralelo) == DIAS
+    for dia in DIAS:
+        assert set(paralelo[dia]) >= {"tesoreria", "pagaduria", "cross_dashboard", "propagacion_dia_siguiente"}
+        assert [a["cuenta_id"] for a in paralelo[dia]["pagaduria"] if a["concepto_id"] == 52] == [1, 2, 3, 4, 5]
+        assert len(paralelo[dia]["pagaduria"]) == len(secuencial[dia]["pagaduria"])
+
+    db_a.expire_all()
+    db_b.expire_all()
+    assert _diferencias(db_b) == _diferencias(db_a)
+    assert (DIAS[1], 3, Decimal("2971.00")) in _diferencias(db_b)
+
+    for db, engine in ((db_a, engine_a), (db_b, engine_b)):
+        db.close()
+        engine.dispose()
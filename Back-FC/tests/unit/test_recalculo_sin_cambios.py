@@ -0,0 +1,110 @@
+"""
+Pruebas del recálculo sin escrituras redundantes: solo se actualizan las celdas cuyo monto cambió
+"""
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+from app.models import AreaConcepto, AreaTransaccion, Banco, Compania, ConceptoFlujoCaja, CuentaBancaria, TransaccionFlujoCaja
+from app.services.dependencias_flujo_caja_service import DependenciasFlujoCajaService
+
+FECHA = date(2025, 3, 4)
+
+
+@pytest.fixture
+def db(db_sqlite):
+    db_sqlite.add_all([
+        Compania(id=1, nombre="Bolívar"),
+        Banco(id=1, nombre="Banco de Bogotá"),
+        CuentaBancaria(id=1, numero_cuenta="001", compania_id=1, banco_id=1),
+    ])
+    db_sqlite.add_all([
+        ConceptoFlujoCaja(id=concepto_id, nombre=nombre, codigo=codigo, area=AreaConcepto.pagaduria)
+        for concepto_id, nombre, codigo in [
+            (52, "DIFERENCIA SALDOS", "N"), (53, "SALDOS EN BANCOS", "N"), (54, "SALDO DIA ANTERIOR", "N"),
+            (55, "NÓMINA", "E"), (82, "SUBTOTAL MOVIMIENTO PAGADURIA", "N"),
+            (83, "SUBTOTAL SALDO INICIAL PAGADURIA", "N"), (85, "SALDO TOTAL EN BANCOS", "N"),
+        ]
+    ])
+    db_sqlite.add_all([
+        TransaccionFlujoCaja(fecha=FECHA, concepto_id=concepto_id, cuenta_id=1, monto=Decimal(monto),
+                             area=AreaTransaccion.pagaduria, compania_id=1)
+        for concepto_id, monto in [(53, "1500"), (54, "1000"), (55, "200")]
+    ])
+    db_sqlite.commit()
+    return db_sqlite
+
+
+def _recalcular(db):
+    service = DependenciasFlujoCajaService(db, paralelismo=1)
+    resultados = service.procesar_dependencias_completas_ambos_dashboards(
+        fecha=FECHA, cuenta_id=1, compania_id=1, usuario_id=7
+    )
+    return service, resultados
+
+
+def _converger(db):
+    """Con autoflush=False las celdas creadas en una pasada se ven en la siguiente"""
+    for _ in range(5):
+        service, _resultados = _recalcular(db)
+        if service.metricas["cambiadas"] == 0:
+            return
+    pytest.fail("el recálculo no converge")
+
+
+def _updates(db, funcion):
+    sentencias = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE transacciones_flujo_caja"):
+            sentencias.append(parameters)
+
+    event.listen(db.get_bind(), "before_cursor_execute", capturar)
+    try:
+        return funcion(), sentencias
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", capturar)
+
+
+def _montos(db):
+    db.expire_all()
+    return {
+        (t.fecha, t.concepto_id): (t.monto, t.version)
+        for t in db.query(TransaccionFlujoCaja).filter(TransaccionFlujoCaja.concepto_id.in_([52, 54, 82, 83, 85]))
+    }
+
+
+def test_segundo_recalculo_no_escribe_nada(db):
+    service, resultados = _recalcular(db)
+    assert {a["concepto_id"] for a in resultados["pagaduria"]} >= {52, 82, 83}
+    assert service.metricas["cambiadas"] > 0
+    _converger(db)
+    antes = _montos(db)
+    assert antes[(FECHA, 85)][0] == Decimal("800.00")
+    # Proyección 85 → 54 del próximo día hábil
+    assert antes[(date(2025, 3, 5), 54)][0] == Decimal("800.00")
+
+    (service, resultados), updates = _updates(db, lambda: _recalcular(db))
+
+    assert updates == []
+    assert resultados["pagaduria"] == [] and resultados["propagacion_dia_siguiente"] == []
+    assert service.metricas["cambiadas"] == 0
+    assert service.metricas["omitidas"] == service.metricas["evaluadas"] > 0
+    assert _montos(db) == antes
+
+
+def test_solo_se_escriben_las_celdas_que_cambian(db):
+    _converger(db)
+    saldos_bancos = db.query(TransaccionFlujoCaja).filter_by(concepto_id=53).one()
+    saldos_bancos.monto = Decimal("1700")
+    db.commit()
+
+    (service, resultados), updates = _updates(db, lambda: _recalcular(db))
+
+    # Solo DIFERENCIA SALDOS depende de SALDOS EN BANCOS: subtotales y proyecciones quedan intactos
+    assert [(a["concepto_id"], a["monto_nuevo"]) for a in resultados["pagaduria"]] == [(52, Decimal("700.00"))]
+    assert len(updates) == 1
+    assert service.metricas["cambiadas"] == 1
+    assert service.metricas["evaluadas"] == service.metricas["cambiadas"] + service.metricas["omitidas"]
@@ -0,0 +1,100 @@
+"""
+Pruebas del enrutamiento de lecturas con dos bases locales (primario y "réplica"):
+la réplica se usa salvo para el cliente que acaba de escribir (marca por cookie o header)
+o si no responde, y las sesiones de solo lectura rechazan escrituras
+"""
+import time
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base, EnrutadorLectura, MiddlewareMarcaEscritura
+from app.models.trm import TRM
+
+FECHA = date(2025, 3, 7)
+
+
+def _base(ruta, valor):
+    engine = create_engine(f"sqlite:///{ruta}")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as db:
+        db.add(TRM(fecha=FECHA, valor=Decimal(valor)))
+        db.commit()
+    return engine
+
+
+@pytest.fixture
+def bases(tmp_path):
+    # Valores distintos en cada base para saber de dónde leyó cada sesión
+    primario, replica = _base(tmp_path / "primario.db", "4000"), _base(tmp_path / "replica.db", "3999")
+    yield primario, replica
+    primario.dispose()
+    replica.dispose()
+
+
+def _leer(enrutador):
+    with enrutador.sesion() as db:
+        return db.query(TRM.valor).filter(TRM.fecha == FECHA).scalar()
+
+
+def test_quien_acaba_de_escribir_lee_del_primario(bases):
+    primario, replica = bases
+    enrutador = EnrutadorLectura(primario, replica, ventana=0.2, lag_maximo=30, intervalo=0)
+    enrutador.medir()
+
+    app = FastAPI()
+    app.add_middleware(MiddlewareMarcaEscritura, enrutador=enrutador)
+
+    @app.post("/trm")
+    def guardar():
+        with sessionmaker(bind=primario)() as db:
+            db.query(TRM).filter(TRM.fecha == FECHA).one().valor = Decimal("4100")
+            db.commit()
+
+    @app.get("/trm")
+    def leer():
+        return str(_leer(enrutador))
+
+    quien_guarda, otro = TestClient(app), TestClient(app)
+    assert Decimal(quien_guarda.get("/trm").json()) == Decimal("3999")
+
+    marca = quien_guarda.post("/trm").headers["x-ultima-escritura"]
+    assert Decimal(quien_guarda.get("/trm").json()) == Decimal("4100")  # La cookie viaja con el cliente
+    assert Decimal(otro.get("/trm").json()) == Decimal("3999")  # Los demás siguen en la réplica
+    # El header sirve igual (p. ej. un cliente que no envía cookies)
+    assert Decimal(otro.get("/trm", headers={"X-Ultima-Escritura": marca}).json()) == Decimal("4100")
+
+    time.sleep(0.25)
+    assert Decimal(quien_guarda.get("/trm").json()) == Decimal("3999")
+
+
+def test_sin_respuesta_de_la_replica_lee_del_primario(bases, tmp_path):
+    primario, _ = bases
+    caida = create_engine(f"sqlite:///{tmp_path / 'no-existe' / 'replica.db'}")
+    enrutador = EnrutadorLectura(primario, caida, ventana=0, lag_maximo=30, intervalo=60)
+    try:
+        # La medición corre en segundo plano: la lectura no espera a la réplica
+        assert _leer(enrutador) == Decimal("4000")
+        enrutador.medir()
+        assert _leer(enrutador) == Decimal("4000")
+        assert enrutador.estado()["responde"] is False
+    finally:
+        enrutador.detener()
+
+
+def test_sesion_de_solo_lectura_rechaza_escrituras(bases):
+    primario, replica = bases
+    enrutador = EnrutadorLectura(primario, replica, ventana=0, lag_maximo=30, intervalo=0)
+
+    with enrutador.sesion() as db:
+        db.add(TRM(fecha=date(2025, 3, 10), valor=Decimal("4050")))
+        with pytest.raises(RuntimeError, match="solo lectura"):
+            db.commit()
+        db.rollback()
+        with pytest.raises(RuntimeError):
+            db.query(TRM).filter(TRM.fecha == FECHA).delete()
@@ -0,0 +1,92 @@
+"""
+Pruebas de la ruta rápida de listados: tuplas → orjson con el mismo contenido que el response_model, y compresión
+"""
+import gzip
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.serializacion import UMBRAL_COMPRESION, dumps, respuesta_json
+from app.models import AreaConcepto, AreaTransaccion, Banco, Compania, ConceptoFlujoCaja, CuentaBancaria, TransaccionFlujoCaja
+from app.models.auditoria import RegistroAuditoria
+from app.schemas.auditoria import RegistroAuditoriaResponse
+from app.schemas.flujo_caja import TransaccionFlujoCajaResponse
+from app.services.auditoria_service import AuditoriaService
+from app.services.transaccion_flujo_caja_service import TransaccionFlujoCajaService
+
+FECHA = date(2025, 3, 4)
+
+
+@pytest.fixture
+def db(db_sqlite):
+    db_sqlite.add_all([
+        Compania(id=1, nombre="Bolívar"),
+        Compania(id=2, nombre="Capitalizadora"),
+        Banco(id=1, nombre="Banco de Bogotá"),
+        CuentaBancaria(id=1, numero_cuenta="001", compania_id=1, banco_id=1),
+        CuentaBancaria(id=2, numero_cuenta="002", compania_id=2, banco_id=1),
+        ConceptoFlujoCaja(id=5, nombre="INGRESO CLIENTES", codigo="I", area=AreaConcepto.tesoreria),
+        ConceptoFlujoCaja(id=60, nombre="NÓMINA", codigo="E", area=AreaConcepto.pagaduria, depende_de_concepto_id=5),
+    ])
+    db_sqlite.add_all([
+        TransaccionFlujoCaja(fecha=FECHA, concepto_id=5, cuenta_id=1, compania_id=1, monto=Decimal("1234.5"),
+                             area=AreaTransaccion.tesoreria, descripcion="Recaudo"),
+        TransaccionFlujoCaja(fecha=FECHA, concepto_id=60, cuenta_id=1, compania_id=1, monto=Decimal("-7"),
+                             area=AreaTransaccion.pagaduria),
+        TransaccionFlujoCaja(fecha=FECHA, concepto_id=5, cuenta_id=2, compania_id=2, monto=Decimal("99"),
+                             area=AreaTransaccion.tesoreria),
+    ])
+    db_sqlite.commit()
+    return db_sqlite
+
+
+def test_transacciones_por_fecha_igual_al_response_model(db):
+    service = TransaccionFlujoCajaService(db)
+    esperado = [
+        TransaccionFlujoCajaResponse.model_validate(t).model_dump(mode="json")
+        for t in service.obtener_transacciones_por_fecha(FECHA, companias_excluidas={2})
+    ]
+
+    rapido = service.listar_por_fecha_serializadas(FECHA, companias_excluidas={2})
+
+    assert len(rapido) == 2
+    assert json.loads(dumps(rapido)) == esperado
+    assert esperado[0]["monto"] == "1234.50"  # Decimal como texto, sin pasar por float
+
+
+def test_registros_auditoria_igual_al_response_model(db):
+    db.add(RegistroAuditoria(
+        usuario_id=7, usuario_nombre="Ana", usuario_email="ana@bolivar.com", accion="UPDATE", modulo="FLUJO_CAJA",
+        entidad="TransaccionFlujoCaja", entidad_id="1", descripcion="Edición", valores_nuevos={"monto": 10},
+        ip_address="10.0.0.1", fecha_hora=datetime(2025, 3, 4, 9, 15), resultado="EXITOSO"
+    ))
+    db.commit()
+
+    registros, total = AuditoriaService.obtener_registros_serializados(db, modulo="flujo_caja")
+    esperado, _ = AuditoriaService.obtener_registros(db, modulo="flujo_caja")
+
+    assert total == 1
+    assert json.loads(dumps(registros)) == [
+        RegistroAuditoriaResponse.model_validate(r).model_dump(mode="json") for r in esperado
+    ]
+
+
+def test_respuesta_comprimida_segun_accept_encoding():
+    contenido = {1: [{"monto": Decimal("10.00"), "fecha": FECHA} for _ in range(200)]}
+    cuerpo = dumps(contenido)
+    assert len(cuerpo) >= UMBRAL_COMPRESION
+    assert json.loads(cuerpo)["1"][0] == {"monto": "10.00", "fecha": "2025-03-04"}
+
+    comprimida = respuesta_json(SimpleNamespace(headers={"accept-encoding": "gzip, deflate"}), contenido)
+    assert comprimida.headers["content-encoding"] == "gzip"
+    assert comprimida.headers["vary"] == "Accept-Encoding"
+    assert gzip.decompress(comprimida.body) == cuerpo
+
+    rechazada = respuesta_json(SimpleNamespace(headers={"accept-encoding": "gzip;q=0"}), contenido)
+    assert "content-encoding" not in rechazada.headers and rechazada.body == cuerpo
+
+    pequena = respuesta_json(SimpleNamespace(headers={"accept-encoding": "gzip"}), {"ok": True})
+    assert "content-encoding" not in pequena.headers
@@ -0,0 +1,117 @@
+"""
+Pruebas del backfill de TRM por rango contra un stub local de Datos Abiertos
+"""
+import sys
+import os
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+BACK_FC = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, BACK_FC)
+
+from app.core.database import Base
+from app.models.trm import TRM
+from app.services.trm_service import TRMService, completar_por_vigencia
+from tests.stubs.datos_abiertos_stub import DatosAbiertosStub
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[TRM.__table__])
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def test_completar_por_vigencia():
+    """Fines de semana toman la vigencia del viernes; sin semilla no se inventan valores"""
+    vigencias = [(date(2025, 3, 7), Decimal("4100")), (date(2025, 3, 10), Decimal("4200"))]
+    fechas = [date(2025, 3, d) for d in (6, 7, 8, 9, 10)]
+
+    sin_semilla = completar_por_vigencia(fechas, vigencias)
+    assert date(2025, 3, 6) not in sin_semilla
+    assert sin_semilla[date(2025, 3, 8)] == Decimal("4100")
+    assert sin_semilla[date(2025, 3, 10)] == Decimal("4200")
+
+    con_semilla = completar_por_vigencia(fechas, vigencias, (date(2025, 3, 1), Decimal("4000")))
+    assert con_semilla[date(2025, 3, 6)] == Decimal("4000")
+
+
+def test_backfill_rango_una_consulta_paginada(db):
+    """Los faltantes se completan con una sola consulta al endpoint (paginada) y un upsert"""
+    db.add_all([TRM(fecha=date(2025, 3, 3), valor=Decimal("4000")), TRM(fecha=date(2025, 3, 5), valor=Decimal("4050"))])
+    db.commit()
+
+    publicadas = {date(2025, 2, d): "3990.10" for d in range(20, 29)}
+    publicadas.update({
+        date(2025, 3, 3): "4000.00",
+        date(2025, 3, 4): "4010.50",
+        date(2025, 3, 5): "4050.00",
+        date(2025, 3, 6): "4060.00",
+        date(2025, 3, 7): "4070.25",
+        date(2025, 3, 10): "4100.00",
+    })
+
+    service = TRMService()
+    with DatosAbiertosStub(publicadas) as stub:
+        service.scraper.urls["datos_abiertos"] = stub.url
+        resultado = service.backfill_rango(date(2025, 3, 3), date(2025, 3, 10), db=db)
+        pagina = service.scraper.get_trm_range_from_datos_abiertos(date(2025, 2, 20), date(2025, 3, 10), page_size=4)
+        consultas_paginadas = len(stub.requests) - 1
+
+    assert resultado["missing_count"] == 6
+    assert resultado["updated_count"] == 6
+    assert resultado["failed_count"] == 0
+    valores = {t.fecha: t.valor for t in db.query(TRM).all()}
+    assert valores[date(2025, 3, 4)] == Decimal("4010.50")
+    assert valores[date(2025, 3, 8)] == Decimal("4070.25")
+    assert valores[date(2025, 3, 9)] == Decimal("4070.25")
+    assert valores[date(2025, 3, 10)] == Decimal("4100.00")
+    assert valores[date(2025, 3, 5)] == Decimal("4050")
+
+    assert len(pagina) == len(publicadas)
+    assert consultas_paginadas == 4
+
+
+def test_backfill_sin_faltantes_no_consulta_endpoint(db):
+    db.add_all([TRM(fecha=date(2025, 3, d), valor=Decimal("4000")) for d in (1, 2)])
+    db.commit()
+    service = TRMService()
+    with DatosAbiertosStub({}) as stub:
+        service.scraper.urls["datos_abiertos"] = stub.url
+        resultado = service.backfill_rango(date(2025, 3, 1), date(2025, 3, 2), db=db)
+        assert stub.requests == []
+    assert resultado["missing_count"] == 0
+
+
+class _ScraperCaido:
+    def __init__(self, error=None):
+        self.error = error
+
+    def get_trm_range_from_datos_abiertos(self, desde, hasta):
+        if self.error:
+            raise self.error
+        return None
+
+
+def test_backfill_sin_datos_abiertos_solo_completa_fines_de_semana(db):
+    """Sin respuesta del endpoint los días hábiles quedan fallidos (el job reintenta)"""
+    db.add(TRM(fecha=date(2025, 3, 7), valor=Decimal("4070")))
+    db.commit()
+    service = TRMService()
+    service.scraper = _ScraperCaido()
+
+    resultado = service.backfill_rango(date(2025, 3, 8), date(2025, 3, 11), db=db)
+
+    assert (resultado["missing_count"], resultado["updated_count"], resultado["failed_count"]) == (4, 2, 2)
+    assert sorted(t.fecha for t in db.query(TRM).all()) == [date(2025, 3, 7), date(2025, 3, 8), date(2025, 3, 9)]
+    assert service._fechas_faltantes(date(2025, 3, 8), date(2025, 3, 11), db) == [date(2025, 3, 10), date(2025, 3, 11)]
+
+    service.scraper = _ScraperCaido(ConnectionError("timeout"))
+    resultado = service.backfill_rango(date(2025, 3, 10), date(2025, 3, 11), db=db)
+    assert resultado["success"] is False and resultado["failed_count"] == 2
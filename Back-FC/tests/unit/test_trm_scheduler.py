@@ -0,0 +1,124 @@
+"""
+Pruebas del runner de jobs TRM: el encolado y el arranque de la app no bloquean, hay
+reintentos, deduplicación y el apagado corta las esperas. El scraping se hace contra un
+stub local del endpoint de Datos Abiertos.
+"""
+import json
+import subprocess
+import sys
+import os
+import threading
+import time
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+BACK_FC = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, BACK_FC)
+sys.path.insert(0, os.path.join(BACK_FC, "scripts"))
+
+from app.services.trm_scheduler import TRMJobRunner
+from tests.stubs.datos_abiertos_stub import DatosAbiertosStub
+from trm.trm_scraper import TRMScraper
+
+
+def test_encolar_no_espera_al_scraping():
+    """Encolar un job que consulta un endpoint lento retorna de inmediato"""
+    fecha = date(2025, 3, 4)
+    runner = TRMJobRunner(max_workers=1, max_retries=0)
+    with DatosAbiertosStub({fecha: "4123.45"}, delay=0.5) as stub:
+        scraper = TRMScraper()
+        scraper.urls["datos_abiertos"] = stub.url
+
+        inicio = time.perf_counter()
+        future = runner.encolar("scrape", scraper.get_trm_from_datos_abiertos, fecha)
+        duracion_encolado = time.perf_counter() - inicio
+
+        resultado = future.result(timeout=5)
+    runner.detener()
+
+    assert duracion_encolado < 0.1
+    assert resultado == {"valor": Decimal("4123.45"), "vigenciadesde": fecha}
+
+
+def test_arranque_de_la_app_no_espera_al_backfill(tmp_path):
+    """El startup real solo encola el backfill; al apagar no se espera el backoff de los reintentos"""
+    url = f"sqlite:///{tmp_path / 'arranque.db'}"
+    subprocess.run([sys.executable, os.path.join(BACK_FC, "scripts", "setup", "crear_esquema.py"), "--db", url],
+                   cwd=BACK_FC, capture_output=True, check=True)
+    codigo = (
+        "import json, time; from fastapi.testclient import TestClient; import app.main; "
+        "cliente = TestClient(app.main.app); inicio = time.perf_counter(); cliente.__enter__(); "
+        "arranque = time.perf_counter() - inicio; cliente.__exit__(None, None, None); "
+        "print('ARRANQUE', json.dumps({'arranque': arranque}))"
+    )
+    # Sin TRMs en el stub el backfill falla y se reintentaría en 30 s
+    with DatosAbiertosStub({}, delay=0.5) as stub:
+        env = {
+            **os.environ, "DATABASE_URL": url, "TRM_DATOS_ABIERTOS_URL": stub.url,
+            "TRM_BANREP_URL": stub.url.replace("32sa-8pi3.json", "banrep"), "TRM_STARTUP_BACKFILL_DAYS": "5",
+            "TRM_JOB_MAX_RETRIES": "3", "TRM_JOB_RETRY_BASE_SECONDS": "30",
+        }
+        inicio = time.perf_counter()
+        salida = subprocess.run([sys.executable, "-c", codigo], cwd=BACK_FC, env=env,
+                                capture_output=True, text=True, check=True, timeout=60)
+        duracion_proceso = time.perf_counter() - inicio
+
+    linea = next(l for l in salida.stdout.splitlines() if l.startswith("ARRANQUE "))
+    assert json.loads(linea.split(" ", 1)[1])["arranque"] < 0.4  # El stub tarda 0.5 s por consulta
+    assert stub.requests  # El backfill sí consultó el stub, en segundo plano
+    assert duracion_proceso < 20
+
+
+def test_detener_corta_la_espera_del_reintento():
+    runner = TRMJobRunner(max_workers=1, max_retries=3, retry_base_seconds=30)
+    fallo = threading.Event()
+
+    def job_caido():
+        fallo.set()
+        raise RuntimeError("fuente no disponible")
+
+    future = runner.encolar("caido", job_caido)
+    assert fallo.wait(5)
+    inicio = time.perf_counter()
+    runner.detener()
+
+    assert future.result(timeout=5) is None
+    assert time.perf_counter() - inicio < 1
+
+
+def test_reintentos_con_jitter():
+    runner = TRMJobRunner(max_workers=1, max_retries=3, retry_base_seconds=0.01)
+    intentos = []
+
+    def job_inestable():
+        intentos.append(1)
+        if len(intentos) < 3:
+            raise RuntimeError("fuente no disponible")
+        return "ok"
+
+    assert runner.encolar("inestable", job_inestable).result(timeout=5) == "ok"
+    assert len(intentos) == 3
+
+    def job_roto():
+        raise RuntimeError("siempre falla")
+
+    with pytest.raises(RuntimeError):
+        runner.encolar("roto", job_roto).result(timeout=5)
+    runner.detener()
+
+
+def test_no_duplica_jobs_en_curso():
+    runner = TRMJobRunner(max_workers=2, max_retries=0)
+    liberar = threading.Event()
+
+    primero = runner.encolar("backfill", liberar.wait, 5)
+    segundo = runner.encolar("backfill", liberar.wait, 5)
+    assert primero is segundo
+    assert runner.estado() == {"backfill": "ejecutando"}
+
+    liberar.set()
+    primero.result(timeout=5)
+    assert runner.estado() == {"backfill": "completado"}
+    runner.detener()
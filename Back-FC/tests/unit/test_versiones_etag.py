@@ -0,0 +1,144 @@
+"""
+Pruebas de los contadores de versión por dominio y de los GET condicionales (ETag / 304)
+"""
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from fastapi import Depends, FastAPI, Request
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import get_db
+from app.core.etag import VersionCondicional, verificar_version
+from app.core.serializacion import respuesta_json
+from app.models import AreaConcepto, AreaTransaccion, Banco, Compania, ConceptoFlujoCaja, CuentaBancaria, TransaccionFlujoCaja
+from app.models.version_datos import CLAVE_GLOBAL, claves_transacciones, leer_versiones
+
+DIA_1, DIA_2 = date(2025, 3, 4), date(2025, 3, 5)
+
+
+@pytest.fixture
+def db(db_sqlite):
+    db_sqlite.add_all([
+        Compania(id=1, nombre="Bolívar"),
+        Banco(id=1, nombre="Banco de Bogotá"),
+        CuentaBancaria(id=1, numero_cuenta="001", compania_id=1, banco_id=1),
+        ConceptoFlujoCaja(id=5, nombre="INGRESO CLIENTES", codigo="I", area=AreaConcepto.tesoreria),
+    ])
+    db_sqlite.commit()
+    return db_sqlite
+
+
+def _version(db, fecha, area="tesoreria"):
+    return leer_versiones(db, [("transacciones", f"{fecha.isoformat()}:{area}")])[0]
+
+
+def test_escrituras_incrementan_solo_su_dia_y_area(db):
+    assert leer_versiones(db, [("conceptos", CLAVE_GLOBAL), ("cuentas", CLAVE_GLOBAL)]) == [1, 1]
+    transaccion = TransaccionFlujoCaja(fecha=DIA_1, concepto_id=5, cuenta_id=1, compania_id=1,
+                                       monto=Decimal("10"), area=AreaTransaccion.tesoreria)
+    db.add(transaccion)
+    db.commit()
+    assert (_version(db, DIA_1), _version(db, DIA_1, "pagaduria"), _version(db, DIA_2)) == (1, 0, 0)
+
+    # Mismo monto: no es una modificación, la versión no cambia
+    transaccion.monto = Decimal("10.00")
+    db.commit()
+    assert _version(db, DIA_1) == 1
+
+    # Mover la transacción de día invalida el origen y el destino
+    transaccion.fecha = DIA_2
+    db.commit()
+    assert (_version(db, DIA_1), _version(db, DIA_2)) == (2, 1)
+
+    # El contador no se toca dentro de la transacción que escribe (no retiene su bloqueo)
+    transaccion.monto = Decimal("99")
+    db.flush()
+    assert _version(db, DIA_2) == 1
+
+    # Una escritura revertida no cambia la versión
+    db.rollback()
+    assert _version(db, DIA_2) == 1
+
+    # Las sentencias masivas incrementan la clave global del dominio
+    db.query(TransaccionFlujoCaja).filter_by(fecha=DIA_2).update({"monto": Decimal("5")})
+    db.commit()
+    assert leer_versiones(db, [("transacciones", CLAVE_GLOBAL)]) == [1]
+
+
+def test_get_condicional_responde_304_hasta_que_cambian_los_datos(db, sqlite_engine):
+    Sesion = sessionmaker(bind=sqlite_engine, autoflush=False)
+    consultas = []
+
+    app = FastAPI()
+
+    @app.get("/conceptos", dependencies=[Depends(VersionCondicional("conceptos"))])
+    def conceptos(sesion=Depends(get_db)):
+        consultas.append("conceptos")
+        return [c.nombre for c in sesion.query(ConceptoFlujoCaja).order_by(ConceptoFlujoCaja.id)]
+
+    @app.get("/fecha/{fecha}")
+    def por_fecha(request: Request, fecha: date, sesion=Depends(get_db)):
+        verificar_version(request, sesion, claves_transacciones(fecha))
+        return respuesta_json(request, {"fecha": fecha})
+
+    def sesion_prueba():
+        sesion = Sesion()
+        try:
+            yield sesion
+        finally:
+            sesion.close()
+
+    app.dependency_overrides[get_db] = sesion_prueba
+    cliente = TestClient(app)
+
+    primera = cliente.get("/conceptos")
+    etag = primera.headers["etag"]
+    assert primera.status_code == 200 and primera.headers["cache-control"] == "private, no-cache"
+
+    repetida = cliente.get("/conceptos", headers={"If-None-Match": etag})
+    assert repetida.status_code == 304 and repetida.content == b""
+    assert repetida.headers["etag"] == etag
+    assert consultas == ["conceptos"]  # El 304 no ejecuta el endpoint
+
+    db.add(ConceptoFlujoCaja(id=6, nombre="OTROS", codigo="I", area=AreaConcepto.tesoreria))
+    db.commit()
+    cambiada = cliente.get("/conceptos", headers={"If-None-Match": etag})
+    assert cambiada.status_code == 200 and cambiada.json() == ["INGRESO CLIENTES", "OTROS"]
+    assert cambiada.headers["etag"] != etag
+
+    # Respuestas directas (orjson) también llevan el ETag
+    dia = cliente.get(f"/fecha/{DIA_1}")
+    assert cliente.get(f"/fecha/{DIA_1}", headers={"If-None-Match": dia.headers["etag"]}).status_code == 304
+    db.add(TransaccionFlujoCaja(fecha=DIA_1, concepto_id=5, cuenta_id=1, compania_id=1,
+                                monto=Decimal("1"), area=AreaTransaccion.pagaduria))
+    db.commit()
+    assert cliente.get(f"/fecha/{DIA_1}", headers={"If-None-Match": dia.headers["etag"]}).status_code == 200
+
+
+def test_304_por_la_app_real_sin_cuerpo_y_con_cabeceras(db, sqlite_engine):
+    from app.main import app
+
+    Sesion = sessionmaker(bind=sqlite_engine, autoflush=False)
+
+    def sesion_prueba():
+        sesion = Sesion()
+        try:
+            yield sesion
+        finally:
+            sesion.close()
+
+    app.dependency_overrides[get_db] = sesion_prueba
+    try:
+        cliente = TestClient(app)
+        primera = cliente.get("/api/v1/dias-habiles/festivos")
+        assert primera.status_code == 200
+
+        repetida = cliente.get("/api/v1/dias-habiles/festivos", headers={"If-None-Match": primera.headers["etag"]})
+        assert repetida.status_code == 304 and repetida.content == b""
+        assert repetida.headers.get("content-length", "0") == "0"
+        assert repetida.headers["etag"] == primera.headers["etag"]
+        assert repetida.headers["cache-control"] == "private, no-cache"
+    finally:
+        app.dependency_overrides.pop(get_db, None)
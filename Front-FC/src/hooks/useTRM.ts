@@ -16,9 +16,8 @@ export const useTRM = () => {
       setLoading(true);
       setError(null);
       
-      // Agregar timestamp para evitar cache
-      const timestamp = new Date().getTime();
-      const response = await fetch(`http://localhost:8000/api/v1/trm/current?_t=${timestamp}`);
+      // El backend responde con ETag y Cache-Control: no-cache: el navegador revalida y reutiliza su copia (304)
+      const response = await fetch(`http://localhost:8000/api/v1/trm/current`);
       
       if (!response.ok) {
         throw new Error('Error al obtener TRM');
@@ -39,9 +38,8 @@ export const useTRM = () => {
       setLoading(true);
       setError(null);
       
-      // Agregar timestamp para evitar cache
-      const timestamp = new Date().getTime();
-      const response = await fetch(`http://localhost:8000/api/v1/trm/by-date/${fecha}?_t=${timestamp}`);
+      // El backend responde con ETag y Cache-Control: no-cache: el navegador revalida y reutiliza su copia (304)
+      const response = await fetch(`http://localhost:8000/api/v1/trm/by-date/${fecha}`);
       
       if (!response.ok) {
         if (response.status === 404) {
@@ -62,9 +60,8 @@ export const useTRM = () => {
 
   const getTRMRange = async (fechaInicio?: string, fechaFin?: string, limit = 30): Promise<TRM[]> => {
     try {
-      // Agregar timestamp para evitar cache
-      const timestamp = new Date().getTime();
-      let url = `http://localhost:8000/api/v1/trm/range?limit=${limit}&_t=${timestamp}`;
+      // El backend responde con ETag y Cache-Control: no-cache: el navegador revalida y reutiliza su copia (304)
+      let url = `http://localhost:8000/api/v1/trm/range?limit=${limit}`;
       
       if (fechaInicio) {
         url += `&fecha_inicio=${fechaInicio}`;
@@ -21,8 +21,8 @@ export const useTRMByDate = (fecha?: string) => {
       console.log(`🔍 Obteniendo TRM para fecha: ${targetDate}`);
       
       // Intentar obtener TRM de la fecha específica
-      const timestamp = new Date().getTime();
-      let response = await fetch(`http://localhost:8000/api/v1/trm/by-date/${targetDate}?_t=${timestamp}`);
+      // El backend responde con ETag y Cache-Control: no-cache: el navegador revalida y reutiliza su copia (304)
+      let response = await fetch(`http://localhost:8000/api/v1/trm/by-date/${targetDate}`);
       
       if (response.ok) {
         const data = await response.json();
@@ -36,7 +36,7 @@ export const useTRMByDate = (fecha?: string) => {
       
       // Obtener TRM más reciente hasta esa fecha
       const rangeResponse = await fetch(
-        `http://localhost:8000/api/v1/trm/range?fecha_fin=${targetDate}&limit=1&_t=${timestamp}`
+        `http://localhost:8000/api/v1/trm/range?fecha_fin=${targetDate}&limit=1`
       );
       
       if (rangeResponse.ok) {
@@ -51,7 +51,7 @@ export const useTRMByDate = (fecha?: string) => {
       
       // Si no se encuentra ninguna TRM, usar la actual como fallback
       console.log(`⚠️ No se encontró TRM anterior, usando TRM actual como fallback`);
-      const currentResponse = await fetch(`http://localhost:8000/api/v1/trm/current?_t=${timestamp}`);
+      const currentResponse = await fetch(`http://localhost:8000/api/v1/trm/current`);
       
       if (currentResponse.ok) {
         const currentData = await currentResponse.json();